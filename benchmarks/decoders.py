@@ -0,0 +1,108 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Multi-record BTP response decoding benchmark
+
+Decodes synthetic Get Attributes and Discover Characteristics responses
+of growing size and prints the time spent per record. With decoders
+walking the response in place the time per record stays flat.
+
+    python -m benchmarks.decoders [--records 1000] [--repeat 5]
+"""
+
+import argparse
+import struct
+import timeit
+
+from pybtp import btp
+
+SIZES = (125, 250, 500, 1000)
+
+
+def gen_attrs(count):
+    """Get Attributes response records, 16 and 128-bit UUID types"""
+    records = bytearray()
+
+    for hdl in range(1, count + 1):
+        if hdl % 2:
+            uuid = struct.pack('<H', 0x2803)
+        else:
+            uuid = bytes(range(16))
+        records += struct.pack('<HBB', hdl, 0x01, len(uuid)) + uuid
+
+    return bytes(records)
+
+
+def gen_chrcs(count):
+    """Discover Characteristics response records"""
+    records = bytearray()
+
+    for hdl in range(1, 2 * count, 2):
+        records += struct.pack('<HHBBH', hdl, hdl + 1, 0x02, 2, 0x2a19)
+
+    return bytes(records)
+
+
+def decode_attrs(data, count):
+    return list(btp.gatts_iter_attrs_rp(data, count))
+
+
+def decode_chrcs(data, count):
+    return list(btp.gatt_iter_disc_rsp(data, "characteristic", count))
+
+
+BENCHMARKS = (
+    ("gatts_get_attrs", gen_attrs, decode_attrs),
+    ("gatt_disc_chrc", gen_chrcs, decode_chrcs),
+)
+
+
+def run(sizes, repeat):
+    results = {}
+
+    for name, gen, decode in BENCHMARKS:
+        for count in sizes:
+            data = gen(count)
+            assert len(decode(data, count)) == count
+
+            timer = timeit.Timer(lambda: decode(data, count))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat, number)) / number
+
+            results[(name, count)] = best
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, action='append',
+                        help="Number of records, can be given many times")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of timing repetitions")
+    args = parser.parse_args()
+
+    sizes = args.records or SIZES
+    results = run(sizes, args.repeat)
+
+    print("%-16s %8s %12s %14s" % ("decoder", "records", "total [ms]",
+                                    "per rec [us]"))
+    for (name, count), best in results.items():
+        print("%-16s %8d %12.3f %14.3f" % (name, count, best * 1e3,
+                                           best * 1e6 / count))
+
+
+if __name__ == "__main__":
+    main()
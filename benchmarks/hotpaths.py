@@ -0,0 +1,450 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Microbenchmarks of the pybtp and stack hot paths
+
+Frame coding, the BTP socket and worker over a socketpair standing in
+for the IUT, event dispatch, advertising data, response decoders, GATT
+database lookups and UUID conversion are timed on synthetic data, no
+hardware is needed. The median time per call of --repeat timings and
+their range, the noise of the benchmark, are reported.
+
+Results are saved as a JSON baseline and later runs compared against
+it. A benchmark is slower if its median grew by more than --threshold
+percent and every timing of the run is slower than every timing of the
+baseline, changes within the noise are not flagged. The exit status is
+1 if a benchmark got slower:
+
+    python -m benchmarks.hotpaths --save baseline.json
+    python -m benchmarks.hotpaths --compare baseline.json [--filter gatt]
+"""
+
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import functools
+import json
+import platform
+import socket
+import struct
+import sys
+import threading
+import timeit
+
+from benchmarks.decoders import gen_attrs, gen_chrcs
+from common.utils import percentile
+from pybtp import btp, defs, parser
+from pybtp import messages as msgs
+from pybtp.btp import BTPEventHandler
+from pybtp.btp_socket import BTPSocket
+from pybtp.btp_worker import BTPWorker
+from pybtp.types import AdType
+from stack.gap import BleAddress
+from stack.gatt import GattDB, GattPrimary, GattCharacteristic, \
+    GattCharacteristicDescriptor
+from stack.stack import Stack
+
+# Name -> context manager factory yielding the function to time
+BENCHMARKS = {}
+
+LISTENERS = (1, 10, 100)
+
+DB_SIZES = (10, 100, 1000)
+
+# Records of the decoded responses, the count is a single byte
+RECORDS = 100
+
+PAYLOAD = bytes(range(20))
+
+
+def benchmark(name, *params):
+    """Register f as benchmark name, or name/param for every param"""
+    def register(f):
+        f = contextlib.contextmanager(f)
+        if not params:
+            BENCHMARKS[name] = f
+        for param in params:
+            BENCHMARKS["%s/%s" % (name, param)] = functools.partial(f, param)
+        return f
+    return register
+
+
+@benchmark("parser.dec_hdr")
+def bench_dec_hdr():
+    hdr = parser.enc_frame(defs.BTP_SERVICE_ID_GAP, defs.GAP_EV_DEVICE_FOUND,
+                           0, PAYLOAD)[:parser.HDR_LEN]
+    yield lambda: parser.dec_hdr(hdr)
+
+
+@benchmark("parser.dec_data")
+def bench_dec_data():
+    data = bytearray(PAYLOAD)
+    yield lambda: parser.dec_data(data)
+
+
+@benchmark("parser.enc_frame")
+def bench_enc_frame():
+    yield lambda: parser.enc_frame(defs.BTP_SERVICE_ID_GATT,
+                                   defs.GATT_READ, 0, PAYLOAD)
+
+
+class PairSocket(BTPSocket):
+    """BTPSocket on one end of a socketpair, the IUT on the other"""
+
+    def __init__(self):
+        super(__class__, self).__init__(None)
+        self.conn, self.iut = socket.socketpair()
+
+    def open(self):
+        pass
+
+    def accept(self, timeout=10.0):
+        pass
+
+    def close(self):
+        self.conn.close()
+        self.iut.close()
+
+
+def recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def iut_drain(sock):
+    with contextlib.suppress(OSError):
+        while sock.recv(65536):
+            pass
+
+
+def iut_respond(sock):
+    """Answer every command with an empty response"""
+    with contextlib.suppress(OSError, EOFError):
+        while True:
+            hdr = parser.dec_hdr(recv_exact(sock, parser.HDR_LEN))
+            recv_exact(sock, hdr.data_len)
+            sock.sendall(parser.enc_frame(hdr.svc_id, hdr.op,
+                                          hdr.ctrl_index, b""))
+
+
+@contextlib.contextmanager
+def worker_over_pair(iut_f=None):
+    btp_socket = PairSocket()
+    worker = BTPWorker(btp_socket, "BenchRxWorker")
+    worker.accept()
+    iut = None
+    if iut_f is not None:
+        iut = threading.Thread(target=iut_f, args=(btp_socket.iut,),
+                               daemon=True)
+        iut.start()
+    try:
+        yield worker, btp_socket.iut
+    finally:
+        # The IUT end sees the end of the stream and stops
+        worker.close()
+        if iut is not None:
+            iut.join()
+
+
+@benchmark("btp_socket.read")
+def bench_socket_read():
+    btp_socket = PairSocket()
+    frame = parser.enc_frame(defs.BTP_SERVICE_ID_GAP,
+                             defs.GAP_EV_DEVICE_FOUND, 0, PAYLOAD)
+
+    def read():
+        btp_socket.iut.sendall(frame)
+        return btp_socket.read()
+
+    try:
+        yield read
+    finally:
+        btp_socket.close()
+
+
+@benchmark("btp_worker.send")
+def bench_worker_send():
+    with worker_over_pair(iut_drain) as (worker, _):
+        yield lambda: worker.send(defs.BTP_SERVICE_ID_GATT, defs.GATT_READ,
+                                  0, PAYLOAD)
+
+
+@benchmark("btp_worker.read")
+def bench_worker_read():
+    frame = parser.enc_frame(defs.BTP_SERVICE_ID_GATT, defs.GATT_READ, 0,
+                             PAYLOAD)
+
+    with worker_over_pair() as (worker, iut):
+        def read():
+            iut.sendall(frame)
+            return worker.read()
+
+        yield read
+
+
+@benchmark("btp_worker.send_wait_rsp")
+def bench_worker_send_wait_rsp():
+    with worker_over_pair(iut_respond) as (worker, _):
+        yield lambda: worker.send_wait_rsp(defs.BTP_SERVICE_ID_GATT,
+                                           defs.GATT_READ, 0, PAYLOAD)
+
+
+class BenchIut:
+    """Just enough of an IutCtl for the event handler"""
+
+    def __init__(self):
+        self.stack = Stack("bench")
+        self.stack.gap_init()
+
+    def get_type(self):
+        return "bench"
+
+    def __str__(self):
+        return "BenchIut"
+
+
+@benchmark("btp_event_handler.dispatch", *LISTENERS)
+def bench_event_dispatch(listeners):
+    iut = BenchIut()
+    handler = BTPEventHandler(iut)
+    ev = msgs.GapDeviceFoundEv(BleAddress("00:11:22:33:44:55", 0), 200, 4,
+                               bytes([3, AdType.uuid16_some, 0x0d, 0x18]))
+    data = ev.encode()
+    hdr = parser.Header(defs.BTP_SERVICE_ID_GAP, defs.GAP_EV_DEVICE_FOUND,
+                        0, len(data))
+
+    # Listeners waiting for another device, as while scanning
+    for _ in range(listeners):
+        handler.wait_for_event(defs.BTP_SERVICE_ID_GAP,
+                               defs.GAP_EV_DEVICE_FOUND, lambda adv: False)
+
+    def dispatch():
+        iut.stack.gap.found_devices.data.clear()
+        return handler(hdr, (data,))
+
+    try:
+        yield dispatch
+    finally:
+        handler.clear_listeners()
+        handler.executor.shutdown()
+
+
+AD = bytes([2, AdType.flags, 0x06,
+            9, AdType.uuid16_some, 0x0d, 0x18, 0x0f, 0x18, 0x0a, 0x18,
+            0x09, 0x18,
+            8, AdType.name_full]) + b"btptest"
+
+
+@benchmark("btp.parse_ad")
+def bench_parse_ad():
+    yield lambda: btp.parse_ad(AD)
+
+
+@benchmark("btp.ad_find_uuid16")
+def bench_ad_find_uuid16():
+    ad = btp.parse_ad(AD)
+    yield lambda: btp.ad_find_uuid16(ad)
+
+
+def gen_svcs(count):
+    """GATT client Discover Primary Services response records"""
+    records = bytearray()
+
+    for hdl in range(1, 10 * count, 10):
+        records += struct.pack('<HHBH', hdl, hdl + 9, 2, 0x180d)
+
+    return bytes(records)
+
+
+@benchmark("btp.dec_gatts_get_attrs_rp")
+def bench_dec_gatts_get_attrs_rp():
+    data = bytes([RECORDS]) + gen_attrs(RECORDS)
+    yield lambda: btp.dec_gatts_get_attrs_rp(data, len(data))
+
+
+@benchmark("btp.gatt_dec_disc_rsp")
+def bench_gatt_dec_disc_rsp():
+    data = bytes([RECORDS]) + gen_chrcs(RECORDS)
+    yield lambda: btp.gatt_dec_disc_rsp(data, "characteristic")
+
+
+@benchmark("btp.gatt_cl_dec_disc_rsp")
+def bench_gatt_cl_dec_disc_rsp():
+    data = bytes([RECORDS]) + gen_svcs(RECORDS)
+    yield lambda: btp.gatt_cl_dec_disc_rsp(data, "service")
+
+
+def gen_db(size):
+    """GattDB of size attributes, services of a characteristic, its
+    value and a descriptor, and the UUID of the last characteristic
+    """
+    db = GattDB()
+    uuid = None
+    for hdl in range(1, size + 1, 4):
+        uuid = "%04x" % (0x2a00 + hdl)
+        db.attr_add(hdl, GattPrimary(hdl, 0x01, "180d", None, hdl + 3))
+        db.attr_add(hdl + 1, GattCharacteristic(hdl + 1, 0x01, uuid, None,
+                                                0x02, hdl + 2))
+        db.attr_add(hdl + 2, GattCharacteristicDescriptor(
+            hdl + 2, 0x01, uuid, None, PAYLOAD))
+        db.attr_add(hdl + 3, GattCharacteristicDescriptor(
+            hdl + 3, 0x01, "2902", None, b"\x00\x00"))
+    return db, uuid
+
+
+@benchmark("gatt_db.attr_lookup_handle", *DB_SIZES)
+def bench_attr_lookup_handle(size):
+    db, _ = gen_db(size)
+    yield lambda: db.attr_lookup_handle(size // 2)
+
+
+@benchmark("gatt_db.find_chr_by_uuid", *DB_SIZES)
+def bench_find_chr_by_uuid(size):
+    db, uuid = gen_db(size)
+    yield lambda: db.find_chr_by_uuid(uuid)
+
+
+@benchmark("gatt_db.get_attributes", *DB_SIZES)
+def bench_get_attributes(size):
+    db, _ = gen_db(size)
+    yield db.get_attributes
+
+
+@benchmark("btp.btp2uuid", 16, 128)
+def bench_btp2uuid(bits):
+    uuid = bytes(range(bits // 8))
+    yield lambda: btp.btp2uuid(len(uuid), uuid)
+
+
+def run(names, repeat):
+    """Name -> median, min and max seconds per call of the repeated
+    timings of every benchmark in names
+    """
+    results = {}
+
+    for name in names:
+        with BENCHMARKS[name]() as f:
+            f()
+            timer = timeit.Timer(f)
+            number, _ = timer.autorange()
+            timings = sorted(t / number
+                             for t in timer.repeat(repeat, number))
+            results[name] = {'median': percentile(timings, 50),
+                             'min': timings[0], 'max': timings[-1]}
+
+    return results
+
+
+def spread(result):
+    """Range of the timings in percent of the median"""
+    return 100 * (result['max'] - result['min']) / result['median']
+
+
+def save(path, results):
+    with open(path, "w") as baseline_file:
+        json.dump({
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, baseline_file, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """Print results against baseline, returns the names slower than
+    threshold percent and outside the noise of both runs
+    """
+    slower = []
+
+    print("%-36s %12s %12s %9s %9s" % ("benchmark", "base [us]", "now [us]",
+                                       "change", "noise"))
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print("%-36s %12s %12.3f %9s %8.1f%%" % (
+                name, "-", result['median'] * 1e6, "new", spread(result)))
+            continue
+
+        change = 100 * (result['median'] - base['median']) / base['median']
+        mark = ""
+        if change > threshold and result['min'] > base['max']:
+            mark = " SLOWER"
+            slower.append(name)
+        elif change < -threshold and result['max'] < base['min']:
+            mark = " faster"
+        print("%-36s %12.3f %12.3f %+8.1f%% %8.1f%%%s" % (
+            name, base['median'] * 1e6, result['median'] * 1e6, change,
+            max(spread(base), spread(result)), mark))
+
+    return slower
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--filter', type=str, action='append',
+                            help="Only benchmarks matching the glob, "
+                                 "e.g. 'gatt_db.*', can be given many times")
+    arg_parser.add_argument('--repeat', type=int, default=5,
+                            help="Number of timing repetitions")
+    arg_parser.add_argument('--save', type=str, metavar='FILE',
+                            help="Write the results as JSON baseline")
+    arg_parser.add_argument('--compare', type=str, metavar='FILE',
+                            help="Compare the results to a JSON baseline")
+    arg_parser.add_argument('--threshold', type=float, default=10.0,
+                            help="Change of the median in percent reported "
+                                 "as slower or faster if outside the noise, "
+                                 "default %(default)s")
+    arg_parser.add_argument('--list', action='store_true',
+                            help="List the benchmarks")
+    args = arg_parser.parse_args()
+
+    names = [name for name in BENCHMARKS
+             if not args.filter or
+             any(fnmatch.fnmatch(name, pattern) for pattern in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = run(names, args.repeat)
+
+    if args.save is not None:
+        save(args.save, results)
+
+    if args.compare is None:
+        print("%-36s %12s %9s" % ("benchmark", "time [us]", "noise"))
+        for name, result in results.items():
+            print("%-36s %12.3f %8.1f%%" % (name, result['median'] * 1e6,
+                                            spread(result)))
+        return 0
+
+    with open(args.compare, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    print("Baseline %s, Python %s, %s\n" % (
+        baseline.get('created'), baseline.get('python'),
+        baseline.get('platform')))
+    slower = compare(results, baseline['results'], args.threshold)
+    print("\n%d of %d benchmarks slower by more than %.0f%% and the "
+          "noise" % (len(slower), len(results), args.threshold))
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
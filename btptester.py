@@ -14,19 +14,41 @@
 # limitations under the License.
 #
 import argparse
+import functools
 import logging
 import unittest
 import signal
 import sys
 import threading
-import time
 
+from common import metrics, profiling, results, results_db, sharding, \
+    timeouts, tracing
 from common.board import NordicBoard
 from common.iutctl import IutCtl
+from common.watchdog import Watchdog
 from projects.android.iutctl import AndroidCtl
 from projects.mynewt.iutctl import MynewtCtl
+from pybtp import btp
 from testcases.GattTestCase import GattTestCase
+from testcases.GapBenchmarkTestCase import GapBenchmarkTestCase
+from testcases.GattBenchmarkTestCase import GattBenchmarkTestCase
+from testcases.L2capBenchmarkTestCase import L2capBenchmarkTestCase
+from testcases.MultiLinkTestCase import MultiLinkTestCase, \
+    MultiLinkBenchmarkTestCase
 from testcases.GapTestCase import GapTestCase
+from testcases.fixtures import group_by_fixture, order_by_fixture, \
+    release_fixtures
+
+
+def shard_arg(value):
+    """Parse I/N of --shard, I counting from 1"""
+    try:
+        index, count = (int(v) for v in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, e.g. 1/4")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("shard must be within 1/N to N/N")
+    return index - 1, count
 
 
 def main():
@@ -40,7 +62,10 @@ def main():
                         help='OS and serial number for central IUT')
     parser.add_argument('--peripheral', type=str, nargs=2, \
                         metavar=('OS', 'serial number'), required=True, \
-                        help='OS and serial number for peripheral IUT')
+                        action='append',
+                        help='OS and serial number for peripheral IUT. '
+                             'Repeat for multi link tests with one central '
+                             'and several peripherals')
 
     parser.add_argument('--flash-central', type=str, nargs=2, \
                         metavar=('board name', 'project path'), \
@@ -49,6 +74,13 @@ def main():
                         metavar=('board name', 'project path'), \
                         help='Build the OS specified in --peripheral and flash the board')
 
+    parser.add_argument('--central-build', type=str,
+                        help='Firmware build label of the central IUT, '
+                             'benchmark results are aggregated by it')
+    parser.add_argument('--peripheral-build', type=str,
+                        help='Firmware build label of the peripheral IUT, '
+                             'benchmark results are aggregated by it')
+
     parser.add_argument('--rerun-reverse', action='store_true',
                         help='After completion, switch roles and rerun the tests')
 
@@ -58,12 +90,85 @@ def main():
                         help='Run the tests again after completion until one test fails')
     parser.add_argument('--fail-fast', action='store_true',
                         help='Stops the run at first failure'),
+    parser.add_argument('--retry-failed', type=int, default=0,
+                        metavar='N',
+                        help='Rerun only the failed tests, up to N times. '
+                             'Tests passing on a retry are reported as '
+                             'passed after retry')
+    parser.add_argument('--result-file', type=str,
+                        help='Write the verdict of every test as JSON lines')
+    parser.add_argument('--rerun-failed-from', type=str, metavar='FILE',
+                        help='Run the tests that failed in a result file '
+                             'written with --result-file')
+    sharding_group = parser.add_mutually_exclusive_group()
+    sharding_group.add_argument('--shard', type=shard_arg, metavar='I/N',
+                                help='Run the I-th of N parts of the tests, '
+                                     'balanced by their durations in the '
+                                     'results database')
+    sharding_group.add_argument('--work-queue', type=str, metavar='FILE',
+                                help='Take the tests from a queue shared '
+                                     'with other btptester processes, '
+                                     'longest first, until it is empty')
+    parser.add_argument('--history-db', type=str,
+                        default=results_db.RESULTS_DB, metavar='FILE',
+                        help='Results database estimating test durations '
+                             'for --shard and --work-queue and wait '
+                             'latencies for --adaptive-timeouts, '
+                             'default %(default)s')
+    parser.add_argument('--adaptive-timeouts', action='store_true',
+                        help='Shorten every wait to the 99th percentile of '
+                             'its latencies in the results database times '
+                             'a safety margin, capped at its static timeout')
+    parser.add_argument('--timeout-override', type=float, metavar='SECONDS',
+                        help='Wait SECONDS for every response, event and '
+                             'procedure, for debugging')
+    parser.add_argument('--watchdog', type=float, metavar='SECONDS',
+                        help='Send a heartbeat to an IUT idle for SECONDS '
+                             'and fail the test at once if it stalls')
+    parser.add_argument('--watchdog-timeout', type=float, default=5.0,
+                        metavar='SECONDS',
+                        help='Seconds an IUT has to answer a heartbeat or '
+                             'command, default %(default)s')
+    parser.add_argument('--trace', type=str, metavar='DIR',
+                        help='Write a Chrome trace of every test to DIR, '
+                             'open it in https://ui.perfetto.dev')
+    parser.add_argument('--profile', choices=profiling.PROFILERS,
+                        help='cpu: write a cProfile of every test and report '
+                             'the hottest functions. mem: write the memory '
+                             'growth of every test and report the growth '
+                             'over all tests, with tracemalloc')
+    parser.add_argument('--profile-dir', type=str, default='profiles',
+                        metavar='DIR',
+                        help='Directory of the --profile files, '
+                             'default %(default)s')
+    parser.add_argument('--profile-top', type=int, default=profiling.TOP,
+                        metavar='N',
+                        help='Entries of the --profile reports, '
+                             'default %(default)s')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='Serve live metrics of the run in the '
+                             'Prometheus text format on '
+                             'http://HOST:PORT/metrics')
+    parser.add_argument('--metrics-host', type=str, default='127.0.0.1',
+                        metavar='HOST',
+                        help='Address the metrics are served on, '
+                             'default %(default)s')
     parser.add_argument('--gdb', type=str,
                         help="Skip selected board reset to avoid gdb server"
                              " disconnection e.g. --gdb cent/prph/both")
 
     args = parser.parse_args()
 
+    if args.rerun_failed_from is not None:
+        failed = results.load_failed(args.rerun_failed_from)
+        if not failed:
+            print("No failed tests in " + args.rerun_failed_from)
+            return 0
+        args.test = (args.test or []) + failed
+
+    if args.result_file is not None:
+        open(args.result_file, "w").close()
+
     format = ("%(asctime)s %(levelname)s %(threadName)-20s "
               "%(filename)-25s %(lineno)-5s %(funcName)-25s : %(message)s")
     logging.basicConfig(level=logging.DEBUG,
@@ -74,7 +179,6 @@ def main():
     logger.addHandler(logging.StreamHandler())
 
     central_os, central_sn = args.central
-    peripheral_os, peripheral_sn = args.peripheral
 
     gdb_cent = False
     gdb_prph = False
@@ -88,80 +192,209 @@ def main():
         else:
             gdb_cent = True
 
-    if central_os == IutCtl.TYPE_MYNEWT:
-        central = MynewtCtl(NordicBoard(central_sn), gdb_cent)
-    elif central_os == IutCtl.TYPE_ANDROID:
-        central = AndroidCtl(central_sn)
-    else:
+    def create_iut(iut_os, sn, gdb):
+        if iut_os == IutCtl.TYPE_MYNEWT:
+            return MynewtCtl(NordicBoard(sn), gdb)
+        elif iut_os == IutCtl.TYPE_ANDROID:
+            return AndroidCtl(sn)
+        return None
+
+    central = create_iut(central_os, central_sn, gdb_cent)
+    if central is None:
         raise ValueError("Central OS is not implemented.")
 
-    if peripheral_os == IutCtl.TYPE_MYNEWT:
-        peripheral = MynewtCtl(NordicBoard(peripheral_sn), gdb_prph)
-    elif peripheral_os == IutCtl.TYPE_ANDROID:
-        peripheral = AndroidCtl(peripheral_sn)
-    else:
-        raise ValueError("Peripheral OS is not implemented.")
+    peripherals = []
+    for peripheral_os, peripheral_sn in args.peripheral:
+        peripheral = create_iut(peripheral_os, peripheral_sn, gdb_prph)
+        if peripheral is None:
+            raise ValueError("Peripheral OS is not implemented.")
+        peripherals.append(peripheral)
+
+    central.build = args.central_build
+    for peripheral in peripherals:
+        peripheral.build = args.peripheral_build
+
+    if args.adaptive_timeouts or args.timeout_override is not None:
+        iut_types = [iut.get_type() for iut in [central] + peripherals] \
+            if args.adaptive_timeouts else []
+        timeouts.set_policy(timeouts.load_policy(
+            args.history_db, iut_types, override=args.timeout_override))
+
+    if args.metrics_port is not None:
+        metrics.start([central] + peripherals, args.metrics_port,
+                      args.metrics_host)
+
+    if args.profile is not None:
+        profiling.enable(args.profile, args.profile_dir, args.profile_top)
+
+    if args.trace is not None:
+        tracing.enable(args.trace)
+        tracing.instrument(btp)
+
+    if args.watchdog:
+        for iut in [central] + peripherals:
+            iut.watchdog = Watchdog(iut, args.watchdog, args.watchdog_timeout)
+            iut.watchdog.start()
 
     if args.flash_central is not None:
         board_name, project_path = args.flash_central
         central.build_and_flash(board_name, project_path)
     if args.flash_peripheral is not None:
         board_name, project_path = args.flash_peripheral
-        peripheral.build_and_flash(board_name, project_path)
+        for peripheral in peripherals:
+            peripheral.build_and_flash(board_name, project_path)
 
-    def create_suite(iut1, iut2):
+    def create_suite(iut1, iut2, *iuts):
         suite = unittest.TestSuite()
         if args.test is not None:
             for arg in args.test:
                 test = arg.split('#')
+                cls = eval(test[0])
+                # Only multi link tests take the further peripherals
+                extra = iuts if issubclass(cls, MultiLinkTestCase) else ()
                 if len(test) > 1:
-                    suite.addTest(eval(test[0])(test[1],
-                                    iut1, iut2))
+                    suite.addTest(cls(test[1], iut1, iut2, *extra))
                 else:
-                    suite.addTests(eval(test[0]).init_testcases(iut1, iut2))
+                    suite.addTests(cls.init_testcases(iut1, iut2, *extra))
         if args.test is None:
             suite.addTests(GapTestCase.init_testcases(iut1, iut2))
             suite.addTests(GattTestCase.init_testcases(iut1, iut2))
-        return suite
+        # Tests sharing a connection run back to back
+        return unittest.TestSuite(order_by_fixture(list(suite)))
+
+    work_queue = None
+    if args.work_queue is not None:
+        work_queue = sharding.WorkQueue(args.work_queue)
+
+    def shard_suite(suite, batch):
+        """Part of suite this process runs, all of it without sharding"""
+        tests = list(suite)
+        if not tests or (args.shard is None and work_queue is None):
+            return suite
 
-    def run_test(suite):
-        result = runner.run(suite)
-        failed = len(result.errors) + len(result.failures) > 0
-        time.sleep(1)
-        return failed
+        # Tests sharing a connection are never split
+        units = group_by_fixture(tests)
+        names = [[results.test_name(test) for test in unit]
+                 for unit in units]
+        durations = sharding.load_durations(args.history_db,
+                                            tests[0].iut1.get_type(),
+                                            tests[0].iut2.get_type())
+        estimates = sharding.estimate(names, durations)
 
-    runner = unittest.TextTestRunner(verbosity=2, failfast=args.fail_fast)
+        if work_queue is not None:
+            work_queue.fill(batch, names, estimates)
+            return sharding.QueueSuite(tests, work_queue, batch)
+
+        index, count = args.shard
+        shard = sharding.lpt_partition(estimates, count)[index]
+        print("Shard %d/%d: %d of %d tests, estimated %.0fs of %.0fs" % (
+            index + 1, count, sum(len(units[i]) for i in shard), len(tests),
+            sum(estimates[i] for i in shard), sum(estimates)))
+        return unittest.TestSuite([test for i in shard for test in units[i]])
+
+    def test_started(name):
+        if metrics.METRICS is not None:
+            metrics.METRICS.test_started(name)
+
+    def write_result(record):
+        if metrics.METRICS is not None and record['record'] == 'test':
+            metrics.METRICS.test_finished(record)
+        if args.result_file is not None:
+            results.write_results(args.result_file, [record])
+
+    def run_suite(suite, info, attempt=1):
+        def write_run(tests):
+            write_result(dict(record='run', attempt=attempt,
+                              tests=len(tests),
+                              central=tests[0].iut1.get_type(),
+                              peripheral=tests[0].iut2.get_type(), **info))
+
+        # A queue worker only knows its tests as it claims them
+        if isinstance(suite, sharding.QueueSuite):
+            suite.claim_f = write_run
+        elif suite.countTestCases():
+            write_run(list(suite))
+
+        # Every test is written to the result file as soon as it finishes
+        resultclass = functools.partial(results.StreamingTestResult,
+                                        write_f=write_result,
+                                        start_f=test_started, info=info,
+                                        attempt=attempt)
+        runner = unittest.TextTestRunner(verbosity=2, failfast=args.fail_fast,
+                                         resultclass=resultclass)
+        try:
+            return runner.run(suite)
+        finally:
+            release_fixtures()
+
+    def run_test(suite, run, reverse=False):
+        info = {'run': run, 'reverse': reverse}
+        # The runner drops the tests from the suite as they complete
+        tests = list(suite)
+        outcome = run_suite(suite, info).verdicts
+        if isinstance(suite, sharding.QueueSuite):
+            tests = suite.claimed
+
+        for retry in range(args.retry_failed):
+            failed = [test for test in tests
+                      if outcome.get(test) in results.FAILED]
+            if not failed:
+                break
+
+            print("\n### Retrying " + str(len(failed)) + " failed tests, "
+                  "attempt " + str(retry + 1) + "/" +
+                  str(args.retry_failed) + " ###\n")
+            result = run_suite(unittest.TestSuite(failed), info, retry + 2)
+            outcome.update(result.verdicts)
+
+        flaky = [results.test_name(test) for test in tests
+                 if outcome.get(test) == results.PASS_AFTER_RETRY]
+        if flaky:
+            print("\nPassed after retry: " + ", ".join(flaky))
+
+        return any(verdict in results.FAILED for verdict in outcome.values())
 
     print("Starting tester" \
           + ", runs: " + ("until failure" if args.rerun_until_failure else str(args.run_count)) \
           + ", fail-fast: " + str(args.fail_fast) \
           + ", rerun-reverse: " + str(args.rerun_reverse))
     print("Central IUT: " + str(central))
-    print("Peripheral IUT: " + str(peripheral))
+    for peripheral in peripherals:
+        print("Peripheral IUT: " + str(peripheral))
+
+    def suite_size(suite):
+        if isinstance(suite, sharding.QueueSuite):
+            return "queued"
+        return str(suite.countTestCases())
 
     run_count = 0
     run_failed = False
     while run_count < args.run_count or (args.rerun_until_failure and not run_failed):
-        suite = create_suite(central, peripheral)
+        suite = shard_suite(create_suite(central, *peripherals),
+                            "run-%d" % (run_count + 1))
         print("\n### Starting run " + str(run_count + 1) + "/" \
-              + str(args.run_count) + " with " + str(suite.countTestCases()) + " tests ###\n")
-        fail = run_test(suite)
+              + str(args.run_count) + " with " + suite_size(suite) + " tests ###\n")
+        fail = run_test(suite, run_count + 1)
         if args.fail_fast and fail:
             break
 
         rerun_fail = False
 
         if args.rerun_reverse:
-            suite = create_suite(peripheral, central)
+            suite = shard_suite(
+                create_suite(peripherals[0], central, *peripherals[1:]),
+                "run-%d-reverse" % (run_count + 1))
             print("\n### Starting reverse run " + str(run_count + 1) + "/" \
-              + str(args.run_count) + " with " + str(suite.countTestCases()) + " tests ###\n")
-            rerun_fail = run_test(suite)
+              + str(args.run_count) + " with " + suite_size(suite) + " tests ###\n")
+            rerun_fail = run_test(suite, run_count + 1, reverse=True)
             if args.fail_fast and rerun_fail:
                 break
 
         run_failed = fail or rerun_fail
         run_count += 1
-        time.sleep(1)
+
+    if profiling.PROFILER is not None:
+        profiling.PROFILER.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Query the historical database of btptester results
+
+$ python3 btptester_db.py import results.jsonl
+$ python3 btptester_db.py trend --test GattTestCase#test_btp_GATT_CL_GAR_1
+$ python3 btptester_db.py regressions mynewt-1.11 mynewt-1.12
+"""
+import argparse
+import sys
+
+from common import results_db
+
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def cmd_import(args):
+    for path in args.result_file:
+        added = results_db.import_results(path, args.db)
+        print("%s: %d test results added" % (path, added))
+    return 0
+
+
+def cmd_trend(args):
+    conn = results_db.connect(args.db)
+    rows = results_db.trend(conn, args.role, test=args.test,
+                            central=args.central,
+                            peripheral=args.peripheral, since=args.since)
+
+    test = None
+    for row in rows:
+        if row['test'] != test:
+            test = row['test']
+            print("\n%s" % test)
+            print("  %-30s %-10s %5s %7s %10s %12s" % (
+                "build", "first run", "runs", "passed", "duration",
+                "btp p99 ms"))
+        print("  %-30s %-10s %5d %7d %10s %12s" % (
+            row['build'] or "-", row['first_date'], row['runs'],
+            row['passed'], fmt(row['duration'], ".2f"),
+            fmt(row['btp_p99_ms'], ".1f")))
+    return 0
+
+
+def cmd_regressions(args):
+    conn = results_db.connect(args.db)
+    results = results_db.regressions(
+        conn, args.base, args.new, args.role, alpha=args.alpha,
+        min_change_pct=args.min_change, min_runs=args.min_runs,
+        test=args.test, central=args.central, peripheral=args.peripheral,
+        since=args.since)
+
+    print("%-60s %8s %8s %8s %8s" % ("test", "base s", "new s", "change",
+                                     "p"))
+    for result in results:
+        if args.all or result['regression']:
+            print("%-60s %8.2f %8.2f %7.1f%% %8.4f%s" % (
+                result['test'], result['base_mean'], result['new_mean'],
+                result['change_pct'], result['p'],
+                " REGRESSION" if result['regression'] else ""))
+
+    regressed = sum(result['regression'] for result in results)
+    print("\n%d of %d compared tests regressed" % (regressed, len(results)))
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='BTPTester results database')
+    parser.add_argument('--db', type=str, default=results_db.RESULTS_DB,
+                        help='SQLite database file, default %(default)s')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_import = subparsers.add_parser(
+        'import', help='Add the test records of result files')
+    parser_import.add_argument('result_file', nargs='+',
+                               help='File written with --result-file')
+    parser_import.set_defaults(func=cmd_import)
+
+    def add_filters(subparser):
+        subparser.add_argument('--role', choices=results_db.BUILD_COLUMNS,
+                               default='central',
+                               help='IUT role whose firmware builds are '
+                                    'compared, default %(default)s')
+        subparser.add_argument('--test', type=str,
+                               help='Only test, in [class]#[test] format')
+        subparser.add_argument('--central', type=str,
+                               help='Only runs with this central IUT type')
+        subparser.add_argument('--peripheral', type=str,
+                               help='Only runs with this peripheral IUT '
+                                    'type')
+        subparser.add_argument('--since', type=str,
+                               help='Only runs from this date, YYYY-MM-DD')
+
+    parser_trend = subparsers.add_parser(
+        'trend', help='Pass count and mean duration of tests per build')
+    add_filters(parser_trend)
+    parser_trend.set_defaults(func=cmd_trend)
+
+    parser_regressions = subparsers.add_parser(
+        'regressions', help='Tests significantly slower on a new build, '
+                            'exits with 1 if any')
+    parser_regressions.add_argument('base', help='Baseline build label')
+    parser_regressions.add_argument('new', help='Build label to check')
+    add_filters(parser_regressions)
+    parser_regressions.add_argument('--alpha', type=float, default=0.01,
+                                    help='Significance level of the '
+                                         'one sided Welch\'s t-test, '
+                                         'default %(default)s')
+    parser_regressions.add_argument('--min-change', type=float, default=5.0,
+                                    help='Smallest mean duration increase '
+                                         'in percent reported, '
+                                         'default %(default)s')
+    parser_regressions.add_argument('--min-runs', type=int, default=3,
+                                    help='Passed runs needed on each build, '
+                                         'default %(default)s')
+    parser_regressions.add_argument('--all', action='store_true',
+                                    help='List every compared test')
+    parser_regressions.set_defaults(func=cmd_regressions)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,6 +21,11 @@ class IutCtl:
     TYPE_ANDROID = "android"
     TYPE_MYNEWT = "mynewt"
 
+    # Firmware build label, benchmark results are aggregated by it
+    build = None
+    # common.watchdog.Watchdog of the IUT if enabled
+    watchdog = None
+
     @abstractmethod
     def build_and_flash(self, board_name, project_path):
         raise NotImplementedError
@@ -0,0 +1,214 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Live metrics of the tester in the Prometheus text format
+
+While enabled, the tester serves GET /metrics on a local HTTP port.
+Counters are kept for the finished tests, the BTP frames and command
+responses and the resets of every IUT. RX queue depths, pending event
+listeners and the resident memory are read when scraped. Frames per
+second are the rate() of the frame counters.
+"""
+
+import collections
+import http.server
+import logging
+import os
+import threading
+
+from common.utils import percentile
+
+# Metrics of the process, None while the endpoint is disabled
+METRICS = None
+
+# Latest command response latencies the quantiles are computed from
+LATENCY_WINDOW = 1000
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+            .replace('\n', '\\n')
+
+    return "{%s}" % ",".join('%s="%s"' % (key, escape(value))
+                             for key, value in labels.items())
+
+
+def _family(lines, name, kind, description, samples):
+    lines.append("# HELP %s %s" % (name, description))
+    lines.append("# TYPE %s %s" % (name, kind))
+    for labels, value in samples:
+        lines.append("%s%s %s" % (name, _labels(labels), repr(float(value))))
+
+
+def rss_bytes():
+    """Resident memory of the process, None if unknown"""
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Metrics:
+    def __init__(self, iuts):
+        self.iuts = list(iuts)
+        self._lock = threading.Lock()
+        self.current_test = None
+        # Verdict -> tests finished with it
+        self.tests = collections.Counter()
+        # (IUT, 'tx' or 'rx') -> BTP frames
+        self.frames = collections.Counter()
+        # IUT -> latest command response latencies in seconds
+        self.latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=LATENCY_WINDOW))
+        self.latency_count = collections.Counter()
+        self.latency_sum = collections.Counter()
+        # IUT -> resets started
+        self.resets = collections.Counter()
+
+    def frame(self, iut, direction):
+        with self._lock:
+            self.frames[(str(iut), direction)] += 1
+
+    def latency(self, iut, seconds):
+        iut = str(iut)
+        with self._lock:
+            self.latencies[iut].append(seconds)
+            self.latency_count[iut] += 1
+            self.latency_sum[iut] += seconds
+
+    def reset(self, iut):
+        with self._lock:
+            self.resets[str(iut)] += 1
+
+    def test_started(self, name):
+        self.current_test = name
+
+    def test_finished(self, record):
+        with self._lock:
+            self.tests[record['verdict']] += 1
+            self.current_test = None
+
+    @staticmethod
+    def listener_count(iut):
+        # Plain copies, the RX thread adds and removes listeners
+        return sum(len(listeners)
+                   for ops in list(iut.event_handler.listeners.values())
+                   for listeners in list(ops.values()))
+
+    def render(self):
+        with self._lock:
+            tests = dict(self.tests)
+            frames = dict(self.frames)
+            latencies = {iut: list(values)
+                         for iut, values in self.latencies.items()}
+            latency_count = dict(self.latency_count)
+            latency_sum = dict(self.latency_sum)
+            resets = dict(self.resets)
+        current_test = self.current_test
+
+        lines = []
+        _family(lines, "btptester_tests_total", "counter",
+                "Tests finished, by verdict",
+                [({'verdict': verdict}, count)
+                 for verdict, count in sorted(tests.items())])
+        _family(lines, "btptester_current_test", "gauge",
+                "Test running now",
+                [({'test': current_test}, 1)] if current_test else [])
+
+        _family(lines, "btptester_btp_frames_total", "counter",
+                "BTP frames sent and received, by IUT",
+                [({'iut': iut, 'direction': direction}, count)
+                 for (iut, direction), count in sorted(frames.items())])
+
+        samples = []
+        for iut, values in sorted(latencies.items()):
+            for q in QUANTILES:
+                samples.append(({'iut': iut, 'quantile': q},
+                               percentile(values, q * 100)))
+        _family(lines, "btptester_btp_command_latency_seconds", "summary",
+                "BTP command response latency, quantiles of the latest %d "
+                "commands" % LATENCY_WINDOW, samples)
+        for iut in sorted(latency_count):
+            lines.append("btptester_btp_command_latency_seconds_count%s %r" %
+                         (_labels({'iut': iut}),
+                          float(latency_count[iut])))
+            lines.append("btptester_btp_command_latency_seconds_sum%s %r" %
+                         (_labels({'iut': iut}), latency_sum[iut]))
+
+        queues, listeners = [], []
+        for iut in self.iuts:
+            worker = iut.btp_worker
+            if worker is not None:
+                queues.append(({'iut': str(iut)}, worker.rx_queue_depth()))
+            listeners.append(({'iut': str(iut)}, self.listener_count(iut)))
+        _family(lines, "btptester_btp_rx_queue_depth", "gauge",
+                "Responses waiting to be read, by IUT", queues)
+        _family(lines, "btptester_event_listeners", "gauge",
+                "Event listeners waiting, by IUT", listeners)
+
+        _family(lines, "btptester_iut_resets_total", "counter",
+                "IUT resets started, by IUT",
+                [({'iut': str(iut)}, resets.get(str(iut), 0))
+                 for iut in self.iuts])
+
+        rss = rss_bytes()
+        if rss is not None:
+            _family(lines, "process_resident_memory_bytes", "gauge",
+                    "Resident memory of the tester", [({}, rss)])
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        try:
+            body = METRICS.render().encode()
+        except Exception as e:
+            logging.exception("Metrics not rendered: %r", e)
+            self.send_error(500)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("metrics: " + format, *args)
+
+
+def start(iuts, port, host="127.0.0.1"):
+    """Serve the metrics of iuts until the process exits"""
+    global METRICS
+
+    METRICS = Metrics(iuts)
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer",
+                     daemon=True).start()
+    return server
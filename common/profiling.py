@@ -0,0 +1,182 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""CPU and memory profiling of every test
+
+The CPU profiler runs cProfile on the thread running the tests, writes
+the statistics of every test run to a .pstats file and reports the
+hottest functions over all tests at the end.
+
+The memory profiler takes a tracemalloc snapshot before and after every
+test, writes the allocations that grew to a report per test run and at
+the end reports the growth from the first test on. Memory kept by the
+tester across hundreds of runs, e.g. in lists of found devices or event
+listeners, shows up at the top.
+"""
+
+import cProfile
+import gc
+import io
+import linecache
+import os
+import pstats
+import sys
+import tracemalloc
+from abc import ABC, abstractmethod
+
+# Profiler of the process, None while profiling is disabled
+PROFILER = None
+
+# Entries of the reports
+TOP = 20
+
+# Frames kept per traced memory allocation
+MEM_FRAMES = 10
+
+
+class Profiler(ABC):
+    def __init__(self, directory, top=TOP):
+        self.directory = directory
+        self.top = top
+        # Number of profiles written per test
+        self._written = {}
+
+    def path(self, name, ext):
+        count = self._written[name] = self._written.get(name, 0) + 1
+        return os.path.join(self.directory, "%s-%d.%s" % (
+            name.replace('#', '.'), count, ext))
+
+    @abstractmethod
+    def start(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self, name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def report(self, stream=sys.stdout):
+        raise NotImplementedError
+
+
+class CpuProfiler(Profiler):
+    def __init__(self, directory, top=TOP):
+        super(__class__, self).__init__(directory, top)
+        self.stats = None
+        self._profile = None
+
+    def start(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, name):
+        self._profile.disable()
+        self._profile.dump_stats(self.path(name, "pstats"))
+
+        if self.stats is None:
+            self.stats = pstats.Stats(self._profile, stream=io.StringIO())
+        else:
+            self.stats.add(self._profile)
+        self._profile = None
+
+    def report(self, stream=sys.stdout):
+        if self.stats is None:
+            return
+
+        self.stats.dump_stats(os.path.join(self.directory, "all.pstats"))
+        self.stats.stream = stream
+        for key, title in (('tottime', 'own'), ('cumulative', 'cumulative')):
+            print("\n### Top %d functions by %s time of all tests ###" % (
+                self.top, title), file=stream)
+            self.stats.sort_stats(key).print_stats(self.top)
+
+
+class MemProfiler(Profiler):
+    def __init__(self, directory, top=TOP, frames=MEM_FRAMES):
+        super(__class__, self).__init__(directory, top)
+        self.first = None
+        self.last = None
+        self._before = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @staticmethod
+    def snapshot():
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            # Source lines cached while the reports are formatted
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    @staticmethod
+    def write_growth(stream, stats, top):
+        growth = [stat for stat in stats if stat.size_diff > 0][:top]
+        print("%d KiB more in %d allocation sites" % (
+            sum(stat.size_diff for stat in stats) // 1024,
+            sum(stat.size_diff > 0 for stat in stats)), file=stream)
+        for stat in growth:
+            print("%+10.1f KiB %+8d blocks  %s" % (
+                stat.size_diff / 1024, stat.count_diff,
+                stat.traceback[0]), file=stream)
+
+    def start(self):
+        self._before = self.snapshot()
+        if self.first is None:
+            self.first = self._before
+
+    def stop(self, name):
+        self.last = self.snapshot()
+        stats = self.last.compare_to(self._before, 'lineno')
+        with open(self.path(name, "txt"), "w") as report_file:
+            print("Memory growth during %s" % name, file=report_file)
+            self.write_growth(report_file, stats, self.top)
+
+            print("\nTracebacks of the top allocation sites:",
+                  file=report_file)
+            for stat in self.last.compare_to(self._before,
+                                             'traceback')[:self.top]:
+                if stat.size_diff <= 0:
+                    continue
+                print("\n%+.1f KiB" % (stat.size_diff / 1024),
+                      file=report_file)
+                for line in stat.traceback.format():
+                    print(line, file=report_file)
+        self._before = None
+
+    def report(self, stream=sys.stdout):
+        if self.first is None or self.last is None:
+            return
+
+        print("\n### Top %d memory growth since the first test ###" %
+              self.top, file=stream)
+        self.write_growth(stream, self.last.compare_to(self.first, 'lineno'),
+                          self.top)
+
+
+PROFILERS = {
+    'cpu': CpuProfiler,
+    'mem': MemProfiler,
+}
+
+
+def enable(kind, directory, top=TOP):
+    global PROFILER
+
+    os.makedirs(directory, exist_ok=True)
+    PROFILER = PROFILERS[kind](directory, top)
+    return PROFILER
@@ -0,0 +1,213 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Per test verdicts of btptester runs
+
+A result file is written while the tests run. Every suite run, retry
+attempts included, starts with a run record and every finished test
+appends a test record. A --work-queue worker writes a run record for
+every unit of tests it claims, counting the claimed tests:
+
+    {"record": "run", "run": 1, "reverse": false, "attempt": 1,
+     "tests": 18, "central": "mynewt", "peripheral": "android"}
+    {"record": "test", "test": "GattTestCase#test_btp_GATT_CL_GAR_1",
+     "run": 1, "reverse": false, "attempt": 1, "central": "mynewt",
+     "peripheral": "android", "verdict": "pass", "duration": 9.8,
+     "phases": {"reset": 6.1, "preconditions": 0.4,
+                "connection_procedure": 2.2},
+     "btp_latency": {"central": {"count": 12, "p50_ms": 4.1, ...}},
+     "wait_latency": {"mynewt": {"btp_ev/3/0x82": [0.41, ...]}}, ...}
+
+The last test record of a test within a run carries its final verdict.
+"""
+
+import json
+import time
+import unittest
+from collections import OrderedDict
+
+PASS = 'pass'
+PASS_AFTER_RETRY = 'pass_after_retry'
+FAIL = 'fail'
+ERROR = 'error'
+SKIP = 'skip'
+
+FAILED = (FAIL, ERROR)
+
+
+def test_name(test):
+    """Name of test in the [class]#[test] format of --test"""
+    return "%s#%s" % (type(test).__name__, test._testMethodName)
+
+
+def write_results(path, records):
+    with open(path, "a") as results_file:
+        for record in records:
+            results_file.write(json.dumps(record) + "\n")
+
+
+def final_records(records):
+    """Last test record of every test and run, in order of first record"""
+    final = OrderedDict()
+    for record in records:
+        if record.get('record') != 'test':
+            continue
+        key = (record['test'], record['central'], record['peripheral'],
+               record['run'], record['reverse'])
+        final[key] = record
+    return list(final.values())
+
+
+def load_failed(path):
+    """Names of the tests that failed or errored in a result file
+
+    Order is kept and every test is listed once, even if it failed in
+    several runs or in both role assignments.
+    """
+    with open(path, "r") as results_file:
+        records = [json.loads(line) for line in results_file if line.strip()]
+
+    failed = []
+    for record in final_records(records):
+        if record['verdict'] in FAILED and record['test'] not in failed:
+            failed.append(record['test'])
+    return failed
+
+
+class ResultReader:
+    """Reads the records appended to a result file since the last call"""
+
+    def __init__(self, path):
+        self.path = path
+        self._offset = 0
+        self._partial = ""
+
+    def read(self):
+        try:
+            results_file = open(self.path, "r")
+        except FileNotFoundError:
+            return []
+
+        with results_file:
+            results_file.seek(self._offset)
+            data = results_file.read()
+            self._offset = results_file.tell()
+
+        # A record being written is completed by the next read
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class StreamingTestResult(unittest.TextTestResult):
+    """Text test result that also reports every test as it finishes
+
+    start_f is called with the name of every test started, write_f with
+    the record of every finished test, info is merged into every record.
+    attempt is the retry attempt of the run, a test passing on a later
+    attempt is passed after retry.
+    """
+
+    def __init__(self, *args, write_f=None, start_f=None, info=None,
+                 attempt=1, **kwargs):
+        super(__class__, self).__init__(*args, **kwargs)
+        self.write_f = write_f
+        self.start_f = start_f
+        self.info = info or {}
+        self.attempt = attempt
+        # test -> verdict of every test run so far
+        self.verdicts = {}
+        self._failures = {}
+        self._start = {}
+
+    def _set_verdict(self, test, verdict, text=None):
+        # A failed subtest fails the whole test
+        if self.verdicts.get(test) in FAILED:
+            return
+        self.verdicts[test] = verdict
+        if text is not None:
+            self._failures[test] = text
+
+    def startTest(self, test):
+        super(__class__, self).startTest(test)
+        self._start[test] = (time.time(), time.monotonic())
+        if self.start_f is not None:
+            self.start_f(test_name(test))
+
+    def addSuccess(self, test):
+        super(__class__, self).addSuccess(test)
+        self._set_verdict(test, PASS if self.attempt == 1 else
+                          PASS_AFTER_RETRY)
+
+    def addFailure(self, test, err):
+        super(__class__, self).addFailure(test, err)
+        self._set_verdict(test, FAIL, self._exc_info_to_string(err, test))
+
+    def addError(self, test, err):
+        super(__class__, self).addError(test, err)
+        self._set_verdict(test, ERROR, self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super(__class__, self).addSkip(test, reason)
+        self._set_verdict(test, SKIP, reason)
+
+    def addExpectedFailure(self, test, err):
+        super(__class__, self).addExpectedFailure(test, err)
+        self._set_verdict(test, PASS)
+
+    def addUnexpectedSuccess(self, test):
+        super(__class__, self).addUnexpectedSuccess(test)
+        self._set_verdict(test, FAIL, "Unexpected success")
+
+    def addSubTest(self, test, subtest, err):
+        super(__class__, self).addSubTest(test, subtest, err)
+        if err is None:
+            return
+
+        verdict = FAIL if issubclass(err[0], test.failureException) else \
+            ERROR
+        self._set_verdict(test, verdict, "%s\n%s" % (
+            subtest, self._exc_info_to_string(err, test)))
+
+    def stopTest(self, test):
+        super(__class__, self).stopTest(test)
+        if test not in self._start:
+            return
+
+        start, start_monotonic = self._start.pop(test)
+        record = {'record': 'test', 'test': test_name(test), 'id': test.id()}
+        record.update(self.info)
+        record.update({
+            'attempt': self.attempt,
+            'central': test.iut1.get_type(),
+            'peripheral': test.iut2.get_type(),
+            'central_build': test.iut1.build,
+            'peripheral_build': test.iut2.build,
+            'central_iut': str(test.iut1),
+            'peripheral_iuts': [str(iut) for iut in
+                                getattr(test, 'peripherals', [test.iut2])],
+            'verdict': self.verdicts.get(test, ERROR),
+            'start': start,
+            'duration': time.monotonic() - start_monotonic,
+            'phases': dict(getattr(test, 'phases', {})),
+            'btp_latency': dict(getattr(test, 'btp_latency', {})),
+            'stalls': list(getattr(test, 'stalls', [])),
+            'wait_latency': dict(getattr(test, 'wait_latency', {})),
+            'failure': self._failures.get(test),
+        })
+
+        if self.write_f is not None:
+            self.write_f(record)
@@ -0,0 +1,315 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Historical database of btptester results
+
+The final test records of result files are kept in a SQLite database,
+one row per test and run. Duration trends are queried per firmware
+build and builds are compared for statistically significant slowdowns.
+The latencies of the waits of every test are kept along, they set the
+adaptive timeouts.
+"""
+
+import datetime
+import json
+import math
+import sqlite3
+
+from common.results import final_records, PASS, PASS_AFTER_RETRY
+
+RESULTS_DB = "btptester_results.db"
+
+# Role of the IUT -> column of its firmware build
+BUILD_COLUMNS = {
+    'central': 'central_build',
+    'peripheral': 'peripheral_build',
+}
+
+PASSED = (PASS, PASS_AFTER_RETRY)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    start REAL NOT NULL,
+    date TEXT NOT NULL,
+    test TEXT NOT NULL,
+    central TEXT NOT NULL,
+    peripheral TEXT NOT NULL,
+    central_build TEXT,
+    peripheral_build TEXT,
+    central_iut TEXT,
+    run INTEGER,
+    reverse INTEGER,
+    attempt INTEGER,
+    verdict TEXT NOT NULL,
+    duration REAL,
+    phases TEXT,
+    btp_latency TEXT,
+    btp_p99_ms REAL,
+    failure TEXT,
+    UNIQUE (test, start, central_iut)
+);
+CREATE INDEX IF NOT EXISTS results_test ON results (test);
+CREATE INDEX IF NOT EXISTS results_iut ON results (central, peripheral);
+CREATE INDEX IF NOT EXISTS results_central_build ON results (central_build);
+CREATE INDEX IF NOT EXISTS results_peripheral_build
+    ON results (peripheral_build);
+CREATE INDEX IF NOT EXISTS results_date ON results (date);
+CREATE TABLE IF NOT EXISTS wait_latency (
+    result INTEGER NOT NULL REFERENCES results (id),
+    iut_type TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    latency REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS wait_latency_operation
+    ON wait_latency (iut_type, operation);
+"""
+
+
+def connect(path=RESULTS_DB):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def store_records(conn, records):
+    """Insert the final test records, returns the number of new rows
+
+    A record stored before, as when a result file is imported twice, is
+    not added again.
+    """
+    added = 0
+    with conn:
+        for record in final_records(records):
+            latency = record.get('btp_latency') or {}
+            p99 = [stats['p99_ms'] for stats in latency.values()
+                   if stats.get('count')]
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO results (start, date, test, central,"
+                " peripheral, central_build, peripheral_build, central_iut,"
+                " run, reverse, attempt, verdict, duration, phases,"
+                " btp_latency, btp_p99_ms, failure)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record['start'],
+                 datetime.date.fromtimestamp(record['start']).isoformat(),
+                 record['test'],
+                 record['central'],
+                 record['peripheral'],
+                 record.get('central_build'),
+                 record.get('peripheral_build'),
+                 record.get('central_iut'),
+                 record['run'],
+                 record['reverse'],
+                 record['attempt'],
+                 record['verdict'],
+                 record['duration'],
+                 json.dumps(record.get('phases') or {}),
+                 json.dumps(latency),
+                 max(p99) if p99 else None,
+                 record.get('failure')))
+            if not cursor.rowcount:
+                continue
+
+            added += 1
+            conn.executemany(
+                "INSERT INTO wait_latency (result, iut_type, operation,"
+                " latency) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, iut_type, operation, value)
+                 for iut_type, operations in
+                 (record.get('wait_latency') or {}).items()
+                 for operation, values in operations.items()
+                 for value in values])
+    return added
+
+
+def import_results(results_path, db_path=RESULTS_DB):
+    """Store the test records of a result file in the database"""
+    with open(results_path, "r") as results_file:
+        records = [json.loads(line) for line in results_file if line.strip()]
+
+    conn = connect(db_path)
+    try:
+        return store_records(conn, records)
+    finally:
+        conn.close()
+
+
+def _filters(test=None, central=None, peripheral=None, since=None):
+    where, params = [], []
+    for column, value in (('test', test), ('central', central),
+                          ('peripheral', peripheral)):
+        if value is not None:
+            where.append("%s = ?" % column)
+            params.append(value)
+    if since is not None:
+        where.append("date >= ?")
+        params.append(since)
+    return where, params
+
+
+def trend(conn, role='central', **filters):
+    """Verdicts and durations of every test per firmware build of role
+
+    Builds are ordered by their first run. filters are test, central and
+    peripheral IUT type and since, the first date in ISO format.
+    """
+    build = BUILD_COLUMNS[role]
+    where, params = _filters(**filters)
+
+    query = (
+        "SELECT test, {build} AS build, MIN(date) AS first_date,"
+        " COUNT(*) AS runs,"
+        " SUM(verdict IN (?, ?)) AS passed,"
+        " AVG(CASE WHEN verdict IN (?, ?) THEN duration END) AS duration,"
+        " AVG(btp_p99_ms) AS btp_p99_ms"
+        " FROM results {where}"
+        " GROUP BY test, {build} ORDER BY test, MIN(start)"
+    ).format(build=build,
+             where="WHERE " + " AND ".join(where) if where else "")
+    return [dict(row) for row in
+            conn.execute(query, list(PASSED) * 2 + params)]
+
+
+def durations(conn, build=None, role='central', **filters):
+    """Test -> durations of the passed runs, oldest first
+
+    Only runs on a firmware build of role are taken if build is given.
+    """
+    where, params = _filters(**filters)
+    if build is not None:
+        where.append("%s = ?" % BUILD_COLUMNS[role])
+        params.append(build)
+    where.append("verdict IN (?, ?)")
+    params += list(PASSED)
+
+    result = {}
+    for row in conn.execute("SELECT test, duration FROM results WHERE " +
+                            " AND ".join(where) + " ORDER BY start", params):
+        result.setdefault(row['test'], []).append(row['duration'])
+    return result
+
+
+def wait_latencies(conn, iut_types, limit=None):
+    """(operation, IUT type) -> wait latencies in seconds, oldest first
+
+    Only the latest limit latencies of every operation are returned.
+    """
+    result = {}
+    for iut_type in set(iut_types):
+        rows = conn.execute(
+            "SELECT operation, latency FROM wait_latency"
+            " JOIN results ON results.id = wait_latency.result"
+            " WHERE iut_type = ? ORDER BY results.start DESC",
+            (iut_type,))
+        for row in rows:
+            latencies = result.setdefault((row['operation'], iut_type), [])
+            if limit is None or len(latencies) < limit:
+                latencies.append(row['latency'])
+
+    return {key: latencies[::-1] for key, latencies in result.items()}
+
+
+def _betacf(a, b, x):
+    # Continued fraction of the incomplete beta function, modified Lentz
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x /
+                    ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                     a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1 - x) / b
+
+
+def welch_test(base, new):
+    """One sided Welch's t-test of new being greater than base
+
+    Returns the t statistic and p-value, samples need two values each.
+    """
+    n1, n2 = len(base), len(new)
+    m1, m2 = sum(base) / n1, sum(new) / n2
+    v1 = sum((x - m1) ** 2 for x in base) / (n1 - 1)
+    v2 = sum((x - m2) ** 2 for x in new) / (n2 - 1)
+
+    se2 = v1 / n1 + v2 / n2
+    if se2 == 0:
+        return (math.inf, 0.0) if m2 > m1 else (0.0, 1.0)
+
+    t = (m2 - m1) / math.sqrt(se2)
+    df = se2 ** 2 / ((v1 / n1) ** 2 / (n1 - 1) + (v2 / n2) ** 2 / (n2 - 1))
+
+    # Survival function of the Student's t distribution
+    tail = 0.5 * _betainc(df / 2, 0.5, df / (df + t * t))
+    return t, tail if t > 0 else 1.0 - tail
+
+
+def regressions(conn, base, new, role='central', alpha=0.01,
+                min_change_pct=5.0, min_runs=3, **filters):
+    """Tests significantly slower on build new than on build base
+
+    A test regresses when its passed runs on new take min_change_pct
+    longer on average and Welch's t-test rejects equal durations at
+    significance alpha. Tests with fewer than min_runs passed runs on
+    either build are not compared.
+    """
+    base_durations = durations(conn, base, role, **filters)
+    new_durations = durations(conn, new, role, **filters)
+
+    result = []
+    for test in sorted(set(base_durations) & set(new_durations)):
+        b, n = base_durations[test], new_durations[test]
+        if len(b) < max(min_runs, 2) or len(n) < max(min_runs, 2):
+            continue
+
+        base_mean, new_mean = sum(b) / len(b), sum(n) / len(n)
+        change_pct = 100 * (new_mean - base_mean) / base_mean \
+            if base_mean else math.inf
+        t, p = welch_test(b, n)
+        result.append({
+            'test': test,
+            'base_runs': len(b),
+            'new_runs': len(n),
+            'base_mean': base_mean,
+            'new_mean': new_mean,
+            'change_pct': change_pct,
+            't': t,
+            'p': p,
+            'regression': p < alpha and change_pct >= min_change_pct,
+        })
+    return result
@@ -15,12 +15,17 @@
 #
 
 import atexit
+import os
 import shlex
 import subprocess
-import time
+
+from common.utils import wait_for
 
 SYMLINK_NAME = 'btptester'
 
+# Seconds rtt2pty has to attach to the board and create the pty
+PTY_TIMEOUT = 10.0
+
 
 class RTT2PTY:
     def __init__(self, board_id, buffer_name):
@@ -41,10 +46,21 @@ class RTT2PTY:
         if self.proc:
             raise Exception("RTT2PTY process already started")
 
+        # A link left by an earlier run must not be taken for the new pty
+        if os.path.islink(self.pty_file):
+            os.unlink(self.pty_file)
+
         print("Executing command: {}".format(self.cmd))
-        time.sleep(3)
         self.proc = subprocess.Popen(shlex.split(self.cmd))
 
+        def pty_exists():
+            if not self.is_running():
+                raise Exception("rtt2pty exited with {}".format(
+                    self.proc.returncode))
+            return os.path.exists(self.pty_file)
+
+        wait_for(pty_exists, PTY_TIMEOUT, what=self.pty_file)
+
     def is_running(self):
         return self.proc.poll() is None
 
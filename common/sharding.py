@@ -0,0 +1,209 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Spreading a test suite over several IUT pairs
+
+Tests are scheduled in units, a test alone or the tests sharing a
+connection fixture. The duration of a unit is estimated from the
+passed runs in the results database on the same IUT types.
+
+A static split assigns the units to shards longest first, each to the
+shard with the least work so far. A work queue lets every worker take
+the longest unit left as soon as it is done with the previous one, so
+faster pairs take over the work of slower ones.
+"""
+
+import heapq
+import json
+import logging
+import os
+import socket
+import sqlite3
+import statistics
+import time
+import unittest
+
+from common import results_db
+from common.results import test_name
+
+# Only the latest passed runs of a test estimate its duration
+HISTORY_RUNS = 20
+
+# Estimate of every test if no test has a history
+DEFAULT_DURATION = 1.0
+
+
+def load_durations(db_path, central, peripheral):
+    """Test -> median duration of its latest passed runs on IUT types"""
+    if not os.path.exists(db_path):
+        return {}
+
+    conn = results_db.connect(db_path)
+    try:
+        history = results_db.durations(conn, central=central,
+                                       peripheral=peripheral)
+    finally:
+        conn.close()
+
+    return {test: statistics.median(values[-HISTORY_RUNS:])
+            for test, values in history.items()}
+
+
+def estimate(units, durations):
+    """Estimated duration of every unit, a list of test names
+
+    A test without history is taken to last as long as the median test.
+    """
+    default = statistics.median(durations.values()) if durations else \
+        DEFAULT_DURATION
+    return [sum(durations.get(name, default) for name in unit)
+            for unit in units]
+
+
+def lpt_partition(estimates, count):
+    """Split unit indexes into count shards of balanced estimated time
+
+    Longest processing time first: every unit, longest first, goes to
+    the shard with the least work so far. Shards keep the suite order.
+    """
+    shards = [[] for _ in range(count)]
+    loads = [(0.0, i) for i in range(count)]
+
+    for unit in sorted(range(len(estimates)),
+                       key=lambda i: (-estimates[i], i)):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(unit)
+        heapq.heappush(loads, (load + estimates[unit], shard))
+
+    return [sorted(shard) for shard in shards]
+
+
+class WorkQueue:
+    """Units of tests shared by workers through a SQLite file
+
+    Every batch, a run or reverse run, is queued once by the first
+    worker reaching it. Workers then claim the longest unclaimed unit
+    one at a time. The file must be on a file system with working
+    locks and is removed by the caller before a new set of runs.
+    """
+
+    def __init__(self, path, worker=None):
+        self.worker = worker or "%s-%d" % (socket.gethostname(), os.getpid())
+        # Transactions are started explicitly to lock the queue
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue ("
+            " batch TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " tests TEXT NOT NULL,"
+            " estimate REAL,"
+            " worker TEXT,"
+            " claimed REAL,"
+            " PRIMARY KEY (batch, position))")
+
+    def _locked(self, f):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = f()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return result
+
+    def fill(self, batch, units, estimates):
+        """Queue units longest first, unless batch is queued already
+
+        Returns whether this worker queued the batch.
+        """
+        def fill():
+            queued = self.conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE batch = ?",
+                (batch,)).fetchone()[0]
+            if queued:
+                return False
+
+            order = sorted(range(len(units)), key=lambda i: -estimates[i])
+            self.conn.executemany(
+                "INSERT INTO queue (batch, position, tests, estimate)"
+                " VALUES (?, ?, ?, ?)",
+                [(batch, position, json.dumps(units[i]), estimates[i])
+                 for position, i in enumerate(order)])
+            return True
+
+        return self._locked(fill)
+
+    def claim(self, batch):
+        """Test names of the next unit of batch, None if none is left"""
+        def claim():
+            row = self.conn.execute(
+                "SELECT position, tests FROM queue"
+                " WHERE batch = ? AND worker IS NULL"
+                " ORDER BY position LIMIT 1", (batch,)).fetchone()
+            if row is None:
+                return None
+
+            self.conn.execute(
+                "UPDATE queue SET worker = ?, claimed = ?"
+                " WHERE batch = ? AND position = ?",
+                (self.worker, time.time(), batch, row[0]))
+            return json.loads(row[1])
+
+        return self._locked(claim)
+
+    def close(self):
+        self.conn.close()
+
+
+class QueueSuite(unittest.TestSuite):
+    """Suite running the units this worker claims from a work queue
+
+    Tests are looked up by name among the tests of the suite, every
+    worker must be started with the same tests. claim_f is called with
+    the tests of every claimed unit before they run, claimed lists the
+    tests claimed by the last run.
+    """
+
+    def __init__(self, tests, queue, batch, claim_f=None):
+        super(__class__, self).__init__(tests)
+        self.queue = queue
+        self.batch = batch
+        self.claim_f = claim_f
+        self.claimed = []
+
+    def run(self, result, debug=False):
+        tests = {test_name(test): test for test in self}
+        self.claimed = []
+
+        while not result.shouldStop:
+            unit = self.queue.claim(self.batch)
+            if unit is None:
+                break
+
+            for name in unit:
+                if name not in tests:
+                    logging.error("Queued test %s is not in the suite", name)
+            unit = [tests[name] for name in unit if name in tests]
+            self.claimed.extend(unit)
+            if unit and self.claim_f is not None:
+                self.claim_f(unit)
+
+            for test in unit:
+                if result.shouldStop:
+                    break
+                test(result)
+
+        return result
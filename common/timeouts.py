@@ -0,0 +1,148 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Timeouts of waits learned from the latencies of past runs
+
+Every wait for a BTP response, an event or a stack procedure is an
+operation. The time each operation took on an IUT type is observed
+while the tests run, written to the test records and kept in the
+results database.
+
+With an adaptive policy, a wait is given a high percentile of the
+latencies of its operation times a safety margin, but never longer than
+its static timeout. A failing operation so ends as soon as it is
+clearly late instead of after a timeout tuned for the slowest case.
+"""
+
+import collections
+import logging
+import os
+import threading
+
+from common import results_db
+from common.utils import percentile
+
+# Percentile of the past latencies of an operation given to a wait
+PERCENTILE = 99
+
+# Safety margin the percentile is multiplied with
+MARGIN = 3.0
+
+# Shortest timeout given to a wait, absorbs host scheduling jitter
+MIN_TIMEOUT = 1.0
+
+# Latencies needed before the timeout of an operation is shortened
+MIN_SAMPLES = 30
+
+# Latest latencies of an operation and IUT type taken into account
+HISTORY_SAMPLES = 1000
+
+
+def rsp_operation(svc_id, op):
+    """Operation of waiting for the response to a BTP command"""
+    return "btp_rsp/%d/0x%02x" % (svc_id, op)
+
+
+def ev_operation(svc_id, op):
+    """Operation of waiting for a BTP event"""
+    return "btp_ev/%d/0x%02x" % (svc_id, op)
+
+
+class TimeoutPolicy:
+    """Timeout of every wait of an operation on an IUT type
+
+    Without history, every wait keeps its static timeout. override, for
+    debugging, replaces every timeout, static ones included.
+    """
+
+    def __init__(self, history=None, pct=PERCENTILE, margin=MARGIN,
+                 min_timeout=MIN_TIMEOUT, min_samples=MIN_SAMPLES,
+                 override=None):
+        self.override = override
+        # (operation, IUT type) -> learned timeout in seconds
+        self.limits = {}
+        for key, latencies in (history or {}).items():
+            if len(latencies) >= min_samples:
+                self.limits[key] = max(min_timeout,
+                                       percentile(latencies, pct) * margin)
+
+    def timeout(self, operation, iut_type, default):
+        if self.override is not None:
+            return self.override
+
+        limit = self.limits.get((operation, iut_type))
+        if limit is None:
+            return default
+        if default is None:
+            return limit
+        return min(default, limit)
+
+
+_policy = TimeoutPolicy()
+
+# IUT type -> operation -> latencies observed since the last take
+_observed = collections.defaultdict(lambda: collections.defaultdict(list))
+_observed_lock = threading.Lock()
+
+
+def set_policy(policy):
+    global _policy
+
+    _policy = policy
+
+
+def load_policy(db_path, iut_types, override=None, **kwargs):
+    """Policy learned from the results database, static without it"""
+    history = {}
+    if os.path.exists(db_path):
+        conn = results_db.connect(db_path)
+        try:
+            history = results_db.wait_latencies(conn, iut_types,
+                                                HISTORY_SAMPLES)
+        finally:
+            conn.close()
+
+    policy = TimeoutPolicy(history, override=override, **kwargs)
+    for (operation, iut_type), limit in sorted(policy.limits.items()):
+        logging.debug("Timeout of %s on %s: %.3f s", operation, iut_type,
+                      limit)
+    return policy
+
+
+def get_timeout(operation, iut_type, default):
+    """Timeout of a wait of operation, default is its static timeout"""
+    return _policy.timeout(operation, iut_type, default)
+
+
+def observe(operation, iut_type, latency):
+    """Record the seconds a wait of operation took on iut_type"""
+    if iut_type is None:
+        return
+
+    with _observed_lock:
+        _observed[iut_type][operation].append(round(latency, 6))
+
+
+def take_observed():
+    """IUT type -> operation -> latencies observed since the last call"""
+    global _observed
+
+    with _observed_lock:
+        observed, _observed = _observed, collections.defaultdict(
+            lambda: collections.defaultdict(list))
+
+    return {iut_type: dict(operations)
+            for iut_type, operations in observed.items()}
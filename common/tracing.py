@@ -0,0 +1,177 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Span tracing of tests in the Chrome trace event format
+
+Spans nest test, phase (setUp, preconditions, connection_procedure,
+body, disconnection_procedure, tearDown), pybtp.btp wrapper and BTP
+frame sent or received. Phases run by a procedure of testcases.utils
+are named after it. Every IUT is a process of the trace and every
+thread a track of it, so the IUTs of a test are shown side by side. The test and phase spans are repeated on every IUT
+of the test, the wrappers and frames on the IUT they talk to.
+
+A trace is written per test and opens in https://ui.perfetto.dev or
+chrome://tracing. While tracing is disabled, spans cost a global lookup
+and the wrappers are not instrumented at all.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# Tracer of the process, None while tracing is disabled
+TRACER = None
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Tracer:
+    def __init__(self, directory):
+        self.directory = directory
+        self.events = []
+        self._lock = threading.Lock()
+        # Track key, e.g. the IUT, -> process ID of the trace
+        self._pids = {}
+        # (process ID, thread ident) of the tracks named in the trace
+        self._tids = set()
+        # Number of traces written per test
+        self._written = {}
+        self._origin = time.perf_counter()
+
+    def now(self):
+        """Trace timestamp in microseconds"""
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _metadata(self, pid, tid=None, name=None):
+        if tid is None:
+            return [{'ph': 'M', 'name': 'process_name', 'pid': pid,
+                     'args': {'name': name}},
+                    {'ph': 'M', 'name': 'process_sort_index', 'pid': pid,
+                     'args': {'sort_index': pid}}]
+        return [{'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid,
+                 'args': {'name': name}}]
+
+    def _track(self, key):
+        # Called with the lock held
+        pid = self._pids.get(key)
+        if pid is None:
+            pid = self._pids[key] = len(self._pids) + 1
+            self.events += self._metadata(pid, name=key)
+
+        thread = threading.current_thread()
+        if (pid, thread.ident) not in self._tids:
+            self._tids.add((pid, thread.ident))
+            self.events += self._metadata(pid, thread.ident, thread.name)
+        return pid, thread.ident
+
+    def complete(self, name, keys, start, cat, args=None):
+        """Add a span from start until now on the track of every key"""
+        end = self.now()
+        with self._lock:
+            for key in keys:
+                pid, tid = self._track(key)
+                event = {'ph': 'X', 'name': name, 'cat': cat, 'ts': start,
+                         'dur': end - start, 'pid': pid, 'tid': tid}
+                if args:
+                    event['args'] = args
+                self.events.append(event)
+
+    def write(self, name):
+        """Write the spans collected so far to a trace file of name
+
+        Returns the path of the file. Tracks stay named in every file.
+        """
+        with self._lock:
+            events, self.events = self.events, []
+            self._tids = set()
+            pids, self._pids = self._pids, {}
+            count = self._written[name] = self._written.get(name, 0) + 1
+
+        path = os.path.join(self.directory, "%s-%d.json" % (
+            name.replace('#', '.'), count))
+        with open(path, "w") as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      trace_file)
+        return path
+
+
+def enable(directory):
+    global TRACER
+
+    os.makedirs(directory, exist_ok=True)
+    TRACER = Tracer(directory)
+    return TRACER
+
+
+def disable():
+    global TRACER
+
+    TRACER = None
+
+
+@contextlib.contextmanager
+def _span(tracer, name, keys, cat, args):
+    start = tracer.now()
+    try:
+        yield
+    finally:
+        tracer.complete(name, keys, start, cat, args)
+
+
+def span(name, keys, cat='', **args):
+    """Context manager tracing a block on the track of every key"""
+    tracer = TRACER
+    if tracer is None:
+        return _NO_SPAN
+    return _span(tracer, name, [str(key) for key in keys], cat, args)
+
+
+def _traced(f):
+    @functools.wraps(f)
+    def wrapper(iutctl, *args, **kwargs):
+        tracer = TRACER
+        if tracer is None:
+            return f(iutctl, *args, **kwargs)
+
+        start = tracer.now()
+        try:
+            return f(iutctl, *args, **kwargs)
+        finally:
+            tracer.complete(f.__name__, [str(iutctl)], start, 'btp',
+                            {'iut': str(iutctl)})
+
+    wrapper.traced = True
+    return wrapper
+
+
+def instrument(module):
+    """Trace every function of module taking iutctl first, e.g. pybtp.btp
+
+    Calls through the module attribute, as btp.gap_conn(), are traced,
+    so are the calls of the functions among themselves.
+    """
+    for name, f in list(vars(module).items()):
+        if not inspect.isfunction(f) or f.__module__ != module.__name__ or \
+                getattr(f, 'traced', False):
+            continue
+
+        params = list(inspect.signature(f).parameters)
+        if params and params[0] == 'iutctl':
+            setattr(module, name, _traced(f))
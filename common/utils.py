@@ -11,9 +11,11 @@
 #
 
 import importlib
+import math
 import os
 import subprocess
 import sys
+import time
 
 from pathlib import Path
 
@@ -23,12 +25,43 @@ PROJECT_DIR = os.path.dirname(  # BTPTesterCore repo directory
 
 GLOBAL_END = False
 
+# IUT name -> IUTLostError of every IUT whose BTP transport was lost
+LOST_IUTS = {}
+
 
 def check_call(cmd, env=None, cwd=None, shell=True):
     cmd = subprocess.list2cmdline(cmd)
     return subprocess.check_call(cmd, env=env, cwd=cwd, shell=shell)
 
 
+def wait_for(condition, timeout, interval=0.05, what=None):
+    """Poll condition until it returns a true value and return it
+
+    Raises TimeoutError if condition is still false after timeout
+    seconds. Used instead of fixed sleeps, so a ready resource is used
+    at once.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result:
+            return result
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Timeout waiting for {}".format(
+                what or getattr(condition, '__name__', 'condition')))
+        time.sleep(interval)
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of values, None if values is empty"""
+    if not values:
+        return None
+
+    values = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
 def get_absolute_module_path(config_path):
     # Path to the config file can be specified as 'config',
     # or 'config.py'.
@@ -82,3 +115,23 @@ def get_global_end():
 def raise_on_global_end():
     if GLOBAL_END:
         raise RunEnd
+
+
+def set_iut_lost(name, error):
+    LOST_IUTS[name] = error
+
+
+def clear_iut_lost(name):
+    LOST_IUTS.pop(name, None)
+
+
+def raise_on_iut_lost(*names):
+    """Raise the IUTLostError of the first lost IUT of names
+
+    Waiting for a lost IUT is futile. IUTs not waited for are left to the
+    waits on them.
+    """
+    for name in names:
+        error = LOST_IUTS.get(name)
+        if error is not None:
+            raise error
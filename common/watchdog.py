@@ -0,0 +1,128 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Heartbeat watchdog of an IUT
+
+Once an IUT received nothing for the idle interval, the watchdog sends
+a cheap BTP command and waits for the response. Any frame received
+proves the IUT alive, so no heartbeat is sent while tests are busy.
+
+An IUT not answering a heartbeat or a command in time is stalled. The
+stall is logged with the time of the unanswered frame and the last
+frames exchanged, and the IUT is marked lost, so the test fails at once.
+"""
+
+import collections
+import logging
+import socket
+import threading
+import time
+
+from pybtp.types import IUTLostError
+
+log = logging.debug
+
+
+def wall_time(monotonic):
+    """time.time() of a time.monotonic() timestamp"""
+    return time.time() - (time.monotonic() - monotonic)
+
+
+def format_time(timestamp):
+    return time.strftime("%H:%M:%S", time.localtime(timestamp)) + \
+        (".%03d" % (timestamp % 1 * 1000))
+
+
+class Watchdog(threading.Thread):
+    def __init__(self, iutctl, interval=10.0, timeout=5.0):
+        super(__class__, self).__init__(name="Watchdog-%s" % iutctl,
+                                        daemon=True)
+        self.iutctl = iutctl
+        self.interval = interval
+        self.timeout = timeout
+
+        # Heartbeat response times in seconds
+        self.rtts = collections.deque(maxlen=100)
+        self.stalls = []
+        self._end = threading.Event()
+
+    def stop(self):
+        self._end.set()
+
+    def take_stalls(self):
+        """Stalls recorded since the last call"""
+        stalls, self.stalls = self.stalls, []
+        return stalls
+
+    def _stalled(self, worker, since):
+        stall = {
+            'iut': str(self.iutctl),
+            'unanswered': wall_time(since),
+            'last_rx': wall_time(worker.last_rx),
+            'frames': [
+                {'time': t, 'dir': direction, 'svc_id': svc_id, 'op': op,
+                 'len': data_len}
+                for t, direction, svc_id, op, data_len in list(worker.trace)],
+        }
+        self.stalls.append(stall)
+
+        logging.error("%s stopped responding: nothing received since %s, "
+                      "frame sent at %s not answered. Last frames:\n%s",
+                      self.iutctl, format_time(stall['last_rx']),
+                      format_time(stall['unanswered']),
+                      "\n".join("  %s %s svc %d op 0x%02x len %d" % (
+                          format_time(frame['time']), frame['dir'],
+                          frame['svc_id'], frame['op'], frame['len'])
+                          for frame in stall['frames']))
+
+        worker.set_lost(IUTLostError(
+            "IUT not responding since %s" % format_time(stall['unanswered'])))
+
+    def check(self):
+        worker = self.iutctl.btp_worker
+        # Nothing to check before the IUT ready event
+        if worker is None or worker.lost is not None or \
+                worker.last_rx is None:
+            return
+
+        now = time.monotonic()
+        if now - worker.last_rx < self.interval:
+            return
+
+        # A command in flight serves as heartbeat
+        pending = worker.pending_since()
+        if pending is not None:
+            if pending > worker.last_rx and now - pending > self.timeout:
+                self._stalled(worker, pending)
+            return
+
+        try:
+            rtt = worker.probe(self.timeout)
+        except socket.timeout:
+            self._stalled(worker, worker.pending_since() or now)
+        except (IUTLostError, OSError) as e:
+            log("%s: heartbeat not sent: %r", self.name, e)
+        else:
+            if rtt is not None:
+                self.rtts.append(rtt)
+
+    def run(self):
+        tick = min(1.0, self.interval / 2)
+        while not self._end.wait(tick):
+            try:
+                self.check()
+            except Exception as e:
+                logging.exception("%s: %r", self.name, e)
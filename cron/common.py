@@ -35,13 +35,16 @@ import traceback
 import subprocess
 from os import listdir
 from pathlib import Path
-from time import sleep, time
+from time import time
 from os.path import dirname, abspath
 from datetime import datetime, date
 
 from common.utils import load_config, check_call, get_global_end
-from common.github import update_sources, update_repos
+from common.github import update_sources, update_repos, describe_repo
 from common.mail import send_mail
+from common.results import ResultReader, final_records, PASS, \
+    PASS_AFTER_RETRY, SKIP
+from common.results_db import import_results, RESULTS_DB
 
 BTPTESTER_REPO = os.path.dirname(  # BTPTesterCore repo directory
                     os.path.dirname(  # cron directory
@@ -49,6 +52,7 @@ BTPTESTER_REPO = os.path.dirname(  # BTPTesterCore repo directory
 sys.path.insert(0, BTPTESTER_REPO)
 
 BTPTESTER_STDOUT = 'stdout_btptestercore.log'
+BTPTESTER_RESULTS = 'results_btptestercore.jsonl'
 
 log = logging.info
 CRON_CFG = {}
@@ -100,61 +104,46 @@ def format_message(failed, passed, skipped):
     return msg
 
 
-def report_to_review_msg(options):
-    report_path = os.path.join(BTPTESTER_REPO, BTPTESTER_STDOUT)
-    
-    failed = []
-    passed = []
-    skipped = []
-    
-    msg = '### BTPTester results:'
-    devices_role_info = "\n\n#### Central: {}, Peripheral: {}"
+def group_results(records):
+    """Final test records grouped by run and role assignment, in run order"""
+    groups = {}
+    for record in final_records(records):
+        key = (record['run'], record['reverse'])
+        groups.setdefault(key, []).append(record)
+    return list(groups.values())
 
-    testrun_separator = "------"
-    passed_string = '... ok'
-    failed_string = '======'
-    skipped_string = "... skipped"
 
-    check_twice = False
+def report_to_review_msg():
+    results_path = os.path.join(BTPTESTER_REPO, BTPTESTER_RESULTS)
+    groups = group_results(ResultReader(results_path).read())
 
-    central = options[options.index('--central') + 1]
-    peripheral = options[options.index('--peripheral') + 1]
-    if "--rerun-reverse" in options:
-        check_twice = True
+    if not groups:
+        report_path = os.path.join(BTPTESTER_REPO, BTPTESTER_STDOUT)
+        with open(report_path, 'r') as f:
+            return error_to_review_msg(f)
 
-    msg += devices_role_info.format(central, peripheral)
-
-    with open(report_path, 'r') as f:
-        f.readline()
-
-        # Parsing python's unittest default output
-        last_line = ''
-        while True:
-            line = f.readline()
+    msg = '### BTPTester results:'
+    devices_role_info = "\n\n#### Central: {}, Peripheral: {}"
 
-            if not line:
-                if len(failed) == 0 and len(passed) == 0 and len(skipped) == 0:
-                    return error_to_review_msg(f)
-                break
+    for group in groups:
+        failed = []
+        passed = []
+        skipped = []
+
+        for record in group:
+            name = record['test'].split('#')[-1]
+            if record['verdict'] == PASS:
+                passed.append(name)
+            elif record['verdict'] == PASS_AFTER_RETRY:
+                passed.append(name + ' (passed after retry)')
+            elif record['verdict'] == SKIP:
+                skipped.append(name + ': ' + record['failure'])
+            else:
+                failed.append(name)
 
-            if passed_string in line:
-                passed.append(last_line.split(' ')[0])
-            elif skipped_string in line:
-                skipped.append(last_line.split(' ')[0] + ':' + line.split('...')[1])
-            elif failed_string in last_line:
-                failed.append(line.split(' ')[1])
-            elif testrun_separator in line:
-                if len(failed) == 0 and len(passed) == 0 and len(skipped) == 0:
-                    return error_to_review_msg(f)
-                msg += format_message(failed, passed, skipped)
-                if check_twice:
-                    check_twice = False
-                    msg += devices_role_info.format(peripheral, central)
-                    failed = []
-                    passed = []
-                    skipped = []
-                    
-            last_line = line
+        msg += devices_role_info.format(group[0]['central'],
+                                        group[0]['peripheral'])
+        msg += format_message(failed, passed, skipped)
 
     return msg
 
@@ -240,6 +229,7 @@ def save_files(btptestercore_repo):
         os.path.join(btptestercore_repo, 'iut-mynewt-0.log'),
         os.path.join(btptestercore_repo, 'iut-mynewt-1.log'),
         os.path.join(btptestercore_repo, BTPTESTER_STDOUT),
+        os.path.join(btptestercore_repo, BTPTESTER_RESULTS),
     ]
     try:
         oldlogs_dir = os.path.join(btptestercore_repo, 'oldlogs/')
@@ -283,10 +273,27 @@ def merge_pr_branch(pr_source_repo_owner, pr_source_branch, repo_name, project_r
     check_call(cmd.split(), cwd=project_repo)
 
 
-def run_test(options, btptestercore_repo):
+def log_progress(records):
+    for record in records:
+        run = 'run {}{}'.format(record['run'],
+                                ' reverse' if record['reverse'] else '')
+        if record['record'] == 'run':
+            log('Started {} attempt {} with {} tests'.format(
+                run, record['attempt'], record['tests']))
+        else:
+            log('{} {}: {} in {:.1f}s'.format(
+                run, record['test'], record['verdict'], record['duration']))
+
+
+def run_test(options, btptestercore_repo, timeout=None, poll_interval=5):
+    results_path = os.path.join(btptestercore_repo, BTPTESTER_RESULTS)
+    if os.path.exists(results_path):
+        os.remove(results_path)
+
     # Start subprocess of btptestercore
-    cmd = 'python3 btptester.py {}' \
-              ' >> {} 2>&1'.format(options, BTPTESTER_STDOUT)
+    cmd = 'python3 btptester.py {} --result-file {}' \
+              ' >> {} 2>&1'.format(options, BTPTESTER_RESULTS,
+                                   BTPTESTER_STDOUT)
     log(f'Running: {cmd}')
     test_process = subprocess.Popen(cmd,
                                    shell=True,
@@ -294,17 +301,66 @@ def run_test(options, btptestercore_repo):
                                    stderr=subprocess.STDOUT,
                                    cwd=btptestercore_repo)
 
-    sleep(5)
+    # Results are streamed by btptester as the tests finish
+    reader = ResultReader(results_path)
+
+    deadline = None if timeout is None else time() + timeout
     try:
-        # Main thread waits for the subprocesses to finish
-        while test_process.poll() is None:
-            sleep(5)
+        # Main thread waits for the subprocesses to finish, progress is
+        # logged every poll_interval and the wait ends when it exits
+        while True:
+            try:
+                test_process.wait(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                log_progress(reader.read())
+
+            if deadline is not None and time() > deadline:
+                log(f'Test run exceeded {timeout}s, terminating it')
+                test_process.terminate()
+                test_process.wait(timeout=poll_interval)
+                break
+        log_progress(reader.read())
     except:
         pass
 
-    sleep(10)
     kill_processes('python.exe')
 
+
+def store_results(btptestercore_repo):
+    """Add the results of the last run to the historical database"""
+    results_path = os.path.join(btptestercore_repo, BTPTESTER_RESULTS)
+    if not os.path.exists(results_path):
+        log('No results to store')
+        return
+
+    try:
+        added = import_results(results_path,
+                               os.path.join(btptestercore_repo, RESULTS_DB))
+        log(f'Stored {added} test results in {RESULTS_DB}')
+    except:
+        log(traceback.format_exc())
+
+
+def build_label(cfg, project):
+    """Firmware revision of project, git describe of each of its repos"""
+    project_cfg = cfg.get(project, {})
+    labels = []
+    try:
+        for repo, conf in project_cfg.get('git', {}).items():
+            repo_path = conf['path']
+            if not os.path.isabs(repo_path):
+                repo_path = os.path.join(project_cfg['project_path'],
+                                         repo_path)
+            desc, _ = describe_repo(repo_path)
+            labels.append(f'{repo}@{desc}')
+    except:
+        log(traceback.format_exc())
+        return None
+
+    return ','.join(labels) or None
+
+
 def get_suitable_iuts(cfg, os):
     suitable_iuts = []
     for iut in cfg['iuts']:
@@ -350,6 +406,12 @@ def create_run_options(cfg, os, against=None):
     for test in cfg['test_options']['tests']:
         options += ' --test {}'.format(test)
 
+    # Results are tracked per firmware revision in the results database
+    for role, project in (('central', os), ('peripheral', peripheral_os)):
+        label = build_label(cfg, project)
+        if label:
+            options += ' --{}-build {}'.format(role, shlex.quote(label))
+
     options += ' --flash-central {} {}'.format(central['name'], \
             cfg[os]['project_path'])
 
@@ -399,14 +461,16 @@ def generic_pr_job(cron, cfg, pr_cfg, pr_repo_name_in_config, **kwargs):
     options = create_run_options(cfg_dict, pr_repo_name_in_config, against)
 
     # Run BTPTesterCore
-    run_test(options, BTPTESTER_REPO)
+    run_test(options, BTPTESTER_REPO,
+             cfg_dict['test_options'].get('timeout'))
 
     git_checkout(cfg_dict[pr_repo_name_in_config]['git'][pr_cfg['repo_name']]['branch'], repo_path)
 
     # Post in PR comment with results
     cron.post_pr_comment(
-        pr_cfg['number'], report_to_review_msg(options.split()))
+        pr_cfg['number'], report_to_review_msg())
 
+    store_results(BTPTESTER_REPO)
     save_files(BTPTESTER_REPO)
 
     log('PR Job finished')
@@ -443,8 +507,10 @@ def generic_test_job(cfg, os, against, **kwargs):
     print(kwargs)
 
     options = create_run_options(cfg_dict, os, against)
-    run_test(options, BTPTESTER_REPO)
+    run_test(options, BTPTESTER_REPO,
+             cfg_dict['test_options'].get('timeout'))
 
+    store_results(BTPTESTER_REPO)
     save_files(BTPTESTER_REPO)
 
     log(f'{cfg} Job finished')
@@ -110,6 +110,10 @@ class BTMonitor():
         logging.debug('btmon closed: ' + str(rc))
 
 
+# Seconds rtt2pty has to attach to the board and report its pty
+RTT2PTY_TIMEOUT = 10.0
+
+
 class RTT2PTY:
     def __init__(self):
         self.rtt2pty_process = None
@@ -128,17 +132,24 @@ class RTT2PTY:
         flags = fcntl(self.rtt2pty_process.stdout, F_GETFL) # get current p.stdout flags
         fcntl(self.rtt2pty_process.stdout, F_SETFL, flags | O_NONBLOCK)
 
-        time.sleep(3)
-        pty = None
-        try:
-            for line in iter(self.rtt2pty_process.stdout.readline, b''):
+        # Wait for rtt2pty to print the pty name instead of a fixed time
+        deadline = time.monotonic() + RTT2PTY_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                line = self.rtt2pty_process.stdout.readline()
+            except IOError:
+                line = None
+
+            if line:
                 line = line.decode('UTF-8')
                 if line.startswith('PTY name is '):
-                    pty = line[len('PTY name is '):].strip()
-        except IOError:
-            pass
+                    return line[len('PTY name is '):].strip()
+            elif self.rtt2pty_process.poll() is not None:
+                break
+            else:
+                time.sleep(0.05)
 
-        return pty
+        return None
 
     def _read_from_port(self, ser, stop_thread, file):
         current_test = None
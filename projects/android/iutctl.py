@@ -141,11 +141,13 @@ class AndroidCtl(IutCtl):
 
         self._btp_socket = None
         self._btp_worker = None
+        # BTP worker name, the IUT is reported lost under it
+        self._worker_name = 'RxWorkerAndroid-' + self.serial_num
 
         # self.log_filename = "iut-mynewt-{}.log".format(id)
         # self.log_file = open(self.log_filename, "w")
 
-        self._stack = Stack()
+        self._stack = Stack(self.get_type(), self._worker_name)
         self._stack.set_pairing_consent_cb(lambda addr:
                                            _adb_tap_ok(self.serial_num))
         self._stack.set_passkey_confirm_cb(lambda addr, match:
@@ -178,10 +180,13 @@ class AndroidCtl(IutCtl):
         _adb_start_app(self.serial_num)
 
         self._btp_socket = BTPWebSocket(self.host, self.port)
-        self._btp_worker = BTPWorker(self._btp_socket, 'RxWorkerAndroid-' +
-                                     self.serial_num)
+        self._btp_worker = BTPWorker(self._btp_socket, self._worker_name,
+                                     is_alive=self._btp_socket.is_alive,
+                                     iut_type=self.get_type(),
+                                     track=str(self))
         self._btp_worker.open()
         self._btp_worker.register_event_handler(self._event_handler)
+        self._btp_worker.register_lost_handler(self._event_handler.iut_lost)
         self._btp_worker.accept()
 
     def reset(self):
@@ -37,6 +37,9 @@ log = logging.debug
 # BTP communication transport: unix domain socket file name
 BTP_ADDRESS = "/tmp/bt-stack-tester"
 
+# Seconds socat has to exit after being terminated
+SOCAT_EXIT_TIMEOUT = 5.0
+
 
 class MynewtCtl(IutCtl):
     """Mynewt OS Control Class"""
@@ -51,12 +54,14 @@ class MynewtCtl(IutCtl):
         self._socat_process = None
         self._btp_socket = None
         self._btp_worker = None
+        # BTP worker name, the IUT is reported lost under it
+        self._worker_name = 'RxWorkerMynewt-' + str(self.id)
         self.gdb = gdb
 
         self.log_filename = "iut-mynewt-{}.log".format(self.id)
         self.log_file = open(self.log_filename, "w")
 
-        self._stack = Stack()
+        self._stack = Stack(self.get_type(), self._worker_name)
         self._event_handler = BTPEventHandler(self)
 
     @property
@@ -79,13 +84,29 @@ class MynewtCtl(IutCtl):
         except:
             raise
 
-    def flush_serial(self):
+    def flush_serial(self, quiet=0.05, timeout=1.0):
+        """Drop stale serial data until the line stays quiet
+
+        Returns as soon as nothing was received for quiet seconds, a
+        device still sending is read for at most timeout seconds.
+        """
         log("%s.%s", self.__class__, self.flush_serial.__name__)
-        # Try to read data or timeout
         ser = serial.Serial(port=self.board.serial_port,
-                            baudrate=self.board.serial_baudrate, timeout=1)
-        ser.read(99999)
-        ser.close()
+                            baudrate=self.board.serial_baudrate,
+                            timeout=quiet)
+        try:
+            ser.reset_input_buffer()
+            deadline = time.monotonic() + timeout
+            while ser.read(max(1, ser.in_waiting)) and \
+                    time.monotonic() < deadline:
+                pass
+        finally:
+            ser.close()
+
+    def socat_alive(self):
+        """False once socat exited, e.g. on a serial port disconnect"""
+        return self._socat_process is None or \
+            self._socat_process.poll() is None
 
     def start(self):
         """Starts the Mynewt OS"""
@@ -93,13 +114,15 @@ class MynewtCtl(IutCtl):
         log("%s.%s", self.__class__, self.start.__name__)
 
         self._btp_socket = BTPSocket(self.btp_address)
-        self._btp_worker = BTPWorker(self._btp_socket, 'RxWorkerMynewt-' +
-                                     str(self.id))
+        self._btp_worker = BTPWorker(self._btp_socket, self._worker_name,
+                                     is_alive=self.socat_alive,
+                                     iut_type=self.get_type(), track=str(self))
 
         self._event_handler = BTPEventHandler(self)
 
         self._btp_worker.open()
         self._btp_worker.register_event_handler(self._event_handler)
+        self._btp_worker.register_lost_handler(self._event_handler.iut_lost)
 
         self.flush_serial()
 
@@ -154,7 +177,12 @@ class MynewtCtl(IutCtl):
 
         if self._socat_process and self._socat_process.poll() is None:
             self._socat_process.terminate()
-            self._socat_process.wait()
+            try:
+                self._socat_process.wait(timeout=SOCAT_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                log("socat did not exit, killing it")
+                self._socat_process.kill()
+                self._socat_process.wait()
 
         if self._event_handler:
             self._event_handler.clear_listeners()
@@ -17,262 +17,41 @@
 
 import binascii
 import logging
-import struct
 import threading
-import uuid
+import time
 from collections import defaultdict
 from concurrent.futures.thread import ThreadPoolExecutor
 
+from common import timeouts
 from common.iutctl import IutCtl
 from pybtp import defs
-from pybtp.types import addr2btp_ba
+from pybtp import messages as msgs
+from pybtp.utils import payload_bytes
 from stack.gap import LeAdv, BleAddress, ConnParams
 from stack.gatt import GattDB, GattPrimary, GattSecondary, GattCharacteristic, \
     GattServiceIncluded, GattCharacteristicDescriptor, GattValue
 from .types import BTPError, gap_settings_btp2txt, Addr, OwnAddrType, AdDuration, UUID, AdType, \
-    BTPErrorInvalidServiceID, BTPErrorInvalidStatus, BTPErrorInvalidOpcode, Perm
+    BleUUID, BTPErrorInvalidServiceID, BTPErrorInvalidStatus, BTPErrorInvalidOpcode, Perm
 
 CONTROLLER_INDEX = 0
 
-CORE = {
-    "gap_reg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_REGISTER_SERVICE,
-                defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GAP),
-    "gap_unreg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_UNREGISTER_SERVICE,
-                  defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GAP),
-    "gatt_reg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_REGISTER_SERVICE,
-                 defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GATT),
-    "gatt_unreg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_UNREGISTER_SERVICE,
-                   defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GATT),
-    "l2cap_reg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_REGISTER_SERVICE,
-                  defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_L2CAP),
-    "l2cap_unreg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_UNREGISTER_SERVICE,
-                    defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_L2CAP),
-    "mesh_reg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_REGISTER_SERVICE,
-                 defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_MESH),
-    "mesh_unreg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_UNREGISTER_SERVICE,
-                   defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_MESH),
-    "gatt_cl_reg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_REGISTER_SERVICE,
-                    defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GATTC),
-    "gatt_cl_unreg": (defs.BTP_SERVICE_ID_CORE, defs.CORE_UNREGISTER_SERVICE,
-                      defs.BTP_INDEX_NONE, defs.BTP_SERVICE_ID_GATTC),
-    "read_supp_cmds": (defs.BTP_SERVICE_ID_CORE,
-                       defs.CORE_READ_SUPPORTED_COMMANDS,
-                       defs.BTP_INDEX_NONE, ""),
-    "read_supp_svcs": (defs.BTP_SERVICE_ID_CORE,
-                       defs.CORE_READ_SUPPORTED_SERVICES,
-                       defs.BTP_INDEX_NONE, ""),
-}
-
-GAP = {
-    "start_adv": (defs.BTP_SERVICE_ID_GAP, defs.GAP_START_ADVERTISING,
-                  CONTROLLER_INDEX),
-    "stop_adv": (defs.BTP_SERVICE_ID_GAP, defs.GAP_STOP_ADVERTISING,
-                 CONTROLLER_INDEX, ""),
-    "conn": (defs.BTP_SERVICE_ID_GAP, defs.GAP_CONNECT, CONTROLLER_INDEX),
-    "pair": (defs.BTP_SERVICE_ID_GAP, defs.GAP_PAIR, CONTROLLER_INDEX),
-    "unpair": (defs.BTP_SERVICE_ID_GAP, defs.GAP_UNPAIR, CONTROLLER_INDEX),
-    "disconn": (defs.BTP_SERVICE_ID_GAP, defs.GAP_DISCONNECT,
-                CONTROLLER_INDEX),
-    "set_io_cap": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_IO_CAP,
-                   CONTROLLER_INDEX),
-    "set_conn": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_CONNECTABLE,
-                 CONTROLLER_INDEX, 1),
-    "set_nonconn": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_CONNECTABLE,
-                    CONTROLLER_INDEX, 0),
-    "set_nondiscov": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_DISCOVERABLE,
-                      CONTROLLER_INDEX, defs.GAP_NON_DISCOVERABLE),
-    "set_gendiscov": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_DISCOVERABLE,
-                      CONTROLLER_INDEX, defs.GAP_GENERAL_DISCOVERABLE),
-    "set_limdiscov": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_DISCOVERABLE,
-                      CONTROLLER_INDEX, defs.GAP_LIMITED_DISCOVERABLE),
-    "set_powered_on": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_POWERED,
-                       CONTROLLER_INDEX, 1),
-    "set_powered_off": (defs.BTP_SERVICE_ID_GAP, defs.GAP_SET_POWERED,
-                        CONTROLLER_INDEX, 0),
-    "start_discov": (defs.BTP_SERVICE_ID_GAP,
-                     defs.GAP_START_DISCOVERY, CONTROLLER_INDEX),
-    "stop_discov": (defs.BTP_SERVICE_ID_GAP, defs.GAP_STOP_DISCOVERY,
-                    CONTROLLER_INDEX, ""),
-    "read_ctrl_info": (defs.BTP_SERVICE_ID_GAP,
-                       defs.GAP_READ_CONTROLLER_INFO,
-                       CONTROLLER_INDEX, ""),
-    "passkey_entry_rsp": (defs.BTP_SERVICE_ID_GAP,
-                          defs.GAP_PASSKEY_ENTRY,
-                          CONTROLLER_INDEX),
-    "passkey_confirm": (defs.BTP_SERVICE_ID_GAP,
-                        defs.GAP_PASSKEY_CONFIRM,
-                        CONTROLLER_INDEX),
-    "start_direct_adv": (defs.BTP_SERVICE_ID_GAP,
-                         defs.GAP_START_DIRECT_ADV,
-                         CONTROLLER_INDEX),
-    "conn_param_update": (defs.BTP_SERVICE_ID_GAP,
-                          defs.GAP_CONN_PARAM_UPDATE,
-                          CONTROLLER_INDEX),
-    "pairing_consent_rsp": (defs.BTP_SERVICE_ID_GAP,
-                            defs.GAP_PAIRING_CONSENT_RSP,
-                            CONTROLLER_INDEX),
-    "reset": (defs.BTP_SERVICE_ID_GAP, defs.GAP_RESET, CONTROLLER_INDEX, "")
-}
-
-GATTS = {
-    "add_svc": (defs.BTP_SERVICE_ID_GATT, defs.GATT_ADD_SERVICE,
-                CONTROLLER_INDEX),
-    "start_server": (defs.BTP_SERVICE_ID_GATT, defs.GATT_START_SERVER,
-                     CONTROLLER_INDEX, ""),
-    "add_inc_svc": (defs.BTP_SERVICE_ID_GATT,
-                    defs.GATT_ADD_INCLUDED_SERVICE, CONTROLLER_INDEX),
-    "add_char": (defs.BTP_SERVICE_ID_GATT, defs.GATT_ADD_CHARACTERISTIC,
-                 CONTROLLER_INDEX),
-    "set_val": (defs.BTP_SERVICE_ID_GATT, defs.GATT_SET_VALUE,
-                CONTROLLER_INDEX),
-    "add_desc": (defs.BTP_SERVICE_ID_GATT, defs.GATT_ADD_DESCRIPTOR,
-                 CONTROLLER_INDEX),
-    "set_enc_key_size": (defs.BTP_SERVICE_ID_GATT,
-                         defs.GATT_SET_ENC_KEY_SIZE, CONTROLLER_INDEX),
-    "get_attrs": (defs.BTP_SERVICE_ID_GATT, defs.GATT_GET_ATTRIBUTES,
-                  CONTROLLER_INDEX),
-    "get_attr_val": (defs.BTP_SERVICE_ID_GATT,
-                     defs.GATT_GET_ATTRIBUTE_VALUE, CONTROLLER_INDEX)
-}
 
-GATTC = {
-    "exchange_mtu": (defs.BTP_SERVICE_ID_GATT, defs.GATT_EXCHANGE_MTU,
-                     CONTROLLER_INDEX),
-    "disc_prim_svcs": (defs.BTP_SERVICE_ID_GATT, defs.GATT_DISC_PRIM_SVCS,
-                       CONTROLLER_INDEX),
-    "disc_prim_uuid": (defs.BTP_SERVICE_ID_GATT, defs.GATT_DISC_PRIM_UUID,
-                       CONTROLLER_INDEX),
-    "find_included": (defs.BTP_SERVICE_ID_GATT, defs.GATT_FIND_INCLUDED,
-                      CONTROLLER_INDEX),
-    "disc_all_chrc": (defs.BTP_SERVICE_ID_GATT, defs.GATT_DISC_ALL_CHRC,
-                      CONTROLLER_INDEX),
-    "disc_chrc_uuid": (defs.BTP_SERVICE_ID_GATT, defs.GATT_DISC_CHRC_UUID,
-                       CONTROLLER_INDEX),
-    "disc_all_desc": (defs.BTP_SERVICE_ID_GATT, defs.GATT_DISC_ALL_DESC,
-                      CONTROLLER_INDEX),
-    "read": (defs.BTP_SERVICE_ID_GATT, defs.GATT_READ, CONTROLLER_INDEX),
-    "read_long": (defs.BTP_SERVICE_ID_GATT, defs.GATT_READ_LONG,
-                  CONTROLLER_INDEX),
-    "read_multiple": (defs.BTP_SERVICE_ID_GATT, defs.GATT_READ_MULTIPLE,
-                      CONTROLLER_INDEX),
-    "write_without_rsp": (defs.BTP_SERVICE_ID_GATT,
-                          defs.GATT_WRITE_WITHOUT_RSP, CONTROLLER_INDEX),
-    "signed_write": (defs.BTP_SERVICE_ID_GATT,
-                     defs.GATT_SIGNED_WRITE_WITHOUT_RSP, CONTROLLER_INDEX),
-    "write": (defs.BTP_SERVICE_ID_GATT, defs.GATT_WRITE, CONTROLLER_INDEX),
-    "write_long": (defs.BTP_SERVICE_ID_GATT, defs.GATT_WRITE_LONG,
-                   CONTROLLER_INDEX),
-    "cfg_notify": (defs.BTP_SERVICE_ID_GATT, defs.GATT_CFG_NOTIFY,
-                   CONTROLLER_INDEX),
-    "cfg_indicate": (defs.BTP_SERVICE_ID_GATT, defs.GATT_CFG_INDICATE,
-                     CONTROLLER_INDEX),
-}
+def send_msg(iutctl: IutCtl, msg, ctrl_index=CONTROLLER_INDEX):
+    """Encode and send BTP command message"""
+    iutctl.btp_worker.send(msg.svc_id, msg.op, ctrl_index, msg.encode())
 
-GATT_CL = {
-    "disc_prim_svcs": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_DISC_ALL_PRIM,
-                       CONTROLLER_INDEX),
-    "disc_prim_uuid": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_DISC_PRIM_UUID,
-                       CONTROLLER_INDEX),
-    "find_included": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_FIND_INCLUDED,
-                       CONTROLLER_INDEX),
-    "disc_all_chrc": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_DISC_ALL_CHRC,
-                       CONTROLLER_INDEX),
-    "disc_chrc_uuid": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_DISC_CHRC_UUID,
-                       CONTROLLER_INDEX),
-    "disc_all_desc": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_DISC_ALL_DESC,
-                       CONTROLLER_INDEX),
-    "read": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_READ,
-                       CONTROLLER_INDEX),
-    "read_long": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_READ_LONG,
-                       CONTROLLER_INDEX),
-    "write": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_WRITE,
-                       CONTROLLER_INDEX),
-    "write_long": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_WRITE_LONG,
-                       CONTROLLER_INDEX),
-    "cfg_notify": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_CFG_NOTIFY,
-                       CONTROLLER_INDEX),
-    "cfg_indicate": (defs.BTP_SERVICE_ID_GATTC, defs.GATTC_CFG_INDICATE,
-                       CONTROLLER_INDEX),
-}
 
-L2CAP = {
-    "read_supp_cmds": (defs.BTP_SERVICE_ID_L2CAP,
-                       defs.L2CAP_READ_SUPPORTED_COMMANDS,
-                       defs.BTP_INDEX_NONE, ""),
-    "connect": (defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_CONNECT,
-                CONTROLLER_INDEX),
-    "disconnect": (defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_DISCONNECT,
-                   CONTROLLER_INDEX),
-    "send_data": (defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_SEND_DATA,
-                  CONTROLLER_INDEX),
-    "listen": (defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_LISTEN,
-               CONTROLLER_INDEX),
-}
+def send_msg_wait_rsp(iutctl: IutCtl, msg, ctrl_index=CONTROLLER_INDEX):
+    """Encode and send BTP command message, return response data"""
+    return iutctl.btp_worker.send_wait_rsp(msg.svc_id, msg.op, ctrl_index,
+                                           msg.encode())
 
-MESH = {
-    "read_supp_cmds": (defs.BTP_SERVICE_ID_MESH,
-                       defs.MESH_READ_SUPPORTED_COMMANDS,
-                       defs.BTP_INDEX_NONE, ""),
-    "config_prov": (defs.BTP_SERVICE_ID_MESH,
-                    defs.MESH_CONFIG_PROVISIONING,
-                    CONTROLLER_INDEX),
-    "prov_node": (defs.BTP_SERVICE_ID_MESH,
-                  defs.MESH_PROVISION_NODE,
-                  CONTROLLER_INDEX),
-    "init": (defs.BTP_SERVICE_ID_MESH,
-             defs.MESH_INIT,
-             CONTROLLER_INDEX, ""),
-    "reset": (defs.BTP_SERVICE_ID_MESH,
-              defs.MESH_RESET,
-              CONTROLLER_INDEX, ""),
-    "input_num": (defs.BTP_SERVICE_ID_MESH,
-                  defs.MESH_INPUT_NUMBER,
-                  CONTROLLER_INDEX),
-    "input_str": (defs.BTP_SERVICE_ID_MESH,
-                  defs.MESH_INPUT_STRING,
-                  CONTROLLER_INDEX),
-    "iv_update_test_mode": (defs.BTP_SERVICE_ID_MESH,
-                            defs.MESH_IV_UPDATE_TEST_MODE,
-                            CONTROLLER_INDEX),
-    "iv_update_toggle": (defs.BTP_SERVICE_ID_MESH,
-                         defs.MESH_IV_UPDATE_TOGGLE,
-                         CONTROLLER_INDEX, ""),
-    "net_send": (defs.BTP_SERVICE_ID_MESH,
-                 defs.MESH_NET_SEND,
-                 CONTROLLER_INDEX),
-    "health_generate_faults": (defs.BTP_SERVICE_ID_MESH,
-                               defs.MESH_HEALTH_ADD_FAULTS,
-                               CONTROLLER_INDEX, ""),
-    "mesh_clear_faults": (defs.BTP_SERVICE_ID_MESH,
-                          defs.MESH_HEALTH_CLEAR_FAULTS,
-                          CONTROLLER_INDEX, ""),
-    "lpn": (defs.BTP_SERVICE_ID_MESH,
-            defs.MESH_LPN_SET,
-            CONTROLLER_INDEX),
-    "lpn_poll": (defs.BTP_SERVICE_ID_MESH,
-                 defs.MESH_LPN_POLL,
-                 CONTROLLER_INDEX, ""),
-    "model_send": (defs.BTP_SERVICE_ID_MESH,
-                   defs.MESH_MODEL_SEND,
-                   CONTROLLER_INDEX),
-    "lpn_subscribe": (defs.BTP_SERVICE_ID_MESH,
-                      defs.MESH_LPN_SUBSCRIBE,
-                      CONTROLLER_INDEX),
-    "lpn_unsubscribe": (defs.BTP_SERVICE_ID_MESH,
-                        defs.MESH_LPN_UNSUBSCRIBE,
-                        CONTROLLER_INDEX),
-    "rpl_clear": (defs.BTP_SERVICE_ID_MESH,
-                  defs.MESH_RPL_CLEAR,
-                  CONTROLLER_INDEX, ""),
-    "proxy_identity": (defs.BTP_SERVICE_ID_MESH,
-                       defs.MESH_PROXY_IDENTITY,
-                       CONTROLLER_INDEX, ""),
-}
 
 def read_supp_svcs(iutctl: IutCtl):
     logging.debug("%s", read_supp_svcs.__name__)
 
-    iutctl.btp_worker.send(*CORE['read_supp_svcs'])
+    send_msg(iutctl, msgs.CoreReadSupportedServicesCmd(),
+             defs.BTP_INDEX_NONE)
 
     # Expected result
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
@@ -282,7 +61,8 @@ def read_supp_svcs(iutctl: IutCtl):
     logging.debug("%s received %r %r", read_supp_svcs.__name__,
                   tuple_hdr, tuple_data)
 
-    iutctl.stack.supported_svcs = tuple_data[0]
+    rp = msgs.CoreReadSupportedServicesRp.decode(tuple_data[0])
+    iutctl.stack.supported_svcs = rp.services
 
 
 def check_bit(data: bytes, bit: int) -> int:
@@ -321,7 +101,8 @@ def btp_hdr_check(rcv_hdr, exp_svc_id, exp_op=None):
 def core_reg_svc_gap(iutctl: IutCtl):
     logging.debug("%s", core_reg_svc_gap.__name__)
 
-    iutctl.btp_worker.send(*CORE['gap_reg'])
+    send_msg(iutctl, msgs.CoreRegisterServiceCmd(defs.BTP_SERVICE_ID_GAP),
+             defs.BTP_INDEX_NONE)
 
     core_reg_svc_rsp_succ(iutctl)
 
@@ -329,7 +110,8 @@ def core_reg_svc_gap(iutctl: IutCtl):
 def core_unreg_svc_gap(iutctl: IutCtl):
     logging.debug("%s", core_unreg_svc_gap.__name__)
 
-    iutctl.btp_worker.send(*CORE['gap_unreg'])
+    send_msg(iutctl, msgs.CoreUnregisterServiceCmd(defs.BTP_SERVICE_ID_GAP),
+             defs.BTP_INDEX_NONE)
 
     core_unreg_svc_rsp_succ(iutctl)
 
@@ -337,7 +119,8 @@ def core_unreg_svc_gap(iutctl: IutCtl):
 def core_reg_svc_gatt(iutctl: IutCtl):
     logging.debug("%s", core_reg_svc_gatt.__name__)
 
-    iutctl.btp_worker.send(*CORE['gatt_reg'])
+    send_msg(iutctl, msgs.CoreRegisterServiceCmd(defs.BTP_SERVICE_ID_GATT),
+             defs.BTP_INDEX_NONE)
 
     core_reg_svc_rsp_succ(iutctl)
 
@@ -345,13 +128,16 @@ def core_reg_svc_gatt(iutctl: IutCtl):
 def core_unreg_svc_gatt(iutctl: IutCtl):
     logging.debug("%s", core_unreg_svc_gatt.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*CORE['gatt_unreg'])
+    send_msg_wait_rsp(
+        iutctl, msgs.CoreUnregisterServiceCmd(defs.BTP_SERVICE_ID_GATT),
+        defs.BTP_INDEX_NONE)
 
 
 def core_reg_svc_l2cap(iutctl: IutCtl):
     logging.debug("%s", core_reg_svc_l2cap.__name__)
 
-    iutctl.btp_worker.send(*CORE['l2cap_reg'])
+    send_msg(iutctl, msgs.CoreRegisterServiceCmd(defs.BTP_SERVICE_ID_L2CAP),
+             defs.BTP_INDEX_NONE)
 
     core_reg_svc_rsp_succ(iutctl)
 
@@ -359,13 +145,16 @@ def core_reg_svc_l2cap(iutctl: IutCtl):
 def core_unreg_svc_l2cap(iutctl: IutCtl):
     logging.debug("%s", core_unreg_svc_l2cap.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*CORE['l2cap_unreg'])
+    send_msg_wait_rsp(
+        iutctl, msgs.CoreUnregisterServiceCmd(defs.BTP_SERVICE_ID_L2CAP),
+        defs.BTP_INDEX_NONE)
 
 
 def core_reg_svc_mesh(iutctl: IutCtl):
     logging.debug("%s", core_reg_svc_mesh.__name__)
 
-    iutctl.btp_worker.send(*CORE['mesh_reg'])
+    send_msg(iutctl, msgs.CoreRegisterServiceCmd(defs.BTP_SERVICE_ID_MESH),
+             defs.BTP_INDEX_NONE)
 
     core_reg_svc_rsp_succ(iutctl)
 
@@ -373,13 +162,16 @@ def core_reg_svc_mesh(iutctl: IutCtl):
 def core_unreg_svc_mesh(iutctl: IutCtl):
     logging.debug("%s", core_unreg_svc_mesh.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*CORE['mesh_unreg'])
+    send_msg_wait_rsp(
+        iutctl, msgs.CoreUnregisterServiceCmd(defs.BTP_SERVICE_ID_MESH),
+        defs.BTP_INDEX_NONE)
 
 
 def core_reg_svc_gatt_cl(iutctl: IutCtl):
     logging.debug("%s", core_reg_svc_gatt_cl.__name__)
 
-    iutctl.btp_worker.send(*CORE['gatt_cl_reg'])
+    send_msg(iutctl, msgs.CoreRegisterServiceCmd(defs.BTP_SERVICE_ID_GATTC),
+             defs.BTP_INDEX_NONE)
 
     core_reg_svc_rsp_succ(iutctl)
 
@@ -387,7 +179,9 @@ def core_reg_svc_gatt_cl(iutctl: IutCtl):
 def core_unreg_svc_gatt_cl(iutctl: IutCtl):
     logging.debug("%s", core_unreg_svc_gatt_cl.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*CORE['gatt_cl_unreg'])
+    send_msg_wait_rsp(
+        iutctl, msgs.CoreUnregisterServiceCmd(defs.BTP_SERVICE_ID_GATTC),
+        defs.BTP_INDEX_NONE)
 
 
 def core_reg_svc_rsp_succ(iutctl: IutCtl):
@@ -418,7 +212,7 @@ def core_unreg_svc_rsp_succ(iutctl: IutCtl):
                        defs.CORE_UNREGISTER_SERVICE,
                        defs.BTP_INDEX_NONE,
                        0),
-                      ('',))
+                      (b'',))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
 
@@ -435,12 +229,8 @@ def core_unreg_svc_rsp_succ(iutctl: IutCtl):
 def __gap_current_settings_update(gap, settings):
     logging.debug("%s %r", __gap_current_settings_update.__name__, settings)
     if isinstance(settings, tuple):
-        fmt = '<I'
-        if len(settings[0]) != struct.calcsize(fmt):
-            raise BTPError("Invalid data length")
-
-        settings = struct.unpack(fmt, settings[0])
-        settings = settings[0]  # Result of unpack is always a tuple
+        rp = msgs.GapCurrentSettingsRp.decode(settings[0], exact=True)
+        settings = rp.current_settings
         logging.debug("%s %r", __gap_current_settings_update.__name__, settings)
 
     for bit in gap_settings_btp2txt:
@@ -511,7 +301,6 @@ def gap_adv_ind_on(iutctl: IutCtl, ad=None, sd=None, duration=AdDuration.forever
             gap_settings_btp2txt[defs.GAP_SETTINGS_ADVERTISING]):
         return
 
-    data_ba = bytearray()
     ad_ba = bytearray()
     sd_ba = bytearray()
 
@@ -531,18 +320,12 @@ def gap_adv_ind_on(iutctl: IutCtl, ad=None, sd=None, duration=AdDuration.forever
                 data = binascii.unhexlify(entry[1])[::-1]
             else:
                 data = entry[1]
-            ad_ba.extend([entry[0]])
-            ad_ba.extend([len(data)])
+            sd_ba.extend([entry[0]])
+            sd_ba.extend([len(data)])
             sd_ba.extend(data)
 
-    data_ba.extend([len(ad_ba)])
-    data_ba.extend([len(sd_ba)])
-    data_ba.extend(ad_ba)
-    data_ba.extend(sd_ba)
-    data_ba.extend(struct.pack("<I", duration))
-    data_ba.extend(chr(own_addr_type).encode('utf-8'))
-
-    iutctl.btp_worker.send(*GAP['start_adv'], data=data_ba)
+    send_msg(iutctl, msgs.GapStartAdvertisingCmd(ad_ba, sd_ba, duration,
+                                                 own_addr_type))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_START_ADVERTISING)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -555,7 +338,7 @@ def gap_adv_off(iutctl: IutCtl):
             gap_settings_btp2txt[defs.GAP_SETTINGS_ADVERTISING]):
         return
 
-    iutctl.btp_worker.send(*GAP['stop_adv'])
+    send_msg(iutctl, msgs.GapStopAdvertisingCmd())
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_STOP_ADVERTISING)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -564,10 +347,7 @@ def gap_adv_off(iutctl: IutCtl):
 def gap_conn(iutctl: IutCtl, bd_addr: BleAddress, own_addr_type=OwnAddrType.le_identity_address):
     logging.debug("%s %r", gap_conn.__name__, bd_addr)
 
-    data_ba = bytearray(bd_addr)
-    data_ba.append(own_addr_type)
-
-    iutctl.btp_worker.send(*GAP['conn'], data=data_ba)
+    send_msg(iutctl, msgs.GapConnectCmd(bd_addr, own_addr_type))
 
     gap_command_rsp_succ(iutctl, defs.GAP_CONNECT)
 
@@ -578,9 +358,7 @@ def gap_disconn(iutctl: IutCtl, bd_addr: BleAddress):
     if not iutctl.stack.gap.is_connected():
         return
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GAP['disconn'], data=data_ba)
+    send_msg(iutctl, msgs.GapDisconnectCmd(bd_addr))
 
     gap_command_rsp_succ(iutctl, defs.GAP_DISCONNECT)
 
@@ -598,7 +376,7 @@ def verify_not_connected(iutctl: IutCtl, description):
 def gap_set_io_cap(iutctl: IutCtl, io_cap):
     logging.debug("%s %r", gap_set_io_cap.__name__, io_cap)
 
-    iutctl.btp_worker.send(*GAP['set_io_cap'], data=chr(io_cap))
+    send_msg(iutctl, msgs.GapSetIoCapCmd(io_cap))
 
     gap_command_rsp_succ(iutctl, defs.GAP_SET_IO_CAP)
 
@@ -606,9 +384,7 @@ def gap_set_io_cap(iutctl: IutCtl, io_cap):
 def gap_pair(iutctl: IutCtl, bd_addr: BleAddress):
     logging.debug("%s %r", gap_pair.__name__, bd_addr)
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GAP['pair'], data=data_ba)
+    send_msg(iutctl, msgs.GapPairCmd(bd_addr))
 
     # Expected result
     gap_command_rsp_succ(iutctl, defs.GAP_PAIR)
@@ -617,9 +393,7 @@ def gap_pair(iutctl: IutCtl, bd_addr: BleAddress):
 def gap_unpair(iutctl: IutCtl, bd_addr: BleAddress):
     logging.debug("%s %r", gap_unpair.__name__, bd_addr)
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GAP['unpair'], data=data_ba)
+    send_msg(iutctl, msgs.GapUnpairCmd(bd_addr))
 
     # Expected result
     gap_command_rsp_succ(iutctl, defs.GAP_UNPAIR)
@@ -642,15 +416,10 @@ def var_store_get_wrong_passkey(iutctl: IutCtl):
 def gap_passkey_entry_rsp(iutctl: IutCtl, bd_addr: BleAddress, passkey):
     logging.debug("%s %r", gap_passkey_entry_rsp.__name__, bd_addr)
 
-    data_ba = bytearray(bd_addr)
-
     if isinstance(passkey, str):
         passkey = int(passkey, 32)
 
-    passkey_ba = struct.pack('I', passkey)
-    data_ba.extend(passkey_ba)
-
-    iutctl.btp_worker.send(*GAP['passkey_entry_rsp'], data=data_ba)
+    send_msg(iutctl, msgs.GapPasskeyEntryCmd(bd_addr, passkey))
 
     gap_command_rsp_succ(iutctl, defs.GAP_PASSKEY_ENTRY)
 
@@ -658,7 +427,7 @@ def gap_passkey_entry_rsp(iutctl: IutCtl, bd_addr: BleAddress, passkey):
 def gap_reset(iutctl: IutCtl):
     logging.debug("%s", gap_reset.__name__)
 
-    iutctl.btp_worker.send(*GAP['reset'])
+    send_msg(iutctl, msgs.GapResetCmd())
 
     gap_command_rsp_succ(iutctl, defs.GAP_RESET)
 
@@ -666,16 +435,39 @@ def gap_reset(iutctl: IutCtl):
 def gap_passkey_confirm(iutctl: IutCtl, bd_addr: BleAddress, match):
     logging.debug("%s %r", gap_passkey_confirm.__name__, bd_addr)
 
-    data_ba = bytearray(bd_addr)
-    data_ba.extend([match])
-
-    iutctl.btp_worker.send(*GAP['passkey_confirm'], data=data_ba)
+    send_msg(iutctl, msgs.GapPasskeyConfirmCmd(bd_addr, match))
 
     gap_command_rsp_succ(iutctl, defs.GAP_PASSKEY_CONFIRM)
 
     iutctl.stack.passkey_confirm_cb(bd_addr, match)
 
 
+def gap_auto_passkey_confirm(iutctl: IutCtl, match=1):
+    """Answer passkey confirm requests from the event handler"""
+    logging.debug("%s %r", gap_auto_passkey_confirm.__name__, match)
+
+    def respond(result):
+        addr, _ = result
+        gap_passkey_confirm(iutctl, addr, match)
+
+    iutctl.event_handler.set_responder(defs.BTP_SERVICE_ID_GAP,
+                                       defs.GAP_EV_PASSKEY_CONFIRM_REQ,
+                                       respond)
+
+
+def gap_auto_passkey_entry(iutctl: IutCtl, get_passkey):
+    """Answer passkey entry requests with get_passkey() from the handler"""
+    logging.debug("%s", gap_auto_passkey_entry.__name__)
+
+    def respond(result):
+        addr, = result
+        gap_passkey_entry_rsp(iutctl, addr, get_passkey())
+
+    iutctl.event_handler.set_responder(defs.BTP_SERVICE_ID_GAP,
+                                       defs.GAP_EV_PASSKEY_ENTRY_REQ,
+                                       respond)
+
+
 def gap_set_conn(iutctl: IutCtl):
     logging.debug("%s", gap_set_conn.__name__)
 
@@ -683,7 +475,7 @@ def gap_set_conn(iutctl: IutCtl):
             gap_settings_btp2txt[defs.GAP_SETTINGS_CONNECTABLE]):
         return
 
-    iutctl.btp_worker.send(*GAP['set_conn'])
+    send_msg(iutctl, msgs.GapSetConnectableCmd(1))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_CONNECTABLE)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -696,7 +488,7 @@ def gap_set_nonconn(iutctl: IutCtl):
             gap_settings_btp2txt[defs.GAP_SETTINGS_CONNECTABLE]):
         return
 
-    iutctl.btp_worker.send(*GAP['set_nonconn'])
+    send_msg(iutctl, msgs.GapSetConnectableCmd(0))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_CONNECTABLE)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -709,7 +501,8 @@ def gap_set_nondiscov(iutctl: IutCtl):
             gap_settings_btp2txt[defs.GAP_SETTINGS_DISCOVERABLE]):
         return
 
-    iutctl.btp_worker.send(*GAP['set_nondiscov'])
+    send_msg(iutctl, msgs.GapSetDiscoverableCmd(
+        defs.GAP_NON_DISCOVERABLE))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_DISCOVERABLE)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -718,7 +511,8 @@ def gap_set_nondiscov(iutctl: IutCtl):
 def gap_set_gendiscov(iutctl: IutCtl):
     logging.debug("%s", gap_set_gendiscov.__name__)
 
-    iutctl.btp_worker.send(*GAP['set_gendiscov'])
+    send_msg(iutctl, msgs.GapSetDiscoverableCmd(
+        defs.GAP_GENERAL_DISCOVERABLE))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_DISCOVERABLE)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -727,7 +521,8 @@ def gap_set_gendiscov(iutctl: IutCtl):
 def gap_set_limdiscov(iutctl: IutCtl):
     logging.debug("%s", gap_set_limdiscov.__name__)
 
-    iutctl.btp_worker.send(*GAP['set_limdiscov'])
+    send_msg(iutctl, msgs.GapSetDiscoverableCmd(
+        defs.GAP_LIMITED_DISCOVERABLE))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_DISCOVERABLE)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -736,7 +531,7 @@ def gap_set_limdiscov(iutctl: IutCtl):
 def gap_set_powered_on(iutctl: IutCtl):
     logging.debug("%s", gap_set_powered_on.__name__)
 
-    iutctl.btp_worker.send(*GAP['set_powered_on'])
+    send_msg(iutctl, msgs.GapSetPoweredCmd(1))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_POWERED)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -745,7 +540,7 @@ def gap_set_powered_on(iutctl: IutCtl):
 def gap_set_powered_off(iutctl: IutCtl):
     logging.debug("%s", gap_set_powered_off.__name__)
 
-    iutctl.btp_worker.send(*GAP['set_powered_off'])
+    send_msg(iutctl, msgs.GapSetPoweredCmd(0))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_SET_POWERED)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -781,7 +576,7 @@ def gap_start_discov(iutctl: IutCtl, transport='le', type='active',
 
     iutctl.stack.gap.reset_discovery()
 
-    iutctl.btp_worker.send(*GAP['start_discov'], data=chr(flags))
+    send_msg(iutctl, msgs.GapStartDiscoveryCmd(flags))
 
     gap_command_rsp_succ(iutctl, defs.GAP_START_DISCOVERY)
 
@@ -830,6 +625,7 @@ def check_discov_results_by_name(iutctl: IutCtl, name_long, name_short):
 def check_discov_results_by_uuid(iutctl: IutCtl, uuid):
     logging.debug("%s %r", check_discov_results_by_uuid.__name__, uuid)
 
+    uuid = BleUUID(uuid)
     devices = iutctl.stack.gap.found_devices.data
 
     for device in devices:
@@ -846,7 +642,7 @@ def check_discov_results_by_uuid(iutctl: IutCtl, uuid):
 def gap_stop_discov(iutctl: IutCtl):
     logging.debug("%s", gap_stop_discov.__name__)
 
-    iutctl.btp_worker.send(*GAP['stop_discov'])
+    send_msg(iutctl, msgs.GapStopDiscoveryCmd())
 
     gap_command_rsp_succ(iutctl, defs.GAP_STOP_DISCOVERY)
 
@@ -859,19 +655,9 @@ def gap_conn_param_update(iutctl: IutCtl, addr: BleAddress, conn_itvl_min,
                   conn_itvl_min, conn_itvl_max,
                   conn_latency, supervision_timeout)
 
-    data_ba = bytearray(addr)
-
-    conn_itvl_min_ba = struct.pack('H', conn_itvl_min)
-    conn_itvl_max_ba = struct.pack('H', conn_itvl_max)
-    conn_latency_ba = struct.pack('H', conn_latency)
-    supervision_timeout_ba = struct.pack('H', supervision_timeout)
-
-    data_ba.extend(conn_itvl_min_ba)
-    data_ba.extend(conn_itvl_max_ba)
-    data_ba.extend(conn_latency_ba)
-    data_ba.extend(supervision_timeout_ba)
-
-    iutctl.btp_worker.send(*GAP['conn_param_update'], data=data_ba)
+    send_msg(iutctl, msgs.GapConnParamUpdateCmd(addr, conn_itvl_min,
+                                                conn_itvl_max, conn_latency,
+                                                supervision_timeout))
 
     gap_command_rsp_succ(iutctl, defs.GAP_CONN_PARAM_UPDATE)
 
@@ -879,7 +665,7 @@ def gap_conn_param_update(iutctl: IutCtl, addr: BleAddress, conn_itvl_min,
 def gap_read_ctrl_info(iutctl: IutCtl):
     logging.debug("%s", gap_read_ctrl_info.__name__)
 
-    iutctl.btp_worker.send(*GAP['read_ctrl_info'])
+    send_msg(iutctl, msgs.GapReadControllerInfoCmd())
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -887,21 +673,17 @@ def gap_read_ctrl_info(iutctl: IutCtl):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GAP,
                   defs.GAP_READ_CONTROLLER_INFO)
 
-    fmt = '<6sII3s249s11s'
-    if len(tuple_data[0]) < struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
-
-    _addr, _supp_set, _curr_set, _cod, _name, _name_sh = \
-        struct.unpack_from(fmt, tuple_data[0])
-    _addr = binascii.hexlify(_addr[::-1]).lower().decode()
+    rp = msgs.GapReadControllerInfoRp.decode(tuple_data[0])
+    _addr = rp.address[::-1].hex()
+    _curr_set = rp.current_settings
 
     addr_type = Addr.le_random if \
         (_curr_set & (1 << defs.GAP_SETTINGS_PRIVACY)) or \
         (_curr_set & (1 << defs.GAP_SETTINGS_STATIC_ADDRESS)) else \
         Addr.le_public
 
-    name = _name.decode().rstrip('\0')
-    name_short = _name_sh.decode().rstrip('\0')
+    name = rp.name.decode().rstrip('\0')
+    name_short = rp.short_name.decode().rstrip('\0')
 
     iutctl.stack.gap.name = name
     iutctl.stack.gap.name_short = name_short
@@ -915,8 +697,6 @@ def gap_read_ctrl_info(iutctl: IutCtl):
 def gap_start_direct_adv(iutctl: IutCtl, addr: BleAddress, high_duty=0, peer_rpa=0):
     logging.debug("%s %r %r", gap_start_direct_adv.__name__, addr, high_duty)
 
-    data_ba = bytearray(addr)
-
     opts = 0
     if high_duty:
         opts |= defs.GAP_START_DIRECT_ADV_HD
@@ -924,9 +704,7 @@ def gap_start_direct_adv(iutctl: IutCtl, addr: BleAddress, high_duty=0, peer_rpa
     if peer_rpa:
         opts |= defs.GAP_START_DIRECT_ADV_PEER_RPA
 
-    data_ba.extend(struct.pack('H', opts))
-
-    iutctl.btp_worker.send(*GAP['start_direct_adv'], data=data_ba)
+    send_msg(iutctl, msgs.GapStartDirectAdvCmd(addr, opts))
 
     tuple_data = gap_command_rsp_succ(iutctl, defs.GAP_START_DIRECT_ADV)
     __gap_current_settings_update(iutctl.stack.gap, tuple_data)
@@ -948,11 +726,9 @@ def gap_new_settings_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    data_fmt = '<I'
-
-    curr_set, = struct.unpack_from(data_fmt, data)
+    ev = msgs.GapNewSettingsEv.decode(data)
 
-    __gap_current_settings_update(gap, curr_set)
+    __gap_current_settings_update(gap, ev.current_settings)
 
 
 def gap_device_found_ev(iutctl: IutCtl, verify_f=None):
@@ -967,21 +743,11 @@ def gap_device_found_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    fmt = '<B6sBBH'
-    if len(data) < struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
+    ev = msgs.GapDeviceFoundEv.decode(data, exact=True)
 
-    addr_type, addr, rssi, flags, eir_len = struct.unpack_from(fmt, data)
-    eir = data[struct.calcsize(fmt):]
+    logging.debug("found %r eir %r", ev.address, ev.eir)
 
-    if len(eir) != eir_len:
-        raise BTPError("Invalid data length")
-
-    addr = binascii.hexlify(addr[::-1]).lower().decode()
-
-    logging.debug("found %r type %r eir %r", addr, addr_type, eir)
-
-    le_adv = LeAdv(BleAddress(addr, addr_type), rssi, flags, eir)
+    le_adv = LeAdv(ev.address, ev.rssi, ev.flags, ev.eir)
     gap.found_devices.data.append(le_adv)
 
     return le_adv
@@ -999,16 +765,12 @@ def gap_connected_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    hdr_fmt = '<B6sHHH'
-    hdr_len = struct.calcsize(hdr_fmt)
-
-    addr_type, addr, itvl, latency, timeout = struct.unpack_from(hdr_fmt, data)
-    addr = binascii.hexlify(addr[::-1]).decode()
+    ev = msgs.GapDeviceConnectedEv.decode(data)
 
-    logging.debug("connected to %r type %r", addr, addr_type)
+    logging.debug("connected to %r", ev.address)
 
-    addr = BleAddress(addr, addr_type)
-    params = ConnParams(itvl, latency, timeout)
+    addr = ev.address
+    params = ConnParams(ev.interval, ev.latency, ev.timeout)
     gap.connected(addr)
     gap.set_conn_params(params)
 
@@ -1027,15 +789,10 @@ def gap_disconnected_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    hdr_fmt = '<B6s'
-    hdr_len = struct.calcsize(hdr_fmt)
+    addr = msgs.GapDeviceDisconnectedEv.decode(data).address
 
-    addr_type, addr = struct.unpack_from(hdr_fmt, data)
-    addr = binascii.hexlify(addr[::-1]).decode()
+    logging.debug("disconnected from %r", addr)
 
-    logging.debug("disconnected from %r type %r", addr, addr_type)
-
-    addr = BleAddress(addr, addr_type)
     gap.disconnected(addr)
 
     return addr,
@@ -1051,15 +808,9 @@ def gap_passkey_entry_req_ev(iutctl: IutCtl, verify_f=None):
 def gap_passkey_entry_req_ev_(stack, data, data_len):
     logging.debug("%s %r", gap_passkey_entry_req_ev_.__name__, data)
 
-    fmt = '<B6s'
-    if len(data) != struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
-
-    # Unpack and swap address
-    _addr_type, _addr = struct.unpack(fmt, data)
-    _addr = binascii.hexlify(_addr[::-1]).decode()
+    ev = msgs.GapPasskeyEntryReqEv.decode(data, exact=True)
 
-    return BleAddress(_addr, _addr_type),
+    return ev.address,
 
 
 def gap_passkey_disp_ev(iutctl: IutCtl, verify_f=None):
@@ -1074,16 +825,13 @@ def gap_passkey_disp_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    fmt = '<B6sI'
+    ev = msgs.GapPasskeyDisplayEv.decode(data, exact=True)
 
-    addr_type, addr, passkey = struct.unpack(fmt, data)
-    addr = binascii.hexlify(addr[::-1]).decode()
+    logging.debug("passkey = %r", ev.passkey)
 
-    logging.debug("passkey = %r", passkey)
+    gap.passkey.data = ev.passkey
 
-    gap.passkey.data = passkey
-
-    return BleAddress(addr, addr_type), passkey
+    return ev.address, ev.passkey
 
 
 def gap_passkey_confirm_req_ev(iutctl: IutCtl, verify_f=None):
@@ -1098,34 +846,22 @@ def gap_passkey_confirm_req_ev_(stack, data, data_len):
 
     gap = stack.gap
 
-    fmt = '<B6sI'
-
-    addr_type, addr, passkey = struct.unpack(fmt, data)
-    addr = binascii.hexlify(addr[::-1]).decode()
+    ev = msgs.GapPasskeyConfirmReqEv.decode(data, exact=True)
 
-    bleaddr = BleAddress(addr, addr_type)
-    logging.debug("addr=%r passkey=%r", bleaddr, passkey)
+    logging.debug("addr=%r passkey=%r", ev.address, ev.passkey)
 
-    gap.passkey.data = passkey
+    gap.passkey.data = ev.passkey
 
-    return bleaddr, passkey
+    return ev.address, ev.passkey
 
 
 def gap_identity_resolved_ev_(stack, data, data_len):
     logging.debug("%s", gap_identity_resolved_ev_.__name__)
 
-    fmt = '<B6sB6s'
-    if len(data) != struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
+    ev = msgs.GapIdentityResolvedEv.decode(data, exact=True)
 
-    _addr_t, _addr, _id_addr_t, _id_addr = struct.unpack_from('<B6sB6s', data)
-
-    # Convert addresses to lower case
-    _addr = binascii.hexlify(_addr[::-1]).lower().decode()
-    _id_addr = binascii.hexlify(_id_addr[::-1]).lower().decode()
-
-    ota_addr = BleAddress(_addr, _addr_t)
-    id_addr = BleAddress(_id_addr, _id_addr_t)
+    ota_addr = ev.address
+    id_addr = ev.identity_address
 
     stack.gap.identity_resolved(ota_addr, id_addr)
 
@@ -1146,17 +882,12 @@ def gap_conn_param_update_ev_(stack, data, data_len):
 
     logging.debug("received %r", data)
 
-    fmt = '<B6sHHH'
-    if len(data) != struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
+    ev = msgs.GapConnParamUpdateEv.decode(data, exact=True)
 
-    _addr_t, _addr, _itvl, _latency, _timeout = struct.unpack_from(fmt, data)
-    _addr = binascii.hexlify(_addr[::-1]).decode()
+    logging.debug("received %r", ev)
 
-    logging.debug("received %r", (_addr_t, _addr, _itvl, _latency, _timeout))
-
-    bleaddr = BleAddress(_addr, _addr_t)
-    params = ConnParams(_itvl, _latency, _timeout)
+    bleaddr = ev.address
+    params = ConnParams(ev.interval, ev.latency, ev.timeout)
 
     gap.set_conn_params(params)
 
@@ -1177,18 +908,11 @@ def gap_sec_level_changed_ev_(stack, data, data_len):
 
     logging.debug("received %r", data)
 
-    fmt = '<B6sB'
-    if len(data) != struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
-
-    _addr_t, _addr, _level = struct.unpack_from(fmt, data)
-    _addr = binascii.hexlify(_addr[::-1]).decode()
+    ev = msgs.GapSecLevelChangedEv.decode(data, exact=True)
 
-    logging.debug("received %r", (_addr_t, _addr, _level))
+    logging.debug("received %r", ev)
 
-    bleaddr = BleAddress(_addr, _addr_t)
-
-    return bleaddr, _level
+    return ev.address, ev.sec_level
 
 
 def gap_pairing_consent_ev_(stack, data, data_len):
@@ -1198,16 +922,11 @@ def gap_pairing_consent_ev_(stack, data, data_len):
 
     logging.debug("received %r", data)
 
-    fmt = '<B6s'
-    if len(data) != struct.calcsize(fmt):
-        raise BTPError("Invalid data length")
-
-    _addr_t, _addr, = struct.unpack_from(fmt, data)
-    _addr = binascii.hexlify(_addr[::-1]).decode()
+    ev = msgs.GapPairingConsentReqEv.decode(data, exact=True)
 
-    logging.debug("received %r", (_addr_t, _addr))
+    logging.debug("received %r", ev)
 
-    bleaddr = BleAddress(_addr, _addr_t)
+    bleaddr = ev.address
 
     stack.pairing_consent_cb(bleaddr)
 
@@ -1232,14 +951,7 @@ GAP_EV = {
 def gatts_add_svc(iutctl: IutCtl, svc_type, uuid):
     logging.debug("%s %r %r", gatts_add_svc.__name__, svc_type, uuid)
 
-    data_ba = bytearray()
-    uuid_ba = binascii.unhexlify(uuid.replace("-", ""))[::-1]
-
-    data_ba.extend([svc_type])
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATTS['add_svc'], data=data_ba)
+    send_msg(iutctl, msgs.GattAddServiceCmd(svc_type, uuid2btp(uuid)))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1247,8 +959,7 @@ def gatts_add_svc(iutctl: IutCtl, svc_type, uuid):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT,
                   defs.GATT_ADD_SERVICE)
 
-    data = struct.unpack('H', tuple_data[0])
-    return data[0]
+    return msgs.GattAddServiceRp.decode(tuple_data[0], exact=True).service_id
 
 
 def gatts_add_inc_svc(iutctl: IutCtl, hdl):
@@ -1257,11 +968,7 @@ def gatts_add_inc_svc(iutctl: IutCtl, hdl):
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
-    data_ba = bytearray()
-    hdl_ba = struct.pack('H', hdl)
-    data_ba.extend(hdl_ba)
-
-    iutctl.btp_worker.send(*GATTS['add_inc_svc'], data=data_ba)
+    send_msg(iutctl, msgs.GattAddIncludedServiceCmd(hdl))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1269,8 +976,8 @@ def gatts_add_inc_svc(iutctl: IutCtl, hdl):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT,
                   defs.GATT_ADD_INCLUDED_SERVICE)
 
-    data = struct.unpack('H', tuple_data[0])
-    return data[0]
+    rp = msgs.GattAddIncludedServiceRp.decode(tuple_data[0], exact=True)
+    return rp.included_service_id
 
 
 def gatts_add_char(iutctl: IutCtl, hdl, prop, perm, uuid):
@@ -1280,17 +987,8 @@ def gatts_add_char(iutctl: IutCtl, hdl, prop, perm, uuid):
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
-    data_ba = bytearray()
-    hdl_ba = struct.pack('H', hdl)
-    uuid_ba = binascii.unhexlify(uuid.replace("-", ""))[::-1]
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend([prop])
-    data_ba.extend([perm])
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATTS['add_char'], data=data_ba)
+    send_msg(iutctl, msgs.GattAddCharacteristicCmd(hdl, prop, perm,
+                                                   uuid2btp(uuid)))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1298,8 +996,8 @@ def gatts_add_char(iutctl: IutCtl, hdl, prop, perm, uuid):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT,
                   defs.GATT_ADD_CHARACTERISTIC)
 
-    data = struct.unpack('H', tuple_data[0])
-    return data[0]
+    rp = msgs.GattAddCharacteristicRp.decode(tuple_data[0], exact=True)
+    return rp.char_id
 
 
 def gatts_set_val(iutctl: IutCtl, hdl, val):
@@ -1308,21 +1006,9 @@ def gatts_set_val(iutctl: IutCtl, hdl, val):
     if isinstance(hdl, str):
         hdl = int(hdl, 16)
 
-    data_ba = bytearray()
-    hdl_ba = struct.pack('H', hdl)
-    if isinstance(val, str):
-        val_ba = binascii.unhexlify(bytearray(val, 'utf-8'))
-    elif isinstance(val, bytes):
-        val_ba = binascii.unhexlify(val)
-    else:
-        val_ba = binascii.unhexlify(bytearray(val.encode('utf-8')))
-    val_len_ba = struct.pack('H', len(val_ba))
+    val_ba = payload_bytes(val)
 
-    data_ba.extend(hdl_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
-
-    iutctl.btp_worker.send(*GATTS['set_val'], data=data_ba)
+    send_msg(iutctl, msgs.GattSetValueCmd(hdl, val_ba))
 
     gatt_command_rsp_succ(iutctl)
 
@@ -1333,16 +1019,7 @@ def gatts_add_desc(iutctl: IutCtl, hdl, perm, uuid):
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
-    data_ba = bytearray()
-    hdl_ba = struct.pack('H', hdl)
-    uuid_ba = binascii.unhexlify(uuid.replace("-", ""))[::-1]
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend([perm])
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATTS['add_desc'], data=data_ba)
+    send_msg(iutctl, msgs.GattAddDescriptorCmd(hdl, perm, uuid2btp(uuid)))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1350,14 +1027,13 @@ def gatts_add_desc(iutctl: IutCtl, hdl, perm, uuid):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT,
                   defs.GATT_ADD_DESCRIPTOR)
 
-    data = struct.unpack('H', tuple_data[0])
-    return data[0]
+    return msgs.GattAddDescriptorRp.decode(tuple_data[0], exact=True).desc_id
 
 
 def gatts_start_server(iutctl: IutCtl):
     logging.debug("%s", gatts_start_server.__name__)
 
-    iutctl.btp_worker.send(*GATTS['start_server'])
+    send_msg(iutctl, msgs.GattStartServerCmd())
 
     gatt_command_rsp_succ(iutctl)
 
@@ -1369,13 +1045,7 @@ def gatts_set_enc_key_size(iutctl: IutCtl, hdl, enc_key_size):
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
-    data_ba = bytearray()
-    hdl_ba = struct.pack('H', hdl)
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend([enc_key_size])
-
-    iutctl.btp_worker.send(*GATTS['set_enc_key_size'], data=data_ba)
+    send_msg(iutctl, msgs.GattSetEncKeySizeCmd(hdl, enc_key_size))
 
     gatt_command_rsp_succ(iutctl)
 
@@ -1390,21 +1060,18 @@ def gatts_dec_attr_value_changed_ev_data(frame):
     +--------------+-------------+------+
 
     """
-    hdr = '<HH'
-    hdr_len = struct.calcsize(hdr)
-
-    (handle, data_len) = struct.unpack_from(hdr, frame)
-    data = struct.unpack_from('%ds' % data_len, frame, hdr_len)
+    ev = msgs.GattAttrValueChangedEv.decode(frame)
 
-    return handle, data
+    return ev.attr_id, ev.data
 
 
 def btp2uuid(uuid_len, uu):
-    if uuid_len == 2:
-        (uu,) = struct.unpack("H", uu)
-        return format(uu, 'x').upper().zfill(4)
-    else:
-        return uuid.UUID(bytes=uu[::-1]).urn[9:].replace('-', '').upper()
+    return BleUUID.from_bytes(bytes(uu[:uuid_len]))
+
+
+def uuid2btp(uu):
+    """Encodes UUID given as BleUUID or hex string for BTP commands"""
+    return BleUUID(uu).to_bytes()
 
 
 def gatt_server_fetch_db(iutctl: IutCtl, db: GattDB, start_handle=0x0001,
@@ -1426,83 +1093,64 @@ def gatt_server_fetch_db(iutctl: IutCtl, db: GattDB, start_handle=0x0001,
             char_val_set.remove(handle)
             continue
 
-        if type_uuid == '2800' or type_uuid == '2801':
+        if type_uuid in (UUID.primary_svc, UUID.secondary_svc):
             uuid = btp2uuid(val_len, val)
 
-            if type_uuid == '2800':
+            if type_uuid == UUID.primary_svc:
                 db.attr_add(handle,
                             GattPrimary(handle, perm, uuid, att_rsp, None))
             else:
                 db.attr_add(handle,
                             GattSecondary(handle, perm, uuid, att_rsp, None))
-        elif type_uuid == '2803':
-
-            hdr = '<BH'
-            hdr_len = struct.calcsize(hdr)
-            uuid_len = val_len - hdr_len
-
-            prop, value_handle, uuid = struct.unpack("<BH%ds" % uuid_len, val)
-            uuid = btp2uuid(uuid_len, uuid)
+        elif type_uuid == UUID.chrc:
+            chrc = msgs.GattChrcDeclValue.decode(val)
+            prop, value_handle = chrc.properties, chrc.value_handle
+            uuid = btp2uuid(len(chrc.uuid), chrc.uuid)
 
             char_val_set.add(value_handle)
 
             db.attr_add(handle,
                         GattCharacteristic(handle, perm, uuid, att_rsp, prop,
                                            value_handle))
-        elif type_uuid == '2802':
-            hdr = "<HH"
-            hdr_len = struct.calcsize(hdr)
-            uuid_len = val_len - hdr_len
-            incl_svc_hdl, end_grp_hdl, uuid = struct.unpack(
-                hdr + "%ds" % uuid_len, val)
-            if uuid_len > 0:
-                uuid = btp2uuid(uuid_len, uuid)
+        elif type_uuid == UUID.include_svc:
+            incl = msgs.GattInclDeclValue.decode(val)
+            incl_svc_hdl, end_grp_hdl = incl.start_handle, incl.end_handle
+            if incl.uuid:
+                uuid = btp2uuid(len(incl.uuid), incl.uuid)
             else:
                 uuid = None
 
             db.attr_add(handle, GattServiceIncluded(handle, perm, uuid, att_rsp,
                                                     incl_svc_hdl, end_grp_hdl))
         else:
-            uuid = type_uuid.replace("0x", "").replace("-", "").upper()
-
-            db.attr_add(handle, GattCharacteristicDescriptor(handle, perm, uuid,
+            db.attr_add(handle, GattCharacteristicDescriptor(handle, perm,
+                                                             type_uuid,
                                                              att_rsp, val))
 
 
-def dec_gatts_get_attrs_rp(data, data_len):
-    logging.debug("%s %r %r", dec_gatts_get_attrs_rp.__name__, data, data_len)
-
-    hdr = '<B'
-    hdr_len = struct.calcsize(hdr)
-    data_len = data_len - hdr_len
-
-    (attr_count, attrs) = struct.unpack(hdr + '%ds' % data_len, data)
-
-    attributes = []
-
-    while (attr_count - 1) >= 0:
-        hdr = '<HBB'
-        hdr_len = struct.calcsize(hdr)
-        data_len = data_len - hdr_len
+def gatts_iter_attrs_rp(data, count=None, offset=0):
+    """Yields (handle, permission, type_uuid) of Get Attributes response
 
-        (handle, permission, type_uuid_len, frag) = \
-            struct.unpack(hdr + '%ds' % data_len, attrs)
-
-        data_len = data_len - type_uuid_len
+    Records are decoded one by one while walking the data. If count is
+    not given it is read from the response header at offset.
+    """
+    if count is None:
+        rp, offset = msgs.GattGetAttributesRp.decode_from(data, offset)
+        count = rp.attrs_count
 
-        (type_uuid, attrs) = struct.unpack('%ds%ds' % (type_uuid_len,
-                                                       data_len), frag)
+    for attr in msgs.GattAttributeRecord.iter_decode(data, count, offset):
+        type_uuid = btp2uuid(len(attr.type), attr.type)
 
-        type_uuid = btp2uuid(type_uuid_len, type_uuid)
+        logging.debug("handle %r perm %r type_uuid %r", attr.handle,
+                      attr.permission, type_uuid)
 
-        attributes.append((handle, permission, type_uuid))
+        yield attr.handle, attr.permission, type_uuid
 
-        attr_count = attr_count - 1
 
-        logging.debug("handle %r perm %r type_uuid %r", handle, permission,
-                      type_uuid)
+def dec_gatts_get_attrs_rp(data, data_len):
+    logging.debug("%s %r %r", dec_gatts_get_attrs_rp.__name__, data, data_len)
 
-    return attributes
+    return list(gatts_iter_attrs_rp(data))
 
 
 def gatts_get_attrs(iutctl: IutCtl, start_handle=0x0001,
@@ -1510,28 +1158,19 @@ def gatts_get_attrs(iutctl: IutCtl, start_handle=0x0001,
     logging.debug("%s %r %r %r", gatts_get_attrs.__name__, start_handle,
                   end_handle, type_uuid)
 
-    data_ba = bytearray()
-
     if type(start_handle) is str:
         start_handle = int(start_handle, 16)
 
-    start_hdl_ba = struct.pack('H', start_handle)
-    data_ba.extend(start_hdl_ba)
-
     if type(end_handle) is str:
         end_handle = int(end_handle, 16)
 
-    end_hdl_ba = struct.pack('H', end_handle)
-    data_ba.extend(end_hdl_ba)
-
     if type_uuid:
-        uuid_ba = binascii.unhexlify(type_uuid.replace("-", ""))[::-1]
-        data_ba.extend([len(uuid_ba)])
-        data_ba.extend(uuid_ba)
+        uuid_ba = uuid2btp(type_uuid)
     else:
-        data_ba.extend([0])
+        uuid_ba = b''
 
-    iutctl.btp_worker.send(*GATTS['get_attrs'], data=data_ba)
+    send_msg(iutctl, msgs.GattGetAttributesCmd(start_handle, end_handle,
+                                               uuid_ba))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1547,15 +1186,10 @@ def gatts_get_attr_val(iutctl: IutCtl, bd_addr: BleAddress, handle):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
     if type(handle) is str:
         handle = int(handle, 16)
 
-    hdl_ba = struct.pack('H', handle)
-    data_ba.extend(hdl_ba)
-
-    iutctl.btp_worker.send(*GATTS['get_attr_val'], data=data_ba)
+    send_msg(iutctl, msgs.GattGetAttributeValueCmd(bd_addr, handle))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("received %r %r", tuple_hdr, tuple_data)
@@ -1563,11 +1197,9 @@ def gatts_get_attr_val(iutctl: IutCtl, bd_addr: BleAddress, handle):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT,
                   defs.GATT_GET_ATTRIBUTE_VALUE)
 
-    hdr = '<BH'
-    hdr_len = struct.calcsize(hdr)
-    data_len = tuple_hdr.data_len - hdr_len
+    rp = msgs.GattGetAttributeValueRp.decode(tuple_data[0], exact=True)
 
-    return struct.unpack(hdr + '%ds' % data_len, tuple_data[0])
+    return rp.att_response, len(rp.value), rp.value
 
 
 def gatts_parse_attribute(hdl, perm, type_uuid, data):
@@ -1578,29 +1210,20 @@ def gatts_parse_attribute(hdl, perm, type_uuid, data):
         svc_uuid = btp2uuid(len(value), value)
         return ("service", (hdl, 0xffff, svc_uuid))
     elif type_uuid == UUID.include_svc:
-        hdr = '<HH'
-        hdr_len = struct.calcsize(hdr)
-
-        incl_hdl, end_hdl = struct.unpack_from(hdr, value)
+        incl = msgs.GattInclDeclValue.decode(value)
         incl_uuid = None
 
-        uuid_len = len(value) - hdr_len
-        if uuid_len > 0:
-            uuid = struct.unpack_from('%ds' % uuid_len, value[hdr_len:])
-            incl_uuid = btp2uuid(uuid_len, uuid[0])
+        if incl.uuid:
+            incl_uuid = btp2uuid(len(incl.uuid), incl.uuid)
 
-        return ("include", (hdl, incl_hdl, end_hdl, incl_uuid))
+        return ("include", (hdl, incl.start_handle, incl.end_handle,
+                            incl_uuid))
     elif type_uuid == UUID.chrc:
-        hdr = '<BH'
-        hdr_len = struct.calcsize(hdr)
-
-        props, val_hdl = struct.unpack_from(hdr, value)
-
-        uuid_len = len(value) - hdr_len
-        uuid = struct.unpack_from('%ds' % uuid_len, value[hdr_len:])
-        chr_uuid = btp2uuid(uuid_len, uuid[0])
+        chrc = msgs.GattChrcDeclValue.decode(value)
+        chr_uuid = btp2uuid(len(chrc.uuid), chrc.uuid)
 
-        return ("characteristic", (hdl, val_hdl, props, chr_uuid))
+        return ("characteristic", (hdl, chrc.value_handle, chrc.properties,
+                                   chr_uuid))
     else:
         return ("descriptor", (hdl, type_uuid))
 
@@ -1634,9 +1257,7 @@ def gattc_exchange_mtu(iutctl: IutCtl, bd_addr: BleAddress):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GATTC['exchange_mtu'], data=data_ba)
+    send_msg(iutctl, msgs.GattExchangeMtuCmd(bd_addr))
 
 
 def gattc_disc_prim_svcs(iutctl: IutCtl, bd_addr: BleAddress):
@@ -1644,9 +1265,7 @@ def gattc_disc_prim_svcs(iutctl: IutCtl, bd_addr: BleAddress):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GATTC['disc_prim_svcs'], data=data_ba)
+    send_msg(iutctl, msgs.GattDiscPrimSvcsCmd(bd_addr))
 
 
 def gattc_disc_prim_uuid(iutctl: IutCtl, bd_addr: BleAddress, uuid):
@@ -1654,14 +1273,7 @@ def gattc_disc_prim_uuid(iutctl: IutCtl, bd_addr: BleAddress, uuid):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    uuid_ba = binascii.unhexlify(uuid.replace('-', ''))[::-1]
-
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATTC['disc_prim_uuid'], data=data_ba)
+    send_msg(iutctl, msgs.GattDiscPrimUuidCmd(bd_addr, uuid2btp(uuid)))
 
 
 def gattc_find_included(iutctl: IutCtl, bd_addr: BleAddress,
@@ -1677,15 +1289,7 @@ def gattc_find_included(iutctl: IutCtl, bd_addr: BleAddress,
     if type(start_hdl) is str:
         start_hdl = int(start_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-
-    iutctl.btp_worker.send(*GATTC['find_included'], data=data_ba)
+    send_msg(iutctl, msgs.GattFindIncludedCmd(bd_addr, start_hdl, stop_hdl))
 
 
 def gattc_disc_all_chrc_find_attrs_rsp(iutctl: IutCtl, exp_chars,
@@ -1754,15 +1358,7 @@ def gattc_disc_all_chrc(iutctl: IutCtl, bd_addr: BleAddress, start_hdl,
     if type(stop_hdl) is str:
         stop_hdl = int(stop_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-
-    iutctl.btp_worker.send(*GATTC['disc_all_chrc'], data=data_ba)
+    send_msg(iutctl, msgs.GattDiscAllChrcCmd(bd_addr, start_hdl, stop_hdl))
 
 
 def gattc_disc_chrc_uuid(iutctl: IutCtl, bd_addr: BleAddress,
@@ -1778,23 +1374,8 @@ def gattc_disc_chrc_uuid(iutctl: IutCtl, bd_addr: BleAddress,
     if type(start_hdl) is str:
         start_hdl = int(start_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    if "-" in uuid:
-        uuid = uuid.replace("-", "")
-    if uuid.startswith("0x"):
-        uuid = uuid.replace("0x", "")
-    uuid_ba = binascii.unhexlify(uuid)[::-1]
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATTC['disc_chrc_uuid'], data=data_ba)
+    send_msg(iutctl, msgs.GattDiscChrcUuidCmd(bd_addr, start_hdl, stop_hdl,
+                                              uuid2btp(uuid)))
 
 
 def gattc_disc_all_desc(iutctl: IutCtl, bd_addr: BleAddress,
@@ -1810,15 +1391,7 @@ def gattc_disc_all_desc(iutctl: IutCtl, bd_addr: BleAddress,
     if type(stop_hdl) is str:
         stop_hdl = int(stop_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-
-    iutctl.btp_worker.send(*GATTC['disc_all_desc'], data=data_ba)
+    send_msg(iutctl, msgs.GattDiscAllDescCmd(bd_addr, start_hdl, stop_hdl))
 
 
 def gattc_disc_full(iutctl: IutCtl, bd_addr: BleAddress, db: GattDB):
@@ -1876,15 +1449,10 @@ def gattc_read(iutctl: IutCtl, bd_addr: BleAddress, hdl):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
     if type(hdl) is str:
         hdl = int(hdl, 16)
-    hdl_ba = struct.pack('H', hdl)
-
-    data_ba.extend(hdl_ba)
 
-    iutctl.btp_worker.send(*GATTC['read'], data=data_ba)
+    send_msg(iutctl, msgs.GattReadCmd(bd_addr, hdl))
 
 
 def gattc_read_long(iutctl: IutCtl, bd_addr: BleAddress,
@@ -1894,8 +1462,6 @@ def gattc_read_long(iutctl: IutCtl, bd_addr: BleAddress,
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
     if type(off) is str:
         off = int(off, 16)
     if modif_off:
@@ -1903,13 +1469,7 @@ def gattc_read_long(iutctl: IutCtl, bd_addr: BleAddress,
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
-    hdl_ba = struct.pack('H', hdl)
-    off_ba = struct.pack('H', off)
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(off_ba)
-
-    iutctl.btp_worker.send(*GATTC['read_long'], data=data_ba)
+    send_msg(iutctl, msgs.GattReadLongCmd(bd_addr, hdl, off))
 
 
 def gattc_read_multiple(iutctl: IutCtl, bd_addr: BleAddress, *hdls):
@@ -1918,18 +1478,9 @@ def gattc_read_multiple(iutctl: IutCtl, bd_addr: BleAddress, *hdls):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    hdls_j = ''.join(hdl for hdl in hdls)
-    hdls_byte_table = [hdls_j[i:i + 2] for i in range(0, len(hdls_j), 2)]
-    hdls_swp = ''.join([c[1] + c[0] for c in zip(hdls_byte_table[::2],
-                                                 hdls_byte_table[1::2])])
-    hdls_ba = binascii.unhexlify(bytearray(hdls_swp))
+    hdls = [int(hdl, 16) if isinstance(hdl, str) else hdl for hdl in hdls]
 
-    data_ba.extend([len(hdls)])
-    data_ba.extend(hdls_ba)
-
-    iutctl.btp_worker.send(*GATTC['read_multiple'], data=data_ba)
+    send_msg(iutctl, msgs.GattReadMultipleCmd(bd_addr, hdls))
 
 
 def gattc_write_without_rsp(iutctl: IutCtl, bd_addr: BleAddress, hdl, val,
@@ -1942,20 +1493,11 @@ def gattc_write_without_rsp(iutctl: IutCtl, bd_addr: BleAddress, hdl, val,
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
+    val_ba = payload_bytes(val)
     if val_mtp:
-        val *= int(val_mtp)
-
-    data_ba = bytearray(bd_addr)
-
-    hdl_ba = struct.pack('H', hdl)
-    val_ba = binascii.unhexlify(bytearray(val))
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
+        val_ba *= int(val_mtp)
 
-    iutctl.btp_worker.send(*GATTC['write_without_rsp'], data=data_ba)
+    send_msg(iutctl, msgs.GattWriteWithoutRspCmd(bd_addr, hdl, val_ba))
 
     gatt_command_rsp_succ(iutctl)
 
@@ -1970,20 +1512,11 @@ def gattc_signed_write(iutctl: IutCtl, bd_addr: BleAddress,
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
+    val_ba = payload_bytes(val)
     if val_mtp:
-        val *= int(val_mtp)
+        val_ba *= int(val_mtp)
 
-    data_ba = bytearray(bd_addr)
-
-    hdl_ba = struct.pack('H', hdl)
-    val_ba = binascii.unhexlify(bytearray(val))
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
-
-    iutctl.btp_worker.send(*GATTC['signed_write'], data=data_ba)
+    send_msg(iutctl, msgs.GattSignedWriteWithoutRspCmd(bd_addr, hdl, val_ba))
 
     gatt_command_rsp_succ(iutctl)
 
@@ -1997,20 +1530,11 @@ def gattc_write(iutctl: IutCtl, bd_addr: BleAddress, hdl, val, val_mtp=None):
     if type(hdl) is str:
         hdl = int(hdl, 16)
 
+    val_ba = payload_bytes(val)
     if val_mtp:
-        val *= int(val_mtp)
-
-    data_ba = bytearray(bd_addr)
+        val_ba *= int(val_mtp)
 
-    hdl_ba = struct.pack('H', hdl)
-    val_ba = binascii.unhexlify(bytearray(val.encode()))
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
-
-    iutctl.btp_worker.send(*GATTC['write'], data=data_ba)
+    send_msg(iutctl, msgs.GattWriteCmd(bd_addr, hdl, val_ba))
 
 
 def gattc_write_long(iutctl: IutCtl, bd_addr: BleAddress, hdl, off, val,
@@ -2026,21 +1550,11 @@ def gattc_write_long(iutctl: IutCtl, bd_addr: BleAddress, hdl, off, val,
     if type(off) is str:
         off = int(off, 16)
 
+    val_ba = payload_bytes(val)
     if length:
-        val *= int(length)
-
-    hdl_ba = struct.pack('H', hdl)
-    off_ba = struct.pack('H', off)
-    val_ba = binascii.unhexlify(bytearray(val.encode()))
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba = bytearray(bd_addr)
-    data_ba.extend(hdl_ba)
-    data_ba.extend(off_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
+        val_ba *= int(length)
 
-    iutctl.btp_worker.send(*GATTC['write_long'], data=data_ba)
+    send_msg(iutctl, msgs.GattWriteLongCmd(bd_addr, hdl, off, val_ba))
 
 
 def gattc_cfg_notify(iutctl: IutCtl, bd_addr: BleAddress, enable, ccc_hdl):
@@ -2052,13 +1566,7 @@ def gattc_cfg_notify(iutctl: IutCtl, bd_addr: BleAddress, enable, ccc_hdl):
     if type(ccc_hdl) is str:
         ccc_hdl = int(ccc_hdl, 16)
 
-    ccc_hdl_ba = struct.pack('H', ccc_hdl)
-
-    data_ba = bytearray(bd_addr)
-    data_ba.extend([enable])
-    data_ba.extend(ccc_hdl_ba)
-
-    iutctl.btp_worker.send(*GATTC['cfg_notify'], data=data_ba)
+    send_msg(iutctl, msgs.GattCfgNotifyCmd(bd_addr, enable, ccc_hdl))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("%s received %r %r", gattc_cfg_notify.__name__,
@@ -2075,13 +1583,7 @@ def gattc_cfg_indicate(iutctl: IutCtl, bd_addr: BleAddress, enable, ccc_hdl):
     if type(ccc_hdl) is str:
         ccc_hdl = int(ccc_hdl, 16)
 
-    ccc_hdl_ba = struct.pack('H', ccc_hdl)
-
-    data_ba = bytearray(bd_addr)
-    data_ba.extend([enable])
-    data_ba.extend(ccc_hdl_ba)
-
-    iutctl.btp_worker.send(*GATTC['cfg_indicate'], data=data_ba)
+    send_msg(iutctl, msgs.GattCfgIndicateCmd(bd_addr, enable, ccc_hdl))
 
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
     logging.debug("%s received %r %r", gattc_cfg_indicate.__name__,
@@ -2100,7 +1602,7 @@ def gatt_command_rsp_succ(iutctl: IutCtl):
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_GATT)
 
 
-def gatt_dec_svc_attr(data):
+def gatt_dec_svc_attr(data, offset=0):
     """Decodes Service Attribute data from Discovery Response data.
 
     BTP Single Service Attribute
@@ -2110,16 +1612,12 @@ def gatt_dec_svc_attr(data):
     +--------------+------------+-------------+------+
 
     """
-    hdr = '<HHB'
-    hdr_len = struct.calcsize(hdr)
-
-    start_hdl, end_hdl, uuid_len = struct.unpack_from(hdr, data)
-    uuid = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
+    svc, end = msgs.GattServiceRecord.decode_from(data, offset)
 
-    return (start_hdl, end_hdl, uuid), hdr_len + uuid_len
+    return (svc.start_handle, svc.end_handle, (svc.uuid,)), end - offset
 
 
-def gatt_dec_incl_attr(data):
+def gatt_dec_incl_attr(data, offset=0):
     """Decodes Included Service Attribute data from Discovery Response data.
 
     BTP Single Included Service Attribute
@@ -2129,16 +1627,13 @@ def gatt_dec_incl_attr(data):
     +-----------------+-------------------+
 
     """
-    hdr = '<H'
-    hdr_len = struct.calcsize(hdr)
+    incl, end = msgs.GattIncludedRecord.decode_from(data, offset)
+    svc = (incl.start_handle, incl.end_handle, (incl.uuid,))
 
-    incl_hdl = struct.unpack_from(hdr, data)
-    svc, svc_len = gatt_dec_svc_attr(data[hdr_len:])
+    return ((incl.included_handle,), svc), end - offset
 
-    return (incl_hdl, svc), hdr_len + svc_len
 
-
-def gatt_dec_chrc_attr(data):
+def gatt_dec_chrc_attr(data, offset=0):
     """Decodes Characteristic Attribute data from Discovery Response data.
 
     BTP Single Characteristic Attribute
@@ -2148,16 +1643,13 @@ def gatt_dec_chrc_attr(data):
     +--------+--------------+------------+-------------+------+
 
     """
-    hdr = '<HHBB'
-    hdr_len = struct.calcsize(hdr)
-
-    chrc_hdl, val_hdl, props, uuid_len = struct.unpack_from(hdr, data)
-    uuid = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
+    chrc, end = msgs.GattCharacteristicRecord.decode_from(data, offset)
 
-    return (chrc_hdl, val_hdl, props, uuid), hdr_len + uuid_len
+    return (chrc.handle, chrc.value_handle, chrc.properties,
+            (chrc.uuid,)), end - offset
 
 
-def gatt_dec_desc_attr(data):
+def gatt_dec_desc_attr(data, offset=0):
     """Decodes Descriptor Attribute data from Discovery Response data.
 
     BTP Single Descriptor Attribute
@@ -2167,13 +1659,9 @@ def gatt_dec_desc_attr(data):
     +--------+-------------+------+
 
     """
-    hdr = '<HB'
-    hdr_len = struct.calcsize(hdr)
+    desc, end = msgs.GattDescriptorRecord.decode_from(data, offset)
 
-    hdl, uuid_len = struct.unpack_from(hdr, data)
-    uuid = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
-
-    return (hdl, uuid), hdr_len + uuid_len
+    return (desc.handle, (desc.uuid,)), end - offset
 
 
 def gatt_dec_disc_rsp(data, attr_type):
@@ -2186,26 +1674,36 @@ def gatt_dec_disc_rsp(data, attr_type):
     +------------------+------------+
 
     """
-    attrs_len = len(data) - 1
-    attr_cnt, attrs = struct.unpack('B%ds' % attrs_len, data)
-
-    attrs_list = []
-    offset = 0
-
-    for x in range(attr_cnt):
-        if attr_type == "service":
-            attr, attr_len = gatt_dec_svc_attr(attrs[offset:])
-        elif attr_type == "include":
-            attr, attr_len = gatt_dec_incl_attr(attrs[offset:])
-        elif attr_type == "characteristic":
-            attr, attr_len = gatt_dec_chrc_attr(attrs[offset:])
-        else:  # descriptor
-            attr, attr_len = gatt_dec_desc_attr(attrs[offset:])
-
-        attrs_list.append(attr)
+    rp, offset = msgs.GattDiscRp.decode_from(data)
+
+    return tuple(gatt_iter_disc_rsp(data, attr_type, rp.attrs_count, offset))
+
+
+def iter_attrs(dec_attr, data, count, offset=0):
+    """Yields count attributes decoded with dec_attr starting at offset
+
+    dec_attr(data, offset) returns the attribute and its length. The data
+    is walked in place, so decoding is linear in the response size.
+    """
+    view = memoryview(data)
+
+    for _ in range(count):
+        attr, attr_len = dec_attr(view, offset)
         offset += attr_len
+        yield attr
+
 
-    return tuple(attrs_list)
+def gatt_iter_disc_rsp(data, attr_type, count, offset=0):
+    """Yields count attributes of attr_type from Discovery Response data"""
+    return iter_attrs(GATT_DISC_ATTR_DEC[attr_type], data, count, offset)
+
+
+GATT_DISC_ATTR_DEC = {
+    "service": gatt_dec_svc_attr,
+    "include": gatt_dec_incl_attr,
+    "characteristic": gatt_dec_chrc_attr,
+    "descriptor": gatt_dec_desc_attr,
+}
 
 
 def gatt_dec_read_rsp(data):
@@ -2218,13 +1716,9 @@ def gatt_dec_read_rsp(data):
     +--------------+-------------+------+
 
     """
-    hdr = '<BH'
-    hdr_len = struct.calcsize(hdr)
-
-    att_rsp, val_len = struct.unpack_from(hdr, data)
-    val = struct.unpack_from('%ds' % val_len, data, hdr_len)
+    rp = msgs.GattReadRp.decode(data)
 
-    return att_rsp, val
+    return rp.att_response, (rp.data,)
 
 
 def gatt_dec_write_rsp(data):
@@ -2237,7 +1731,7 @@ def gatt_dec_write_rsp(data):
     +--------------+
 
     """
-    return ord(data)
+    return msgs.GattWriteRp.decode(data).att_response
 
 
 def gattc_disc_prim_uuid_find_attrs_rsp(iutctl: IutCtl, exp_svcs,
@@ -2422,7 +1916,7 @@ def gattc_read_rsp(iutctl: IutCtl, gatt_value: GattValue):
         return
 
     gatt_value.att_rsp = att_rsp_str[rsp]
-    gatt_value.value = binascii.hexlify(value[0]).decode().upper()
+    gatt_value.value = value[0]
 
 
 def gattc_read_long_rsp(iutctl: IutCtl, gatt_value: GattValue):
@@ -2439,7 +1933,7 @@ def gattc_read_long_rsp(iutctl: IutCtl, gatt_value: GattValue):
         return
 
     gatt_value.att_rsp = att_rsp_str[rsp]
-    gatt_value.value = binascii.hexlify(value[0]).decode().upper()
+    gatt_value.value = value[0]
 
 
 def gattc_read_multiple_rsp(iutctl: IutCtl, store_val=False, store_rsp=False):
@@ -2461,7 +1955,7 @@ def gattc_read_multiple_rsp(iutctl: IutCtl, store_val=False, store_rsp=False):
             gatt.add_verify_values(att_rsp_str[rsp])
 
         if store_val:
-            gatt.add_verify_values((binascii.hexlify(values[0])).upper())
+            gatt.add_verify_values(values[0])
 
 
 def gattc_write_rsp(iutctl: IutCtl, gatt_value: GattValue):
@@ -2498,15 +1992,9 @@ def gattc_write_long_rsp(iutctl: IutCtl, gatt_value: GattValue):
 
 
 def gattc_dec_notification_ev_data(frame):
-    hdr = '<B6sBHH'
-    hdr_len = struct.calcsize(hdr)
+    ev = msgs.GattNotificationEv.decode(frame)
 
-    addr_type, addr, type, handle, data_len = struct.unpack_from(hdr, frame)
-    addr = binascii.hexlify(addr[::-1]).lower().decode()
-    data = struct.unpack_from('%ds' % data_len, frame, hdr_len)
-    data = binascii.hexlify(data[0]).decode().upper()
-
-    return BleAddress(addr, addr_type), type, handle, data
+    return ev.address, ev.type, ev.handle, ev.data
 
 
 def gattc_notification_ev(iutctl: IutCtl, verify_f=None):
@@ -2534,7 +2022,6 @@ def gatts_attr_value_changed_ev_(stack, data, data_len):
     (handle, data) = gatts_dec_attr_value_changed_ev_data(data)
     logging.debug("%s %r %r", gatts_attr_value_changed_ev_.__name__,
                   handle, data)
-    data = binascii.hexlify(data[0]).decode().upper()
     return handle, data
 
 
@@ -2555,28 +2042,18 @@ def gatt_cl_dec_disc_rsp(data, attr_type):
     +------------------+------------+
 
     """
-    attrs_len = len(data) - 1
-    attr_cnt, attrs = struct.unpack('B%ds' % attrs_len, data)
-    attrs_list = []
-    offset = 0
-
-    for x in range(attr_cnt):
-        if attr_type == "service":
-            attr, attr_len = gatt_cl_dec_svc_attr(attrs[offset:])
-        elif attr_type == "include":
-            attr, attr_len = gatt_cl_dec_incl_attr(attrs[offset:])
-        elif attr_type == "characteristic":
-            attr, attr_len = gatt_cl_dec_chrc_attr(attrs[offset:])
-        else:  # descriptor
-            attr, attr_len = gatt_cl_dec_desc_attr(attrs[offset:])
-
-        attrs_list.append(attr)
-        offset += attr_len
+    rp, offset = msgs.GattDiscRp.decode_from(data)
+
+    return list(gatt_cl_iter_disc_rsp(data, attr_type, rp.attrs_count,
+                                      offset))
+
 
-    return attrs_list
+def gatt_cl_iter_disc_rsp(data, attr_type, count, offset=0):
+    """Yields count attributes of attr_type from Discovery Response data"""
+    return iter_attrs(GATT_CL_DISC_ATTR_DEC[attr_type], data, count, offset)
 
 
-def gatt_cl_dec_svc_attr(data):
+def gatt_cl_dec_svc_attr(data, offset=0):
     """Decodes Service Attribute data from Discovery Response data.
 
     BTP Single Service Attribute
@@ -2586,17 +2063,13 @@ def gatt_cl_dec_svc_attr(data):
     +--------------+------------+-------------+------+
 
     """
-    hdr = '<HHB'
-    hdr_len = struct.calcsize(hdr)
+    svc, end = msgs.GattServiceRecord.decode_from(data, offset)
+    uuid = btp2uuid(len(svc.uuid), svc.uuid)
 
-    start_hdl, end_hdl, uuid_len = struct.unpack_from(hdr, data)
-    (uuid,) = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
-    uuid = btp2uuid(uuid_len, uuid)
+    return (svc.start_handle, svc.end_handle, uuid), end - offset
 
-    return (start_hdl, end_hdl, uuid), hdr_len + uuid_len
 
-
-def gatt_cl_dec_incl_attr(data):
+def gatt_cl_dec_incl_attr(data, offset=0):
     """Decodes Included Service Attribute data from Discovery Response data.
 
     BTP Single Included Service Attribute
@@ -2606,16 +2079,14 @@ def gatt_cl_dec_incl_attr(data):
     +-----------------+-------------------+
 
     """
-    hdr = '<H'
-    hdr_len = struct.calcsize(hdr)
-
-    incl_hdl = struct.unpack_from(hdr, data)
-    svc, svc_len = gatt_cl_dec_svc_attr(data[hdr_len:])
+    incl, end = msgs.GattIncludedRecord.decode_from(data, offset)
+    uuid = btp2uuid(len(incl.uuid), incl.uuid)
+    svc = (incl.start_handle, incl.end_handle, uuid)
 
-    return (incl_hdl, svc), hdr_len + svc_len
+    return ((incl.included_handle,), svc), end - offset
 
 
-def gatt_cl_dec_chrc_attr(data):
+def gatt_cl_dec_chrc_attr(data, offset=0):
     """Decodes Characteristic Attribute data from Discovery Response data.
 
     BTP Single Characteristic Attribute
@@ -2625,17 +2096,14 @@ def gatt_cl_dec_chrc_attr(data):
     +--------+--------------+------------+-------------+------+
 
     """
-    hdr = '<HHBB'
-    hdr_len = struct.calcsize(hdr)
+    chrc, end = msgs.GattCharacteristicRecord.decode_from(data, offset)
+    uuid = btp2uuid(len(chrc.uuid), chrc.uuid)
 
-    chrc_hdl, val_hdl, props, uuid_len = struct.unpack_from(hdr, data)
-    (uuid,) = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
-    uuid = btp2uuid(uuid_len, uuid)
+    return (chrc.handle, chrc.value_handle, chrc.properties, uuid), \
+        end - offset
 
-    return (chrc_hdl, val_hdl, props, uuid), hdr_len + uuid_len
 
-
-def gatt_cl_dec_desc_attr(data):
+def gatt_cl_dec_desc_attr(data, offset=0):
     """Decodes Descriptor Attribute data from Discovery Response data.
 
     BTP Single Descriptor Attribute
@@ -2645,14 +2113,18 @@ def gatt_cl_dec_desc_attr(data):
     +--------+-------------+------+
 
     """
-    hdr = '<HB'
-    hdr_len = struct.calcsize(hdr)
+    desc, end = msgs.GattDescriptorRecord.decode_from(data, offset)
+    uuid = btp2uuid(len(desc.uuid), desc.uuid)
+
+    return (desc.handle, uuid), end - offset
 
-    hdl, uuid_len = struct.unpack_from(hdr, data)
-    (uuid,) = struct.unpack_from('%ds' % uuid_len, data, hdr_len)
-    uuid = btp2uuid(uuid_len, uuid)
 
-    return (hdl, uuid), hdr_len + uuid_len
+GATT_CL_DISC_ATTR_DEC = {
+    "service": gatt_cl_dec_svc_attr,
+    "include": gatt_cl_dec_incl_attr,
+    "characteristic": gatt_cl_dec_chrc_attr,
+    "descriptor": gatt_cl_dec_desc_attr,
+}
 
 
 def gatt_cl_command_rsp_succ(iutctl: IutCtl):
@@ -2669,9 +2141,7 @@ def gatt_cl_disc_prim_svcs(iutctl: IutCtl, bd_addr: BleAddress):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    iutctl.btp_worker.send(*GATT_CL['disc_prim_svcs'], data=data_ba)
+    send_msg(iutctl, msgs.GattClDiscAllPrimCmd(bd_addr))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2682,14 +2152,7 @@ def gatt_cl_disc_prim_uuid(iutctl: IutCtl, bd_addr: BleAddress, uuid):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
-    uuid_ba = binascii.unhexlify(uuid.replace('-', ''))[::-1]
-
-    data_ba.extend([len(uuid_ba)])
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['disc_prim_uuid'], data=data_ba)
+    send_msg(iutctl, msgs.GattClDiscPrimUuidCmd(bd_addr, uuid2btp(uuid)))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2706,15 +2169,7 @@ def gatt_cl_find_included(iutctl: IutCtl, bd_addr: BleAddress, start_hdl, end_hd
     if isinstance(start_hdl, str):
         start_hdl = int(start_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-
-    start_hdl_ba = struct.pack('H', start_hdl)
-    end_hdl_ba = struct.pack('H', end_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(end_hdl_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['find_included'], data=data_ba)
+    send_msg(iutctl, msgs.GattClFindIncludedCmd(bd_addr, start_hdl, end_hdl))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2754,14 +2209,7 @@ def gatt_cl_disc_all_chrc(iutctl: IutCtl, bd_addr: BleAddress, start_hdl, stop_h
     if isinstance(stop_hdl, str):
         stop_hdl = int(stop_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['disc_all_chrc'], data=data_ba)
+    send_msg(iutctl, msgs.GattClDiscAllChrcCmd(bd_addr, start_hdl, stop_hdl))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2782,22 +2230,8 @@ def gatt_cl_disc_chrc_uuid(iutctl: IutCtl, bd_addr: BleAddress, start_hdl, stop_
     if isinstance(start_hdl, str):
         start_hdl = int(start_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    if "-" in uuid:
-        uuid = uuid.replace("-", "")
-    if uuid.startswith("0x"):
-        uuid = uuid.replace("0x", "")
-    uuid_ba = binascii.unhexlify(uuid)[::-1]
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-    data_ba.extend(chr(len(uuid_ba)).encode('utf-8'))
-    data_ba.extend(uuid_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['disc_chrc_uuid'], data=data_ba)
+    send_msg(iutctl, msgs.GattClDiscChrcUuidCmd(bd_addr, start_hdl, stop_hdl,
+                                                uuid2btp(uuid)))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2817,14 +2251,7 @@ def gatt_cl_disc_all_desc(iutctl: IutCtl, bd_addr: BleAddress, start_hdl, stop_h
     if isinstance(stop_hdl, str):
         stop_hdl = int(stop_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-    start_hdl_ba = struct.pack('H', start_hdl)
-    stop_hdl_ba = struct.pack('H', stop_hdl)
-
-    data_ba.extend(start_hdl_ba)
-    data_ba.extend(stop_hdl_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['disc_all_desc'], data=data_ba)
+    send_msg(iutctl, msgs.GattClDiscAllDescCmd(bd_addr, start_hdl, stop_hdl))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2836,16 +2263,14 @@ def gatt_cl_read(iutctl: IutCtl, bd_addr: BleAddress, hdl):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
     if isinstance(hdl, str):
         hdl = int(hdl, 16)
-    hdl_ba = struct.pack('H', hdl)
-
-    data_ba.extend(hdl_ba)
 
-    iutctl.btp_worker.send(*GATT_CL['read'], data=data_ba)
+    clear_verify_values(stack)
+    send_msg(iutctl, msgs.GattClReadCmd(bd_addr, hdl))
 
-    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_read_complete)
+    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_read_complete,
+                                     'gatt_cl/read')
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2857,8 +2282,6 @@ def gatt_cl_read_long(iutctl: IutCtl, bd_addr: BleAddress, hdl, off, modif_off=N
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
     if isinstance(off, str):
         off = int(off, 16)
     if modif_off:
@@ -2866,14 +2289,10 @@ def gatt_cl_read_long(iutctl: IutCtl, bd_addr: BleAddress, hdl, off, modif_off=N
     if isinstance(hdl, str):
         hdl = int(hdl, 16)
 
-    hdl_ba = struct.pack('H', hdl)
-    off_ba = struct.pack('H', off)
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(off_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['read_long'], data=data_ba)
-    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_read_complete)
+    clear_verify_values(stack)
+    send_msg(iutctl, msgs.GattClReadLongCmd(bd_addr, hdl, off))
+    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_read_complete,
+                                     'gatt_cl/read')
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2885,25 +2304,18 @@ def gatt_cl_write(iutctl: IutCtl, bd_addr: BleAddress, hdl, val, val_mtp=None):
 
     gap_wait_for_connection(iutctl)
 
-    data_ba = bytearray(bd_addr)
-
     if isinstance(hdl, str):
         hdl = int(hdl, 16)
 
+    val_ba = payload_bytes(val)
     if val_mtp:
-        val *= int(val_mtp)
-
-    hdl_ba = struct.pack('H', hdl)
-    val_ba = binascii.unhexlify(val)
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba.extend(hdl_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
+        val_ba *= int(val_mtp)
 
-    iutctl.btp_worker.send(*GATT_CL['write'], data=data_ba)
+    stack.gatt_cl.write_status = None
+    send_msg(iutctl, msgs.GattClWriteCmd(bd_addr, hdl, val_ba))
 
-    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_write_completed)
+    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_write_completed,
+                                     'gatt_cl/write_rsp')
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2921,23 +2333,15 @@ def gatt_cl_write_long(iutctl: IutCtl, bd_addr: BleAddress, hdl, off, val, lengt
     if isinstance(off, str):
         off = int(off, 16)
 
+    val_ba = payload_bytes(val)
     if length:
-        val *= int(length)
+        val_ba *= int(length)
 
-    hdl_ba = struct.pack('H', hdl)
-    off_ba = struct.pack('H', off)
-    val_ba = bytes.fromhex(val)
-    val_len_ba = struct.pack('H', len(val_ba))
+    stack.gatt_cl.write_status = None
+    send_msg(iutctl, msgs.GattClWriteLongCmd(bd_addr, hdl, off, val_ba))
 
-    data_ba = bytearray(bd_addr)
-    data_ba.extend(hdl_ba)
-    data_ba.extend(off_ba)
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['write_long'], data=data_ba)
-
-    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_write_completed)
+    stack.gatt_cl.set_event_to_await(stack.gatt_cl.is_write_completed,
+                                     'gatt_cl/write_rsp')
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2951,13 +2355,7 @@ def gatt_cl_cfg_notify(iutctl: IutCtl, bd_addr: BleAddress, enable, ccc_hdl):
     if isinstance(ccc_hdl, str):
         ccc_hdl = int(ccc_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-    ccc_hdl_ba = struct.pack('H', ccc_hdl)
-
-    data_ba.extend(chr(enable).encode('utf-8'))
-    data_ba.extend(ccc_hdl_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['cfg_notify'], data=data_ba)
+    send_msg(iutctl, msgs.GattClCfgNotifyCmd(bd_addr, enable, ccc_hdl))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2971,13 +2369,7 @@ def gatt_cl_cfg_indicate(iutctl: IutCtl, bd_addr: BleAddress, enable, ccc_hdl):
     if isinstance(ccc_hdl, str):
         ccc_hdl = int(ccc_hdl, 16)
 
-    data_ba = bytearray(bd_addr)
-    ccc_hdl_ba = struct.pack('H', ccc_hdl)
-
-    data_ba.extend(chr(enable).encode('utf-8'))
-    data_ba.extend(ccc_hdl_ba)
-
-    iutctl.btp_worker.send(*GATT_CL['cfg_indicate'], data=data_ba)
+    send_msg(iutctl, msgs.GattClCfgIndicateCmd(bd_addr, enable, ccc_hdl))
 
     gatt_cl_command_rsp_succ(iutctl)
 
@@ -2987,15 +2379,11 @@ def gatt_cl_disc_all_prim_rsp_ev_(stack, data, data_len):
 
     db = stack.gatt_cl.db
 
-    fmt = '<B6sBB'
-
-    addr_type, addr, status, svc_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r svc_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    svc_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r svc_cnt=%r",
                   gatt_cl_disc_all_prim_rsp_ev_.__name__,
-                  addr_type, addr, status, svc_cnt)
-
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, svc_cnt)
 
     stack.gatt_cl.prim_svcs = []
     stack.gatt_cl.prim_svcs_cnt = svc_cnt
@@ -3004,14 +2392,14 @@ def gatt_cl_disc_all_prim_rsp_ev_(stack, data, data_len):
         logging.debug("No services in response")
         return
 
-    svcs = gatt_cl_dec_disc_rsp(svcs_data, 'service')
+    svcs = list(gatt_cl_iter_disc_rsp(data, 'service', svc_cnt, offset))
 
     logging.debug("%s %r", gatt_cl_disc_all_prim_rsp_ev_.__name__, svcs)
 
     for svc in svcs:
         start_handle = "%04X" % (svc[0],)
         end_handle = "%04X" % (svc[1],)
-        uuid = svc[2].upper()
+        uuid = svc[2]
 
         # avoid repeated service uuid, it should be verified only once
         if uuid not in stack.gatt_cl.prim_svcs:
@@ -3025,17 +2413,11 @@ def gatt_cl_disc_prim_uuid_rsp_ev_(stack, data, data_len):
 
     db = stack.gatt_cl.db
 
-    fmt = '<B6sBB'
-
-    addr_type, addr, status, svc_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r svc_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    svc_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r svc_cnt=%r",
                   gatt_cl_disc_prim_uuid_rsp_ev_.__name__,
-                  addr_type, addr, status, svc_cnt)
-
-    # svcs_data contains service count and services - adjust data offset
-    # to include count
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, svc_cnt)
 
     stack.gatt_cl.prim_svcs = []
     stack.gatt_cl.prim_svcs_cnt = svc_cnt
@@ -3044,7 +2426,7 @@ def gatt_cl_disc_prim_uuid_rsp_ev_(stack, data, data_len):
         logging.debug("No services in response")
         return
 
-    svcs = gatt_cl_dec_disc_rsp(svcs_data, 'service')
+    svcs = list(gatt_cl_iter_disc_rsp(data, 'service', svc_cnt, offset))
 
     logging.debug("%s %r", gatt_cl_disc_prim_uuid_rsp_ev_.__name__, svcs)
 
@@ -3064,15 +2446,11 @@ def gatt_cl_find_incld_rsp_ev_(stack, data, data_len):
 
     db = stack.gatt_cl.db
 
-    fmt = '<B6sBB'
-
-    addr_type, addr, status, svc_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r svc_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    svc_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r svc_cnt=%r",
                   gatt_cl_find_incld_rsp_ev_.__name__,
-                  addr_type, addr, status, svc_cnt)
-
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, svc_cnt)
 
     stack.gatt_cl.incl_svcs = []
     stack.gatt_cl.incl_svcs_cnt = svc_cnt
@@ -3080,7 +2458,7 @@ def gatt_cl_find_incld_rsp_ev_(stack, data, data_len):
     if svc_cnt == 0:
         logging.debug("No services in response")
         return
-    incl_tuples = gatt_cl_dec_disc_rsp(svcs_data, 'include')
+    incl_tuples = list(gatt_cl_iter_disc_rsp(data, 'include', svc_cnt, offset))
 
     logging.debug("%s %r", gatt_cl_find_incld_rsp_ev_.__name__, incl_tuples)
 
@@ -3105,15 +2483,11 @@ def gatt_cl_disc_all_chrc_rsp_ev_(stack, data, data_len):
 
     attrs = []
     db = stack.gatt_cl.db
-    fmt = '<B6sBB'
-
-    addr_type, addr, status, char_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r char_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    char_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r char_cnt=%r",
                   gatt_cl_disc_all_chrc_rsp_ev_.__name__,
-                  addr_type, addr, status, char_cnt)
-
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, char_cnt)
 
     stack.gatt_cl.chrcs = []
     stack.gatt_cl.chrcs_cnt = char_cnt
@@ -3122,7 +2496,8 @@ def gatt_cl_disc_all_chrc_rsp_ev_(stack, data, data_len):
         logging.debug("No characteristics in response")
         return
 
-    chrcs = gatt_cl_dec_disc_rsp(svcs_data, 'characteristic')
+    chrcs = list(gatt_cl_iter_disc_rsp(data, 'characteristic', char_cnt,
+                                       offset))
 
     logging.debug("%s %r", gatt_cl_disc_all_chrc_rsp_ev_.__name__, chrcs)
 
@@ -3150,15 +2525,11 @@ def gatt_cl_disc_chrc_uuid_rsp_ev_(stack, data, data_len):
 
     attrs = []
     db = stack.gatt_cl.db
-    fmt = '<B6sBB'
-
-    addr_type, addr, status, char_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r char_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    char_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r char_cnt=%r",
                   gatt_cl_disc_chrc_uuid_rsp_ev_.__name__,
-                  addr_type, addr, status, char_cnt)
-
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, char_cnt)
 
     stack.gatt_cl.chrcs = []
     stack.gatt_cl.chrcs_cnt = char_cnt
@@ -3167,7 +2538,8 @@ def gatt_cl_disc_chrc_uuid_rsp_ev_(stack, data, data_len):
         logging.debug("No characteristics in response")
         return
 
-    chrcs = gatt_cl_dec_disc_rsp(svcs_data, 'characteristic')
+    chrcs = list(gatt_cl_iter_disc_rsp(data, 'characteristic', char_cnt,
+                                       offset))
 
     logging.debug("%s %r", gatt_cl_disc_chrc_uuid_rsp_ev_.__name__, chrcs)
 
@@ -3192,16 +2564,12 @@ def gatt_cl_disc_chrc_uuid_rsp_ev_(stack, data, data_len):
 def gatt_cl_disc_all_desc_rsp_ev_(stack, data, data_len):
     logging.debug("%s %r", gatt_cl_disc_all_desc_rsp_ev_.__name__, data)
 
-    fmt = '<B6sBB'
     db = stack.gatt_cl.db
-
-    addr_type, addr, status, char_cnt = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r char_cnt=%r",
+    rp, offset = msgs.GattClDiscRp.decode_from(data)
+    char_cnt = rp.attrs_count
+    logging.debug("%s received addr=%r status=%r char_cnt=%r",
                   gatt_cl_disc_all_desc_rsp_ev_.__name__,
-                  addr_type, addr, status, char_cnt)
-
-    svcs_data = data[struct.calcsize(fmt) - 1:]
+                  rp.address, rp.status, char_cnt)
 
     stack.gatt_cl.dscs = []
     stack.gatt_cl.dscs_cnt = char_cnt
@@ -3210,7 +2578,7 @@ def gatt_cl_disc_all_desc_rsp_ev_(stack, data, data_len):
         logging.debug("No descriptors in response")
         return
 
-    descs = gatt_cl_dec_disc_rsp(svcs_data, 'descriptor')
+    descs = list(gatt_cl_iter_disc_rsp(data, 'descriptor', char_cnt, offset))
 
     logging.debug("%s %r", gatt_cl_disc_all_desc_rsp_ev_.__name__, descs)
 
@@ -3227,29 +2595,23 @@ def gatt_cl_disc_all_desc_rsp_ev_(stack, data, data_len):
 
 def gatt_cl_read_rsp_ev_(stack, data, data_len):
     logging.debug("%s %r", gatt_cl_read_rsp_ev_.__name__, data)
- 
-    fmt = '<B6sBH'
 
-    addr_type, addr, status, data_length = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r data_len=%r",
+    rp = msgs.GattClReadRp.decode(data)
+    status, value = rp.status, rp.data
+    logging.debug("%s received addr=%r status=%r data_len=%r",
                   gatt_cl_read_rsp_ev_.__name__,
-                  addr_type, addr, status, data_length)
+                  rp.address, status, len(value))
 
     clear_verify_values(stack)
 
-    if data_length == 0:
+    if not value:
         logging.debug("No data in response")
         return
 
-    rp_data = data[struct.calcsize(fmt):]
-
-    (value,) = struct.unpack_from('%ds' % data_length, rp_data)
-
     logging.debug("%s %r %r", gatt_cl_read_rsp_ev_.__name__, status, value)
 
     add_to_verify_values(stack, att_rsp_str[status])
-    add_to_verify_values(stack, (binascii.hexlify(value)).upper())
+    add_to_verify_values(stack, value)
 
     logging.debug("Set verify values to: %r", get_verify_values(stack))
 
@@ -3257,23 +2619,17 @@ def gatt_cl_read_rsp_ev_(stack, data, data_len):
 def gatt_cl_read_long_rsp_ev_(stack, data, data_len):
     logging.debug("%s %r", gatt_cl_read_long_rsp_ev_.__name__, data)
 
-    fmt = '<B6sBH'
-
-    addr_type, addr, status, data_length = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r data_len=%r",
+    rp = msgs.GattClReadRp.decode(data)
+    status, value = rp.status, rp.data
+    logging.debug("%s received addr=%r status=%r data_len=%r",
                   gatt_cl_read_long_rsp_ev_.__name__,
-                  addr_type, addr, status, data_length)
-
-    rp_data = data[struct.calcsize(fmt):]
-
-    (value,) = struct.unpack_from('%ds' % data_length, rp_data)
+                  rp.address, status, len(value))
 
     logging.debug("%s %r %r", gatt_cl_read_long_rsp_ev_.__name__, status, value)
 
     clear_verify_values(stack)
     add_to_verify_values(stack, att_rsp_str[status])
-    add_to_verify_values(stack, (binascii.hexlify(value)).upper())
+    add_to_verify_values(stack, value)
 
     logging.debug("Set verify values to: %r", get_verify_values(stack))
 
@@ -3281,13 +2637,10 @@ def gatt_cl_read_long_rsp_ev_(stack, data, data_len):
 def gatt_cl_write_rsp_ev_(stack, data, data_len):
     logging.debug("%s %r", gatt_cl_write_rsp_ev_.__name__, data)
 
-    fmt = '<B6sB'
-
-    addr_type, addr, status = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r status=%r",
-                  gatt_cl_write_rsp_ev_.__name__,
-                  addr_type, addr, status)
+    rp = msgs.GattClWriteRp.decode(data)
+    status = rp.status
+    logging.debug("%s received addr=%r status=%r",
+                  gatt_cl_write_rsp_ev_.__name__, rp.address, status)
     stack.gatt_cl.write_status = status
 
     clear_verify_values(stack)
@@ -3297,27 +2650,20 @@ def gatt_cl_write_rsp_ev_(stack, data, data_len):
 def gatt_cl_notification_rxed_ev_(stack, data, data_len):
     logging.debug("%s %r", gatt_cl_notification_rxed_ev_.__name__, data)
 
-    fmt = '<B6sBHH'
-
-    addr_type, addr, type, handle, data_length = \
-        struct.unpack_from(fmt, data[:struct.calcsize(fmt)])
-    logging.debug("%s received addr_type=%r addr=%r"
-                  "type=%r handle=%r data_length=%r",
+    ev = msgs.GattClNotificationEv.decode(data)
+    logging.debug("%s received addr=%r type=%r handle=%r data_length=%r",
                   gatt_cl_notification_rxed_ev_.__name__,
-                  addr_type, addr, type, handle, data_length)
+                  ev.address, ev.type, ev.handle, len(ev.data))
 
-    if data_length == 0:
+    if not ev.data:
         logging.debug("No data in response")
         return
 
-    notification_data = binascii.hexlify(data[struct.calcsize(fmt):]).upper()
-
     # save addr as BleAddress object, type, handle, data - this is needed
     # for verify_notification_ev
-    addr_str = ''.join(f'{byte:02x}' for byte in addr[::-1])
-    ble_addr = BleAddress(addr_str, addr_type)
-
-    stack.gatt_cl.notifications.append((ble_addr, type, handle, notification_data))
+    notification = (ev.address, ev.type, ev.handle, ev.data)
+    stack.gatt_cl.notifications.append(notification)
+    return notification
 
 
 GATT_CL_EV = {
@@ -3355,12 +2701,9 @@ def l2cap_conn(iutctl: IutCtl, bd_addr: BleAddress, psm):
     if type(psm) is str:
         psm = int(psm, 16)
 
-    data_ba = bytearray(bd_addr)
-    data_ba.extend(struct.pack('H', psm))
-
-    iutctl.btp_worker.send(*L2CAP['connect'], data=data_ba)
+    send_msg(iutctl, msgs.L2capConnectCmd(bd_addr, psm))
 
-    l2cap_conn_rsp(iutctl)
+    return l2cap_conn_rsp(iutctl)
 
 
 l2cap_result_str = {0: "Connection successful",
@@ -3383,28 +2726,21 @@ def l2cap_conn_rsp(iutctl: IutCtl):
 
     btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_CONNECT)
 
-    chan_id = struct.unpack_from('<B', tuple_data[0])[0]
-
-    iutctl.stack.l2cap.channels.append(chan_id)
+    chan_id = msgs.L2capConnectRp.decode(tuple_data[0]).chan_id
 
     logging.debug("new L2CAP channel: id %r", chan_id)
 
+    return chan_id
+
 
 def l2cap_disconn(iutctl: IutCtl, chan_id):
     logging.debug("%s %r", l2cap_disconn.__name__, chan_id)
 
-    channels = iutctl.stack.l2cap.channels
-    try:
-        idx = channels.index(chan_id)
-    except ValueError:
+    if not iutctl.stack.l2cap.is_connected(chan_id):
         raise BTPError("Channel with given chan_id: %r does not exists" %
                        chan_id)
 
-    chan_id = channels[idx]
-
-    data_ba = bytearray([chan_id])
-
-    iutctl.btp_worker.send(*L2CAP['disconnect'], data=data_ba)
+    send_msg(iutctl, msgs.L2capDisconnectCmd(chan_id))
 
     l2cap_command_rsp_succ(iutctl, defs.L2CAP_DISCONNECT)
 
@@ -3413,17 +2749,11 @@ def l2cap_send_data(iutctl: IutCtl, chan_id, val, val_mtp=None):
     logging.debug("%s %r %r %r", l2cap_send_data.__name__, chan_id, val,
                   val_mtp)
 
+    val_ba = payload_bytes(val)
     if val_mtp:
-        val *= int(val_mtp)
-
-    val_ba = binascii.unhexlify(bytearray(val))
-    val_len_ba = struct.pack('H', len(val_ba))
-
-    data_ba = bytearray([chan_id])
-    data_ba.extend(val_len_ba)
-    data_ba.extend(val_ba)
+        val_ba *= int(val_mtp)
 
-    iutctl.btp_worker.send(*L2CAP['send_data'], data=data_ba)
+    send_msg(iutctl, msgs.L2capSendDataCmd(chan_id, val_ba))
 
     l2cap_command_rsp_succ(iutctl, defs.L2CAP_SEND_DATA)
 
@@ -3434,10 +2764,7 @@ def l2cap_listen(iutctl: IutCtl, psm, transport):
     if type(psm) is str:
         psm = int(psm, 16)
 
-    data_ba = bytearray(struct.pack('H', psm))
-    data_ba.extend(struct.pack('B', transport))
-
-    iutctl.btp_worker.send(*L2CAP['listen'], data=data_ba)
+    send_msg(iutctl, msgs.L2capListenCmd(psm, transport))
 
     l2cap_command_rsp_succ(iutctl, defs.L2CAP_LISTEN)
 
@@ -3446,74 +2773,67 @@ def l2cap_le_listen(iutctl, psm):
     l2cap_listen(iutctl, psm, defs.L2CAP_TRANSPORT_LE)
 
 
-def l2cap_connected_ev(iutctl: IutCtl):
+def l2cap_connected_ev(iutctl: IutCtl, verify_f=None):
     logging.debug("%s", l2cap_connected_ev.__name__)
+    return iutctl.event_handler.wait_for_event(defs.BTP_SERVICE_ID_L2CAP,
+                                               defs.L2CAP_EV_CONNECTED,
+                                               verify_f)
 
-    tuple_hdr, tuple_data = iutctl.btp_worker.read()
-    logging.debug("received %r %r", tuple_hdr, tuple_data)
-
-    btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_L2CAP,
-                  defs.L2CAP_EV_CONNECTED)
 
-    chan_id, psm, bd_addr_type, bd_addr = struct.unpack_from('<BHB6s',
-                                                             tuple_data[0])
-    logging.debug("New L2CAP connection ID:%r on PSM:%r, Addr %r Type %r",
-                  chan_id, psm, bd_addr, bd_addr_type)
+def l2cap_connected_ev_(stack, data, data_len):
+    logging.debug("%s %r", l2cap_connected_ev_.__name__, data)
 
-    channels = iutctl.stack.l2cap.channels
+    ev = msgs.L2capConnectedEv.decode(data)
+    logging.debug("New L2CAP connection ID:%r on PSM:%r, Addr %r",
+                  ev.chan_id, ev.psm, ev.address)
 
-    # Append incoming connection only
-    if chan_id not in channels:
-        channels.append(chan_id)
+    stack.l2cap.add_channel(ev.chan_id, ev.psm, ev.address)
 
+    return ev.chan_id, ev.psm, ev.address
 
-def l2cap_disconnected_ev(iutctl: IutCtl, exp_chan_id, store=False):
-    logging.debug("%s %r", l2cap_disconnected_ev.__name__, exp_chan_id)
 
-    tuple_hdr, tuple_data = iutctl.btp_worker.read()
-    logging.debug("received %r %r", tuple_hdr, tuple_data)
+def l2cap_disconnected_ev(iutctl: IutCtl, verify_f=None):
+    logging.debug("%s", l2cap_disconnected_ev.__name__)
+    return iutctl.event_handler.wait_for_event(defs.BTP_SERVICE_ID_L2CAP,
+                                               defs.L2CAP_EV_DISCONNECTED,
+                                               verify_f)
 
-    btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_L2CAP,
-                  defs.L2CAP_EV_DISCONNECTED)
 
-    res, chan_id, psm, bd_addr_type, bd_addr = \
-        struct.unpack_from('<HBHB6s', tuple_data[0])
+def l2cap_disconnected_ev_(stack, data, data_len):
+    logging.debug("%s %r", l2cap_disconnected_ev_.__name__, data)
 
-    channels = iutctl.stack.l2cap.channels
-    channels.remove(chan_id)
+    ev = msgs.L2capDisconnectedEv.decode(data)
+    logging.debug("L2CAP channel disconnected: id %r", ev.chan_id)
 
-    logging.debug("L2CAP channel disconnected: id %r", chan_id)
+    stack.l2cap.remove_channel(ev.chan_id)
+    stack.l2cap.clear_verify_values()
+    stack.l2cap.add_verify_values(l2cap_result_str.get(ev.result, ev.result))
 
-    if chan_id != exp_chan_id:
-        raise BTPError("Error in L2CAP disconnected event data")
+    return ev.chan_id, ev.result
 
-    if store:
-        iutctl.stack.l2cap.clear_verify_values()
-        iutctl.stack.l2cap.add_verify_values(l2cap_result_str[res])
 
+def l2cap_data_rcv_ev(iutctl: IutCtl, verify_f=None):
+    logging.debug("%s", l2cap_data_rcv_ev.__name__)
+    return iutctl.event_handler.wait_for_event(defs.BTP_SERVICE_ID_L2CAP,
+                                               defs.L2CAP_EV_DATA_RECEIVED,
+                                               verify_f)
 
-def l2cap_data_rcv_ev(iutctl: IutCtl, chan_id=None, store=False):
-    logging.debug("%s %r %r", l2cap_data_rcv_ev.__name__, chan_id, store)
 
-    tuple_hdr, tuple_data = iutctl.btp_worker.read()
-    logging.debug("received %r %r", tuple_hdr, tuple_data)
+def l2cap_data_rcv_ev_(stack, data, data_len):
+    logging.debug("%s %r", l2cap_data_rcv_ev_.__name__, data_len)
 
-    btp_hdr_check(tuple_hdr, defs.BTP_SERVICE_ID_L2CAP,
-                  defs.L2CAP_EV_DATA_RECEIVED)
+    ev = msgs.L2capDataReceivedEv.decode(data)
 
-    data_hdr = '<BH'
-    data_hdr_len = struct.calcsize(data_hdr)
+    stack.l2cap.data_received(ev.chan_id, ev.data)
 
-    rcv_chan_id, data_len = struct.unpack_from(data_hdr, tuple_data[0])
-    data = binascii.hexlify(struct.unpack_from('%ds' % data_len, tuple_data[0],
-                                               data_hdr_len)[0])
+    return ev.chan_id, ev.data
 
-    if chan_id and chan_id != rcv_chan_id:
-        raise BTPError("Error in L2CAP data received event data")
 
-    if store:
-        iutctl.stack.l2cap.clear_verify_values()
-        iutctl.stack.l2cap.add_verify_values(data)
+L2CAP_EV = {
+    defs.L2CAP_EV_CONNECTED: l2cap_connected_ev_,
+    defs.L2CAP_EV_DISCONNECTED: l2cap_disconnected_ev_,
+    defs.L2CAP_EV_DATA_RECEIVED: l2cap_data_rcv_ev_,
+}
 
 
 def mesh_config_prov(iutctl: IutCtl):
@@ -3528,10 +2848,9 @@ def mesh_config_prov(iutctl: IutCtl):
     input_size = stack.mesh.input_size
     input_actions = stack.mesh.input_actions
 
-    data = bytearray(struct.pack("<16s16sBHBH", uuid, static_auth, output_size,
-                                 output_actions, input_size, input_actions))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['config_prov'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshConfigProvisioningCmd(
+        uuid, static_auth, output_size, output_actions, input_size,
+        input_actions))
 
 
 def mesh_prov_node(iutctl: IutCtl):
@@ -3542,18 +2861,15 @@ def mesh_prov_node(iutctl: IutCtl):
     net_key = binascii.unhexlify(stack.mesh.net_key)
     dev_key = binascii.unhexlify(stack.mesh.dev_key)
 
-    data = bytearray(struct.pack("<16sHBIIH16s", net_key,
-                                 stack.mesh.net_key_idx, stack.mesh.flags,
-                                 stack.mesh.iv_idx, stack.mesh.seq_num,
-                                 stack.mesh.addr, dev_key))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['prov_node'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshProvisionNodeCmd(
+        net_key, stack.mesh.net_key_idx, stack.mesh.flags, stack.mesh.iv_idx,
+        stack.mesh.seq_num, stack.mesh.addr, dev_key))
 
 
 def mesh_init(iutctl: IutCtl):
     logging.debug("%s", mesh_init.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['init'])
+    send_msg_wait_rsp(iutctl, msgs.MeshInitCmd())
 
     stack = iutctl.stack
 
@@ -3565,7 +2881,7 @@ def mesh_init(iutctl: IutCtl):
 def mesh_reset(iutctl: IutCtl):
     logging.debug("%s", mesh_reset.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['reset'])
+    send_msg_wait_rsp(iutctl, msgs.MeshResetCmd())
 
     stack = iutctl.stack
 
@@ -3579,28 +2895,23 @@ def mesh_input_number(iutctl: IutCtl, number):
     if type(number) is str:
         number = int(number)
 
-    data = bytearray(struct.pack("<I", number))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['input_num'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshInputNumberCmd(number))
 
 
 def mesh_input_string(iutctl: IutCtl, string):
     logging.debug("%s %s", mesh_input_string.__name__, string)
 
-    data = bytearray(string)
+    if isinstance(string, str):
+        string = string.encode()
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['input_str'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshInputStringCmd(bytes(string)))
 
 
 def mesh_iv_update_test_mode(iutctl: IutCtl, enable):
     logging.debug("%s", mesh_iv_update_test_mode.__name__)
 
-    if enable:
-        data = bytearray(struct.pack("<B", 0x01))
-    else:
-        data = bytearray(struct.pack("<B", 0x00))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['iv_update_test_mode'], data=data)
+    send_msg_wait_rsp(iutctl,
+                      msgs.MeshIvUpdateTestModeCmd(0x01 if enable else 0x00))
 
     iutctl.stack.mesh.is_iv_test_mode_enabled.data = True
 
@@ -3608,7 +2919,7 @@ def mesh_iv_update_test_mode(iutctl: IutCtl, enable):
 def mesh_iv_update_toggle(iutctl: IutCtl):
     logging.debug("%s", mesh_iv_update_toggle.__name__)
 
-    iutctl.btp_worker.send(*MESH['iv_update_toggle'])
+    send_msg(iutctl, msgs.MeshIvUpdateToggleCmd())
     tuple_hdr, tuple_data = iutctl.btp_worker.read()
 
     if tuple_hdr.op == defs.BTP_STATUS:
@@ -3631,41 +2942,30 @@ def mesh_net_send(iutctl: IutCtl, ttl, src, dst, payload):
         dst = int(dst, 16)
 
     payload = binascii.unhexlify(payload)
-    payload_len = len(payload)
 
-    if payload_len > 0xff:
+    if len(payload) > 0xff:
         raise BTPError("Payload exceeds PDU")
 
-    data = bytearray(struct.pack("<BHHB", ttl, src, dst, payload_len))
-    data.extend(payload)
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['net_send'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshNetSendCmd(ttl, src, dst, payload))
 
 
 def mesh_health_generate_faults(iutctl: IutCtl):
     logging.debug("%s", mesh_health_generate_faults.__name__)
 
-    (rsp,) = iutctl.btp_worker.send_wait_rsp(*MESH['health_generate_faults'])
-
-    hdr_fmt = '<BBB'
-    hdr_len = struct.calcsize(hdr_fmt)
+    (rsp,) = send_msg_wait_rsp(iutctl, msgs.MeshHealthAddFaultsCmd())
 
-    (test_id, cur_faults_cnt, reg_faults_cnt) = \
-        struct.unpack_from(hdr_fmt, rsp)
-    (cur_faults,) = struct.unpack_from('<%ds' % cur_faults_cnt, rsp, hdr_len)
-    (reg_faults,) = struct.unpack_from('<%ds' % reg_faults_cnt, rsp,
-                                       hdr_len + cur_faults_cnt)
+    rp = msgs.MeshHealthAddFaultsRp.decode(rsp)
 
-    cur_faults = binascii.hexlify(cur_faults)
-    reg_faults = binascii.hexlify(reg_faults)
+    cur_faults = binascii.hexlify(rp.cur_faults)
+    reg_faults = binascii.hexlify(rp.reg_faults)
 
-    return test_id, cur_faults, reg_faults
+    return rp.test_id, cur_faults, reg_faults
 
 
 def mesh_health_clear_faults(iutctl: IutCtl):
     logging.debug("%s", mesh_health_clear_faults.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['mesh_clear_faults'])
+    send_msg_wait_rsp(iutctl, msgs.MeshHealthClearFaultsCmd())
 
 
 def mesh_lpn(iutctl: IutCtl, enable):
@@ -3676,15 +2976,13 @@ def mesh_lpn(iutctl: IutCtl, enable):
     else:
         enable = 0x00
 
-    data = bytearray(struct.pack("<B", enable))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['lpn'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshLpnSetCmd(enable))
 
 
 def mesh_lpn_poll(iutctl: IutCtl):
     logging.debug("%s", mesh_lpn_poll.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['lpn_poll'])
+    send_msg_wait_rsp(iutctl, msgs.MeshLpnPollCmd())
 
 
 def mesh_model_send(iutctl: IutCtl, src, dst, payload):
@@ -3697,15 +2995,11 @@ def mesh_model_send(iutctl: IutCtl, src, dst, payload):
         dst = int(dst, 16)
 
     payload = binascii.unhexlify(payload)
-    payload_len = len(payload)
 
-    if payload_len > 0xff:
+    if len(payload) > 0xff:
         raise BTPError("Payload exceeds PDU")
 
-    data = bytearray(struct.pack("<HHB", src, dst, payload_len))
-    data.extend(payload)
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['model_send'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshModelSendCmd(src, dst, payload))
 
 
 def mesh_lpn_subscribe(iutctl: IutCtl, address):
@@ -3714,9 +3008,7 @@ def mesh_lpn_subscribe(iutctl: IutCtl, address):
     if isinstance(address, str):
         address = int(address, 16)
 
-    data = bytearray(struct.pack("<H", address))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['lpn_subscribe'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshLpnSubscribeCmd(address))
 
 
 def mesh_lpn_unsubscribe(iutctl: IutCtl, address):
@@ -3725,21 +3017,19 @@ def mesh_lpn_unsubscribe(iutctl: IutCtl, address):
     if isinstance(address, str):
         address = int(address, 16)
 
-    data = bytearray(struct.pack("<H", address))
-
-    iutctl.btp_worker.send_wait_rsp(*MESH['lpn_unsubscribe'], data=data)
+    send_msg_wait_rsp(iutctl, msgs.MeshLpnUnsubscribeCmd(address))
 
 
 def mesh_rpl_clear(iutctl: IutCtl):
     logging.debug("%s", mesh_rpl_clear.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['rpl_clear'])
+    send_msg_wait_rsp(iutctl, msgs.MeshRplClearCmd())
 
 
 def mesh_proxy_identity(iutctl: IutCtl):
     logging.debug("%s", mesh_proxy_identity.__name__)
 
-    iutctl.btp_worker.send_wait_rsp(*MESH['proxy_identity'])
+    send_msg_wait_rsp(iutctl, msgs.MeshProxyIdentityCmd())
 
 
 def mesh_out_number_action_ev(stack, data, data_len):
@@ -3747,10 +3037,10 @@ def mesh_out_number_action_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    action, number = struct.unpack_from('<HI', data)
+    ev = msgs.MeshOutNumberActionEv.decode(data)
 
-    mesh.oob_action.data = action
-    mesh.oob_data.data = number
+    mesh.oob_action.data = ev.action
+    mesh.oob_data.data = ev.number
 
 
 def mesh_out_string_action_ev(stack, data, data_len):
@@ -3758,13 +3048,7 @@ def mesh_out_string_action_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    hdr_fmt = '<B'
-    hdr_len = struct.calcsize(hdr_fmt)
-
-    (str_len,) = struct.unpack_from(hdr_fmt, data)
-    (string,) = struct.unpack_from('<%ds' % str_len, data, hdr_len)
-
-    mesh.oob_data.data = string
+    mesh.oob_data.data = msgs.MeshOutStringActionEv.decode(data).string
 
 
 def mesh_in_action_ev(stack, data, data_len):
@@ -3772,7 +3056,7 @@ def mesh_in_action_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    action, size = struct.unpack('<HB', data)
+    ev = msgs.MeshInActionEv.decode(data, exact=True)
 
 
 def mesh_provisioned_ev(stack, data, data_len):
@@ -3792,7 +3076,7 @@ def mesh_prov_link_open_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    (bearer,) = struct.unpack('<B', data)
+    bearer = msgs.MeshProvLinkOpenEv.decode(data, exact=True).bearer
 
     mesh.last_seen_prov_link_state.data = ('open', bearer)
 
@@ -3802,7 +3086,7 @@ def mesh_prov_link_closed_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    (bearer,) = struct.unpack('<B', data)
+    bearer = msgs.MeshProvLinkClosedEv.decode(data, exact=True).bearer
 
     mesh.last_seen_prov_link_state.data = ('closed', bearer)
 
@@ -3823,14 +3107,10 @@ def mesh_net_rcv_ev(stack, data, data_len):
 
     logging.debug("%s %r %r", mesh_net_rcv_ev.__name__, data, data_len)
 
-    hdr_fmt = '<BBHHB'
-    hdr_len = struct.calcsize(hdr_fmt)
+    ev = msgs.MeshNetRecvEv.decode(data)
+    payload = binascii.hexlify(ev.payload)
 
-    (ttl, ctl, src, dst, payload_len) = struct.unpack_from(hdr_fmt, data, 0)
-    (payload,) = struct.unpack_from('<%ds' % payload_len, data, hdr_len)
-    payload = binascii.hexlify(payload)
-
-    mesh.net_recv_ev_data.data = (ttl, ctl, src, dst, payload)
+    mesh.net_recv_ev_data.data = (ev.ttl, ev.ctl, ev.src, ev.dst, payload)
 
 
 def mesh_invalid_bearer_ev(stack, data, data_len):
@@ -3838,10 +3118,7 @@ def mesh_invalid_bearer_ev(stack, data, data_len):
 
     mesh = stack.mesh
 
-    hdr_fmt = '<B'
-    hdr_len = struct.calcsize(hdr_fmt)
-
-    (opcode,) = struct.unpack_from(hdr_fmt, data, 0)
+    msgs.MeshInvalidBearerEv.decode(data)
 
     mesh.prov_invalid_bearer_rcv.data = True
 
@@ -3872,14 +3149,23 @@ class BTPEventListener:
         self._sem = threading.Semaphore(value=0)
         self._verify_f = verify_f
         self._result = None
+        self._error = None
+        # Monotonic time the wait started, times the event latency
+        self.created = time.monotonic()
 
     def acquire(self):
         self._sem.acquire()
+        if self._error is not None:
+            raise self._error
         return self._result
 
     def release(self):
         self._sem.release()
 
+    def fail(self, error):
+        self._error = error
+        self._sem.release()
+
     def verify(self, args):
         if self._verify_f:
             return_val = self._verify_f(args)
@@ -3895,28 +3181,93 @@ class BTPEventHandler:
     def __init__(self, iutctl: IutCtl):
         self.iutctl = iutctl
         self.listeners = defaultdict(lambda: defaultdict(list))
+        self.monitors = defaultdict(lambda: defaultdict(list))
+        self.responders = defaultdict(dict)
         self.executor = ThreadPoolExecutor()
+        # IUTLostError once the IUT is lost, fails every later wait
+        self.lost = None
+        # Guards listeners and lost, the RX thread and the test thread
+        # both change them
+        self._lock = threading.Lock()
         self.callbacks = {
             defs.BTP_SERVICE_ID_GAP: GAP_EV,
             defs.BTP_SERVICE_ID_GATT: GATT_EV,
+            defs.BTP_SERVICE_ID_L2CAP: L2CAP_EV,
             defs.BTP_SERVICE_ID_MESH: MESH_EV,
             defs.BTP_SERVICE_ID_GATTC: GATT_CL_EV,
         }
 
     def clear_listeners(self):
-        for _, dct in self.listeners.items():
-            for key, lst in dct.items():
-                if len(lst) > 0:
-                    for listener in lst:
-                        listener.release()
-        self.listeners = defaultdict(lambda: defaultdict(list))
+        with self._lock:
+            listeners = self._all_listeners()
+            self.listeners = defaultdict(lambda: defaultdict(list))
+            self.lost = None
+        for listener in listeners:
+            listener.release()
+        self.monitors = defaultdict(lambda: defaultdict(list))
+        self.responders = defaultdict(dict)
+
+    def _all_listeners(self):
+        return [listener for dct in self.listeners.values()
+                for lst in dct.values() for listener in lst]
 
     def wait_for_event(self, svc_id, op, f):
         listener = BTPEventListener(f)
-        self.listeners[svc_id][op].append(listener)
-        return self.executor.submit(listener.acquire)
+        with self._lock:
+            lost = self.lost
+            if lost is None:
+                self.listeners[svc_id][op].append(listener)
+        if lost is not None:
+            listener.fail(lost)
+        future = self.executor.submit(listener.acquire)
+        # Read by wait_futures for the timeout learned for the event, and
+        # the time it applies from, the event latency is measured from it
+        future.timeout_operation = (timeouts.ev_operation(svc_id, op),
+                                    self.iutctl.get_type())
+        future.timeout_start = listener.created
+        return future
+
+    def iut_lost(self, error):
+        """Fail every pending and later wait_for_event future with error"""
+        with self._lock:
+            self.lost = error
+            listeners = self._all_listeners()
+        for listener in listeners:
+            listener.fail(error)
+
+    def add_monitor(self, svc_id, op, f):
+        """Call f(result, rx_time) for every event until removed
+
+        rx_time is the time.monotonic() timestamp taken when the event
+        reached the handler. Monitors run on the RX thread, so they should
+        only record data.
+        """
+        self.monitors[svc_id][op].append(f)
+
+    def remove_monitor(self, svc_id, op, f):
+        self.monitors[svc_id][op].remove(f)
+
+    def set_responder(self, svc_id, op, f):
+        """Answer every event with f(result) until cleared
+
+        f runs on the handler executor. It may send BTP commands and read
+        their responses, they are told apart from the responses the test
+        thread reads on the same IUT.
+        """
+        self.responders[svc_id][op] = f
+
+    def clear_responder(self, svc_id, op):
+        self.responders[svc_id].pop(op, None)
+
+    def _respond(self, f, result):
+        try:
+            with self.iutctl.btp_worker.own_responses():
+                f(result)
+        except Exception as e:
+            logging.exception("Responder %r failed: %r", f, e)
 
     def __call__(self, hdr, data):
+        rx_time = time.monotonic()
         logging.debug("%s %r %r", BTPEventHandler.__name__, hdr, data)
 
         stack = self.iutctl.stack
@@ -3933,13 +3284,28 @@ class BTPEventHandler:
 
         cb = self.callbacks[hdr.svc_id][hdr.op]
         ret = cb(stack, data[0], hdr.data_len)
-        listeners = self.listeners[hdr.svc_id][hdr.op]
-        to_remove = []
-        for listener in listeners:
-            if listener.verify(ret):
-                listener.release()
-                to_remove.append(listener)
-
-        self.listeners[hdr.svc_id][hdr.op] = \
-            list(set(listeners)-set(to_remove))
+        for monitor in self.monitors[hdr.svc_id][hdr.op]:
+            monitor(ret, rx_time)
+
+        responder = self.responders[hdr.svc_id].get(hdr.op)
+        if responder:
+            self.executor.submit(self._respond, responder, ret)
+
+        # Verified on a snapshot, listeners added meanwhile are kept
+        with self._lock:
+            listeners = list(self.listeners[hdr.svc_id][hdr.op])
+        matched = [listener for listener in listeners
+                   if listener.verify(ret)]
+        if matched:
+            with self._lock:
+                self.listeners[hdr.svc_id][hdr.op] = \
+                    [listener for listener in
+                     self.listeners[hdr.svc_id][hdr.op]
+                     if listener not in matched]
+
+        for listener in matched:
+            listener.release()
+            timeouts.observe(timeouts.ev_operation(hdr.svc_id, hdr.op),
+                             self.iutctl.get_type(),
+                             rx_time - listener.created)
         return True
@@ -19,6 +19,7 @@ import os
 import socket
 
 from .parser import dec_hdr, dec_data, HDR_LEN
+from .types import IUTLostError
 
 log = logging.debug
 
@@ -55,6 +56,8 @@ class BTPSocket:
         # Gather frame header
         while toread_hdr_len:
             nbytes = self.conn.recv_into(hdr_memview, toread_hdr_len)
+            if not nbytes:
+                raise IUTLostError("BTP socket closed by the IUT")
             hdr_memview = hdr_memview[nbytes:]
             toread_hdr_len -= nbytes
 
@@ -69,6 +72,8 @@ class BTPSocket:
         # Gather optional frame data
         while toread_data_len:
             nbytes = self.conn.recv_into(data_memview, toread_data_len)
+            if not nbytes:
+                raise IUTLostError("BTP socket closed by the IUT")
             data_memview = data_memview[nbytes:]
             toread_data_len -= nbytes
 
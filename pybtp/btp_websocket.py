@@ -19,11 +19,11 @@ import concurrent
 import logging
 import socket
 import threading
-import time
 
 import websockets
 
 from .parser import dec_hdr, dec_data, HDR_LEN
+from .types import IUTLostError
 
 log = logging.debug
 
@@ -37,6 +37,8 @@ class WebSocketThread(threading.Thread):
         self.websocket = None
         self.loop = None
         self.stoprequest = threading.Event()
+        # Set once the event loop runs and accepts coroutines
+        self.loop_running = threading.Event()
 
     async def _connect(self):
         return await websockets.connect('ws://{}:{}/'.format(self.host, self.port))
@@ -53,6 +55,8 @@ class WebSocketThread(threading.Thread):
         except concurrent.futures.TimeoutError:
             future.cancel()
             raise socket.timeout
+        except websockets.exceptions.ConnectionClosed as e:
+            raise IUTLostError("WebSocket closed by the IUT: %s" % e)
 
     def recv(self, timeout=None):
         future = asyncio.run_coroutine_threadsafe(self.websocket.recv(),
@@ -62,6 +66,8 @@ class WebSocketThread(threading.Thread):
         except concurrent.futures.TimeoutError:
             future.cancel()
             raise socket.timeout
+        except websockets.exceptions.ConnectionClosed as e:
+            raise IUTLostError("WebSocket closed by the IUT: %s" % e)
 
     def _exception_handler(self, loop, context):
         logging.debug("%s %r %r", self._exception_handler.__name__,
@@ -76,6 +82,7 @@ class WebSocketThread(threading.Thread):
         asyncio.set_event_loop(self.loop)
 
         self.loop.set_exception_handler(self._exception_handler)
+        self.loop.call_soon(self.loop_running.set)
         self.loop.run_forever()
 
     async def _close(self):
@@ -98,10 +105,11 @@ class BTPWebSocket:
         self.port = port
         self.websocket_task = None
 
-    def open(self):
+    def open(self, timeout=5.0):
         self.websocket_task = WebSocketThread(self.host, self.port)
         self.websocket_task.start()
-        time.sleep(1)
+        if not self.websocket_task.loop_running.wait(timeout):
+            raise TimeoutError("WebSocket event loop not running")
 
     def accept(self, timeout=10.0):
         self.websocket_task.connect(timeout)
@@ -127,5 +135,9 @@ class BTPWebSocket:
     def send(self, data):
         self.websocket_task.send(data)
 
+    def is_alive(self):
+        """False once the event loop stopped on a connection error"""
+        return self.websocket_task.is_alive()
+
     def close(self):
         self.websocket_task.join()
@@ -13,74 +13,283 @@
 # more details.
 #
 import binascii
+import collections
+import contextlib
 import logging
 import queue
 import socket
 import threading
+import time
 
+from common import metrics, timeouts, tracing
+from common.utils import set_iut_lost, clear_iut_lost
 from pybtp import defs
 from pybtp.parser import enc_frame
-from .types import BTPError
+from .types import BTPError, IUTLostError
 
 log = logging.debug
 
+# Frames kept in the trace of a worker
+TRACE_FRAMES = 64
+
+# Answered by every IUT, sent as heartbeat probe
+PROBE = enc_frame(defs.BTP_SERVICE_ID_CORE, defs.CORE_READ_SUPPORTED_SERVICES,
+                  defs.BTP_INDEX_NONE, b"")
+
 
 class BTPWorker:
-    def __init__(self, btp_socket, name=None):
+    def __init__(self, btp_socket, name=None, is_alive=None, iut_type=None,
+                 track=None):
         self.btp_socket = btp_socket
+        # Response timeouts are learned per IUT type
+        self.iut_type = iut_type
+        # Trace track of the frames, the IUT the wrappers are traced for
+        self.track = track or name
         self._rx_queue = queue.Queue()
         self._running = threading.Event()
 
         self._rx_worker = threading.Thread(target=self._rx_task,
                                            name=name)
-        self.read_timer = None
+        self.name = self._rx_worker.name
         self.event_handler_cb = None
+        self.lost_handler_cb = None
+
+        # Called while no frame is received, False once the IUT is gone,
+        # e.g. the process bridging the transport exited
+        self.is_alive = is_alive
+        # IUTLostError once the transport is lost, until the worker closes
+        self.lost = None
+
+        # (response queue, monotonic send time, timeout operation) of the
+        # commands in flight, the IUT answers them in order
+        self._in_flight = collections.deque()
+        # Response queue and last command operation of a thread
+        self._local = threading.local()
+        # Seconds from command sent to response received, per command
+        self._latencies = []
+        # Serializes commands and heartbeat probes
+        self._lock = threading.Lock()
+
+        # Event set by the response of the heartbeat probe in flight
+        self._probe = None
+        self._probe_sent = None
+        self._probe_rtt = None
+        # Monotonic time of the last frame received, a sign of life
+        self.last_rx = None
+        # (time, 'tx' or 'rx', svc_id, op, data length) of the last frames
+        self.trace = collections.deque(maxlen=TRACE_FRAMES)
 
     def open(self):
         self.btp_socket.open()
 
+    def _lose(self, error):
+        if not self._running.is_set() or self.lost is not None:
+            return
+
+        logging.error("%s: IUT lost: %s", self.name, error)
+        self.lost = error
+        set_iut_lost(self.name, error)
+
+        # Wake up the pending reads
+        with self._lock:
+            rx_queues = {rx_queue for rx_queue, _, _ in self._in_flight}
+        for rx_queue in rx_queues | {self._rx_queue}:
+            rx_queue.put(error)
+        if self.lost_handler_cb:
+            self.lost_handler_cb(error)
+
     def _rx_task(self):
-        while self._running.is_set():
+        while self._running.is_set() and self.lost is None:
             try:
                 data = self.btp_socket.read(timeout=1.0)
 
                 hdr = data[0]
-                if hdr.svc_id != defs.BTP_SERVICE_ID_CORE and hdr.op >= 0x80:
-                    # Do not put handled events on RX queue
-                    if self.event_handler_cb:
-                        ret = self.event_handler_cb(*data)
-                        if ret is True:
-                            continue
-
-                self._rx_queue.put(data)
+                self.last_rx = time.monotonic()
+                self.trace.append((time.time(), 'rx', hdr.svc_id, hdr.op,
+                                   hdr.data_len))
+
+                if metrics.METRICS is not None:
+                    metrics.METRICS.frame(self.track, 'rx')
+
+                tracer = tracing.TRACER
+                if tracer is None:
+                    self._dispatch(data)
+                    continue
+
+                start = tracer.now()
+                self._dispatch(data)
+                tracer.complete("rx svc %d op 0x%02x" % (hdr.svc_id, hdr.op),
+                                [self.track], start, 'frame',
+                                {'svc_id': hdr.svc_id, 'op': hdr.op,
+                                 'len': hdr.data_len})
             except socket.timeout:
-                pass
-
-    @staticmethod
-    def _read_timeout(flag):
-        flag.clear()
+                if self.is_alive is not None and not self.is_alive():
+                    self._lose(IUTLostError("BTP transport process exited"))
+            except IUTLostError as e:
+                self._lose(e)
+            except OSError as e:
+                self._lose(IUTLostError("BTP transport failed: %r" % e))
+
+    def _dispatch(self, data):
+        hdr = data[0]
+        rx_queue = self._rx_queue
+        if hdr.svc_id != defs.BTP_SERVICE_ID_CORE and hdr.op >= 0x80:
+            # Do not put handled events on RX queue
+            if self.event_handler_cb:
+                ret = self.event_handler_cb(*data)
+                if ret is True:
+                    return
+        elif hdr.op < 0x80:
+            # Core events, as IUT ready, are not responses to a command
+            rx_queue = self._on_response(hdr)
+            if rx_queue is None:
+                # Heartbeat responses are not read by anyone
+                return
+
+        rx_queue.put(data)
+
+    def _on_response(self, hdr):
+        """Time a response and return the queue it is read from
+
+        None if it answers the heartbeat probe.
+        """
+        with self._lock:
+            # The probe is only sent with no command in flight and the IUT
+            # answers in order, so the first response is the probe's
+            if self._probe is not None:
+                self._probe_rtt = time.monotonic() - self._probe_sent
+                self._probe.set()
+                self._probe = None
+                return None
+
+            if not self._in_flight:
+                return self._rx_queue
+
+            rx_queue, sent_time, operation = self._in_flight.popleft()
+            latency = time.monotonic() - sent_time
+            self._latencies.append(latency)
+            timeouts.observe(operation, self.iut_type, latency)
+            if metrics.METRICS is not None:
+                metrics.METRICS.latency(self.track, latency)
+            return rx_queue
+
+    def pending_since(self):
+        """Monotonic send time of the unanswered command or probe"""
+        with self._lock:
+            if self._probe is not None:
+                return self._probe_sent
+            if self._in_flight:
+                return self._in_flight[0][1]
+            return None
+
+    def probe(self, timeout):
+        """Send a heartbeat probe and wait for its response
+
+        Returns the response time in seconds, None if a command was in
+        flight and no probe was sent. Raises socket.timeout if the IUT
+        did not answer within timeout.
+        """
+        with self._lock:
+            if self._in_flight or self._probe is not None:
+                return None
+
+            probe = self._probe = threading.Event()
+            self._probe_sent = time.monotonic()
+            self.trace.append((time.time(), 'tx', defs.BTP_SERVICE_ID_CORE,
+                               defs.CORE_READ_SUPPORTED_SERVICES, 0))
+            self.btp_socket.send(PROBE)
+
+        if not probe.wait(timeout):
+            raise socket.timeout
+        return self._probe_rtt
+
+    def set_lost(self, error):
+        """Fail all pending and later reads of an unresponsive IUT"""
+        self._lose(error)
+
+    def latency_stats(self, reset=False):
+        """Count, mean, median, 99th percentile and maximum response
+        latency in milliseconds of the commands sent so far
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            if reset:
+                self._latencies = []
+
+        if not latencies:
+            return {'count': 0}
+
+        def ms(value):
+            return round(value * 1000, 3)
+
+        return {
+            'count': len(latencies),
+            'mean_ms': ms(sum(latencies) / len(latencies)),
+            'p50_ms': ms(latencies[(len(latencies) - 1) // 2]),
+            'p99_ms': ms(latencies[min(len(latencies) - 1,
+                                       int(len(latencies) * 0.99))]),
+            'max_ms': ms(latencies[-1]),
+        }
+
+    def rx_queue_depth(self):
+        """Responses received and not read yet"""
+        return self._rx_queue.qsize()
 
     def read(self, timeout=20.0):
         logging.debug("%s", self.read.__name__)
 
-        flag = threading.Event()
-        flag.set()
-
-        self.read_timer = threading.Timer(timeout, self._read_timeout, [flag])
-        self.read_timer.start()
-
-        while flag.is_set():
-            if self._rx_queue.empty():
-                continue
-
-            self.read_timer.cancel()
-
-            data = self._rx_queue.get()
-            self._rx_queue.task_done()
-
-            return data
-
-        raise socket.timeout
+        if self.lost is not None:
+            raise self.lost
+
+        operation = getattr(self._local, 'operation', None)
+        timeout = timeouts.get_timeout(operation, self.iut_type, timeout)
+
+        rx_queue = self._responses()
+        try:
+            data = rx_queue.get(timeout=timeout)
+        except queue.Empty:
+            self._forget(rx_queue)
+            raise socket.timeout
+        rx_queue.task_done()
+
+        if isinstance(data, IUTLostError):
+            # Left for the next read, the transport stays lost
+            rx_queue.put(data)
+            raise data
+
+        return data
+
+    def _forget(self, rx_queue):
+        """Drop the unanswered command a read of rx_queue timed out on
+
+        Later responses are then matched to the commands sent after it,
+        as when the IUT never answers it. A response to it arriving late
+        is still taken for the next one, BTP frames carry no sequence
+        number to tell them apart.
+        """
+        with self._lock:
+            for entry in self._in_flight:
+                if entry[0] is rx_queue:
+                    self._in_flight.remove(entry)
+                    return
+
+    def _responses(self):
+        return getattr(self._local, 'rx_queue', None) or self._rx_queue
+
+    @contextlib.contextmanager
+    def own_responses(self):
+        """Read the responses of the commands this thread sends in the block
+
+        Lets a thread other than the test, e.g. an event responder, send
+        commands and read their responses while the test thread sends and
+        reads its own. Responses are matched to the commands in the order
+        the commands were sent.
+        """
+        self._local.rx_queue = queue.Queue()
+        try:
+            yield
+        finally:
+            self._local.rx_queue = None
 
     def send(self, svc_id, op, ctrl_index, data):
         logging.debug("%s, %r %r %r %r",
@@ -102,11 +311,35 @@ class BTPWorker:
 
         logging.debug("sending frame %r", bin_data)
 
-        self.btp_socket.send(bin_data)
+        if self.lost is not None:
+            raise self.lost
+
+        tracer = tracing.TRACER
+        start = tracer.now() if tracer is not None else None
+        try:
+            with self._lock:
+                operation = timeouts.rsp_operation(svc_id, op)
+                self._local.operation = operation
+                sent_time = time.monotonic()
+                self.trace.append((time.time(), 'tx', svc_id, op, len(data)))
+                self.btp_socket.send(bin_data)
+                self._in_flight.append((self._responses(), sent_time,
+                                        operation))
+        except OSError as e:
+            error = IUTLostError("BTP transport failed: %r" % e)
+            self._lose(error)
+            raise error
+
+        if metrics.METRICS is not None:
+            metrics.METRICS.frame(self.track, 'tx')
+        if tracer is not None:
+            tracer.complete("tx svc %d op 0x%02x" % (svc_id, op),
+                            [self.track], start, 'frame',
+                            {'svc_id': svc_id, 'op': op, 'len': len(data)})
 
     def send_wait_rsp(self, svc_id, op, ctrl_index, data, cb=None,
                       user_data=None):
-        self.btp_socket.send(svc_id, op, ctrl_index, data)
+        self.send(svc_id, op, ctrl_index, data)
         ret = True
 
         while ret:
@@ -144,6 +377,7 @@ class BTPWorker:
 
         self.btp_socket.accept(timeout)
 
+        clear_iut_lost(self.name)
         self._running.set()
         self._rx_worker.start()
 
@@ -153,12 +387,15 @@ class BTPWorker:
         if self._rx_worker.is_alive():
             self._rx_worker.join()
 
-        if self.read_timer:
-            self.read_timer.cancel()
-
         self._reset_rx_queue()
+        self._in_flight.clear()
+        clear_iut_lost(self.name)
 
         self.btp_socket.close()
 
     def register_event_handler(self, event_handler):
         self.event_handler_cb = event_handler
+
+    def register_lost_handler(self, lost_handler):
+        """Call lost_handler(error) on the RX thread once the IUT is lost"""
+        self.lost_handler_cb = lost_handler
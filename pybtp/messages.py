@@ -0,0 +1,567 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""BTP message declarations.
+
+Commands are suffixed with Cmd, command responses with Rp and events with
+Ev. Multi-record responses are declared as a count header followed by
+record messages, see the *Record classes.
+"""
+
+from pybtp import defs
+from pybtp.schema import message, length, U8, U16, U32, ADDR, BYTES, \
+    RAW, TAIL, VAR8, VAR16, LIST8
+
+CORE = defs.BTP_SERVICE_ID_CORE
+GAP = defs.BTP_SERVICE_ID_GAP
+GATT = defs.BTP_SERVICE_ID_GATT
+L2CAP = defs.BTP_SERVICE_ID_L2CAP
+MESH = defs.BTP_SERVICE_ID_MESH
+GATTC = defs.BTP_SERVICE_ID_GATTC
+
+# CORE
+
+CoreRegisterServiceCmd = message(
+    'CoreRegisterServiceCmd', CORE, defs.CORE_REGISTER_SERVICE,
+    ('id', U8))
+
+CoreUnregisterServiceCmd = message(
+    'CoreUnregisterServiceCmd', CORE, defs.CORE_UNREGISTER_SERVICE,
+    ('id', U8))
+
+CoreReadSupportedServicesCmd = message(
+    'CoreReadSupportedServicesCmd', CORE, defs.CORE_READ_SUPPORTED_SERVICES)
+
+CoreReadSupportedServicesRp = message(
+    'CoreReadSupportedServicesRp', CORE, defs.CORE_READ_SUPPORTED_SERVICES,
+    ('services', TAIL))
+
+# GAP
+
+GapReadControllerInfoCmd = message(
+    'GapReadControllerInfoCmd', GAP, defs.GAP_READ_CONTROLLER_INFO)
+
+GapReadControllerInfoRp = message(
+    'GapReadControllerInfoRp', GAP, defs.GAP_READ_CONTROLLER_INFO,
+    ('address', BYTES(6)), ('supported_settings', U32),
+    ('current_settings', U32), ('cod', BYTES(3)), ('name', BYTES(249)),
+    ('short_name', BYTES(11)))
+
+GapCurrentSettingsRp = message(
+    'GapCurrentSettingsRp', GAP, None,
+    ('current_settings', U32),
+    doc="Response of commands changing controller settings")
+
+GapStartAdvertisingCmd = message(
+    'GapStartAdvertisingCmd', GAP, defs.GAP_START_ADVERTISING,
+    length('B', 'adv_data'), length('B', 'scan_rsp'), ('adv_data', RAW),
+    ('scan_rsp', RAW), ('duration', U32), ('own_addr_type', U8))
+
+GapStopAdvertisingCmd = message(
+    'GapStopAdvertisingCmd', GAP, defs.GAP_STOP_ADVERTISING)
+
+GapSetConnectableCmd = message(
+    'GapSetConnectableCmd', GAP, defs.GAP_SET_CONNECTABLE,
+    ('connectable', U8))
+
+GapSetDiscoverableCmd = message(
+    'GapSetDiscoverableCmd', GAP, defs.GAP_SET_DISCOVERABLE,
+    ('discoverable', U8))
+
+GapSetPoweredCmd = message(
+    'GapSetPoweredCmd', GAP, defs.GAP_SET_POWERED,
+    ('powered', U8))
+
+GapResetCmd = message(
+    'GapResetCmd', GAP, defs.GAP_RESET)
+
+GapStartDiscoveryCmd = message(
+    'GapStartDiscoveryCmd', GAP, defs.GAP_START_DISCOVERY,
+    ('flags', U8))
+
+GapStopDiscoveryCmd = message(
+    'GapStopDiscoveryCmd', GAP, defs.GAP_STOP_DISCOVERY)
+
+GapConnectCmd = message(
+    'GapConnectCmd', GAP, defs.GAP_CONNECT,
+    ('address', ADDR), ('own_addr_type', U8))
+
+GapDisconnectCmd = message(
+    'GapDisconnectCmd', GAP, defs.GAP_DISCONNECT,
+    ('address', ADDR))
+
+GapSetIoCapCmd = message(
+    'GapSetIoCapCmd', GAP, defs.GAP_SET_IO_CAP,
+    ('io_cap', U8))
+
+GapPairCmd = message(
+    'GapPairCmd', GAP, defs.GAP_PAIR,
+    ('address', ADDR))
+
+GapUnpairCmd = message(
+    'GapUnpairCmd', GAP, defs.GAP_UNPAIR,
+    ('address', ADDR))
+
+GapPasskeyEntryCmd = message(
+    'GapPasskeyEntryCmd', GAP, defs.GAP_PASSKEY_ENTRY,
+    ('address', ADDR), ('passkey', U32))
+
+GapPasskeyConfirmCmd = message(
+    'GapPasskeyConfirmCmd', GAP, defs.GAP_PASSKEY_CONFIRM,
+    ('address', ADDR), ('match', U8))
+
+GapStartDirectAdvCmd = message(
+    'GapStartDirectAdvCmd', GAP, defs.GAP_START_DIRECT_ADV,
+    ('address', ADDR), ('options', U16))
+
+GapConnParamUpdateCmd = message(
+    'GapConnParamUpdateCmd', GAP, defs.GAP_CONN_PARAM_UPDATE,
+    ('address', ADDR), ('interval_min', U16), ('interval_max', U16),
+    ('latency', U16), ('timeout', U16))
+
+GapNewSettingsEv = message(
+    'GapNewSettingsEv', GAP, defs.GAP_EV_NEW_SETTINGS,
+    ('current_settings', U32))
+
+GapDeviceFoundEv = message(
+    'GapDeviceFoundEv', GAP, defs.GAP_EV_DEVICE_FOUND,
+    ('address', ADDR), ('rssi', U8), ('flags', U8), ('eir', VAR16()))
+
+GapDeviceConnectedEv = message(
+    'GapDeviceConnectedEv', GAP, defs.GAP_EV_DEVICE_CONNECTED,
+    ('address', ADDR), ('interval', U16), ('latency', U16),
+    ('timeout', U16))
+
+GapDeviceDisconnectedEv = message(
+    'GapDeviceDisconnectedEv', GAP, defs.GAP_EV_DEVICE_DISCONNECTED,
+    ('address', ADDR))
+
+GapPasskeyDisplayEv = message(
+    'GapPasskeyDisplayEv', GAP, defs.GAP_EV_PASSKEY_DISPLAY,
+    ('address', ADDR), ('passkey', U32))
+
+GapPasskeyEntryReqEv = message(
+    'GapPasskeyEntryReqEv', GAP, defs.GAP_EV_PASSKEY_ENTRY_REQ,
+    ('address', ADDR))
+
+GapPasskeyConfirmReqEv = message(
+    'GapPasskeyConfirmReqEv', GAP, defs.GAP_EV_PASSKEY_CONFIRM_REQ,
+    ('address', ADDR), ('passkey', U32))
+
+GapIdentityResolvedEv = message(
+    'GapIdentityResolvedEv', GAP, defs.GAP_EV_IDENTITY_RESOLVED,
+    ('address', ADDR), ('identity_address', ADDR))
+
+GapConnParamUpdateEv = message(
+    'GapConnParamUpdateEv', GAP, defs.GAP_EV_CONN_PARAM_UPDATE,
+    ('address', ADDR), ('interval', U16), ('latency', U16),
+    ('timeout', U16))
+
+GapSecLevelChangedEv = message(
+    'GapSecLevelChangedEv', GAP, defs.GAP_EV_SEC_LEVEL_CHANGED,
+    ('address', ADDR), ('sec_level', U8))
+
+GapPairingConsentReqEv = message(
+    'GapPairingConsentReqEv', GAP, defs.GAP_EV_PAIRING_CONSENT_REQ,
+    ('address', ADDR))
+
+# GATT server
+
+GattAddServiceCmd = message(
+    'GattAddServiceCmd', GATT, defs.GATT_ADD_SERVICE,
+    ('type', U8), ('uuid', VAR8()))
+
+GattAddServiceRp = message(
+    'GattAddServiceRp', GATT, defs.GATT_ADD_SERVICE,
+    ('service_id', U16))
+
+GattAddCharacteristicCmd = message(
+    'GattAddCharacteristicCmd', GATT, defs.GATT_ADD_CHARACTERISTIC,
+    ('service_id', U16), ('properties', U8), ('permissions', U8),
+    ('uuid', VAR8()))
+
+GattAddCharacteristicRp = message(
+    'GattAddCharacteristicRp', GATT, defs.GATT_ADD_CHARACTERISTIC,
+    ('char_id', U16))
+
+GattAddDescriptorCmd = message(
+    'GattAddDescriptorCmd', GATT, defs.GATT_ADD_DESCRIPTOR,
+    ('char_id', U16), ('permissions', U8), ('uuid', VAR8()))
+
+GattAddDescriptorRp = message(
+    'GattAddDescriptorRp', GATT, defs.GATT_ADD_DESCRIPTOR,
+    ('desc_id', U16))
+
+GattAddIncludedServiceCmd = message(
+    'GattAddIncludedServiceCmd', GATT, defs.GATT_ADD_INCLUDED_SERVICE,
+    ('service_id', U16))
+
+GattAddIncludedServiceRp = message(
+    'GattAddIncludedServiceRp', GATT, defs.GATT_ADD_INCLUDED_SERVICE,
+    ('included_service_id', U16))
+
+GattSetValueCmd = message(
+    'GattSetValueCmd', GATT, defs.GATT_SET_VALUE,
+    ('attr_id', U16), ('value', VAR16()))
+
+GattStartServerCmd = message(
+    'GattStartServerCmd', GATT, defs.GATT_START_SERVER)
+
+GattSetEncKeySizeCmd = message(
+    'GattSetEncKeySizeCmd', GATT, defs.GATT_SET_ENC_KEY_SIZE,
+    ('attr_id', U16), ('key_size', U8))
+
+GattGetAttributesCmd = message(
+    'GattGetAttributesCmd', GATT, defs.GATT_GET_ATTRIBUTES,
+    ('start_handle', U16), ('end_handle', U16), ('type', VAR8()))
+
+GattGetAttributesRp = message(
+    'GattGetAttributesRp', GATT, defs.GATT_GET_ATTRIBUTES,
+    ('attrs_count', U8),
+    doc="Header of Get Attributes response, see GattAttributeRecord")
+
+GattAttributeRecord = message(
+    'GattAttributeRecord', GATT, defs.GATT_GET_ATTRIBUTES,
+    ('handle', U16), ('permission', U8), ('type', VAR8()))
+
+GattGetAttributeValueCmd = message(
+    'GattGetAttributeValueCmd', GATT, defs.GATT_GET_ATTRIBUTE_VALUE,
+    ('address', ADDR), ('handle', U16))
+
+GattGetAttributeValueRp = message(
+    'GattGetAttributeValueRp', GATT, defs.GATT_GET_ATTRIBUTE_VALUE,
+    ('att_response', U8), ('value', VAR16()))
+
+GattChrcDeclValue = message(
+    'GattChrcDeclValue', GATT, None,
+    ('properties', U8), ('value_handle', U16), ('uuid', TAIL),
+    doc="Characteristic declaration attribute value")
+
+GattInclDeclValue = message(
+    'GattInclDeclValue', GATT, None,
+    ('start_handle', U16), ('end_handle', U16), ('uuid', TAIL),
+    doc="Include declaration attribute value")
+
+GattAttrValueChangedEv = message(
+    'GattAttrValueChangedEv', GATT, defs.GATT_EV_ATTR_VALUE_CHANGED,
+    ('attr_id', U16), ('data', VAR16()))
+
+# GATT client (GATT service)
+
+GattExchangeMtuCmd = message(
+    'GattExchangeMtuCmd', GATT, defs.GATT_EXCHANGE_MTU,
+    ('address', ADDR))
+
+GattDiscPrimSvcsCmd = message(
+    'GattDiscPrimSvcsCmd', GATT, defs.GATT_DISC_PRIM_SVCS,
+    ('address', ADDR))
+
+GattDiscPrimUuidCmd = message(
+    'GattDiscPrimUuidCmd', GATT, defs.GATT_DISC_PRIM_UUID,
+    ('address', ADDR), ('uuid', VAR8()))
+
+GattFindIncludedCmd = message(
+    'GattFindIncludedCmd', GATT, defs.GATT_FIND_INCLUDED,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattDiscAllChrcCmd = message(
+    'GattDiscAllChrcCmd', GATT, defs.GATT_DISC_ALL_CHRC,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattDiscChrcUuidCmd = message(
+    'GattDiscChrcUuidCmd', GATT, defs.GATT_DISC_CHRC_UUID,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16),
+    ('uuid', VAR8()))
+
+GattDiscAllDescCmd = message(
+    'GattDiscAllDescCmd', GATT, defs.GATT_DISC_ALL_DESC,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattReadCmd = message(
+    'GattReadCmd', GATT, defs.GATT_READ,
+    ('address', ADDR), ('handle', U16))
+
+GattReadLongCmd = message(
+    'GattReadLongCmd', GATT, defs.GATT_READ_LONG,
+    ('address', ADDR), ('handle', U16), ('offset', U16))
+
+GattReadMultipleCmd = message(
+    'GattReadMultipleCmd', GATT, defs.GATT_READ_MULTIPLE,
+    ('address', ADDR), ('handles', LIST8(U16)))
+
+GattWriteWithoutRspCmd = message(
+    'GattWriteWithoutRspCmd', GATT, defs.GATT_WRITE_WITHOUT_RSP,
+    ('address', ADDR), ('handle', U16), ('data', VAR16()))
+
+GattSignedWriteWithoutRspCmd = message(
+    'GattSignedWriteWithoutRspCmd', GATT, defs.GATT_SIGNED_WRITE_WITHOUT_RSP,
+    ('address', ADDR), ('handle', U16), ('data', VAR16()))
+
+GattWriteCmd = message(
+    'GattWriteCmd', GATT, defs.GATT_WRITE,
+    ('address', ADDR), ('handle', U16), ('data', VAR16()))
+
+GattWriteLongCmd = message(
+    'GattWriteLongCmd', GATT, defs.GATT_WRITE_LONG,
+    ('address', ADDR), ('handle', U16), ('offset', U16), ('data', VAR16()))
+
+GattCfgNotifyCmd = message(
+    'GattCfgNotifyCmd', GATT, defs.GATT_CFG_NOTIFY,
+    ('address', ADDR), ('enable', U8), ('ccc_handle', U16))
+
+GattCfgIndicateCmd = message(
+    'GattCfgIndicateCmd', GATT, defs.GATT_CFG_INDICATE,
+    ('address', ADDR), ('enable', U8), ('ccc_handle', U16))
+
+GattDiscRp = message(
+    'GattDiscRp', GATT, None,
+    ('attrs_count', U8),
+    doc="Header of discovery responses, followed by attribute records")
+
+GattServiceRecord = message(
+    'GattServiceRecord', GATT, None,
+    ('start_handle', U16), ('end_handle', U16), ('uuid', VAR8()))
+
+GattIncludedRecord = message(
+    'GattIncludedRecord', GATT, None,
+    ('included_handle', U16), ('start_handle', U16), ('end_handle', U16),
+    ('uuid', VAR8()))
+
+GattCharacteristicRecord = message(
+    'GattCharacteristicRecord', GATT, None,
+    ('handle', U16), ('value_handle', U16), ('properties', U8),
+    ('uuid', VAR8()))
+
+GattDescriptorRecord = message(
+    'GattDescriptorRecord', GATT, None,
+    ('handle', U16), ('uuid', VAR8()))
+
+GattReadRp = message(
+    'GattReadRp', GATT, defs.GATT_READ,
+    ('att_response', U8), ('data', VAR16()))
+
+GattWriteRp = message(
+    'GattWriteRp', GATT, defs.GATT_WRITE,
+    ('att_response', U8))
+
+GattNotificationEv = message(
+    'GattNotificationEv', GATT, defs.GATT_EV_NOTIFICATION,
+    ('address', ADDR), ('type', U8), ('handle', U16), ('data', VAR16()))
+
+# GATT client (GATTC service)
+
+GattClDiscAllPrimCmd = message(
+    'GattClDiscAllPrimCmd', GATTC, defs.GATTC_DISC_ALL_PRIM,
+    ('address', ADDR))
+
+GattClDiscPrimUuidCmd = message(
+    'GattClDiscPrimUuidCmd', GATTC, defs.GATTC_DISC_PRIM_UUID,
+    ('address', ADDR), ('uuid', VAR8()))
+
+GattClFindIncludedCmd = message(
+    'GattClFindIncludedCmd', GATTC, defs.GATTC_FIND_INCLUDED,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattClDiscAllChrcCmd = message(
+    'GattClDiscAllChrcCmd', GATTC, defs.GATTC_DISC_ALL_CHRC,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattClDiscChrcUuidCmd = message(
+    'GattClDiscChrcUuidCmd', GATTC, defs.GATTC_DISC_CHRC_UUID,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16),
+    ('uuid', VAR8()))
+
+GattClDiscAllDescCmd = message(
+    'GattClDiscAllDescCmd', GATTC, defs.GATTC_DISC_ALL_DESC,
+    ('address', ADDR), ('start_handle', U16), ('end_handle', U16))
+
+GattClReadCmd = message(
+    'GattClReadCmd', GATTC, defs.GATTC_READ,
+    ('address', ADDR), ('handle', U16))
+
+GattClReadLongCmd = message(
+    'GattClReadLongCmd', GATTC, defs.GATTC_READ_LONG,
+    ('address', ADDR), ('handle', U16), ('offset', U16))
+
+GattClWriteCmd = message(
+    'GattClWriteCmd', GATTC, defs.GATTC_WRITE,
+    ('address', ADDR), ('handle', U16), ('data', VAR16()))
+
+GattClWriteLongCmd = message(
+    'GattClWriteLongCmd', GATTC, defs.GATTC_WRITE_LONG,
+    ('address', ADDR), ('handle', U16), ('offset', U16), ('data', VAR16()))
+
+GattClCfgNotifyCmd = message(
+    'GattClCfgNotifyCmd', GATTC, defs.GATTC_CFG_NOTIFY,
+    ('address', ADDR), ('enable', U8), ('ccc_handle', U16))
+
+GattClCfgIndicateCmd = message(
+    'GattClCfgIndicateCmd', GATTC, defs.GATTC_CFG_INDICATE,
+    ('address', ADDR), ('enable', U8), ('ccc_handle', U16))
+
+GattClDiscRp = message(
+    'GattClDiscRp', GATTC, None,
+    ('address', ADDR), ('status', U8), ('attrs_count', U8),
+    doc="Header of discovery response events, followed by attribute "
+        "records")
+
+GattClReadRp = message(
+    'GattClReadRp', GATTC, defs.GATTC_READ_RP,
+    ('address', ADDR), ('status', U8), ('data', VAR16()))
+
+GattClWriteRp = message(
+    'GattClWriteRp', GATTC, defs.GATTC_WRITE_RP,
+    ('address', ADDR), ('status', U8))
+
+GattClNotificationEv = message(
+    'GattClNotificationEv', GATTC, defs.GATTC_EV_NOTIFICATION_RXED,
+    ('address', ADDR), ('type', U8), ('handle', U16), ('data', VAR16()))
+
+# L2CAP
+
+L2capConnectCmd = message(
+    'L2capConnectCmd', L2CAP, defs.L2CAP_CONNECT,
+    ('address', ADDR), ('psm', U16))
+
+L2capConnectRp = message(
+    'L2capConnectRp', L2CAP, defs.L2CAP_CONNECT,
+    ('chan_id', U8))
+
+L2capDisconnectCmd = message(
+    'L2capDisconnectCmd', L2CAP, defs.L2CAP_DISCONNECT,
+    ('chan_id', U8))
+
+L2capSendDataCmd = message(
+    'L2capSendDataCmd', L2CAP, defs.L2CAP_SEND_DATA,
+    ('chan_id', U8), ('data', VAR16()))
+
+L2capListenCmd = message(
+    'L2capListenCmd', L2CAP, defs.L2CAP_LISTEN,
+    ('psm', U16), ('transport', U8))
+
+L2capConnectedEv = message(
+    'L2capConnectedEv', L2CAP, defs.L2CAP_EV_CONNECTED,
+    ('chan_id', U8), ('psm', U16), ('address', ADDR))
+
+L2capDisconnectedEv = message(
+    'L2capDisconnectedEv', L2CAP, defs.L2CAP_EV_DISCONNECTED,
+    ('result', U16), ('chan_id', U8), ('psm', U16), ('address', ADDR))
+
+L2capDataReceivedEv = message(
+    'L2capDataReceivedEv', L2CAP, defs.L2CAP_EV_DATA_RECEIVED,
+    ('chan_id', U8), ('data', VAR16()))
+
+# MESH
+
+MeshInitCmd = message(
+    'MeshInitCmd', MESH, defs.MESH_INIT)
+
+MeshResetCmd = message(
+    'MeshResetCmd', MESH, defs.MESH_RESET)
+
+MeshInputStringCmd = message(
+    'MeshInputStringCmd', MESH, defs.MESH_INPUT_STRING,
+    ('string', TAIL))
+
+MeshIvUpdateToggleCmd = message(
+    'MeshIvUpdateToggleCmd', MESH, defs.MESH_IV_UPDATE_TOGGLE)
+
+MeshHealthAddFaultsCmd = message(
+    'MeshHealthAddFaultsCmd', MESH, defs.MESH_HEALTH_ADD_FAULTS)
+
+MeshHealthClearFaultsCmd = message(
+    'MeshHealthClearFaultsCmd', MESH, defs.MESH_HEALTH_CLEAR_FAULTS)
+
+MeshLpnPollCmd = message(
+    'MeshLpnPollCmd', MESH, defs.MESH_LPN_POLL)
+
+MeshRplClearCmd = message(
+    'MeshRplClearCmd', MESH, defs.MESH_RPL_CLEAR)
+
+MeshProxyIdentityCmd = message(
+    'MeshProxyIdentityCmd', MESH, defs.MESH_PROXY_IDENTITY)
+
+MeshConfigProvisioningCmd = message(
+    'MeshConfigProvisioningCmd', MESH, defs.MESH_CONFIG_PROVISIONING,
+    ('uuid', BYTES(16)), ('static_auth', BYTES(16)), ('output_size', U8),
+    ('output_actions', U16), ('input_size', U8), ('input_actions', U16))
+
+MeshProvisionNodeCmd = message(
+    'MeshProvisionNodeCmd', MESH, defs.MESH_PROVISION_NODE,
+    ('net_key', BYTES(16)), ('net_key_idx', U16), ('flags', U8),
+    ('iv_index', U32), ('seq_num', U32), ('addr', U16),
+    ('dev_key', BYTES(16)))
+
+MeshInputNumberCmd = message(
+    'MeshInputNumberCmd', MESH, defs.MESH_INPUT_NUMBER,
+    ('number', U32))
+
+MeshIvUpdateTestModeCmd = message(
+    'MeshIvUpdateTestModeCmd', MESH, defs.MESH_IV_UPDATE_TEST_MODE,
+    ('enable', U8))
+
+MeshNetSendCmd = message(
+    'MeshNetSendCmd', MESH, defs.MESH_NET_SEND,
+    ('ttl', U8), ('src', U16), ('dst', U16), ('payload', VAR8()))
+
+MeshHealthAddFaultsRp = message(
+    'MeshHealthAddFaultsRp', MESH, defs.MESH_HEALTH_ADD_FAULTS,
+    ('test_id', U8), length('B', 'cur_faults'), length('B', 'reg_faults'),
+    ('cur_faults', RAW), ('reg_faults', RAW))
+
+MeshLpnSetCmd = message(
+    'MeshLpnSetCmd', MESH, defs.MESH_LPN_SET,
+    ('enable', U8))
+
+MeshModelSendCmd = message(
+    'MeshModelSendCmd', MESH, defs.MESH_MODEL_SEND,
+    ('src', U16), ('dst', U16), ('payload', VAR8()))
+
+MeshLpnSubscribeCmd = message(
+    'MeshLpnSubscribeCmd', MESH, defs.MESH_LPN_SUBSCRIBE,
+    ('address', U16))
+
+MeshLpnUnsubscribeCmd = message(
+    'MeshLpnUnsubscribeCmd', MESH, defs.MESH_LPN_UNSUBSCRIBE,
+    ('address', U16))
+
+MeshOutNumberActionEv = message(
+    'MeshOutNumberActionEv', MESH, defs.MESH_EV_OUT_NUMBER_ACTION,
+    ('action', U16), ('number', U32))
+
+MeshOutStringActionEv = message(
+    'MeshOutStringActionEv', MESH, defs.MESH_EV_OUT_STRING_ACTION,
+    ('string', VAR8()))
+
+MeshInActionEv = message(
+    'MeshInActionEv', MESH, defs.MESH_EV_IN_ACTION,
+    ('action', U16), ('size', U8))
+
+MeshProvLinkOpenEv = message(
+    'MeshProvLinkOpenEv', MESH, defs.MESH_EV_PROV_LINK_OPEN,
+    ('bearer', U8))
+
+MeshProvLinkClosedEv = message(
+    'MeshProvLinkClosedEv', MESH, defs.MESH_EV_PROV_LINK_CLOSED,
+    ('bearer', U8))
+
+MeshNetRecvEv = message(
+    'MeshNetRecvEv', MESH, defs.MESH_EV_NET_RECV,
+    ('ttl', U8), ('ctl', U8), ('src', U16), ('dst', U16),
+    ('payload', VAR8()))
+
+MeshInvalidBearerEv = message(
+    'MeshInvalidBearerEv', MESH, defs.MESH_EV_INVALID_BEARER,
+    ('opcode', U8))
@@ -18,7 +18,10 @@ import struct
 from collections import namedtuple
 import logging
 
-HDR_LEN = 5
+HDR = struct.Struct('<BBBH')
+HDR_LEN = HDR.size
+
+Header = namedtuple('Header', 'svc_id op ctrl_index data_len')
 
 
 def parse_svc_gap(op, data_len, data):
@@ -37,30 +40,19 @@ def dec_hdr(binary):
     """
     logging.debug("%s, %r", dec_hdr.__name__, binary)
 
-    Header = namedtuple('Header', 'svc_id op ctrl_index data_len')
-
-    hdr = Header._make(struct.unpack("<BBBH", binary))
-
-    return hdr
+    return Header._make(HDR.unpack(binary))
 
 
 def dec_data(binary):
     logging.debug("%s, %r", dec_data.__name__, binary)
 
-    data_len = len(binary)
-    data = struct.unpack('<%ds' % data_len, binary)
-
-    return data
+    return (bytes(binary),)
 
 
 def enc_frame(svc_id, op, ctrl_index, data):
     logging.debug("%s, %r %r %r %r",
                   enc_frame.__name__, svc_id, op, ctrl_index, data)
 
-    str_data = bytearray(data)
-    int_len = len(str_data)
-    hex_len = struct.pack('h', int_len)
-    binary = struct.pack('<BBB2s%ds' % int_len, svc_id, op, ctrl_index, hex_len,
-                         str_data)
+    data = bytes(data)
 
-    return binary
+    return HDR.pack(svc_id, op, ctrl_index, len(data)) + data
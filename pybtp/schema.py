@@ -0,0 +1,370 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Declarative BTP message schema.
+
+A message is declared once as an ordered list of fields:
+
+    GapConnect = message('GapConnect', defs.BTP_SERVICE_ID_GAP,
+                         defs.GAP_CONNECT,
+                         ('address', ADDR), ('own_addr_type', U8, 0))
+
+The encoder and decoder of every message are generated from its
+declaration. Consecutive fixed size fields share one precompiled
+struct.Struct, variable length fields are sliced by length, and message
+objects use __slots__.
+"""
+
+import struct
+
+from .types import BTPError
+
+# Field kinds
+_FIXED = 0
+_DATA = 1
+_TAIL = 2
+_LEN = 3
+
+
+class FieldType:
+    """Type of a single message field"""
+
+    __slots__ = ('kind', 'fmt', 'enc', 'dec', 'ref', 'unit')
+
+    def __init__(self, kind, fmt=None, enc=None, dec=None, ref=None,
+                 unit=1):
+        self.kind = kind
+        self.fmt = fmt
+        self.enc = enc
+        self.dec = dec
+        self.ref = ref
+        # Bytes per unit of the length of a data field
+        self.unit = unit
+
+    def convert(self, enc=None, dec=None):
+        """Return copy of this type with value converters attached"""
+        return FieldType(self.kind, self.fmt, enc, dec, self.ref, self.unit)
+
+
+def fixed(fmt, enc=None, dec=None):
+    """Fixed size field packed with struct format code fmt"""
+    return FieldType(_FIXED, fmt, enc, dec)
+
+
+def length(fmt, field, unit=1):
+    """Length of variable length field declared later in the message.
+
+    The value is computed on encoding and consumed on decoding, so it
+    is not an attribute of the message. It counts units of unit bytes.
+    """
+    return FieldType(_LEN, fmt, ref=field, unit=unit)
+
+
+def _dec_addr(data):
+    # Import here, stack depends on pybtp
+    from stack.gap import BleAddress
+
+    return BleAddress(data[6:0:-1].hex(), data[0])
+
+
+U8 = fixed('B')
+U16 = fixed('H')
+U32 = fixed('I')
+
+# Address type followed by address in little endian order
+ADDR = fixed('7s', enc=bytes, dec=_dec_addr)
+
+
+def BYTES(size):
+    return fixed('%ds' % size)
+
+
+# Raw bytes of the length given by a preceding length() field
+RAW = FieldType(_DATA)
+# Remaining bytes of the frame
+TAIL = FieldType(_TAIL)
+
+
+def VAR8(dtype=RAW):
+    """Bytes prefixed with 8-bit length"""
+    return FieldType(_DATA, 'B', dtype.enc, dtype.dec)
+
+
+def VAR16(dtype=RAW):
+    """Bytes prefixed with 16-bit length"""
+    return FieldType(_DATA, 'H', dtype.enc, dtype.dec)
+
+
+def LIST8(dtype):
+    """List of fixed size values prefixed with 8-bit count"""
+    s = struct.Struct('<' + dtype.fmt)
+
+    def enc(values):
+        return b''.join(s.pack(value) for value in values)
+
+    def dec(data):
+        return [value for value, in s.iter_unpack(data)]
+
+    return FieldType(_DATA, 'B', enc, dec, unit=s.size)
+
+
+class Message:
+    """Base class of generated message classes"""
+
+    __slots__ = ()
+    _fields = ()
+    svc_id = None
+    op = None
+    min_len = 0
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % (name, getattr(self, name)) for name in self._fields))
+
+    @classmethod
+    def decode(cls, data, exact=False):
+        """Decode message from data
+
+        If exact is set the data must not contain trailing bytes.
+        """
+        msg, offset = cls.decode_from(data)
+        if exact and offset != len(data):
+            raise BTPError("Invalid data length")
+        return msg
+
+    @classmethod
+    def iter_decode(cls, data, count, offset=0):
+        """Lazily decode count consecutive messages starting at offset
+
+        Records are decoded in place, the data is never copied.
+        """
+        view = memoryview(data)
+        for _ in range(count):
+            msg, offset = cls.decode_from(view, offset)
+            yield msg
+
+
+def _expand(fields):
+    """Expand prefixed fields into length and data slots"""
+    slots = []
+    defaults = {}
+    lengths = set()
+
+    for field in fields:
+        name, ftype = field[:2]
+        if len(field) > 2:
+            defaults[name] = field[2]
+        elif defaults and ftype.kind != _LEN:
+            raise ValueError("%s: non-default field after default field" %
+                             name)
+
+        if ftype.kind == _LEN:
+            lengths.add(ftype.ref)
+            slots.append((None, ftype))
+        elif ftype.kind == _DATA and ftype.fmt:
+            lengths.add(name)
+            slots.append((None, length(ftype.fmt, name, ftype.unit)))
+            slots.append((name, FieldType(_DATA, None, ftype.enc, ftype.dec,
+                                          unit=ftype.unit)))
+        else:
+            if ftype.kind == _DATA and name not in lengths:
+                raise ValueError("%s: no length declared" % name)
+            slots.append((name, ftype))
+
+    return slots, defaults
+
+
+def _group(slots):
+    """Split slots into runs of fixed fields separated by data fields"""
+    groups = []
+    run = []
+
+    for name, ftype in slots:
+        if ftype.kind in (_FIXED, _LEN):
+            run.append((name, ftype))
+            continue
+
+        if run:
+            groups.append(run)
+            run = []
+        groups.append((name, ftype))
+
+    if run:
+        groups.append(run)
+
+    return groups
+
+
+def _gen_encode(groups, ns):
+    body = []
+    parts = []
+
+    for i, group in enumerate(groups):
+        if isinstance(group, tuple):
+            name, ftype = group
+            if ftype.enc:
+                ns['_enc_' + name] = ftype.enc
+                body.append("    _%s = _enc_%s(self.%s)" % (name, name, name))
+            else:
+                body.append("    _%s = self.%s" % (name, name))
+            parts.append("_%s" % name)
+            continue
+
+        ns['_s%d' % i] = struct.Struct('<' + ''.join(f.fmt for _, f in group))
+        args = []
+        for name, ftype in group:
+            if ftype.kind == _LEN and ftype.unit != 1:
+                args.append("len(_%s) // %d" % (ftype.ref, ftype.unit))
+            elif ftype.kind == _LEN:
+                args.append("len(_%s)" % ftype.ref)
+            elif ftype.enc:
+                ns['_enc_' + name] = ftype.enc
+                args.append("_enc_%s(self.%s)" % (name, name))
+            else:
+                args.append("self.%s" % name)
+        parts.append("_s%d.pack(%s)" % (i, ", ".join(args)))
+
+    # Data fields are evaluated before any fixed run that refers to them,
+    # a length or value too large for its field fails in pack
+    lines = ["def encode(self):", "    try:"]
+    lines += ["    " + line for line in body]
+    if not parts:
+        lines.append("        return b''")
+    elif len(parts) == 1:
+        lines.append("        return %s" % parts[0])
+    else:
+        lines.append("        return b''.join((%s,))" % ", ".join(parts))
+    lines.append("    except struct.error:")
+    lines.append("        raise BTPError('Field value out of range')")
+
+    return "\n".join(lines)
+
+
+def _gen_decode(groups, names, ns):
+    lines = ["def decode_from(cls, data, offset=0):",
+             "    try:"]
+
+    for i, group in enumerate(groups):
+        if isinstance(group, tuple):
+            name, ftype = group
+            if ftype.kind == _TAIL:
+                lines.append("        _%s = bytes(data[offset:])" % name)
+                lines.append("        offset = len(data)")
+            else:
+                if ftype.unit != 1:
+                    lines.append("        end = offset + _n_%s * %d" %
+                                 (name, ftype.unit))
+                else:
+                    lines.append("        end = offset + _n_%s" % name)
+                lines.append("        if end > len(data):")
+                lines.append("            raise BTPError("
+                             "'Invalid data length')")
+                lines.append("        _%s = bytes(data[offset:end])" % name)
+                lines.append("        offset = end")
+            if ftype.dec:
+                ns['_dec_' + name] = ftype.dec
+                lines.append("        _%s = _dec_%s(_%s)" % (name, name, name))
+            continue
+
+        s = struct.Struct('<' + ''.join(f.fmt for _, f in group))
+        ns['_s%d' % i] = s
+        targets = []
+        for name, ftype in group:
+            if ftype.kind == _LEN:
+                targets.append("_n_%s" % ftype.ref)
+            else:
+                targets.append("_%s" % name)
+        lines.append("        %s, = _s%d.unpack_from(data, offset)" %
+                     (", ".join(targets), i))
+        lines.append("        offset += %d" % s.size)
+        for name, ftype in group:
+            if ftype.kind != _LEN and ftype.dec:
+                ns['_dec_' + name] = ftype.dec
+                lines.append("        _%s = _dec_%s(_%s)" %
+                             (name, name, name))
+
+    if not groups:
+        lines.append("        pass")
+    lines.append("    except struct.error:")
+    lines.append("        raise BTPError('Invalid data length')")
+    lines.append("    msg = _new(cls)")
+    for name in names:
+        lines.append("    msg.%s = _%s" % (name, name))
+    lines.append("    return msg, offset")
+
+    return "\n".join(lines)
+
+
+def _gen_init(names, defaults):
+    args = []
+    for name in names:
+        if name in defaults:
+            args.append("%s=_default_%s" % (name, name))
+        else:
+            args.append(name)
+
+    lines = ["def __init__(self%s):" % "".join(", " + a for a in args)]
+    for name in names:
+        lines.append("    self.%s = %s" % (name, name))
+    if not names:
+        lines.append("    pass")
+
+    return "\n".join(lines)
+
+
+def message(name, svc_id, op, *fields, doc=None):
+    """Generate message class from field declarations
+
+    Each field is a (name, type) or (name, type, default) tuple, types are
+    the module level field types. length() entries take no name.
+    """
+    fields = [f if isinstance(f, tuple) else (None, f) for f in fields]
+    slots, defaults = _expand(fields)
+    names = tuple(n for n, _ in slots if n is not None)
+    groups = _group(slots)
+
+    ns = {'struct': struct, 'BTPError': BTPError, '_new': object.__new__}
+    for key, value in defaults.items():
+        ns['_default_' + key] = value
+
+    source = "\n\n".join((_gen_init(names, defaults),
+                          _gen_encode(groups, ns),
+                          _gen_decode(groups, names, ns)))
+    exec(compile(source, "<btp message %s>" % name, "exec"), ns)
+
+    attrs = {
+        '__slots__': names,
+        '__doc__': doc,
+        '_fields': names,
+        '_source': source,
+        'svc_id': svc_id,
+        'op': op,
+        'min_len': sum(struct.calcsize('<' + f.fmt) for _, f in slots
+                    if f.kind in (_FIXED, _LEN)),
+        '__init__': ns['__init__'],
+        'encode': ns['encode'],
+        'decode_from': classmethod(ns['decode_from']),
+    }
+
+    return type(name, (Message,), attrs)
@@ -16,6 +16,8 @@
 from pybtp import defs
 
 from binascii import unhexlify
+from functools import lru_cache
+import weakref
 
 gap_settings_btp2txt = {
     defs.GAP_SETTINGS_POWERED: "Powered",
@@ -67,6 +69,17 @@ class SynchError(Exception):
     """Exception raised if cannot synchronize"""
     pass
 
+
+class IUTLostError(Exception):
+    """Exception raised if the BTP transport of an IUT is lost
+
+    The IUT crashed, its socket was closed or the process bridging it
+    exited. Pending reads, event futures and waits fail with it at once
+    instead of running into their timeouts.
+    """
+    pass
+
+
 class AdType:
     flags = 0x01
     uuid16_some = 0x02
@@ -96,33 +109,149 @@ class AdDuration:
     forever = 0xFFFFFFFF
 
 
+class BleUUID:
+    """Bluetooth UUID
+
+    Immutable value backed by the 128-bit integer form of the UUID, so
+    16, 32 and 128-bit representations of the same UUID are one value.
+    Instances are interned, equal UUIDs are the same object.
+
+    BleUUID accepts a 4, 8 or 32 digit hex string (dashes and 0x prefix
+    allowed), the 128-bit integer value or another BleUUID. Only the 16
+    and 32-bit forms are placed in the Bluetooth base UUID. Use
+    BleUUID.from_bytes() for BTP little endian encoding. A BleUUID only
+    equals another BleUUID, parse strings before comparing them.
+    """
+
+    BASE = 0x0000000000001000800000805F9B34FB
+    _BASE_MASK = (1 << 96) - 1
+
+    __slots__ = ('value', '__weakref__')
+
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, uuid):
+        if isinstance(uuid, BleUUID):
+            return uuid
+        if isinstance(uuid, str):
+            return cls._from_str(uuid)
+
+        value = int(uuid)
+        if not 0 <= value < 1 << 128:
+            raise ValueError("Invalid UUID %r" % uuid)
+        return cls._intern(value)
+
+    @classmethod
+    def _intern(cls, value):
+        self = cls._interned.get(value)
+        if self is None:
+            self = object.__new__(cls)
+            object.__setattr__(self, 'value', value)
+            cls._interned[value] = self
+
+        return self
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _from_str(cls, uuid):
+        uuid = uuid.replace('-', '')
+        if uuid[:2] in ('0x', '0X'):
+            uuid = uuid[2:]
+        if len(uuid) not in (4, 8, 32):
+            raise ValueError("Invalid UUID %r" % uuid)
+
+        value = int(uuid, 16)
+        if len(uuid) != 32:
+            value = (value << 96) | cls.BASE
+        return cls._intern(value)
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def from_bytes(cls, data):
+        """UUID from 2, 4 or 16 bytes in little endian order"""
+        if len(data) not in (2, 4, 16):
+            raise ValueError("Invalid UUID length %d" % len(data))
+
+        value = int.from_bytes(data, 'little')
+        if len(data) != 16:
+            value = (value << 96) | cls.BASE
+        return cls._intern(value)
+
+    @property
+    def size(self):
+        """Shortest size of the UUID in bytes"""
+        if self.value & self._BASE_MASK != self.BASE:
+            return 16
+        if self.value >> 96 <= 0xffff:
+            return 2
+        return 4
+
+    def to_bytes(self):
+        """Shortest BTP (little endian) encoding of the UUID"""
+        size = self.size
+        if size == 16:
+            return self.value.to_bytes(16, 'little')
+        return (self.value >> 96).to_bytes(size, 'little')
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BleUUID is immutable")
+
+    def __reduce__(self):
+        return BleUUID, (self.value,)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, BleUUID):
+            return self.value == other.value
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __str__(self):
+        size = self.size
+        if size == 16:
+            return '%032X' % self.value
+        return '%0*X' % (size * 2, self.value >> 96)
+
+    def __repr__(self):
+        return "BleUUID('%s')" % self
+
+
 class UUID:
-    primary_svc = '2800'
-    secondary_svc = '2801'
-    include_svc = '2802'
-    chrc = '2803'
-    gap_svc = '1800'
-    gatt_svc = '1801'
-    CEP = '2900'
-    CUD = '2901'
-    CCC = '2902'
-    SCC = '2903'
-    CPF = '2904'
-    CAF = '2905'
-    device_name = '2A00'
-    appearance = '2A01'
-    service_changed = '2A05'
-    battery_level = '2A19'
-    date_of_birth = '2A85'
-    gender = '2A8C'
-    VND16_1 = 'AA50'
-    VND16_2 = 'AA51'
-    VND16_3 = 'AA52'
-    VND16_4 = 'AA53'
-    VND16_5 = 'AA54'
-    VND128_1 = 'F000BB5004514000B123456789ABCDEF'
-    VND128_2 = 'F000BB5104514000B123456789ABCDEF'
-    VND128_3 = 'F000BB5204514000B123456789ABCDEF'
+    primary_svc = BleUUID('2800')
+    secondary_svc = BleUUID('2801')
+    include_svc = BleUUID('2802')
+    chrc = BleUUID('2803')
+    gap_svc = BleUUID('1800')
+    gatt_svc = BleUUID('1801')
+    CEP = BleUUID('2900')
+    CUD = BleUUID('2901')
+    CCC = BleUUID('2902')
+    SCC = BleUUID('2903')
+    CPF = BleUUID('2904')
+    CAF = BleUUID('2905')
+    device_name = BleUUID('2A00')
+    appearance = BleUUID('2A01')
+    service_changed = BleUUID('2A05')
+    battery_level = BleUUID('2A19')
+    date_of_birth = BleUUID('2A85')
+    gender = BleUUID('2A8C')
+    VND16_1 = BleUUID('AA50')
+    VND16_2 = BleUUID('AA51')
+    VND16_3 = BleUUID('AA52')
+    VND16_4 = BleUUID('AA53')
+    VND16_5 = BleUUID('AA54')
+    VND128_1 = BleUUID('F000BB5004514000B123456789ABCDEF')
+    VND128_2 = BleUUID('F000BB5104514000B123456789ABCDEF')
+    VND128_3 = BleUUID('F000BB5204514000B123456789ABCDEF')
 
 
 def hdl_str(hdl):
@@ -139,23 +268,23 @@ def u16_hdl_uc_str(hdl):
 
 class PTS_DB:
     PTS_UUID_FMT = '0000{}8C26476F89A7A108033A69C7'
-    SVC = PTS_UUID_FMT.format('0001')
-    CHR_READ = PTS_UUID_FMT.format('0002')
-    CHR_WRITE = PTS_UUID_FMT.format('0003')
-    CHR_RELIABLE_WRITE = PTS_UUID_FMT.format('0004')
-    CHR_WRITE_NO_RSP = PTS_UUID_FMT.format('0005')
-    CHR_READ_WRITE = PTS_UUID_FMT.format('0006')
-    CHR_READ_WRITE_ENC = PTS_UUID_FMT.format('0007')
-    CHR_READ_WRITE_AUTHEN = PTS_UUID_FMT.format('0008')
-    DSC_READ = PTS_UUID_FMT.format('0009')
-    DSC_WRITE = PTS_UUID_FMT.format('000A')
-    DSC_READ_WRITE = PTS_UUID_FMT.format('000B')
-    CHR_NOTIFY = PTS_UUID_FMT.format('0025')
-    LONG_CHR_READ_WRITE = PTS_UUID_FMT.format('0015')
-    LONG_CHR_READ_WRITE_ALT = PTS_UUID_FMT.format('0016')
-    LONG_DSC_READ_WRITE = PTS_UUID_FMT.format('001B')
-    INC_SVC = '001E'
-    CHR_READ_WRITE_ALT = PTS_UUID_FMT.format('001F')
+    SVC = BleUUID(PTS_UUID_FMT.format('0001'))
+    CHR_READ = BleUUID(PTS_UUID_FMT.format('0002'))
+    CHR_WRITE = BleUUID(PTS_UUID_FMT.format('0003'))
+    CHR_RELIABLE_WRITE = BleUUID(PTS_UUID_FMT.format('0004'))
+    CHR_WRITE_NO_RSP = BleUUID(PTS_UUID_FMT.format('0005'))
+    CHR_READ_WRITE = BleUUID(PTS_UUID_FMT.format('0006'))
+    CHR_READ_WRITE_ENC = BleUUID(PTS_UUID_FMT.format('0007'))
+    CHR_READ_WRITE_AUTHEN = BleUUID(PTS_UUID_FMT.format('0008'))
+    DSC_READ = BleUUID(PTS_UUID_FMT.format('0009'))
+    DSC_WRITE = BleUUID(PTS_UUID_FMT.format('000A'))
+    DSC_READ_WRITE = BleUUID(PTS_UUID_FMT.format('000B'))
+    CHR_NOTIFY = BleUUID(PTS_UUID_FMT.format('0025'))
+    LONG_CHR_READ_WRITE = BleUUID(PTS_UUID_FMT.format('0015'))
+    LONG_CHR_READ_WRITE_ALT = BleUUID(PTS_UUID_FMT.format('0016'))
+    LONG_DSC_READ_WRITE = BleUUID(PTS_UUID_FMT.format('001B'))
+    INC_SVC = BleUUID('001E')
+    CHR_READ_WRITE_ALT = BleUUID(PTS_UUID_FMT.format('001F'))
 
     CHR_NO_PERM_ID = 0
     CHR_READ_ID = 1
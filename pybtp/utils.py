@@ -14,12 +14,87 @@
 # limitations under the License.
 #
 
-from concurrent.futures import wait
+import time
+from concurrent.futures import wait, FIRST_EXCEPTION
+
+from common import timeouts
+from pybtp.types import IUTLostError
+
+
+def futures_timeout(futures, timeout):
+    """timeout adapted to the operations the futures wait for
+
+    The longest timeout learned for the operations is taken. Futures
+    not waiting for a known operation keep timeout.
+    """
+    operations = [getattr(future, 'timeout_operation', None)
+                  for future in futures]
+    if not operations or None in operations:
+        return timeouts.get_timeout(None, None, timeout)
+
+    adapted = [timeouts.get_timeout(operation, iut_type, timeout)
+               for operation, iut_type in operations]
+    return None if None in adapted else max(adapted)
+
+
+def futures_start(futures):
+    """Monotonic time the waits of the futures started
+
+    Event latencies are learned from the time the listener was added, the
+    timeout applies from the same time. Futures not telling their start
+    are waited for from now.
+    """
+    starts = [getattr(future, 'timeout_start', None) for future in futures]
+    if not starts or None in starts:
+        return time.monotonic()
+    return min(starts)
 
 
 def wait_futures(futures, timeout=None):
-    _, notdone = wait(futures, timeout=timeout)
+    timeout = futures_timeout(futures, timeout)
+    deadline = None if timeout is None else \
+        futures_start(futures) + timeout
+    notdone = set(futures)
+
+    # A future failing on a lost IUT ends the wait for the others
+    while notdone:
+        remaining = None if deadline is None else \
+            max(0, deadline - time.monotonic())
+        done, notdone = wait(notdone, timeout=remaining,
+                             return_when=FIRST_EXCEPTION)
+        for future in done:
+            if isinstance(future.exception(), IUTLostError):
+                raise future.exception()
+
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
     if len(notdone) != 0:
         raise TimeoutError
 
     return notdone
+
+
+def payload_bytes(payload):
+    """Return payload as bytes
+
+    Payloads are kept as bytes, hex strings are still accepted while
+    callers move away from them.
+    """
+    if isinstance(payload, str):
+        return bytes.fromhex(payload)
+
+    return bytes(payload)
+
+
+def payload_hex(payload):
+    """Render payload as uppercase hex string for logs and reports"""
+    return payload_bytes(payload).hex().upper()
+
+
+def payload_eq(a, b):
+    """Compare payloads given as bytes, memoryview or hex strings"""
+    if a is None or b is None:
+        return a is b
+
+    return payload_bytes(a) == payload_bytes(b)
@@ -14,9 +14,10 @@
 # more details.
 #
 from threading import Lock, Event, Timer
-from time import sleep
+from time import monotonic, sleep
 
-from common.utils import raise_on_global_end
+from common import timeouts
+from common.utils import raise_on_global_end, raise_on_iut_lost
 
 
 class Property:
@@ -42,7 +43,7 @@ def timeout_cb(flag):
     flag.clear()
 
 
-def wait_for_queue_event(event_queue, test, timeout, remove):
+def wait_for_queue_event(event_queue, test, timeout, remove, iut_name=None):
     flag = Event()
     flag.set()
 
@@ -50,30 +51,39 @@ def wait_for_queue_event(event_queue, test, timeout, remove):
     t.name = f'QEventTimer{t.name}'
     t.start()
 
-    while flag.is_set():
-        raise_on_global_end()
+    # The timer is cancelled also when the wait fails
+    try:
+        while flag.is_set():
+            raise_on_global_end()
+            raise_on_iut_lost(iut_name)
 
-        for ev in event_queue:
-            if isinstance(ev, tuple):
-                result = test(*ev)
-            else:
-                result = test(ev)
+            for ev in event_queue:
+                if isinstance(ev, tuple):
+                    result = test(*ev)
+                else:
+                    result = test(ev)
 
-            if result:
-                t.cancel()
-                if ev and remove:
-                    event_queue.remove(ev)
+                if result:
+                    if ev and remove:
+                        event_queue.remove(ev)
 
-                return ev
+                    return ev
 
-            # TODO: Use wait() and notify() from threading.Condition
-            #  instead of sleep()
-            sleep(0.5)
+                # TODO: Use wait() and notify() from threading.Condition
+                #  instead of sleep()
+                sleep(0.5)
+    finally:
+        t.cancel()
 
     return None
 
 
-def wait_for_event(timeout, test, *args, **kwargs):
+def wait_for_event(timeout, test, *args, iut_name=None, **kwargs):
+    """Poll test(*args, **kwargs) until it returns a true value
+
+    Returns False after timeout seconds. Fails at once with IUTLostError
+    once the IUT iut_name is lost.
+    """
     if test(*args, **kwargs):
         return True
 
@@ -84,12 +94,31 @@ def wait_for_event(timeout, test, *args, **kwargs):
     t.name = f'EventTimer{t.name}'
     t.start()
 
-    while flag.is_set():
-        raise_on_global_end()
+    # The timer is cancelled also when the wait fails
+    try:
+        while flag.is_set():
+            raise_on_global_end()
+            raise_on_iut_lost(iut_name)
 
-        result = test(*args, **kwargs)
-        if result:
-            t.cancel()
-            return result
+            result = test(*args, **kwargs)
+            if result:
+                return result
+    finally:
+        t.cancel()
 
     return False
+
+
+def wait_for_operation(operation, iut_type, timeout, test, *args,
+                       iut_name=None, **kwargs):
+    """wait_for_event with the timeout learned for operation on iut_type
+
+    The time the wait took is recorded when test becomes true.
+    """
+    start = monotonic()
+    result = wait_for_event(timeouts.get_timeout(operation, iut_type,
+                                                 timeout),
+                            test, *args, iut_name=iut_name, **kwargs)
+    if result:
+        timeouts.observe(operation, iut_type, monotonic() - start)
+    return result
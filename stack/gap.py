@@ -19,6 +19,7 @@ from asyncio import Event
 from collections import namedtuple
 from threading import Timer
 
+from common.utils import raise_on_iut_lost
 from pybtp.types import addr2btp_ba
 from stack.property import Property, timeout_cb
 
@@ -62,7 +63,7 @@ class BleAddress:
 
         data_ba.extend([self.addr_type])
         data_ba.extend(bd_addr_ba)
-        return data_ba
+        return bytes(data_ba)
 
 
 class ConnParams:
@@ -78,7 +79,9 @@ class Connection:
 
 
 class Gap:
-    def __init__(self):
+    def __init__(self, iut_name=None):
+        # Name the IUT is reported lost under, see set_iut_lost
+        self.iut_name = iut_name
         self.name = None
         self.name_short = None
 
@@ -133,10 +136,14 @@ class Gap:
         t = Timer(timeout, timeout_cb, [flag])
         t.start()
 
-        while flag.is_set():
-            if self.is_connected(addr):
-                t.cancel()
-                return True
+        # The timer is cancelled also when the IUT is lost
+        try:
+            while flag.is_set():
+                if self.is_connected(addr):
+                    return True
+                raise_on_iut_lost(self.iut_name)
+        finally:
+            t.cancel()
 
         return False
 
@@ -150,10 +157,14 @@ class Gap:
         t = Timer(timeout, timeout_cb, [flag])
         t.start()
 
-        while flag.is_set():
-            if not self.is_connected(addr):
-                t.cancel()
-                return True
+        # The timer is cancelled also when the IUT is lost
+        try:
+            while flag.is_set():
+                if not self.is_connected(addr):
+                    return True
+                raise_on_iut_lost(self.iut_name)
+        finally:
+            t.cancel()
 
         return False
 
@@ -16,6 +16,8 @@
 
 from asyncio import Event
 
+from pybtp.types import BleUUID
+
 
 class Gatt:
     def __init__(self):
@@ -98,7 +100,7 @@ class GattAttribute:
     def __init__(self, handle, perm, uuid, att_rsp):
         self.handle = handle
         self.perm = perm
-        self.uuid = uuid
+        self.uuid = BleUUID(uuid) if uuid is not None else None
         self.att_read_rsp = att_rsp
 
     def __repr__(self):
@@ -220,6 +222,7 @@ class GattDB:
             return None
 
     def find_svc_by_uuid(self, uuid):
+        uuid = BleUUID(uuid)
         for hdl, attr in sorted(self.db.items()):
             if not isinstance(attr, GattService):
                 continue
@@ -230,6 +233,7 @@ class GattDB:
         return None
 
     def find_inc_svc_by_uuid(self, uuid):
+        uuid = BleUUID(uuid)
         for hdl, attr in sorted(self.db.items()):
             if not isinstance(attr, GattServiceIncluded):
                 continue
@@ -240,6 +244,7 @@ class GattDB:
         return None
 
     def find_chr_by_uuid(self, uuid):
+        uuid = BleUUID(uuid)
         for hdl, attr in sorted(self.db.items()):
             if not isinstance(attr, GattCharacteristic):
                 continue
@@ -250,6 +255,7 @@ class GattDB:
         return None
 
     def find_dsc_by_uuid(self, uuid):
+        uuid = BleUUID(uuid)
         for hdl, attr in sorted(self.db.items()):
             if not isinstance(attr, GattCharacteristicDescriptor):
                 continue
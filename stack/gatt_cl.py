@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from stack.common import wait_for_event
+from stack.common import wait_for_operation
 from stack.gatt import GattDB
 
 
@@ -28,7 +28,10 @@ def is_procedure_done(list, cnt):
 
 
 class GattCl:
-    def __init__(self):
+    def __init__(self, iut_type=None, iut_name=None):
+        self.iut_type = iut_type
+        # Name the IUT is reported lost under, see set_iut_lost
+        self.iut_name = iut_name
         self.db = GattDB()
         self.verify_values = []
         self.prim_svcs_cnt = None
@@ -42,12 +45,17 @@ class GattCl:
         self.notifications = []
         self.write_status = None
         self.event_to_await = None
+        # Timeout operation of the procedure event_to_await completes
+        self.operation_to_await = None
 
-    def set_event_to_await(self, event):
+    def set_event_to_await(self, event, operation):
         self.event_to_await = event
+        self.operation_to_await = operation
 
     def wait_for_rsp_event(self, timeout=30):
-        return wait_for_event(timeout, self.event_to_await)
+        return wait_for_operation(self.operation_to_await, self.iut_type,
+                                  timeout, self.event_to_await,
+                                  iut_name=self.iut_name)
 
     def is_prim_disc_complete(self, *args):
         return is_procedure_done(self.prim_svcs, self.prim_svcs_cnt)
@@ -56,34 +64,46 @@ class GattCl:
         return is_procedure_done(self.incl_svcs, self.incl_svcs_cnt)
 
     def wait_for_prim_svcs(self, timeout=20):
-        return wait_for_event(timeout, self.is_prim_disc_complete)
+        return wait_for_operation('gatt_cl/prim_svcs', self.iut_type,
+                                  timeout, self.is_prim_disc_complete,
+                                  iut_name=self.iut_name)
 
     def wait_for_incl_svcs(self, timeout=30):
-        return wait_for_event(timeout, self.is_incl_disc_complete)
+        return wait_for_operation('gatt_cl/incl_svcs', self.iut_type,
+                                  timeout, self.is_incl_disc_complete,
+                                  iut_name=self.iut_name)
 
     def is_chrcs_disc_complete(self, *args):
         return is_procedure_done(self.chrcs, self.chrcs_cnt)
 
     def wait_for_chrcs(self, timeout=30):
-        return wait_for_event(timeout, self.is_chrcs_disc_complete)
+        return wait_for_operation('gatt_cl/chrcs', self.iut_type,
+                                  timeout, self.is_chrcs_disc_complete,
+                                  iut_name=self.iut_name)
 
     def is_dscs_disc_complete(self, *args):
         return is_procedure_done(self.dscs, self.dscs_cnt)
 
     def wait_for_descs(self, timeout=30):
-        return wait_for_event(timeout, self.is_dscs_disc_complete)
+        return wait_for_operation('gatt_cl/descs', self.iut_type,
+                                  timeout, self.is_dscs_disc_complete,
+                                  iut_name=self.iut_name)
 
     def is_read_complete(self, *args):
         return self.verify_values != []
 
     def wait_for_read(self, timeout=30):
-        return wait_for_event(timeout, self.is_read_complete)
+        return wait_for_operation('gatt_cl/read', self.iut_type,
+                                  timeout, self.is_read_complete,
+                                  iut_name=self.iut_name)
 
     def is_write_completed(self, *args):
         return self.write_status is not None
 
     def wait_for_write_rsp(self, timeout=30):
-        return wait_for_event(timeout, self.is_write_completed)
+        return wait_for_operation('gatt_cl/write_rsp', self.iut_type,
+                                  timeout, self.is_write_completed,
+                                  iut_name=self.iut_name)
 
     def is_notification_rxed(self, expected_count):
         if expected_count > 0:
@@ -91,5 +111,6 @@ class GattCl:
         return len(self.notifications) > 0
 
     def wait_for_notifications(self, timeout=30, expected_count=0):
-        return wait_for_event(timeout,
-                              self.is_notification_rxed, expected_count)
+        return wait_for_operation('gatt_cl/notifications', self.iut_type,
+                                  timeout, self.is_notification_rxed,
+                                  expected_count, iut_name=self.iut_name)
@@ -14,10 +14,72 @@
 # limitations under the License.
 #
 
+from threading import Lock
+
+from stack.common import wait_for_event, wait_for_operation
+
+# Received bytes buffered per channel until read, older bytes are dropped
+RX_BUFFER_SIZE = 64 * 1024
+
+
+class L2CAPChannel:
+    def __init__(self, chan_id, psm=None, addr=None,
+                 rx_buffer_size=RX_BUFFER_SIZE, iut_name=None):
+        self.chan_id = chan_id
+        self.iut_name = iut_name
+        self.psm = psm
+        self.addr = addr
+        self._lock = Lock()
+        self._rx_buffer = bytearray()
+        self.rx_buffer_size = rx_buffer_size
+        self.rx_count = 0
+        self.rx_bytes = 0
+        # Bytes dropped from the full buffer before they were read
+        self.rx_dropped = 0
+
+    def __repr__(self):
+        return "%s(chan_id=%r, psm=%r, addr=%r)" % (
+            type(self).__name__, self.chan_id, self.psm, self.addr)
+
+    def data_received(self, data):
+        with self._lock:
+            self._rx_buffer += data
+            self.rx_count += 1
+            self.rx_bytes += len(data)
+
+            overflow = len(self._rx_buffer) - self.rx_buffer_size
+            if overflow > 0:
+                del self._rx_buffer[:overflow]
+                self.rx_dropped += overflow
+
+    def rx_len(self):
+        with self._lock:
+            return len(self._rx_buffer)
+
+    def read(self, size=None):
+        """Remove and return up to size buffered bytes, all if size is None"""
+        with self._lock:
+            if size is None:
+                size = len(self._rx_buffer)
+            data = bytes(self._rx_buffer[:size])
+            del self._rx_buffer[:size]
+            return data
+
+    def wait_for_data(self, size, timeout=30):
+        if size > self.rx_buffer_size:
+            raise ValueError("%d bytes do not fit the %d bytes RX buffer" %
+                             (size, self.rx_buffer_size))
+        return wait_for_event(timeout, lambda: self.rx_len() >= size,
+                              iut_name=self.iut_name)
+
 
 class L2CAP:
-    def __init__(self):
-        self.channels = []
+    def __init__(self, iut_type=None, iut_name=None):
+        self.iut_type = iut_type
+        # Name the IUT is reported lost under, see set_iut_lost
+        self.iut_name = iut_name
+        self._lock = Lock()
+        self.channels = {}
         self.verify_values = []
 
     def add_verify_values(self, val):
@@ -25,3 +87,47 @@ class L2CAP:
 
     def clear_verify_values(self):
         self.verify_values.clear()
+
+    def add_channel(self, chan_id, psm=None, addr=None):
+        with self._lock:
+            chan = self.channels.get(chan_id)
+            if chan is None:
+                chan = L2CAPChannel(chan_id, psm, addr,
+                                    iut_name=self.iut_name)
+                self.channels[chan_id] = chan
+            else:
+                # Connect response and connected event both add the channel
+                chan.psm = chan.psm if psm is None else psm
+                chan.addr = chan.addr if addr is None else addr
+            return chan
+
+    def remove_channel(self, chan_id):
+        with self._lock:
+            return self.channels.pop(chan_id, None)
+
+    def get_channel(self, chan_id):
+        with self._lock:
+            return self.channels.get(chan_id)
+
+    def data_received(self, chan_id, data):
+        chan = self.get_channel(chan_id)
+        if chan is None:
+            chan = self.add_channel(chan_id)
+        chan.data_received(data)
+
+    def is_connected(self, chan_id=None):
+        with self._lock:
+            if chan_id is None:
+                return len(self.channels) > 0
+            return chan_id in self.channels
+
+    def wait_for_channel(self, chan_id=None, timeout=10):
+        return wait_for_operation('l2cap/channel', self.iut_type, timeout,
+                                  self.is_connected, chan_id,
+                                  iut_name=self.iut_name)
+
+    def wait_for_disconnection(self, chan_id, timeout=10):
+        return wait_for_operation('l2cap/disconnection', self.iut_type,
+                                  timeout,
+                                  lambda: not self.is_connected(chan_id),
+                                  iut_name=self.iut_name)
@@ -14,7 +14,6 @@
 #
 from threading import Lock, Event, Timer
 
-from pybtp.btp import GATT_CL
 from stack.gap import Gap, BleAddress
 from stack.gatt import Gatt
 from stack.l2cap import L2CAP
@@ -24,7 +23,12 @@ from stack.gatt_cl import GattCl
 STACK = None
 
 class Stack:
-    def __init__(self):
+    def __init__(self, iut_type=None, name=None):
+        # Timeouts of the stack waits are learned per IUT type
+        self.iut_type = iut_type
+        # Name of the BTP worker the IUT is reported lost under, the stack
+        # waits only fail for their own IUT
+        self.name = name
         self.supported_svcs = 0
         self._pairing_consent_cb = None
         self._passkey_confirm_cb = None
@@ -35,16 +39,16 @@ class Stack:
         self.gatt_cl = None
 
     def gap_init(self):
-        self.gap = Gap()
+        self.gap = Gap(self.name)
 
     def gatt_init(self):
         self.gatt = Gatt()
 
     def l2cap_init(self):
-        self.l2cap = L2CAP()
+        self.l2cap = L2CAP(self.iut_type, self.name)
 
     def gatt_cl_init(self):
-        self.gatt_cl = GattCl()
+        self.gatt_cl = GattCl(self.iut_type, self.name)
 
     def mesh_init(self, uuid, oob, output_size, output_actions, input_size,
                   input_actions, crpl_size):
@@ -76,7 +80,7 @@ class Stack:
                            self.mesh.crpl_size)
 
         if self.l2cap:
-            self.l2cap = L2CAP()
+            self.l2cap = L2CAP(self.iut_type, self.name)
 
         if self.gatt:
             self.gatt = Gatt()
@@ -14,11 +14,30 @@
 # limitations under the License.
 #
 
+import contextlib
+import functools
+import time
 import unittest
 import json
 
+from common import profiling, timeouts, tracing
+from common.results import test_name
+from testcases import fixtures
+
+TEST_CONFIG = "test_config.json"
+
+
+@functools.lru_cache(maxsize=None)
+def load_test_config():
+    """Parsed test_config.json, read once per process"""
+    with open(TEST_CONFIG, "r") as read_file:
+        return json.load(read_file)
+
 
 class BTPTestCase(unittest.TestCase):
+    # Prefix of the methods collected by init_testcases
+    test_prefix = 'test'
+
     def __init__(self, testname, iut1, iut2):
         super(__class__, self).__init__(testname)
 
@@ -30,32 +49,161 @@ class BTPTestCase(unittest.TestCase):
 
         self.iut1 = iut1
         self.iut2 = iut2
+        # Phase name -> seconds spent in it by the last run of the test
+        self.phases = {}
+        # Role -> BTP response latency stats of the last run of the test
+        self.btp_latency = {}
+        # IUT stalls detected by the watchdogs during the last run
+        self.stalls = []
+        # IUT type -> operation -> latencies of the waits of the last run
+        self.wait_latency = {}
+
+        # Mark the test skipped while the suite is built, unittest then
+        # skips it without running setUp, which resets the IUTs
+        reason = self.skip_reason(testname)
+        if reason is not None:
+            setattr(self, testname,
+                    unittest.skip(reason)(getattr(self, testname)))
+        elif fixtures.fixture_key(self) is not None:
+            setattr(self, testname,
+                    self._track_failure(getattr(self, testname)))
 
     @classmethod
     def init_testcases(cls, iut1, iut2):
         testcases = []
         ldr = unittest.TestLoader()
+        ldr.testMethodPrefix = cls.test_prefix
         for testname in ldr.getTestCaseNames(cls):
             testcases.append(cls(testname, iut1, iut2))
         return testcases
 
+    def trace_iuts(self):
+        """IUTs whose trace tracks get the test and phase spans"""
+        return [self.iut1] + list(getattr(self, 'peripherals', [self.iut2]))
+
+    def run(self, result=None):
+        name = test_name(self)
+        profiler = profiling.PROFILER
+        if profiler is not None:
+            profiler.start()
+
+        try:
+            with tracing.span(name, self.trace_iuts(), cat='test'):
+                return super(__class__, self).run(result)
+        finally:
+            if tracing.TRACER is not None:
+                tracing.TRACER.write(name)
+            if profiler is not None:
+                profiler.stop(name)
+
+    # unittest hooks, traced as the setUp, body and tearDown phases
+    def _callSetUp(self):
+        with tracing.span('setUp', self.trace_iuts(), cat='phase'):
+            super(__class__, self)._callSetUp()
+
+    def _callTestMethod(self, method):
+        with tracing.span('body', self.trace_iuts(), cat='phase'):
+            super(__class__, self)._callTestMethod(method)
+
+    def _callTearDown(self):
+        with tracing.span('tearDown', self.trace_iuts(), cat='phase'):
+            super(__class__, self)._callTearDown()
+
+    def _track_failure(self, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            except unittest.SkipTest:
+                raise
+            except BaseException:
+                # State is unknown, the next test must reset the IUTs
+                self.fixture_dirty = True
+                raise
+        return wrapper
+
     def setUp(self):
-        self.iut1.wait_iut_ready_event()
-        self.iut2.wait_iut_ready_event()
+        self.phases = {}
+        self.btp_latency = {}
+        self.stalls = []
+        self.wait_latency = {}
+        self.fixture_dirty = False
+        self.fixture_reused = self.reuse_fixture()
+        if self.fixture_reused:
+            return
+
+        # Usually reset already, from the tearDown of the previous test
+        with self.phase('reset'):
+            fixtures.wait_reset(self.iut1, self.iut2)
 
     def tearDown(self):
-        self.iut1.stop()
-        self.iut2.stop()
+        self.collect_btp_latency()
+        if self.keep_fixture():
+            return
+
+        fixtures.drop_fixtures(self.iut1, self.iut2)
+        # The next test gets reset IUTs while this one is reported
+        fixtures.start_reset(self.iut1, self.iut2)
+
+    def collect_btp_latency(self):
+        """Take the response latencies of the commands sent by the test,
+        the latencies of its waits and the stalls of the IUTs
+        """
+        self.wait_latency = timeouts.take_observed()
+        for role, iut in (('central', self.iut1), ('peripheral', self.iut2)):
+            if iut.btp_worker is not None:
+                self.btp_latency[role] = iut.btp_worker.latency_stats(
+                    reset=True)
+            if iut.watchdog is not None:
+                self.stalls += iut.watchdog.take_stalls()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the time spent in the block to phase name of the test"""
+        start = time.monotonic()
+        try:
+            with tracing.span(name, self.trace_iuts(), cat='phase'):
+                yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + \
+                time.monotonic() - start
+
+    def _matching_fixture(self):
+        key = fixtures.fixture_key(self)
+        fixture = fixtures.get_fixture(self.iut1, self.iut2)
+        if key is None or fixture is None or fixture.key != key:
+            return None
+        return fixture
+
+    def reuse_fixture(self):
+        """Take over the connection left by the previous test if it fits"""
+        fixture = self._matching_fixture()
+        if fixture is not None and fixture.is_clean():
+            fixture.uses += 1
+            return True
+
+        # The IUTs are reset, a connection held for them is lost
+        fixtures.drop_fixtures(self.iut1, self.iut2)
+        return False
+
+    def keep_fixture(self):
+        """Whether the connection can be left open for the next test"""
+        fixture = self._matching_fixture()
+        return fixture is not None and not self.fixture_dirty and \
+            fixture.is_clean()
+
+    def skip_roles(self):
+        """IUTs and the test_config.json skip list of their role"""
+        return [(self.iut1, 'skipped_central'),
+                (self.iut2, 'skipped_peripheral')]
 
-    def verify_skipped(self, testname):
-        if not hasattr(self, 'test_config'):
-            with open("test_config.json", "r") as read_file:
-                self.test_config = json.load(read_file)
+    def skip_reason(self, testname):
+        """Reason to skip testname on these IUTs, None if it runs"""
+        test_config = load_test_config()
 
-        if testname in self.test_config.get(self.iut1.get_type()).get('skipped_central'):
-            raise unittest.SkipTest(
-                self.test_config.get(self.iut1.get_type()).get('skipped_central').get(testname))
+        for iut, role in self.skip_roles():
+            skipped = test_config.get(iut.get_type()).get(role)
+            if testname in skipped:
+                return skipped.get(testname) or "Skipped in " + TEST_CONFIG
 
-        if testname in self.test_config.get(self.iut2.get_type()).get('skipped_peripheral'):
-            raise unittest.SkipTest(
-                self.test_config.get(self.iut2.get_type()).get('skipped_peripheral').get(testname))
+        return None
@@ -0,0 +1,267 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import time
+
+from pybtp import btp, defs
+from pybtp.types import AdType, IOCap
+from testcases.GapTestCase import GapTestCase
+from testcases.benchmark import EventTimer, load_benchmark_config, \
+    summarize, report_result, build_results, percentile
+from testcases.utils import find_adv_by_uuid, verify_address, \
+    connection_procedure, disconnection_procedure, EV_TIMEOUT
+
+GAP_EVENTS = (defs.GAP_EV_DEVICE_FOUND, defs.GAP_EV_DEVICE_CONNECTED,
+              defs.GAP_EV_DEVICE_DISCONNECTED)
+
+
+class ConnectionProfile:
+    """Phase durations of repeated connection cycles"""
+
+    def __init__(self, params):
+        self.params = params
+        self.adv_report = []
+        self.connect = []
+        self.connect_peripheral = []
+        self.disconnect = []
+        self.disconnect_peripheral = []
+        self.adv_timeouts = 0
+
+    def report(self):
+        report = dict(self.params)
+        report.update({
+            'cycles': len(self.disconnect),
+            'adv_timeouts': self.adv_timeouts,
+            'time_to_first_adv_report': summarize(self.adv_report),
+            'connect': summarize(self.connect),
+            'connect_peripheral': summarize(self.connect_peripheral),
+            'disconnect': summarize(self.disconnect),
+            'disconnect_peripheral': summarize(self.disconnect_peripheral),
+        })
+        return report
+
+
+class PairingProfile:
+    """Pairing durations of one IO capability combination"""
+
+    def __init__(self, combo):
+        self.combo = combo
+        self.pair = []
+        self.pair_peripheral = []
+        self.sec_levels = set()
+
+    def report(self):
+        return {
+            'combo': self.combo['name'],
+            'central_io_cap': self.combo['central'],
+            'peripheral_io_cap': self.combo['peripheral'],
+            'sec_levels': sorted(self.sec_levels),
+            'pair': summarize(self.pair),
+            'pair_peripheral': summarize(self.pair_peripheral),
+        }
+
+
+class GapBenchmarkTestCase(GapTestCase):
+    """Connection establishment latency profiling
+
+    Repeats advertise, device found, connect and disconnect on one IUT
+    pair and reports the phase durations. Phases are timed from the host
+    issuing the command to the BTP event reaching the event handler.
+    Parameters are read from benchmark_config.json.
+    """
+    test_prefix = 'bench'
+
+    def __init__(self, testname, iut1, iut2):
+        super(__class__, self).__init__(testname, iut1, iut2)
+        self.config = load_benchmark_config('gap_connect')
+        self.pair_config = load_benchmark_config('gap_pair')
+
+    def add_timers(self, iut):
+        timers = {}
+        for op in GAP_EVENTS:
+            timers[op] = EventTimer(iut)
+            iut.event_handler.add_monitor(defs.BTP_SERVICE_ID_GAP, op,
+                                          timers[op])
+        return timers
+
+    def remove_timers(self, iut, timers):
+        for op, timer in timers.items():
+            iut.event_handler.remove_monitor(defs.BTP_SERVICE_ID_GAP, op,
+                                             timer)
+
+    def connection_cycle(self, profile, central_timers, peripheral_timers,
+                         params):
+        found_timer = central_timers[defs.GAP_EV_DEVICE_FOUND]
+
+        uuid = os.urandom(2)
+        found_timer.arm(lambda args: find_adv_by_uuid(
+            args, btp.btp2uuid(len(uuid), uuid)))
+
+        btp.gap_start_discov(self.iut1, type=params['scan_type'],
+                             mode=params['scan_mode'])
+        adv_start = time.monotonic()
+        btp.gap_adv_ind_on(self.iut2, ad=[(AdType.uuid16_some, uuid)],
+                           own_addr_type=params['own_addr_type'])
+        try:
+            found = found_timer.wait(EV_TIMEOUT)
+        except TimeoutError:
+            profile.adv_timeouts += 1
+            btp.gap_stop_discov(self.iut1)
+            btp.gap_adv_off(self.iut2)
+            return
+
+        btp.gap_stop_discov(self.iut1)
+        profile.adv_report.append(found - adv_start)
+
+        addr = found_timer.result.addr
+        self.iut2.stack.gap.iut_addr_set(addr)
+
+        central_timers[defs.GAP_EV_DEVICE_CONNECTED].arm(
+            lambda args: verify_address(args, addr))
+        peripheral_timers[defs.GAP_EV_DEVICE_CONNECTED].arm()
+        conn_start = time.monotonic()
+        btp.gap_conn(self.iut1, addr)
+        profile.connect.append(
+            central_timers[defs.GAP_EV_DEVICE_CONNECTED].wait(EV_TIMEOUT) -
+            conn_start)
+        profile.connect_peripheral.append(
+            peripheral_timers[defs.GAP_EV_DEVICE_CONNECTED].wait(EV_TIMEOUT) -
+            conn_start)
+
+        # The controller stops connectable advertising on connection
+        self.iut2.stack.gap.current_settings_clear("Advertising")
+
+        central_timers[defs.GAP_EV_DEVICE_DISCONNECTED].arm(
+            lambda args: verify_address(args, addr))
+        peripheral_timers[defs.GAP_EV_DEVICE_DISCONNECTED].arm()
+        disconn_start = time.monotonic()
+        btp.gap_disconn(self.iut1, addr)
+        profile.disconnect.append(
+            central_timers[defs.GAP_EV_DEVICE_DISCONNECTED].wait(EV_TIMEOUT) -
+            disconn_start)
+        profile.disconnect_peripheral.append(
+            peripheral_timers[
+                defs.GAP_EV_DEVICE_DISCONNECTED].wait(EV_TIMEOUT) -
+            disconn_start)
+
+    def run_profile(self, params):
+        profile = ConnectionProfile(params)
+        central = self.add_timers(self.iut1)
+        peripheral = self.add_timers(self.iut2)
+
+        try:
+            for _ in range(self.config['cycles']):
+                self.connection_cycle(profile, central, peripheral, params)
+        finally:
+            self.remove_timers(self.iut1, central)
+            self.remove_timers(self.iut2, peripheral)
+
+        report = profile.report()
+        title = "%s %s" % (self._testMethodName, " ".join(
+            "%s=%s" % item for item in params.items()))
+        report_result(self, title, report)
+        return report
+
+    def bench_GAP_CONN_PROF_1(self):
+        """
+        Profile time to first advertising report, connect latency and
+        disconnect latency over many connection cycles, for every
+        configured set of advertising and scan parameters.
+        """
+        btp.gap_set_conn(self.iut2)
+        btp.gap_set_gendiscov(self.iut2)
+
+        for params in self.config['params']:
+            with self.subTest(**params):
+                report = self.run_profile(params)
+                self.assertLessEqual(report['adv_timeouts'],
+                                     self.config.get('max_adv_timeouts', 0))
+
+    def pairing_cycle(self, profile, central_timer, peripheral_timer):
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        central_addr = self.iut1.stack.gap.iut_addr_get()
+        peripheral_addr = self.iut2.stack.gap.iut_addr_get()
+
+        # Passkey of the previous cycle must not be entered
+        self.iut2.stack.gap.passkey.data = None
+
+        central_timer.arm(lambda args: verify_address(args, peripheral_addr))
+        peripheral_timer.arm(lambda args: verify_address(args, central_addr))
+        pair_start = time.monotonic()
+        btp.gap_pair(self.iut1, peripheral_addr)
+        profile.pair.append(central_timer.wait(EV_TIMEOUT) - pair_start)
+        profile.pair_peripheral.append(
+            peripheral_timer.wait(EV_TIMEOUT) - pair_start)
+        profile.sec_levels.add(central_timer.result[1])
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        # The controller stopped connectable advertising on connection
+        self.iut2.stack.gap.current_settings_clear("Advertising")
+
+        btp.gap_unpair(self.iut1, peripheral_addr)
+        btp.gap_unpair(self.iut2, central_addr)
+
+    def run_pairing(self, combo):
+        profile = PairingProfile(combo)
+        svc_id, op = defs.BTP_SERVICE_ID_GAP, defs.GAP_EV_SEC_LEVEL_CHANGED
+        central_timer = EventTimer(self.iut1)
+        peripheral_timer = EventTimer(self.iut2)
+
+        btp.gap_set_io_cap(self.iut1, getattr(IOCap, combo['central']))
+        btp.gap_set_io_cap(self.iut2, getattr(IOCap, combo['peripheral']))
+
+        for iut in (self.iut1, self.iut2):
+            btp.gap_auto_passkey_confirm(iut)
+        btp.gap_auto_passkey_entry(self.iut1, self.iut2.stack.gap.get_passkey)
+        btp.gap_auto_passkey_entry(self.iut2, self.iut1.stack.gap.get_passkey)
+
+        self.iut1.event_handler.add_monitor(svc_id, op, central_timer)
+        self.iut2.event_handler.add_monitor(svc_id, op, peripheral_timer)
+        try:
+            for _ in range(self.pair_config['cycles']):
+                self.pairing_cycle(profile, central_timer, peripheral_timer)
+        finally:
+            self.iut1.event_handler.remove_monitor(svc_id, op, central_timer)
+            self.iut2.event_handler.remove_monitor(svc_id, op,
+                                                   peripheral_timer)
+            for iut in (self.iut1, self.iut2):
+                iut.event_handler.clear_responder(
+                    svc_id, defs.GAP_EV_PASSKEY_CONFIRM_REQ)
+                iut.event_handler.clear_responder(
+                    svc_id, defs.GAP_EV_PASSKEY_ENTRY_REQ)
+
+        report = profile.report()
+        title = "%s %s" % (self._testMethodName, combo['name'])
+        runs = build_results(self, title) + [report]
+        report['build_runs'] = len(runs)
+        report['build_pair_p50_ms'] = percentile(
+            [run['pair']['p50_ms'] for run in runs
+             if run['pair']['p50_ms'] is not None], 50)
+
+        report_result(self, title, report)
+        return report
+
+    def bench_GAP_CONN_PAIR_PROF_1(self):
+        """
+        Profile pairing from gap_pair to the security level change on both
+        IUTs over many cycles, for every configured IO capability
+        combination. Passkey requests are answered by event responders.
+        """
+        for combo in self.pair_config['combos']:
+            with self.subTest(combo=combo['name']):
+                report = self.run_pairing(combo)
+                self.assertEqual(report['sec_levels'], [combo['sec_level']])
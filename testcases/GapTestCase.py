@@ -15,7 +15,6 @@
 #
 
 import os
-import sys
 
 from pybtp import btp
 from pybtp.types import AdType, IOCap
@@ -32,8 +31,9 @@ class GapTestCase(BTPTestCase):
 
     def setUp(self):
         super(__class__, self).setUp()
-        preconditions(self.iut1)
-        preconditions(self.iut2)
+        with self.phase('preconditions'):
+            preconditions(self.iut1)
+            preconditions(self.iut2)
 
     def tearDown(self):
         super(__class__, self).tearDown()
@@ -47,8 +47,6 @@ class GapTestCase(BTPTestCase):
         The IUT1 is operating in the Peripheral role.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         btp.gap_set_conn(self.iut2)
         btp.gap_set_gendiscov(self.iut2)
 
@@ -75,8 +73,6 @@ class GapTestCase(BTPTestCase):
         The IUT1 is operating in the Central role.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
         disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -88,8 +84,6 @@ class GapTestCase(BTPTestCase):
         The IUT1 is operating in the Peripheral role.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut2, peripheral=self.iut1)
 
         iut_addr = self.iut1.stack.gap.iut_addr_get()
@@ -138,8 +132,6 @@ class GapTestCase(BTPTestCase):
         is operating in the Central role and is the responder.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         conn_params = self.iut1.stack.gap.get_conn_params()
@@ -189,8 +181,6 @@ class GapTestCase(BTPTestCase):
         operating in the Peripheral role and is the responder.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         conn_params = self.iut1.stack.gap.get_conn_params()
@@ -239,8 +229,6 @@ class GapTestCase(BTPTestCase):
         is operating in the Peripheral role and is the responder.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         btp.gap_set_io_cap(self.iut2, IOCap.no_input_output)
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -278,8 +266,6 @@ class GapTestCase(BTPTestCase):
         is operating in the Peripheral role and is the responder.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         btp.gap_set_io_cap(self.iut1, IOCap.display_yesno)
         btp.gap_set_io_cap(self.iut2, IOCap.display_yesno)
 
@@ -330,8 +316,6 @@ class GapTestCase(BTPTestCase):
         is operating in the Peripheral role and is the responder.
         """
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         btp.gap_set_io_cap(self.iut1, IOCap.keyboard_only)
         btp.gap_set_io_cap(self.iut2, IOCap.display_only)
 
@@ -0,0 +1,260 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import time
+
+from pybtp import btp, defs
+from pybtp.types import BTPError, PTS_DB, UUID
+from pybtp.utils import wait_futures
+from stack.gatt import GattValue
+from testcases.GattTestCase import GattTestCase
+from testcases.benchmark import NotificationStats, WriteStats, \
+    load_benchmark_config, seq_payload, report_result
+from testcases.utils import connection_procedure, disconnection_procedure, \
+    EV_TIMEOUT
+
+
+class GattBenchmarkTestCase(GattTestCase):
+    """Notification and write throughput and latency benchmarks
+
+    For notifications the peripheral sets the value of the notify
+    characteristic with gatts_set_val and the central collects the
+    resulting notifications. For writes the central writes and the
+    peripheral collects attribute value changed events. Parameters are
+    read from benchmark_config.json.
+    """
+    test_prefix = 'bench'
+
+    def __init__(self, testname, iut1, iut2):
+        super(__class__, self).__init__(testname, iut1, iut2)
+        self.config = load_benchmark_config('gatt_notify')
+        self.write_config = load_benchmark_config('gatt_write')
+
+    def subscribe_notify_chr(self):
+        chars = self.disc_chrc_uuid(self.iut1, self.iut2,
+                                    0x0001, 0xffff, PTS_DB.CHR_NOTIFY)
+        chr = chars.find_chr_by_uuid(PTS_DB.CHR_NOTIFY)
+        self.assertIsNotNone(chr)
+        end_hdl = chars.find_characteristic_end(chr.handle)
+        self.assertIsNotNone(end_hdl)
+
+        desc = self.disc_all_desc(self.iut1, self.iut2,
+                                  chr.value_handle + 1, end_hdl)
+        dsc = desc.find_dsc_by_uuid(UUID.CCC)
+        self.assertIsNotNone(dsc)
+
+        self.cfg_notify(self.iut1, self.iut2, 1, dsc.handle)
+        return chr.value_handle
+
+    def notification_event(self):
+        if self.iut1.stack.gatt_cl:
+            return defs.BTP_SERVICE_ID_GATTC, defs.GATTC_EV_NOTIFICATION_RXED
+        return defs.BTP_SERVICE_ID_GATT, defs.GATT_EV_NOTIFICATION
+
+    def run_notifications(self, handle, rate, payload_size):
+        """Push notifications at rate per second, 0 means no pacing"""
+        count = self.config['count']
+        stats = NotificationStats(handle, rate, payload_size, iut=self.iut1)
+        svc_id, op = self.notification_event()
+
+        self.iut1.event_handler.add_monitor(svc_id, op, stats)
+        try:
+            interval = 1 / rate if rate else 0
+            next_time = time.monotonic()
+            for seq in range(count):
+                if interval:
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_time += interval
+
+                value = seq_payload(seq, payload_size)
+                start = time.monotonic()
+                btp.gatts_set_val(self.iut2, handle, value)
+                stats.on_sent(seq, start, time.monotonic())
+
+            stats.wait_all_received(self.config.get('drain_timeout',
+                                                    EV_TIMEOUT))
+        finally:
+            self.iut1.event_handler.remove_monitor(svc_id, op, stats)
+
+        if self.iut1.stack.gatt_cl:
+            self.iut1.stack.gatt_cl.notifications.clear()
+
+        report = stats.report()
+        title = "%s rate=%s payload_size=%d" % (self._testMethodName,
+                                                rate or "max", payload_size)
+        report_result(self, title, report)
+        return report
+
+    def check_loss(self, report):
+        self.assertLessEqual(report['loss_pct'],
+                             self.config.get('max_loss_pct', 0))
+
+    def find_chr_value_handle(self, uuid):
+        chars = self.disc_chrc_uuid(self.iut1, self.iut2,
+                                    0x0001, 0xffff, uuid)
+        chr = chars.find_chr_by_uuid(uuid)
+        self.assertIsNotNone(chr)
+        return chr.value_handle
+
+    def exchange_mtu(self):
+        """Negotiate the ATT MTU and check it is the configured mtu
+
+        BTP neither takes nor reports an MTU, the central requests the
+        largest its firmware supports. A Write Without Response filling
+        the configured MTU must then reach the peripheral whole.
+        """
+        mtu = self.write_config['mtu']
+        try:
+            btp.gattc_exchange_mtu(self.iut1,
+                                   self.iut2.stack.gap.iut_addr_get())
+            btp.gatt_command_rsp_succ(self.iut1)
+        except BTPError as e:
+            # Stacks exchanging the MTU on connection refuse a second one
+            logging.debug("MTU not exchanged: %r", e)
+
+        handle = self.find_chr_value_handle(PTS_DB.CHR_WRITE_NO_RSP)
+        value = bytes(mtu - 3)
+        future = btp.gatts_attr_value_changed_ev(
+            self.iut2, lambda args: args[0] == handle)
+        try:
+            self.write_without_rsp(handle, value)
+        except BTPError:
+            self.fail("Negotiated ATT MTU is below the configured %d" % mtu)
+        wait_futures([future], timeout=EV_TIMEOUT)
+        _, data = future.result()
+        self.assertEqual(len(data), len(value),
+                         "Negotiated ATT MTU is below the configured %d" % mtu)
+
+    def write_without_rsp(self, handle, value):
+        btp.gattc_write_without_rsp(self.iut1,
+                                    self.iut2.stack.gap.iut_addr_get(),
+                                    handle, value)
+
+    def write_long_wait_rsp(self, handle, value):
+        stack = self.iut1.stack
+        addr = self.iut2.stack.gap.iut_addr_get()
+        if stack.gatt_cl:
+            btp.gatt_cl_write_long(self.iut1, addr, handle, 0, value)
+            stack.gatt_cl.wait_for_write_rsp()
+            att_rsp = stack.gatt_cl.verify_values[0]
+        else:
+            gatt_value = GattValue()
+            btp.gattc_write_long(self.iut1, addr, handle, 0, value)
+            btp.gattc_write_long_rsp(self.iut1, gatt_value)
+            att_rsp = gatt_value.att_rsp
+        self.assertEqual(att_rsp, "No error")
+
+    def run_writes(self, handle, mode, payload_size):
+        """Write count values of payload_size from the central
+
+        mode is 'no_rsp' for Write Without Response or 'long' for
+        prepared writes.
+        """
+        config = self.write_config
+        stats = WriteStats(handle, mode, payload_size, config['mtu'],
+                           self.iut2)
+        svc_id, op = defs.BTP_SERVICE_ID_GATT, defs.GATT_EV_ATTR_VALUE_CHANGED
+        write = self.write_without_rsp if mode == 'no_rsp' else \
+            self.write_long_wait_rsp
+
+        self.iut2.event_handler.add_monitor(svc_id, op, stats)
+        try:
+            for seq in range(config['count']):
+                value = seq_payload(seq, payload_size)
+                start = time.monotonic()
+                write(handle, value)
+                stats.on_sent(seq, start, time.monotonic())
+
+            stats.wait_all_received(config.get('drain_timeout', EV_TIMEOUT))
+        finally:
+            self.iut2.event_handler.remove_monitor(svc_id, op, stats)
+
+        report = stats.report()
+        title = "%s mode=%s mtu=%d payload_size=%d" % (
+            self._testMethodName, mode, config['mtu'], payload_size)
+        report_result(self, title, report)
+        return report
+
+    def bench_GATT_CL_NTF_1(self):
+        """
+        Measure notification throughput and latency for every configured
+        notification rate and payload size.
+        """
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        handle = self.subscribe_notify_chr()
+
+        for payload_size in self.config['payload_sizes']:
+            for rate in self.config['rates']:
+                with self.subTest(rate=rate, payload_size=payload_size):
+                    self.check_loss(self.run_notifications(handle, rate,
+                                                           payload_size))
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
+
+    def bench_GATT_CL_NTF_2(self):
+        """
+        Measure sustained notification throughput with the peripheral
+        setting values back to back, for every configured payload size.
+        """
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        handle = self.subscribe_notify_chr()
+
+        for payload_size in self.config['payload_sizes']:
+            with self.subTest(payload_size=payload_size):
+                self.check_loss(self.run_notifications(handle, 0,
+                                                       payload_size))
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
+
+    def bench_GATT_CL_WR_1(self):
+        """
+        Measure Write Without Response throughput for every configured
+        payload size that fits a single ATT PDU.
+        """
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        self.exchange_mtu()
+        handle = self.find_chr_value_handle(PTS_DB.CHR_WRITE_NO_RSP)
+        max_size = self.write_config['mtu'] - 3
+
+        for payload_size in self.write_config['payload_sizes']:
+            if payload_size > max_size:
+                continue
+
+            with self.subTest(payload_size=payload_size):
+                report = self.run_writes(handle, 'no_rsp', payload_size)
+                self.assertLessEqual(report['lost'] * 100 / report['sent'],
+                                     self.write_config.get('max_loss_pct', 0))
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
+
+    def bench_GATT_CL_WR_2(self):
+        """
+        Measure long write throughput for every configured payload size,
+        values longer than the ATT MTU are sent as prepared writes.
+        """
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+        self.exchange_mtu()
+        handle = self.find_chr_value_handle(PTS_DB.LONG_CHR_READ_WRITE)
+
+        for payload_size in self.write_config['long_payload_sizes']:
+            with self.subTest(payload_size=payload_size):
+                report = self.run_writes(handle, 'long', payload_size)
+                self.assertEqual(report['lost'], 0)
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
@@ -15,14 +15,14 @@
 #
 
 import time
-import sys
 from binascii import hexlify
 
 from pybtp import btp
 from pybtp.types import PTS_DB, Prop, Perm, UUID
-from pybtp.utils import wait_futures
+from pybtp.utils import wait_futures, payload_bytes
 from stack.gatt import GattDB, GattValue
 from testcases.BTPTestCase import BTPTestCase
+from testcases.fixtures import shared_connection, fixture_key, set_fixture
 from testcases.utils import preconditions, connection_procedure, \
     disconnection_procedure, EV_TIMEOUT, verify_notification_ev
 
@@ -33,8 +33,22 @@ class GattTestCase(BTPTestCase):
 
     def setUp(self):
         super(__class__, self).setUp()
-        preconditions(self.iut1)
-        preconditions(self.iut2)
+        if self.fixture_reused:
+            # Host state of the previous test must not leak into this one
+            for iut in (self.iut1, self.iut2):
+                iut.event_handler.clear_listeners()
+            if self.iut1.stack.gatt_cl:
+                self.iut1.stack.gatt_cl_init()
+            return
+
+        with self.phase('preconditions'):
+            preconditions(self.iut1)
+            preconditions(self.iut2)
+
+        key = fixture_key(self)
+        if key is not None:
+            connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+            set_fixture(key, self.iut1, self.iut2)
 
     def tearDown(self):
         super(__class__, self).tearDown()
@@ -234,58 +248,43 @@ class GattTestCase(BTPTestCase):
             return result
 
 
+    @shared_connection()
     def test_btp_GATT_CL_GAD_1(self):
         """
         Verify that a Generic Attribute Profile client discovers Primary
         Services in a GATT server.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         db = self.disc_prim_svcs(self.iut1, self.iut2)
 
         self.assertIsNotNone(db.find_svc_by_uuid(PTS_DB.SVC))
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
+    @shared_connection()
     def test_btp_GATT_CL_GAD_2(self):
         """
         Verify that a Generic Attribute Profile client can discover Primary
         Services selected by service UUID, using 16-bit and 128-bit UUIDs.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         db = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
 
         self.assertIsNotNone(db.find_svc_by_uuid(PTS_DB.SVC))
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
+    @shared_connection()
     def test_btp_GATT_CL_GAD_3(self):
         """
         Verify that a Generic Attribute Profile client can find include service
         declarations within a specified service definition on a server.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         db = self.disc_prim_svcs(self.iut1, self.iut2)
         db_2 = self.find_included_svcs(self.iut1, self.iut2, db)
 
         self.assertIsNotNone(db_2.find_inc_svc_by_uuid(PTS_DB.INC_SVC))
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
+    @shared_connection()
     def test_btp_GATT_CL_GAD_4(self):
         """
         Verify that a Generic Attribute Profile client can discover
         characteristic declarations within a specified service definition.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         svcs = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
         svc = svcs.find_svc_by_uuid(PTS_DB.SVC)
 
@@ -297,34 +296,26 @@ class GattTestCase(BTPTestCase):
         chr = chars.find_chr_by_uuid(PTS_DB.CHR_READ_WRITE)
 
         self.assertIsNotNone(chr)
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
+    @shared_connection()
     def test_btp_GATT_CL_GAD_5(self):
         """
         Verify that a Generic Attribute Profile client can discover
         characteristics of a specified service, using 16-bit and 128-bit
         characteristic UUIDs.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         db = self.disc_chrc_uuid(self.iut1, self.iut2,
                                  0x0001, 0xffff, PTS_DB.CHR_READ_WRITE)
         chr = db.find_chr_by_uuid(PTS_DB.CHR_READ_WRITE)
 
         self.assertIsNotNone(chr)
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
+    @shared_connection()
     def test_btp_GATT_CL_GAD_6(self):
         """
         Verify that a Generic Attribute Profile client can find all Descriptors
         of a specified Characteristic.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         db = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
         svc = db.find_svc_by_uuid(PTS_DB.SVC)
 
@@ -345,17 +336,12 @@ class GattTestCase(BTPTestCase):
 
         self.assertIsNotNone(dsc)
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
+    @shared_connection()
     def test_btp_GATT_CL_GAR_1(self):
         """
         Verify that a Generic Attribute Profile client can read a
         Characteristic Value selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         chars = self.disc_chrc_uuid(self.iut1, self.iut2,
                                     0x0001, 0xffff,PTS_DB.CHR_READ_WRITE)
         chr = chars.find_chr_by_uuid(PTS_DB.CHR_READ_WRITE)
@@ -366,18 +352,13 @@ class GattTestCase(BTPTestCase):
 
         self.assertEqual(rsp, "No error")
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
+    @shared_connection()
     def test_btp_GATT_CL_GAR_2(self):
         """
         Verify that a Generic Attribute Profile client can read a Characteristic
         Value by selected handle. The Characteristic Value length is unknown
         to the client and might be long.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         chars = self.disc_chrc_uuid(self.iut1, self.iut2,
                                     0x0001, 0xffff, PTS_DB.LONG_CHR_READ_WRITE)
         chr = chars.find_chr_by_uuid(PTS_DB.LONG_CHR_READ_WRITE)
@@ -388,17 +369,12 @@ class GattTestCase(BTPTestCase):
 
         self.assertEqual(rsp, "No error")
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
+    @shared_connection()
     def test_btp_GATT_CL_GAR_3(self):
         """
         Verify that a Generic Attribute Profile client can read a characteristic
         descriptor selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         svcs = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
         svc = svcs.find_svc_by_uuid(PTS_DB.SVC)
         self.assertIsNotNone(svc)
@@ -420,8 +396,7 @@ class GattTestCase(BTPTestCase):
 
         self.assertEqual(rsp, "No error")
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
+    @shared_connection()
     def test_btp_GATT_CL_GAR_4(self):
         """
         Verify that a Generic Attribute Profile client can read a characteristic
@@ -430,10 +405,6 @@ class GattTestCase(BTPTestCase):
         """
         stack = self.iut1.stack
 
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
-        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
         svcs = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
         svc = svcs.find_svc_by_uuid(PTS_DB.SVC)
         self.assertIsNotNone(svc)
@@ -455,15 +426,11 @@ class GattTestCase(BTPTestCase):
 
         self.assertEqual(rsp, "No error")
 
-        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
-
     def test_btp_GATT_CL_GAW_1(self):
         """
         Verify that a Generic Attribute Profile client can write
         a Characteristic Value selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         chars = self.disc_chrc_uuid(self.iut1,
@@ -478,7 +445,7 @@ class GattTestCase(BTPTestCase):
         wait_futures([rsp[1]], timeout=EV_TIMEOUT)
 
         hdl, data = rsp[1].result()
-        self.assertEqual(data, new_value)
+        self.assertEqual(data, payload_bytes(new_value))
 
         disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -487,8 +454,6 @@ class GattTestCase(BTPTestCase):
         Verify that a Generic Attribute Profile client can write a long
         Characteristic Value selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         chars = self.disc_chrc_uuid(self.iut1,
@@ -503,7 +468,7 @@ class GattTestCase(BTPTestCase):
         wait_futures([rsp[1]], timeout=EV_TIMEOUT)
 
         hdl, data = rsp[1].result()
-        self.assertEqual(data, new_value)
+        self.assertEqual(data, payload_bytes(new_value))
 
         disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -512,8 +477,6 @@ class GattTestCase(BTPTestCase):
         Verify that a Generic Attribute Profile client can write
         a characteristic descriptor selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         svcs = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
@@ -538,7 +501,7 @@ class GattTestCase(BTPTestCase):
         wait_futures([rsp[1]], timeout=EV_TIMEOUT)
 
         hdl, data = rsp[1].result()
-        self.assertEqual(data, new_value)
+        self.assertEqual(data, payload_bytes(new_value))
 
         disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -547,8 +510,6 @@ class GattTestCase(BTPTestCase):
         Verify that a Generic Attribute Profile client can write a long
         characteristic descriptor selected by handle.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         svcs = self.disc_prim_uuid(self.iut1, self.iut2, PTS_DB.SVC)
@@ -574,7 +535,7 @@ class GattTestCase(BTPTestCase):
         wait_futures([rsp[1]], timeout=EV_TIMEOUT)
 
         hdl, data = rsp[1].result()
-        self.assertEqual(data, new_value)
+        self.assertEqual(data, payload_bytes(new_value))
 
         disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
@@ -583,8 +544,6 @@ class GattTestCase(BTPTestCase):
         Verify that a Generic Attribute Profile client can receive
         a Characteristic Value Notification and report that to the Upper Tester.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         chars = self.disc_chrc_uuid(self.iut1, self.iut2,
@@ -612,8 +571,6 @@ class GattTestCase(BTPTestCase):
         Verify that a Generic Attribute Profile client can receive
         a Characteristic Value Notification and report that to the Upper Tester.
         """
-        self.verify_skipped(sys._getframe().f_code.co_name)
-
         connection_procedure(self, central=self.iut1, peripheral=self.iut2)
 
         chars = self.disc_chrc_uuid(self.iut1, self.iut2,
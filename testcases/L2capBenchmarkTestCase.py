@@ -0,0 +1,123 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import time
+
+from pybtp import btp, defs
+from testcases.BTPTestCase import BTPTestCase
+from testcases.benchmark import ChannelStats, load_benchmark_config, \
+    seq_payload, report_result
+from testcases.utils import preconditions, connection_procedure, \
+    disconnection_procedure, check_supp_svcs, EV_TIMEOUT
+
+
+class L2capBenchmarkTestCase(BTPTestCase):
+    """L2CAP connection oriented channel throughput benchmarks
+
+    The central streams SDUs with l2cap_send_data over an LE CoC channel,
+    the peripheral collects them from its L2CAP data received events.
+    Parameters are read from benchmark_config.json.
+    """
+    test_prefix = 'bench'
+
+    def __init__(self, testname, iut1, iut2):
+        super(__class__, self).__init__(testname, iut1, iut2)
+        self.config = load_benchmark_config('l2cap_coc')
+
+    def setUp(self):
+        super(__class__, self).setUp()
+        for iut in (self.iut1, self.iut2):
+            preconditions(iut)
+            if not check_supp_svcs(iut.stack.supported_svcs,
+                                   defs.BTP_SERVICE_ID_L2CAP):
+                self.skipTest("%s does not support L2CAP" % iut.get_type())
+            btp.core_reg_svc_l2cap(iut)
+            iut.stack.l2cap_init()
+
+    def tearDown(self):
+        super(__class__, self).tearDown()
+
+    def l2cap_connect(self):
+        psm = self.config['psm']
+
+        btp.l2cap_le_listen(self.iut2, psm)
+        connection_procedure(self, central=self.iut1, peripheral=self.iut2)
+
+        chan_id = btp.l2cap_conn(self.iut1,
+                                 self.iut2.stack.gap.iut_addr_get(), psm)
+        self.assertTrue(self.iut1.stack.l2cap.wait_for_channel(chan_id))
+        self.assertTrue(self.iut2.stack.l2cap.wait_for_channel())
+
+        peer_chan_id, = self.iut2.stack.l2cap.channels
+        return chan_id, peer_chan_id
+
+    def l2cap_disconnect(self, chan_id, peer_chan_id):
+        btp.l2cap_disconn(self.iut1, chan_id)
+        self.assertTrue(
+            self.iut1.stack.l2cap.wait_for_disconnection(chan_id))
+        self.assertTrue(
+            self.iut2.stack.l2cap.wait_for_disconnection(peer_chan_id))
+
+        disconnection_procedure(self, central=self.iut1, peripheral=self.iut2)
+
+    def run_stream(self, chan_id, peer_chan_id, sdu_size):
+        stats = ChannelStats(peer_chan_id, sdu_size,
+                             self.config.get('stall_factor', 4), self.iut2)
+        svc_id, op = defs.BTP_SERVICE_ID_L2CAP, defs.L2CAP_EV_DATA_RECEIVED
+
+        self.iut2.event_handler.add_monitor(svc_id, op, stats)
+        try:
+            for seq in range(self.config['count']):
+                sdu = seq_payload(seq, sdu_size)
+                start = time.monotonic()
+                btp.l2cap_send_data(self.iut1, chan_id, sdu)
+                stats.on_sent(seq, start, time.monotonic())
+
+            stats.wait_all_received(self.config.get('drain_timeout',
+                                                    EV_TIMEOUT))
+        finally:
+            self.iut2.event_handler.remove_monitor(svc_id, op, stats)
+
+        # Data was accounted by the monitor, drop the buffered copy. The
+        # buffer is capped, so long runs keep only the latest bytes anyway.
+        self.iut2.stack.l2cap.get_channel(peer_chan_id).read()
+
+        report = stats.report()
+        title = "%s mtu=%d mps=%d sdu_size=%d" % (
+            self._testMethodName, self.config['mtu'], self.config['mps'],
+            sdu_size)
+        report_result(self, title, report)
+        return report
+
+    def bench_L2CAP_COC_THR_1(self):
+        """
+        Measure LE CoC goodput, SDU latency and credit stalls for every
+        configured SDU size that fits the channel MTU.
+        """
+        chan_id, peer_chan_id = self.l2cap_connect()
+
+        for sdu_size in self.config['sdu_sizes']:
+            if sdu_size > self.config['mtu']:
+                logging.info("SDU size %d exceeds MTU %d, skipped",
+                             sdu_size, self.config['mtu'])
+                continue
+
+            with self.subTest(sdu_size=sdu_size):
+                report = self.run_stream(chan_id, peer_chan_id, sdu_size)
+                self.assertEqual(report['lost'], 0)
+
+        self.l2cap_disconnect(chan_id, peer_chan_id)
@@ -0,0 +1,341 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import os
+import threading
+import time
+import unittest
+
+from pybtp import btp, defs
+from pybtp.types import AdType, PTS_DB, UUID
+from pybtp.utils import wait_futures
+from testcases import fixtures
+from testcases.GattTestCase import GattTestCase
+from testcases.benchmark import EventTimer, NotificationStats, \
+    load_benchmark_config, seq_payload, summarize, format_report, \
+    report_result, percentile
+from testcases.utils import preconditions, find_adv_by_uuid, \
+    verify_address, EV_TIMEOUT
+
+
+class MultiLinkTestCase(GattTestCase):
+    """One central connected to several peripherals at the same time
+
+    iut1 is the central, iut2 and every further IUT are peripherals. Links
+    are established one at a time, as a controller creates a single
+    connection at once, and are all kept open while GATT procedures run
+    on them. Parameters are read from benchmark_config.json.
+    """
+    # Inherited single link GATT tests are not collected
+    test_prefix = 'test_btp_MULTI'
+
+    def __init__(self, testname, iut1, iut2, *iuts):
+        # Set before the skip lists of all peripherals are checked
+        self.peripherals = [iut2] + list(iuts)
+        super(__class__, self).__init__(testname, iut1, iut2)
+        self.config = load_benchmark_config('multi_link')
+
+    @classmethod
+    def init_testcases(cls, iut1, iut2, *iuts):
+        testcases = []
+        ldr = unittest.TestLoader()
+        ldr.testMethodPrefix = cls.test_prefix
+        for testname in ldr.getTestCaseNames(cls):
+            testcases.append(cls(testname, iut1, iut2, *iuts))
+        return testcases
+
+    def setUp(self):
+        # Further peripherals are reset along with the first pair
+        fixtures.start_reset(*self.peripherals[1:])
+        super(__class__, self).setUp()
+
+        with self.phase('reset'):
+            fixtures.wait_reset(*self.peripherals[1:])
+        with self.phase('preconditions'):
+            for iut in self.peripherals[1:]:
+                preconditions(iut)
+
+    def tearDown(self):
+        super(__class__, self).tearDown()
+        fixtures.start_reset(*self.peripherals[1:])
+
+    def skip_roles(self):
+        return [(self.iut1, 'skipped_central')] + \
+            [(iut, 'skipped_peripheral') for iut in self.peripherals]
+
+    def connect_all(self, peripherals, connected):
+        """Connect the central to every peripheral
+
+        Appends every peripheral to connected once its link is up, so the
+        links established before a failure can be disconnected. Returns
+        the connect latency of every link, from gap_conn to the connected
+        event of the central.
+        """
+        central = self.iut1
+        svc_id, op = defs.BTP_SERVICE_ID_GAP, defs.GAP_EV_DEVICE_CONNECTED
+
+        uuids = set()
+        while len(uuids) < len(peripherals):
+            uuids.add(os.urandom(2))
+        uuids = list(uuids)
+
+        found_timers = []
+        for uuid in uuids:
+            timer = EventTimer(central)
+            timer.arm(lambda args, uuid=uuid: find_adv_by_uuid(
+                args, btp.btp2uuid(len(uuid), uuid)))
+            central.event_handler.add_monitor(svc_id,
+                                              defs.GAP_EV_DEVICE_FOUND, timer)
+            found_timers.append(timer)
+
+        central_timer = EventTimer(central)
+        central.event_handler.add_monitor(svc_id, op, central_timer)
+
+        latencies = []
+        try:
+            btp.gap_start_discov(central)
+            for iut, uuid in zip(peripherals, uuids):
+                btp.gap_set_conn(iut)
+                btp.gap_set_gendiscov(iut)
+                btp.gap_adv_ind_on(iut, ad=[(AdType.uuid16_some, uuid)])
+
+            try:
+                for timer in found_timers:
+                    timer.wait(EV_TIMEOUT)
+            finally:
+                btp.gap_stop_discov(central)
+
+            for iut, timer in zip(peripherals, found_timers):
+                addr = timer.result.addr
+                iut.stack.gap.iut_addr_set(addr)
+
+                central_timer.arm(lambda args: verify_address(args, addr))
+                future_peripheral = btp.gap_connected_ev(iut)
+                conn_start = time.monotonic()
+                btp.gap_conn(central, addr)
+                latencies.append(central_timer.wait(EV_TIMEOUT) - conn_start)
+                connected.append(iut)
+                wait_futures([future_peripheral], timeout=EV_TIMEOUT)
+
+                central_addr, _ = future_peripheral.result()
+                central.stack.gap.iut_addr_set(central_addr)
+
+                # The controller stops connectable advertising on connection
+                iut.stack.gap.current_settings_clear("Advertising")
+        finally:
+            for timer in found_timers:
+                central.event_handler.remove_monitor(
+                    svc_id, defs.GAP_EV_DEVICE_FOUND, timer)
+            central.event_handler.remove_monitor(svc_id, op, central_timer)
+
+        for iut in peripherals:
+            self.assertTrue(
+                central.stack.gap.is_connected(iut.stack.gap.iut_addr_get()))
+            self.assertTrue(iut.stack.gap.is_connected())
+
+        return latencies
+
+    def disconnect_all(self, peripherals):
+        central = self.iut1
+        for iut in peripherals:
+            addr = iut.stack.gap.iut_addr_get()
+
+            future_central = btp.gap_disconnected_ev(
+                central, lambda args: verify_address(args, addr))
+            future_peripheral = btp.gap_disconnected_ev(iut)
+
+            btp.gap_disconn(central, addr)
+
+            wait_futures([future_central, future_peripheral],
+                         timeout=EV_TIMEOUT)
+            self.assertFalse(iut.stack.gap.is_connected())
+
+        self.assertFalse(central.stack.gap.is_connected())
+
+    def find_chr(self, iut, uuid):
+        # The client database would otherwise mix the links
+        if self.iut1.stack.gatt_cl:
+            self.iut1.stack.gatt_cl.db.clear()
+
+        chars = self.disc_chrc_uuid(self.iut1, iut, 0x0001, 0xffff, uuid)
+        chr = chars.find_chr_by_uuid(uuid)
+        self.assertIsNotNone(chr)
+        return chars, chr
+
+    def subscribe_notify_chr(self, iut):
+        chars, chr = self.find_chr(iut, PTS_DB.CHR_NOTIFY)
+        end_hdl = chars.find_characteristic_end(chr.handle)
+        self.assertIsNotNone(end_hdl)
+
+        desc = self.disc_all_desc(self.iut1, iut,
+                                  chr.value_handle + 1, end_hdl)
+        dsc = desc.find_dsc_by_uuid(UUID.CCC)
+        self.assertIsNotNone(dsc)
+
+        # Only the notification sent on subscription is expected
+        if self.iut1.stack.gatt_cl:
+            self.iut1.stack.gatt_cl.notifications.clear()
+        self.cfg_notify(self.iut1, iut, 1, dsc.handle)
+        return chr.value_handle
+
+    def notification_event(self):
+        if self.iut1.stack.gatt_cl:
+            return defs.BTP_SERVICE_ID_GATTC, defs.GATTC_EV_NOTIFICATION_RXED
+        return defs.BTP_SERVICE_ID_GATT, defs.GATT_EV_NOTIFICATION
+
+    def run_reads(self, peripherals):
+        """Read the same characteristic round robin on every link
+
+        BTP commands to the central are serialized, so reads of different
+        links never overlap on the host side, the links themselves stay
+        active.
+        """
+        handles = [self.find_chr(iut, PTS_DB.CHR_READ_WRITE)[1].value_handle
+                   for iut in peripherals]
+
+        latencies = []
+        for _ in range(self.config['reads']):
+            for iut, handle in zip(peripherals, handles):
+                start = time.monotonic()
+                att_rsp = self.read(self.iut1, iut, handle)
+                latencies.append(time.monotonic() - start)
+                self.assertEqual(att_rsp, "No error")
+        return latencies
+
+    def run_notifications(self, peripherals, handles):
+        """Push notifications from every peripheral at the same time
+
+        Every peripheral sets its value back to back from its own thread,
+        the central collects the notifications of each link separately.
+        """
+        count = self.config['count']
+        payload_size = self.config['payload_size']
+        svc_id, op = self.notification_event()
+
+        stats = [NotificationStats(handle, 0, payload_size,
+                                   iut.stack.gap.iut_addr_get(), self.iut1)
+                 for iut, handle in zip(peripherals, handles)]
+        errors = []
+
+        def push(iut, handle, link_stats):
+            try:
+                for seq in range(count):
+                    value = seq_payload(seq, payload_size)
+                    start = time.monotonic()
+                    btp.gatts_set_val(iut, handle, value)
+                    link_stats.on_sent(seq, start, time.monotonic())
+            except Exception as e:
+                logging.exception(e)
+                errors.append(e)
+
+        for link_stats in stats:
+            self.iut1.event_handler.add_monitor(svc_id, op, link_stats)
+        try:
+            threads = [threading.Thread(target=push, args=args,
+                                        name="Push-%d" % i)
+                       for i, args in enumerate(zip(peripherals, handles,
+                                                    stats))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+
+            drain_timeout = self.config.get('drain_timeout', EV_TIMEOUT)
+            for link_stats in stats:
+                link_stats.wait_all_received(drain_timeout)
+        finally:
+            for link_stats in stats:
+                self.iut1.event_handler.remove_monitor(svc_id, op, link_stats)
+
+        if self.iut1.stack.gatt_cl:
+            self.iut1.stack.gatt_cl.notifications.clear()
+
+        return [link_stats.report() for link_stats in stats]
+
+    def run_links(self, peripherals):
+        connected = []
+        try:
+            setup_start = time.monotonic()
+            connect = self.connect_all(peripherals, connected)
+            setup = time.monotonic() - setup_start
+
+            reads = self.run_reads(peripherals)
+            handles = [self.subscribe_notify_chr(iut) for iut in peripherals]
+            links = self.run_notifications(peripherals, handles)
+        finally:
+            # Also the links established before a failure
+            self.disconnect_all(connected)
+
+        ntf_rates = [link['ntf_per_s'] for link in links]
+        return {
+            'links': len(peripherals),
+            'setup_s': setup,
+            'connect': summarize(connect),
+            'read': summarize(reads),
+            'ntf_per_s_total': sum(ntf_rates),
+            'ntf_per_s_link_min': min(ntf_rates),
+            'ntf_per_s_link_p50': percentile(ntf_rates, 50),
+            'latency_p99_ms_max': max(link['latency_p99_ms'] or 0
+                                      for link in links),
+            'lost': sum(link['lost'] for link in links),
+            'loss_pct': max(link['loss_pct'] for link in links),
+        }
+
+    def test_btp_MULTI_GATT_CONN_1(self):
+        """
+        Connect the central to every peripheral, then read a
+        characteristic and receive notifications on all links while they
+        are open at the same time.
+        """
+        report = self.run_links(self.peripherals)
+
+        title = "%s links=%d" % (self._testMethodName, report['links'])
+        logging.info(format_report(title, report))
+        self.assertLessEqual(report['loss_pct'],
+                             self.config.get('max_loss_pct', 0))
+
+
+class MultiLinkBenchmarkTestCase(MultiLinkTestCase):
+    """Scaling of multi link performance with the number of links"""
+    test_prefix = 'bench'
+
+    def bench_MULTI_GATT_SCALE_1(self):
+        """
+        Measure how connection setup time and per link read latency and
+        notification throughput change with the number of simultaneous
+        links, for every configured link count up to all peripherals.
+        """
+        link_counts = sorted(
+            {k for k in self.config['link_counts']
+             if k <= len(self.peripherals)} | {len(self.peripherals)})
+
+        single_rate = None
+        for k in link_counts:
+            with self.subTest(links=k):
+                report = self.run_links(self.peripherals[:k])
+                if single_rate is None:
+                    single_rate = report['ntf_per_s_link_p50']
+                report['ntf_per_s_link_vs_first_pct'] = \
+                    100 * report['ntf_per_s_link_p50'] / single_rate \
+                    if single_rate else None
+
+                title = "%s links=%d" % (self._testMethodName, k)
+                report_result(self, title, report)
+                self.assertLessEqual(report['loss_pct'],
+                                     self.config.get('max_loss_pct', 0))
@@ -0,0 +1,402 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import logging
+import struct
+import threading
+import time
+
+from common.utils import raise_on_iut_lost, percentile
+
+BENCHMARK_CONFIG = "benchmark_config.json"
+BENCHMARK_RESULTS = "benchmark_results.jsonl"
+
+# Every benchmark payload starts with a little endian sequence number
+SEQ = struct.Struct('<I')
+
+
+# Seconds between checks for a lost IUT while waiting for events
+LOST_POLL = 0.5
+
+
+def wait_event(event, timeout, iut=None):
+    """threading.Event.wait failing at once with IUTLostError once the IUT
+    the event comes from is lost
+    """
+    name = iut.stack.name if iut is not None else None
+    deadline = time.monotonic() + timeout
+    while not event.wait(min(LOST_POLL,
+                             max(0, deadline - time.monotonic()))):
+        raise_on_iut_lost(name)
+        if time.monotonic() >= deadline:
+            return False
+    return True
+
+
+def load_benchmark_config(name):
+    with open(BENCHMARK_CONFIG, "r") as read_file:
+        return json.load(read_file).get(name)
+
+
+def record_result(testcase, title, report):
+    """Append report as one JSON line to the benchmark results file"""
+    result = {
+        'time': time.time(),
+        'test': testcase.id(),
+        'title': title,
+        'central': testcase.iut1.get_type(),
+        'central_build': testcase.iut1.build,
+        'peripheral': testcase.iut2.get_type(),
+        'peripheral_build': testcase.iut2.build,
+        'report': report,
+    }
+    with open(BENCHMARK_RESULTS, "a") as results_file:
+        results_file.write(json.dumps(result) + "\n")
+
+
+def report_result(testcase, title, report):
+    """Log report and append it to the benchmark results file"""
+    logging.info(format_report(title, report))
+    record_result(testcase, title, report)
+
+
+def build_results(testcase, title):
+    """Reports of earlier runs of title with the same firmware builds"""
+    try:
+        results_file = open(BENCHMARK_RESULTS, "r")
+    except FileNotFoundError:
+        return []
+
+    reports = []
+    with results_file:
+        for line in results_file:
+            result = json.loads(line)
+            if result['test'] == testcase.id() and \
+                    result['title'] == title and \
+                    result.get('central_build') == testcase.iut1.build and \
+                    result.get('peripheral_build') == testcase.iut2.build:
+                reports.append(result['report'])
+    return reports
+
+
+def seq_payload(seq, size):
+    return SEQ.pack(seq) + bytes(max(size - SEQ.size, 0))
+
+
+def _ms(value):
+    return None if value is None else value * 1000
+
+
+class PayloadStats:
+    """Collects sequence numbered payloads sent and received in a benchmark
+
+    An instance is registered as BTPEventHandler monitor of the receiving
+    IUT, iut. Subclasses pick their payloads from the events in match().
+    All times are time.monotonic() timestamps.
+    """
+
+    def __init__(self, iut=None):
+        self.iut = iut
+        # seq -> time the sending host started the command
+        self.sent = {}
+        # Duration of the send commands
+        self.send_times = []
+        # Entries returned by match() in order of arrival
+        self.received = []
+        self._all_received = threading.Event()
+
+    def on_sent(self, seq, start, end):
+        self.sent[seq] = start
+        self.send_times.append(end - start)
+
+    def match(self, result, rx_time):
+        """Received entry of the event result, None if not collected"""
+        raise NotImplementedError
+
+    def __call__(self, result, rx_time):
+        if not result:
+            return
+
+        entry = self.match(result, rx_time)
+        if entry is None:
+            return
+
+        self.received.append(entry)
+        if len(self.received) >= len(self.sent) and self.sent:
+            self._all_received.set()
+
+    def wait_all_received(self, timeout):
+        self._all_received.clear()
+        if len(self.received) >= len(self.sent):
+            return True
+        return wait_event(self._all_received, timeout, self.iut)
+
+
+class NotificationStats(PayloadStats):
+    """Collects sent and received notifications of a single benchmark run
+
+    An instance is registered as BTPEventHandler monitor of the central
+    notification event of iut. If addr is set only notifications of that
+    peer are collected. Sends are gatts_set_val commands.
+    """
+
+    def __init__(self, handle, rate, payload_size, addr=None, iut=None):
+        super(__class__, self).__init__(iut)
+        self.handle = handle
+        self.addr = addr
+        self.rate = rate
+        self.payload_size = payload_size
+
+    def match(self, result, rx_time):
+        addr, _, handle, data = result
+        if handle != self.handle or len(data) < SEQ.size:
+            return None
+        if self.addr is not None and addr != self.addr:
+            return None
+
+        seq, = SEQ.unpack_from(data)
+        return seq, rx_time, time.monotonic() - rx_time
+
+    def report(self):
+        received = {}
+        for seq, rx_time, _ in self.received:
+            received.setdefault(seq, rx_time)
+
+        latencies = [rx_time - self.sent[seq]
+                     for seq, rx_time in received.items() if seq in self.sent]
+        arrivals = [rx_time for _, rx_time, _ in self.received]
+        inter_arrival = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        host_times = [host_time for _, _, host_time in self.received]
+
+        lost = len(set(self.sent) - set(received))
+        duration = (max(arrivals) - min(self.sent.values())
+                    if arrivals and self.sent else 0)
+
+        # The set time also covers the peripheral IUT processing the
+        # command, so the host share is an upper bound
+        host_busy = sum(host_times) + sum(self.send_times)
+
+        return {
+            'rate': self.rate,
+            'payload_size': self.payload_size,
+            'sent': len(self.sent),
+            'received': len(received),
+            'lost': lost,
+            'loss_pct': 100 * lost / len(self.sent) if self.sent else 0,
+            'duplicates': len(self.received) - len(received),
+            'duration_s': duration,
+            'ntf_per_s': len(received) / duration if duration else 0,
+            'bytes_per_s': len(received) * self.payload_size /
+                duration if duration else 0,
+            'inter_arrival_p50_ms': _ms(percentile(inter_arrival, 50)),
+            'inter_arrival_p99_ms': _ms(percentile(inter_arrival, 99)),
+            'latency_p50_ms': _ms(percentile(latencies, 50)),
+            'latency_p99_ms': _ms(percentile(latencies, 99)),
+            'set_val_p50_ms': _ms(percentile(self.send_times, 50)),
+            'rx_host_p50_ms': _ms(percentile(host_times, 50)),
+            'rx_host_p99_ms': _ms(percentile(host_times, 99)),
+            'host_share_pct': 100 * host_busy / duration if duration else 0,
+        }
+
+
+class ChannelStats(PayloadStats):
+    """Collects SDUs streamed over an L2CAP channel in a benchmark run
+
+    An instance is registered as BTPEventHandler monitor of the L2CAP data
+    event of the receiving IUT, iut. Sends taking stall_factor times
+    longer than the median send are counted as credit stalls, the IUT
+    holds the send command until the peer returns credits.
+    """
+
+    def __init__(self, chan_id, sdu_size, stall_factor, iut=None):
+        super(__class__, self).__init__(iut)
+        self.chan_id = chan_id
+        self.sdu_size = sdu_size
+        self.stall_factor = stall_factor
+
+    def match(self, result, rx_time):
+        chan_id, data = result
+        if chan_id != self.chan_id or len(data) < SEQ.size:
+            return None
+
+        seq, = SEQ.unpack_from(data)
+        return seq, len(data), rx_time
+
+    def report(self):
+        received = {}
+        for seq, length, rx_time in self.received:
+            received.setdefault(seq, (length, rx_time))
+
+        latencies = [rx_time - self.sent[seq]
+                     for seq, (_, rx_time) in received.items()
+                     if seq in self.sent]
+        rx_bytes = sum(length for length, _ in received.values())
+        duration = (max(rx_time for _, rx_time in received.values()) -
+                    min(self.sent.values()) if received and self.sent else 0)
+
+        median_send = percentile(self.send_times, 50)
+        stalls = [t for t in self.send_times
+                  if median_send and t > self.stall_factor * median_send]
+        lost = len(set(self.sent) - set(received))
+
+        return {
+            'sdu_size': self.sdu_size,
+            'sent': len(self.sent),
+            'received': len(received),
+            'lost': lost,
+            'duration_s': duration,
+            'goodput_bytes_per_s': rx_bytes / duration if duration else 0,
+            'sdu_per_s': len(received) / duration if duration else 0,
+            'latency_p50_ms': _ms(percentile(latencies, 50)),
+            'latency_p99_ms': _ms(percentile(latencies, 99)),
+            'send_p50_ms': _ms(median_send),
+            'send_p99_ms': _ms(percentile(self.send_times, 99)),
+            'credit_stalls': len(stalls),
+            'credit_stall_s': sum(stalls),
+        }
+
+
+class WriteStats(PayloadStats):
+    """Collects client writes and the peripheral value changed events
+
+    An instance is registered as BTPEventHandler monitor of the attribute
+    value changed event of the peripheral, iut.
+    """
+
+    def __init__(self, handle, mode, payload_size, mtu, iut=None):
+        super(__class__, self).__init__(iut)
+        self.handle = handle
+        self.mode = mode
+        self.payload_size = payload_size
+        self.mtu = mtu
+
+    def match(self, result, rx_time):
+        handle, data = result
+        if handle != self.handle or len(data) < SEQ.size:
+            return None
+
+        seq, = SEQ.unpack_from(data)
+        return seq, rx_time
+
+    def att_pdus(self):
+        """ATT requests needed for a single write of payload_size"""
+        if self.mode != 'long':
+            return 1
+        # Prepare Write carries mtu - 5 bytes, followed by Execute Write
+        chunk = self.mtu - 5
+        return -(-self.payload_size // chunk) + 1
+
+    def report(self):
+        received = {}
+        for seq, rx_time in self.received:
+            received.setdefault(seq, rx_time)
+
+        latencies = [rx_time - self.sent[seq]
+                     for seq, rx_time in received.items() if seq in self.sent]
+        write_duration = sum(self.send_times)
+        arrivals = sorted(received.values())
+        rx_duration = arrivals[-1] - arrivals[0] if len(arrivals) > 1 else 0
+        lost = len(set(self.sent) - set(received))
+
+        return {
+            'mode': self.mode,
+            'mtu': self.mtu,
+            'payload_size': self.payload_size,
+            'att_pdus': self.att_pdus(),
+            'sent': len(self.sent),
+            'received': len(received),
+            'lost': lost,
+            'writes_per_s':
+                len(self.sent) / write_duration if write_duration else 0,
+            'bytes_per_s': len(self.sent) * self.payload_size /
+                write_duration if write_duration else 0,
+            'rx_per_s':
+                (len(arrivals) - 1) / rx_duration if rx_duration else 0,
+            'rx_bytes_per_s': (len(arrivals) - 1) * self.payload_size /
+                rx_duration if rx_duration else 0,
+            'write_p50_ms': _ms(percentile(self.send_times, 50)),
+            'write_p99_ms': _ms(percentile(self.send_times, 99)),
+            'latency_p50_ms': _ms(percentile(latencies, 50)),
+            'latency_p99_ms': _ms(percentile(latencies, 99)),
+        }
+
+
+def summarize(values):
+    """Distribution of durations in milliseconds"""
+    return {
+        'count': len(values),
+        'min_ms': _ms(min(values)) if values else None,
+        'p50_ms': _ms(percentile(values, 50)),
+        'p90_ms': _ms(percentile(values, 90)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'max_ms': _ms(max(values)) if values else None,
+    }
+
+
+class EventTimer:
+    """Records the receive time of the first matching event after arm()
+
+    An instance is registered as BTPEventHandler monitor of iut, unlike
+    wait_for_event() it stays registered across many cycles.
+    """
+
+    def __init__(self, iut=None):
+        self.iut = iut
+        self._verify_f = None
+        self._event = threading.Event()
+        self.rx_time = None
+        self.result = None
+
+    def arm(self, verify_f=None):
+        # Ignore events while rearming
+        self._event.set()
+        self._verify_f = verify_f
+        self.rx_time = None
+        self.result = None
+        self._event.clear()
+
+    def __call__(self, result, rx_time):
+        if self._event.is_set():
+            return
+        if self._verify_f and not self._verify_f(result):
+            return
+
+        self.result = result
+        self.rx_time = rx_time
+        self._event.set()
+
+    def wait(self, timeout):
+        """Return the receive time, raise TimeoutError if none matched"""
+        if not wait_event(self._event, timeout, self.iut):
+            raise TimeoutError
+        return self.rx_time
+
+
+def format_report(title, report, indent=4):
+    lines = [title] if title else []
+    for key, value in report.items():
+        if isinstance(value, dict):
+            lines.append("%s%s" % (" " * indent, key))
+            lines.append(format_report(None, value, indent + 4))
+            continue
+
+        if value is None:
+            value = "-"
+        elif isinstance(value, float):
+            value = "%.3f" % value
+        lines.append("%s%-*s %s" % (" " * indent, 26 - indent, key, value))
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""IUT state carried from one test to the next
+
+A test decorated with shared_connection() finds the IUTs connected in
+setUp and leaves the link open in tearDown. The next test with the same
+fixture key reuses the link instead of resetting both IUTs and
+reconnecting. Undecorated tests get freshly reset IUTs as before.
+
+IUTs not kept connected are reset for the next test as soon as a test
+is torn down, while its result is reported. The next test waits for the
+reset in setUp instead of starting it.
+"""
+
+import concurrent.futures
+import logging
+
+from common import metrics
+
+CLASS = 'class'
+MODULE = 'module'
+
+# (central, peripheral) -> ConnectionFixture
+_fixtures = {}
+
+# IUT -> future of the reset started for the next test using it
+_resets = {}
+_executor = None
+
+
+def shared_connection(scope=CLASS):
+    """Mark test able to run on a connection left by an earlier test
+
+    Tests of the same class, or of the same module for MODULE scope,
+    share one connection. The test must leave the link connected and the
+    GATT server as it found it, a failing test drops the connection. Only
+    the link is checked between tests, tests writing attribute values or
+    changing other IUT state are left undecorated.
+    """
+    def decorator(f):
+        f.fixture_scope = scope
+        return f
+    return decorator
+
+
+def fixture_key(testcase):
+    """Key of the fixture the test runs on, None for a fresh state"""
+    method = getattr(testcase, testcase._testMethodName)
+    scope = getattr(method, 'fixture_scope', None)
+
+    if scope == CLASS:
+        return scope, type(testcase).__qualname__
+    if scope == MODULE:
+        return scope, type(testcase).__module__
+    return None
+
+
+class ConnectionFixture:
+    """Connection kept open between the tests of one fixture key"""
+
+    def __init__(self, key, central, peripheral):
+        self.key = key
+        self.central = central
+        self.peripheral = peripheral
+        self.uses = 0
+
+    def is_clean(self):
+        """Whether both IUTs are still connected to each other
+
+        Only the link state is known to the tester, the GATT server and
+        other state of the IUTs is not checked.
+        """
+        addr = self.peripheral.stack.gap.iut_addr_get()
+        return self.central.stack.gap.is_connected(addr) and \
+            self.peripheral.stack.gap.is_connected()
+
+
+def get_fixture(central, peripheral):
+    return _fixtures.get((central, peripheral))
+
+
+def set_fixture(key, central, peripheral):
+    fixture = ConnectionFixture(key, central, peripheral)
+    _fixtures[(central, peripheral)] = fixture
+    return fixture
+
+
+def drop_fixtures(*iuts):
+    """Forget every fixture on iuts, the caller resets or stops them"""
+    for pair, fixture in list(_fixtures.items()):
+        if set(pair) & set(iuts):
+            logging.debug("Dropping fixture %r after %d uses",
+                          fixture.key, fixture.uses)
+            del _fixtures[pair]
+
+
+def start_reset(*iuts):
+    """Reset iuts and wait for their ready events in the background
+
+    An IUT with a reset already started is left alone.
+    """
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            thread_name_prefix='IutReset')
+
+    for iut in iuts:
+        if iut not in _resets:
+            _resets[iut] = _executor.submit(iut.wait_iut_ready_event)
+            if metrics.METRICS is not None:
+                metrics.METRICS.reset(iut)
+
+
+def wait_reset(*iuts):
+    """Wait until iuts are reset and ready
+
+    IUTs not reset ahead are reset now, all of them at the same time.
+    Every reset is finished before a failed one is raised.
+    """
+    start_reset(*iuts)
+    futures = [_resets.pop(iut) for iut in iuts]
+    concurrent.futures.wait(futures)
+    for future in futures:
+        future.result()
+
+
+def release_fixtures():
+    """Stop the IUTs still held by fixtures or reset ahead, call after a
+    test run
+    """
+    for (central, peripheral) in list(_fixtures):
+        drop_fixtures(central, peripheral)
+        central.stop()
+        peripheral.stop()
+
+    for iut, future in list(_resets.items()):
+        del _resets[iut]
+        try:
+            future.result()
+        except Exception as e:
+            logging.debug("Reset of %s for no test failed: %r", iut, e)
+        iut.stop()
+
+
+def group_by_fixture(tests):
+    """Lists of tests sharing a fixture, other tests alone in a list
+
+    Every group takes the position of its first test. A group must run
+    back to back on one IUT pair to reuse its connection.
+    """
+    groups = {}
+    for i, test in enumerate(tests):
+        key = fixture_key(test)
+        groups.setdefault(i if key is None else key, []).append(test)
+
+    return list(groups.values())
+
+
+def order_by_fixture(tests):
+    """Group tests sharing a fixture, keeping the order otherwise
+
+    A fixture is set up once per run instead of once per interleaved
+    sequence.
+    """
+    return [test for group in group_by_fixture(tests) for test in group]
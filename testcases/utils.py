@@ -21,7 +21,7 @@ from pybtp import btp
 from pybtp.btp import parse_ad, ad_find_uuid16
 from pybtp.defs import BTP_SERVICE_ID_GATTC
 from pybtp.types import AdType
-from pybtp.utils import wait_futures
+from pybtp.utils import wait_futures, payload_eq
 from stack.gap import BleAddress
 
 EV_TIMEOUT = 20
@@ -84,7 +84,7 @@ def verify_address(args, addr: BleAddress):
 
 
 def verify_value_changed_ev(args, handle, value):
-    return args[0] == handle and args[1] == value
+    return args[0] == handle and payload_eq(args[1], value)
 
 
 def verify_notification_ev(args, addr: BleAddress, type, handle):
@@ -94,55 +94,57 @@ def verify_notification_ev(args, addr: BleAddress, type, handle):
 
 
 def connection_procedure(testcase, central, peripheral):
-    btp.gap_set_conn(peripheral)
-    btp.gap_set_gendiscov(peripheral)
+    with testcase.phase('connection_procedure'):
+        btp.gap_set_conn(peripheral)
+        btp.gap_set_gendiscov(peripheral)
 
-    uuid = os.urandom(2)
-    btp.gap_adv_ind_on(peripheral, ad=[(AdType.uuid16_some, uuid)])
+        uuid = os.urandom(2)
+        btp.gap_adv_ind_on(peripheral, ad=[(AdType.uuid16_some, uuid)])
 
-    def verify_f(args): return find_adv_by_uuid(args,
-                                                btp.btp2uuid(len(uuid), uuid))
+        def verify_f(args):
+            return find_adv_by_uuid(args, btp.btp2uuid(len(uuid), uuid))
 
-    btp.gap_start_discov(central)
-    future = btp.gap_device_found_ev(central, verify_f)
-    wait_futures([future], timeout=EV_TIMEOUT)
-    btp.gap_stop_discov(central)
+        btp.gap_start_discov(central)
+        future = btp.gap_device_found_ev(central, verify_f)
+        wait_futures([future], timeout=EV_TIMEOUT)
+        btp.gap_stop_discov(central)
 
-    found = future.result()
+        found = future.result()
 
-    testcase.assertIsNotNone(found)
-    peripheral.stack.gap.iut_addr_set(found.addr)
+        testcase.assertIsNotNone(found)
+        peripheral.stack.gap.iut_addr_set(found.addr)
 
-    def verify_central(args): return verify_address(args, found.addr)
+        def verify_central(args): return verify_address(args, found.addr)
 
-    future_central = btp.gap_connected_ev(central, verify_central)
-    future_peripheral = btp.gap_connected_ev(peripheral)
+        future_central = btp.gap_connected_ev(central, verify_central)
+        future_peripheral = btp.gap_connected_ev(peripheral)
 
-    btp.gap_conn(central, peripheral.stack.gap.iut_addr_get())
+        btp.gap_conn(central, peripheral.stack.gap.iut_addr_get())
 
-    wait_futures([future_central, future_peripheral], timeout=EV_TIMEOUT)
+        wait_futures([future_central, future_peripheral], timeout=EV_TIMEOUT)
 
-    testcase.assertTrue(central.stack.gap.is_connected())
-    testcase.assertTrue(peripheral.stack.gap.is_connected())
+        testcase.assertTrue(central.stack.gap.is_connected())
+        testcase.assertTrue(peripheral.stack.gap.is_connected())
 
-    central_addr, _ = future_peripheral.result()
-    central.stack.gap.iut_addr_set(central_addr)
+        central_addr, _ = future_peripheral.result()
+        central.stack.gap.iut_addr_set(central_addr)
 
 
 def disconnection_procedure(testcase, central, peripheral):
-    periph_addr = peripheral.stack.gap.iut_addr_get()
+    with testcase.phase('disconnection_procedure'):
+        periph_addr = peripheral.stack.gap.iut_addr_get()
 
-    def verify_central(args):
-        return verify_address(args, periph_addr)
+        def verify_central(args):
+            return verify_address(args, periph_addr)
 
-    future_central = btp.gap_disconnected_ev(central, verify_central)
-    future_peripheral = btp.gap_disconnected_ev(peripheral)
+        future_central = btp.gap_disconnected_ev(central, verify_central)
+        future_peripheral = btp.gap_disconnected_ev(peripheral)
 
-    btp.gap_disconn(central, peripheral.stack.gap.iut_addr_get())
+        btp.gap_disconn(central, peripheral.stack.gap.iut_addr_get())
 
-    wait_futures([future_central, future_peripheral], timeout=EV_TIMEOUT)
+        wait_futures([future_central, future_peripheral], timeout=EV_TIMEOUT)
 
-    testcase.assertFalse(peripheral.stack.gap.is_connected())
-    testcase.assertFalse(central.stack.gap.is_connected())
+        testcase.assertFalse(peripheral.stack.gap.is_connected())
+        testcase.assertFalse(central.stack.gap.is_connected())
 
 
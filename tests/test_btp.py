@@ -0,0 +1,68 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import unittest
+
+from benchmarks.hotpaths import PairSocket, recv_exact
+from pybtp import btp, parser
+from pybtp import messages as msgs
+from pybtp.btp_worker import BTPWorker
+
+
+class RecordingIut:
+    """Just enough of an IutCtl to send commands to, records them"""
+
+    def __init__(self):
+        self.btp_socket = PairSocket()
+        self.btp_worker = BTPWorker(self.btp_socket, "TestRxWorker")
+        self.btp_worker.accept()
+        self.commands = []
+        self._thread = threading.Thread(target=self._respond, daemon=True)
+        self._thread.start()
+
+    def _respond(self):
+        sock = self.btp_socket.iut
+        try:
+            while True:
+                hdr = parser.dec_hdr(recv_exact(sock, parser.HDR_LEN))
+                self.commands.append(bytes(recv_exact(sock, hdr.data_len)))
+                sock.sendall(parser.enc_frame(hdr.svc_id, hdr.op,
+                                              hdr.ctrl_index, b""))
+        except (OSError, EOFError):
+            pass
+
+    def close(self):
+        self.btp_worker.close()
+        self._thread.join()
+
+
+class PayloadTest(unittest.TestCase):
+    def setUp(self):
+        self.iut = RecordingIut()
+        self.addCleanup(self.iut.close)
+
+    def set_value(self, value):
+        btp.gatts_set_val(self.iut, 1, value)
+        cmd = msgs.GattSetValueCmd.decode(self.iut.commands[-1], exact=True)
+        return cmd.value
+
+    def test_set_value_bytes(self):
+        self.assertEqual(self.set_value(b'\x00\x01'), b'\x00\x01')
+        self.assertEqual(self.set_value(bytearray(b'\xff')), b'\xff')
+
+    def test_set_value_hex(self):
+        self.assertEqual(self.set_value("00ff"), b'\x00\xff')
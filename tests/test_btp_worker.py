@@ -0,0 +1,109 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+import socket
+import threading
+import unittest
+
+from benchmarks.hotpaths import PairSocket, recv_exact
+from pybtp import defs, parser
+from pybtp.btp_worker import BTPWorker
+
+COMMANDS = 200
+
+# Commands the IUT never answers
+DROPPED_OP = defs.GAP_UNPAIR
+
+
+def iut_echo(sock):
+    """Answer every command with its opcode and payload, in order"""
+    try:
+        while True:
+            hdr = parser.dec_hdr(recv_exact(sock, parser.HDR_LEN))
+            data = recv_exact(sock, hdr.data_len)
+            if hdr.op == DROPPED_OP:
+                continue
+            sock.sendall(parser.enc_frame(hdr.svc_id, hdr.op,
+                                          hdr.ctrl_index, bytes(data)))
+    except (OSError, EOFError):
+        pass
+
+
+class BTPWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.btp_socket = PairSocket()
+        self.worker = BTPWorker(self.btp_socket, "TestRxWorker")
+        self.worker.accept()
+        self.iut = threading.Thread(target=iut_echo,
+                                    args=(self.btp_socket.iut,), daemon=True)
+        self.iut.start()
+
+    def tearDown(self):
+        self.worker.close()
+        self.iut.join()
+
+    def command(self, op, seq):
+        data = self.worker.send_wait_rsp(defs.BTP_SERVICE_ID_GAP, op, 0,
+                                         seq.to_bytes(4, 'little'))
+        return int.from_bytes(data[0], 'little')
+
+    def test_send_wait_rsp(self):
+        self.assertEqual(self.command(defs.GAP_PAIR, 7), 7)
+        self.assertIsNone(self.worker.pending_since())
+
+    def test_own_responses(self):
+        # A responder thread and the test thread send on the same IUT
+        mixed = []
+
+        def responder():
+            with self.worker.own_responses():
+                for seq in range(COMMANDS):
+                    if self.command(defs.GAP_PASSKEY_CONFIRM, seq) != seq:
+                        mixed.append(seq)
+
+        thread = threading.Thread(target=responder)
+        thread.start()
+        for seq in range(COMMANDS):
+            self.assertEqual(self.command(defs.GAP_PAIR, seq), seq)
+        thread.join()
+
+        self.assertEqual(mixed, [])
+        self.assertEqual(self.worker.rx_queue_depth(), 0)
+
+    def test_dropped_response(self):
+        results = []
+
+        def responder():
+            with self.worker.own_responses():
+                self.worker.send(defs.BTP_SERVICE_ID_GAP, DROPPED_OP, 0, b"")
+                try:
+                    self.worker.read(timeout=0.2)
+                except socket.timeout:
+                    results.append('timeout')
+                results.append(self.command(defs.GAP_PASSKEY_CONFIRM, 2))
+
+        thread = threading.Thread(target=responder)
+        thread.start()
+        thread.join()
+
+        # Responses after the unanswered command reach their senders
+        self.assertEqual(results, ['timeout', 2])
+        self.assertEqual(self.command(defs.GAP_PAIR, 3), 3)
+        self.assertIsNone(self.worker.pending_since())
+        self.assertEqual(self.worker.rx_queue_depth(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
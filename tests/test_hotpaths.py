@@ -0,0 +1,55 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import contextlib
+import io
+import unittest
+
+from benchmarks import hotpaths
+
+
+def result(median, low, high):
+    return {'median': median, 'min': low, 'max': high}
+
+
+class CompareTest(unittest.TestCase):
+    def compare(self, results, baseline):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return hotpaths.compare(results, baseline, 10)
+
+    def test_within_noise(self):
+        baseline = {'a': result(1.0, 0.8, 1.5)}
+        self.assertEqual(self.compare({'a': result(1.3, 1.2, 1.6)},
+                                      baseline), [])
+
+    def test_slower(self):
+        baseline = {'a': result(1.0, 0.9, 1.1)}
+        self.assertEqual(self.compare({'a': result(1.3, 1.2, 1.4)},
+                                      baseline), ['a'])
+
+    def test_below_threshold(self):
+        baseline = {'a': result(1.0, 1.0, 1.01)}
+        self.assertEqual(self.compare({'a': result(1.05, 1.04, 1.06)},
+                                      baseline), [])
+
+    def test_new(self):
+        self.assertEqual(self.compare({'a': result(1.0, 1.0, 1.0)}, {}), [])
+
+    def test_run(self):
+        name = "parser.dec_hdr"
+        timing = hotpaths.run([name], 3)[name]
+        self.assertLessEqual(timing['min'], timing['median'])
+        self.assertLessEqual(timing['median'], timing['max'])
@@ -0,0 +1,49 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import unittest
+
+from common.utils import set_iut_lost, clear_iut_lost, \
+    raise_on_iut_lost, wait_for
+from pybtp.types import IUTLostError
+from stack.common import wait_for_event
+
+
+class IutLostTest(unittest.TestCase):
+    def setUp(self):
+        self.error = IUTLostError("lost")
+        set_iut_lost("lost", self.error)
+        self.addCleanup(clear_iut_lost, "lost")
+
+    def test_raise_on_iut_lost(self):
+        raise_on_iut_lost()
+        raise_on_iut_lost("other")
+        with self.assertRaises(IUTLostError):
+            raise_on_iut_lost("other", "lost")
+
+    def test_wait_for_event(self):
+        with self.assertRaises(IUTLostError):
+            wait_for_event(10, lambda: False, iut_name="lost")
+        self.assertFalse(wait_for_event(0.05, lambda: False,
+                                        iut_name="other"))
+
+    def test_wait_cancels_timer(self):
+        timers = threading.active_count()
+        with self.assertRaises(IUTLostError):
+            wait_for_event(10, lambda: False, iut_name="lost")
+        # A cancelled timer thread exits at once, not after 10 seconds
+        wait_for(lambda: threading.active_count() == timers, 1)
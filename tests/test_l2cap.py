@@ -0,0 +1,48 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from stack.l2cap import L2CAPChannel
+
+
+class L2CAPChannelTest(unittest.TestCase):
+    def test_read(self):
+        chan = L2CAPChannel(1)
+        chan.data_received(b'abc')
+        chan.data_received(b'def')
+        self.assertEqual(chan.read(2), b'ab')
+        self.assertEqual(chan.read(), b'cdef')
+        self.assertEqual(chan.rx_len(), 0)
+        self.assertEqual((chan.rx_count, chan.rx_bytes), (2, 6))
+
+    def test_buffer_capped(self):
+        chan = L2CAPChannel(1, rx_buffer_size=8)
+        for i in range(5):
+            chan.data_received(bytes([i]) * 4)
+
+        self.assertEqual(chan.rx_len(), 8)
+        self.assertEqual(chan.rx_bytes, 20)
+        self.assertEqual(chan.rx_dropped, 12)
+        self.assertEqual(chan.read(), b'\x03' * 4 + b'\x04' * 4)
+
+    def test_wait_for_more_than_buffer(self):
+        chan = L2CAPChannel(1, rx_buffer_size=8)
+        self.assertRaises(ValueError, chan.wait_for_data, 9, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
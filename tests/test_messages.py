@@ -0,0 +1,105 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+import unittest
+
+from pybtp import messages as msgs
+from pybtp.schema import Message
+from pybtp.types import BTPError
+from stack.gap import BleAddress
+
+ADDR = BleAddress("001122334455", 1)
+ADDR_BYTES = bytes([1, 0x55, 0x44, 0x33, 0x22, 0x11, 0x00])
+
+MESSAGES = [cls for cls in vars(msgs).values()
+            if isinstance(cls, type) and issubclass(cls, Message) and
+            cls is not Message]
+
+# Message and its encoding, one per kind of field
+SAMPLES = [
+    (msgs.GapResetCmd(), b''),
+    (msgs.GapSetPoweredCmd(1), b'\x01'),
+    (msgs.GapConnectCmd(ADDR, 0), ADDR_BYTES + b'\x00'),
+    (msgs.GapPasskeyEntryCmd(ADDR, 123456),
+     ADDR_BYTES + (123456).to_bytes(4, 'little')),
+    (msgs.GapDeviceFoundEv(ADDR, 0xc8, 4, b'\x02\x01\x06'),
+     ADDR_BYTES + b'\xc8\x04\x03\x00\x02\x01\x06'),
+    (msgs.GapStartAdvertisingCmd(b'\x02\x01\x06', b'', 0xffffffff, 0),
+     b'\x03\x00\x02\x01\x06\xff\xff\xff\xff\x00'),
+    (msgs.GattAddServiceCmd(0, b'\x0d\x18'), b'\x00\x02\x0d\x18'),
+    (msgs.GattReadMultipleCmd(ADDR, [0x0001, 0x0020, 0xffff]),
+     ADDR_BYTES + b'\x03\x01\x00\x20\x00\xff\xff'),
+    (msgs.MeshInputStringCmd(b'abc'), b'abc'),
+    (msgs.MeshHealthAddFaultsRp(7, b'\x01\x02', b''),
+     b'\x07\x02\x00\x01\x02'),
+]
+
+
+class MessageTest(unittest.TestCase):
+    def test_samples(self):
+        for msg, data in SAMPLES:
+            with self.subTest(msg=msg):
+                self.assertEqual(msg.encode(), data)
+                self.assertEqual(type(msg).decode(data, exact=True), msg)
+
+    def test_all_round_trip(self):
+        # Zeroed data decodes to empty variable length fields
+        for cls in MESSAGES:
+            with self.subTest(msg=cls.__name__):
+                data = bytes(cls.min_len)
+                msg = cls.decode(data, exact=True)
+                self.assertEqual(msg.encode(), data)
+                self.assertEqual(cls.decode(msg.encode(), exact=True), msg)
+
+    def test_short_data(self):
+        for cls in MESSAGES:
+            if not cls.min_len:
+                continue
+            with self.subTest(msg=cls.__name__):
+                self.assertRaises(BTPError, cls.decode,
+                                  bytes(cls.min_len - 1))
+
+    def test_truncated_data_field(self):
+        data = ADDR_BYTES + b'\x03\x01\x00\x20\x00'
+        self.assertRaises(BTPError, msgs.GattReadMultipleCmd.decode, data)
+        self.assertRaises(BTPError, msgs.GattAddServiceCmd.decode,
+                          b'\x00\x02\x0d')
+
+    def test_oversized_data_field(self):
+        self.assertRaises(BTPError, msgs.GattAddServiceCmd(0, bytes(256))
+                          .encode)
+        self.assertRaises(BTPError, msgs.GattSetValueCmd(1, bytes(0x10000))
+                          .encode)
+        self.assertRaises(BTPError, msgs.GattReadMultipleCmd(
+            ADDR_BYTES, list(range(256))).encode)
+        self.assertRaises(BTPError, msgs.GattReadMultipleCmd(
+            ADDR_BYTES, [0x10000]).encode)
+
+    def test_trailing_data(self):
+        self.assertRaises(BTPError, msgs.GapSetPoweredCmd.decode,
+                          b'\x01\x00', exact=True)
+        self.assertEqual(msgs.GapSetPoweredCmd.decode(b'\x01\x00'),
+                         msgs.GapSetPoweredCmd(1))
+
+    def test_iter_decode(self):
+        records = [msgs.GattServiceRecord(1, 5, b'\x00\x18'),
+                   msgs.GattServiceRecord(6, 0xffff, bytes(16))]
+        data = b'\x00' + b''.join(record.encode() for record in records)
+        self.assertEqual(list(msgs.GattServiceRecord.iter_decode(
+            data, len(records), 1)), records)
+
+
+if __name__ == '__main__':
+    unittest.main()
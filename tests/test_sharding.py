@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import tempfile
+import unittest
+
+from common import sharding
+from common import results
+
+
+class QueuedTest(unittest.TestCase):
+    def test_a(self):
+        pass
+
+    def test_b(self):
+        pass
+
+    def test_c(self):
+        pass
+
+
+class QueueSuiteTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_claimed(self):
+        loader = unittest.TestLoader()
+        queues = [sharding.WorkQueue(self.path, worker)
+                  for worker in ("first", "second")]
+        for queue in queues:
+            self.addCleanup(queue.close)
+
+        names = [[results.test_name(test)] for test in
+                 loader.loadTestsFromTestCase(QueuedTest)]
+        queues[0].fill("run-1", names, [3, 2, 1])
+
+        # The first worker stops after its first unit, the second
+        # claims the rest
+        first_result = unittest.TestResult()
+        first_claims = []
+        second_claims = []
+
+        def first_claim(tests):
+            first_claims.append(tests)
+            first_result.stop()
+
+        first = sharding.QueueSuite(loader.loadTestsFromTestCase(QueuedTest),
+                                    queues[0], "run-1", claim_f=first_claim)
+        second = sharding.QueueSuite(
+            loader.loadTestsFromTestCase(QueuedTest), queues[1], "run-1",
+            claim_f=second_claims.append)
+        first.run(first_result)
+        second_result = second.run(unittest.TestResult())
+
+        self.assertEqual([results.test_name(test) for test in first.claimed],
+                         ["QueuedTest#test_a"])
+        self.assertEqual([results.test_name(test) for test in second.claimed],
+                         ["QueuedTest#test_b", "QueuedTest#test_c"])
+        self.assertEqual([len(tests) for tests in second_claims], [1, 1])
+        self.assertEqual(len(first_claims), 1)
+        self.assertEqual(second_result.testsRun, 2)
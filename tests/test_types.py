@@ -0,0 +1,81 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2017, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+import pickle
+import unittest
+
+from pybtp.types import BleUUID, UUID
+
+
+class BleUUIDTest(unittest.TestCase):
+    def assertRoundTrip(self, uuid_str, size):
+        uuid = BleUUID(uuid_str)
+        data = uuid.to_bytes()
+        self.assertEqual(len(data), size)
+        self.assertIs(BleUUID.from_bytes(data), uuid)
+        self.assertEqual(str(BleUUID.from_bytes(data)), uuid_str)
+
+    def test_round_trip_16(self):
+        self.assertRoundTrip('2800', 2)
+        self.assertRoundTrip('0000', 2)
+
+    def test_round_trip_32(self):
+        self.assertRoundTrip('12345678', 4)
+        # A 32-bit UUID of a 16-bit value is that 16-bit UUID
+        self.assertIs(BleUUID('00001234'), BleUUID('1234'))
+
+    def test_round_trip_128(self):
+        self.assertRoundTrip('F000BB5004514000B123456789ABCDEF', 16)
+        self.assertRoundTrip('00000000000000000000000000001234', 16)
+        self.assertRoundTrip('00000000000000000000000000000000', 16)
+
+    def test_128_bit_bytes_stay_128_bit(self):
+        uuid = BleUUID.from_bytes(bytes(16))
+        self.assertEqual(uuid.size, 16)
+        self.assertEqual(uuid.to_bytes(), bytes(16))
+        self.assertIsNot(uuid, BleUUID('0000'))
+
+    def test_base_forms_are_one_value(self):
+        self.assertIs(BleUUID('00002800-0000-1000-8000-00805F9B34FB'),
+                      UUID.primary_svc)
+        self.assertIs(BleUUID('0x00002800'), UUID.primary_svc)
+        self.assertIs(BleUUID.from_bytes(b'\x00\x28\x00\x00'),
+                      UUID.primary_svc)
+        self.assertEqual(UUID.primary_svc.to_bytes(), b'\x00\x28')
+
+    def test_int_is_128_bit_value(self):
+        self.assertIs(BleUUID(UUID.chrc.value), UUID.chrc)
+        self.assertEqual(BleUUID(0x1234).size, 16)
+        self.assertRaises(ValueError, BleUUID, 1 << 128)
+        self.assertRaises(ValueError, BleUUID, -1)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, BleUUID, '123')
+        self.assertRaises(ValueError, BleUUID.from_bytes, bytes(3))
+
+    def test_eq_and_hash(self):
+        self.assertEqual(BleUUID('2800'), UUID.primary_svc)
+        self.assertIn(BleUUID('2800'), {UUID.primary_svc})
+        self.assertNotEqual(UUID.primary_svc, '2800')
+        self.assertNotIn('2800', {UUID.primary_svc})
+        self.assertNotIn(UUID.primary_svc, {'2800'})
+
+    def test_pickle(self):
+        self.assertIs(pickle.loads(pickle.dumps(UUID.VND128_1)),
+                      UUID.VND128_1)
+
+
+if __name__ == '__main__':
+    unittest.main()
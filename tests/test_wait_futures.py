@@ -0,0 +1,44 @@
+#
+# Copyright (c) 2019 JUUL Labs, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+import unittest
+from concurrent.futures import Future
+
+from pybtp.utils import wait_futures
+
+
+class WaitFuturesTest(unittest.TestCase):
+    def test_timeout_from_start(self):
+        future = Future()
+        future.timeout_start = time.monotonic() - 10
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            wait_futures([future], timeout=5)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_done_after_timeout(self):
+        future = Future()
+        future.timeout_start = time.monotonic() - 10
+        future.set_result(None)
+        wait_futures([future], timeout=5)
+
+    def test_timeout_from_now(self):
+        future = Future()
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            wait_futures([future], timeout=0.1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)